@@ -54,17 +54,25 @@ _comp_dwsutil()
 		condition="${context::2}-${arg::1}"
 		case "${condition}" in
 		"wf-")
+			COMPREPLY+=("assign")
 			COMPREPLY+=("assigncomputes")
 			COMPREPLY+=("assignservers")
+			COMPREPLY+=("capacityplan")
 			COMPREPLY+=("create")
 			COMPREPLY+=("delete")
+			COMPREPLY+=("fitcheck")
 			COMPREPLY+=("get")
 			COMPREPLY+=("investigate")
 			COMPREPLY+=("list")
 			COMPREPLY+=("progress")
 			COMPREPLY+=("progressteardown")
+			COMPREPLY+=("simulate")
+			COMPREPLY+=("sweep")
 			;;
 		"wf-a")
+            if [[ ${#argfull} -le 6 ]]; then
+			    COMPREPLY+=("assign")
+            fi
             if [[ ${#argfull} -le 6 ]] || [[ "${argfull}" =~ .*"assignc".* ]]; then
 			    COMPREPLY+=("assigncomputes")
             fi
@@ -73,11 +81,15 @@ _comp_dwsutil()
             fi
 			;;
 		"wf-c")
+			COMPREPLY+=("capacityplan")
 			COMPREPLY+=("create")
 			;;
 		"wf-d")
 			COMPREPLY+=("delete")
 			;;
+		"wf-f")
+			COMPREPLY+=("fitcheck")
+			;;
 		"wf-g")
 			COMPREPLY+=("get")
 			;;
@@ -96,8 +108,37 @@ _comp_dwsutil()
 				COMPREPLY+=("progressteardown")
 			fi
 			;;
-		"in-"|"in-s")
+		"wf-s")
+			COMPREPLY+=("simulate")
+			COMPREPLY+=("sweep")
+			;;
+		"in-")
+			COMPREPLY+=("export")
+			COMPREPLY+=("generate")
+			COMPREPLY+=("query")
 			COMPREPLY+=("show")
+			COMPREPLY+=("summary")
+			COMPREPLY+=("utilization")
+			COMPREPLY+=("watch")
+			;;
+		"in-w")
+			COMPREPLY+=("watch")
+			;;
+		"in-e")
+			COMPREPLY+=("export")
+			;;
+		"in-g")
+			COMPREPLY+=("generate")
+			;;
+		"in-q")
+			COMPREPLY+=("query")
+			;;
+		"in-s")
+			COMPREPLY+=("show")
+			COMPREPLY+=("summary")
+			;;
+		"in-u")
+			COMPREPLY+=("utilization")
 			;;
 		"st-"|"st-l")
 			COMPREPLY+=("list")
@@ -109,27 +150,172 @@ _comp_dwsutil()
 		esac
 	else
 		case "${arg}" in
-		"--c"|"--co"|"--con")
+		"--c")
+			COMPREPLY+=("--capacity")
+			COMPREPLY+=("--columnar")
+			COMPREPLY+=("--computes")
+			COMPREPLY+=("--context")
+			COMPREPLY+=("--cursorfile")
+			;;
+		"--ca"|"--cap")
+			COMPREPLY+=("--capacity")
+			;;
+		"--col")
+			COMPREPLY+=("--columnar")
+			;;
+		"--com")
+			COMPREPLY+=("--computes")
+			;;
+		"--co")
+			COMPREPLY+=("--columnar")
+			COMPREPLY+=("--computes")
 			COMPREPLY+=("--context")
 			;;
+		"--con")
+			COMPREPLY+=("--context")
+			;;
+		"--cu")
+			COMPREPLY+=("--cursorfile")
+			;;
 		"--e"|"--ex")
 			COMPREPLY+=("--exr")
 			COMPREPLY+=("--exc")
+			COMPREPLY+=("--exrfile")
+			COMPREPLY+=("--excfile")
+			COMPREPLY+=("--exportfile")
+			;;
+		"--exp")
+			COMPREPLY+=("--exportfile")
+			;;
+		"--exr")
+			COMPREPLY+=("--exr")
+			COMPREPLY+=("--exrfile")
+			;;
+		"--exc")
+			COMPREPLY+=("--exc")
+			COMPREPLY+=("--excfile")
+			;;
+		"--l"|"--le")
+			COMPREPLY+=("--ledger")
 			;;
-		"--m"|"--mu")
+		"--m")
+			COMPREPLY+=("--mix")
 			COMPREPLY+=("--munge")
 			;;
-		"--r"|"--re")
+		"--mi")
+			COMPREPLY+=("--mix")
+			;;
+		"--mu")
+			COMPREPLY+=("--munge")
+			;;
+		"--r")
+			COMPREPLY+=("--rabbits")
 			COMPREPLY+=("--regex")
+			COMPREPLY+=("--replan")
+			;;
+		"--ra"|"--rab")
+			COMPREPLY+=("--rabbits")
 			;;
-		"--s"|"--sh"|"--sho")
+		"--re")
+			COMPREPLY+=("--regex")
+			COMPREPLY+=("--replan")
+			;;
+		"--s")
+			COMPREPLY+=("--seed")
 			COMPREPLY+=("--showconfig")
+			COMPREPLY+=("--since")
+			COMPREPLY+=("--storagefile")
+			COMPREPLY+=("--strategy")
+			COMPREPLY+=("--stream")
+			;;
+		"--si")
+			COMPREPLY+=("--since")
+			;;
+		"--se")
+			COMPREPLY+=("--seed")
+			;;
+		"--sh"|"--sho")
+			COMPREPLY+=("--showconfig")
+			;;
+		"--st")
+			COMPREPLY+=("--storagefile")
+			COMPREPLY+=("--strategy")
+			COMPREPLY+=("--stream")
+			;;
+		"--sto")
+			COMPREPLY+=("--storagefile")
+			;;
+		"--str")
+			COMPREPLY+=("--strategy")
+			COMPREPLY+=("--stream")
+			;;
+		"--t")
+			COMPREPLY+=("--telemetry")
+			COMPREPLY+=("--telemetryttl")
+			COMPREPLY+=("--topologycache")
+			COMPREPLY+=("--trace")
+			;;
+		"--te")
+			COMPREPLY+=("--telemetry")
+			COMPREPLY+=("--telemetryttl")
+			;;
+		"--to")
+			COMPREPLY+=("--topologycache")
+			;;
+		"--tr")
+			COMPREPLY+=("--trace")
+			;;
+		"--q"|"--qu")
+			COMPREPLY+=("--query")
+			;;
+		"--g"|"--gr")
+			COMPREPLY+=("--grid")
+			;;
+		"--w")
+			COMPREPLY+=("--watchseconds")
+			COMPREPLY+=("--workers")
+			;;
+		"--wa")
+			COMPREPLY+=("--watchseconds")
+			;;
+		"--wo")
+			COMPREPLY+=("--workers")
+			;;
+		"--d")
+			COMPREPLY+=("--debounce")
+			;;
+		"--i"|"--in")
+			COMPREPLY+=("--inventory")
+			COMPREPLY+=("--interval")
 			;;
 		"--p"|"--pr")
 			COMPREPLY+=("--pretty")
+			COMPREPLY+=("--plancache")
+			COMPREPLY+=("--planout")
+			;;
+		"--pl")
+			COMPREPLY+=("--plancache")
+			COMPREPLY+=("--planout")
 			;;
-		"--a"|"--al"|"--all")
+		"--a")
+			COMPREPLY+=("--all-contexts")
 			COMPREPLY+=("--alloc")
+			COMPREPLY+=("--apply")
+			;;
+		"--al")
+			COMPREPLY+=("--all-contexts")
+			COMPREPLY+=("--alloc")
+			;;
+		"--all")
+			if [[ "${argfull::6}" == "--allo" ]]; then
+				COMPREPLY+=("--alloc")
+			else
+				COMPREPLY+=("--all-contexts")
+				COMPREPLY+=("--alloc")
+			fi
+			;;
+		"--ap")
+			COMPREPLY+=("--apply")
 			;;
 		"--ope")
 			COMPREPLY+=("--operation")
@@ -143,13 +329,18 @@ _comp_dwsutil()
 			;;
 		"--nam")
 			COMPREPLY+=("--name")
+			COMPREPLY+=("--namepattern")
 			;;
 		"--not")
 			COMPREPLY+=("--notimestamp")
+			COMPREPLY+=("--notready")
 			;;
 		"--nod")
 			COMPREPLY+=("--node")
 			;;
+		"--noi")
+			COMPREPLY+=("--noinventorycache")
+			;;
 		"--nor")
 			COMPREPLY+=("--noreuse")
 			;;
@@ -158,41 +349,79 @@ _comp_dwsutil()
 			;;
 		"--no")
 			COMPREPLY+=("--node")
+			COMPREPLY+=("--noinventorycache")
 			COMPREPLY+=("--notimestamp")
+			COMPREPLY+=("--notready")
 			COMPREPLY+=("--noreuse")
 			COMPREPLY+=("--nowait")
 			;;
 		"--n")
 			COMPREPLY+=("--name")
+			COMPREPLY+=("--namepattern")
 			COMPREPLY+=("--node")
+			COMPREPLY+=("--noinventorycache")
 			COMPREPLY+=("--notimestamp")
+			COMPREPLY+=("--notready")
 			COMPREPLY+=("--noreuse")
 			COMPREPLY+=("--nowait")
 			;;
 		"--")
+			COMPREPLY+=("--all-contexts")
 			COMPREPLY+=("--alloc")
+			COMPREPLY+=("--apply")
+			COMPREPLY+=("--capacity")
+			COMPREPLY+=("--columnar")
+			COMPREPLY+=("--computes")
 			COMPREPLY+=("--config")
 			COMPREPLY+=("--exc")
+			COMPREPLY+=("--excfile")
 			COMPREPLY+=("--exr")
+			COMPREPLY+=("--exrfile")
+			COMPREPLY+=("--exportfile")
+			COMPREPLY+=("--grid")
+			COMPREPLY+=("--interval")
 			COMPREPLY+=("--inventory")
 			COMPREPLY+=("--jobid")
 			COMPREPLY+=("--kcfg")
 			COMPREPLY+=("--kctx")
+			COMPREPLY+=("--ledger")
+			COMPREPLY+=("--mix")
 			COMPREPLY+=("--munge")
 			COMPREPLY+=("--name")
+			COMPREPLY+=("--namepattern")
 			COMPREPLY+=("--node")
+			COMPREPLY+=("--noinventorycache")
 			COMPREPLY+=("--notimestamp")
+			COMPREPLY+=("--notready")
 			COMPREPLY+=("--opcount")
+			COMPREPLY+=("--plancache")
+			COMPREPLY+=("--planout")
 			COMPREPLY+=("--pretty")
+			COMPREPLY+=("--query")
+			COMPREPLY+=("--rabbits")
 			COMPREPLY+=("--regex")
+			COMPREPLY+=("--replan")
 			COMPREPLY+=("--noreuse")
 			COMPREPLY+=("--nowait")
+			COMPREPLY+=("--seed")
 			COMPREPLY+=("--showconfig")
+			COMPREPLY+=("--since")
+			COMPREPLY+=("--storagefile")
+			COMPREPLY+=("--strategy")
+			COMPREPLY+=("--stream")
+			COMPREPLY+=("--telemetry")
+			COMPREPLY+=("--telemetryttl")
+			COMPREPLY+=("--topologycache")
+			COMPREPLY+=("--trace")
 			COMPREPLY+=("--userid")
 			COMPREPLY+=("--groupid")
 			COMPREPLY+=("--version")
+			COMPREPLY+=("--watchseconds")
 			COMPREPLY+=("--wlmid")
+			COMPREPLY+=("--workers")
 			COMPREPLY+=("--context")
+			COMPREPLY+=("--debounce")
+			COMPREPLY+=("--cursorfile")
 			COMPREPLY+=("--operation")
 			;;
 		*)
@@ -0,0 +1,755 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility allocation planner
+
+import bisect
+import copy
+import hashlib
+import itertools
+import json
+import os
+import random
+
+from .CapacityView import CapacityView
+from .Console import Console
+from .Dws import DWSError
+from .ExclusionMatcher import ExclusionMatcher
+from .Telemetry import Telemetry
+
+
+class Allocator:
+    """Plans server allocations for directive breakdowns against an inventory."""
+
+    # Configuration items that influence the outcome of a plan
+    SETTINGS = ["nodes", "ost_count", "ost_per_rabbit", "reuse_rabbit",
+                "ignore_ready", "alloc_recipe",
+                "exclude_rabbits", "exclude_computes", "strategy", "seed",
+                "telemetry", "telemetry_ttl"]
+
+    # Placement strategies, the order candidate rabbits are tried in:
+    #   first           inventory order
+    #   roundrobin      inventory order starting after the last rabbit used
+    #   random          shuffled, seeded by the seed setting and workflow name
+    #   leastallocated  smallest fraction of capacity allocated first
+    #   hash            consistent hashing ring walk from the workflow name
+    STRATEGIES = ["first", "roundrobin", "random", "leastallocated", "hash"]
+
+    # Strategies whose plans depend only on the inventory, breakdowns, and settings
+    CACHEABLE_STRATEGIES = ["first"]
+
+    # Telemetry score added across the strategy order, from 0 for the first
+    # rabbit to this for the last, so the strategy is a weighted preference
+    STRATEGY_WEIGHT = 1.0
+
+    # Points per rabbit on the consistent hashing ring
+    HASH_REPLICAS = 16
+
+    # Workflows with up to this many breakdowns try every placement order
+    MAX_PERMUTED_BREAKDOWNS = 4
+
+    def settings_from_config(config):
+        """Extract the planning settings from a Config object.
+
+        Parameters:
+        config : Config object (or any object with the SETTINGS attributes)
+
+        Returns:
+        Dictionary of planning settings
+        """
+        return {key: copy.deepcopy(getattr(config, key)) for key in Allocator.SETTINGS}
+
+    def hash_value(text):
+        """Stable 64 bit hash of a string."""
+        return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def load_cursor(cursor_file):
+        """Read the last rabbit used by round robin placement.
+
+        Parameters:
+        cursor_file : Path to the cursor file, None for no cursor
+
+        Returns:
+        Rabbit name or None
+        """
+        if cursor_file is None or not os.path.exists(cursor_file):
+            return None
+        try:
+            with open(cursor_file, "r") as stream:
+                return json.load(stream).get("lastRabbit")
+        except (OSError, ValueError, AttributeError) as ex:
+            Console.debug(Console.MIN, f"Ignoring unreadable cursor file {cursor_file}: {ex}")
+            return None
+
+    def save_cursor(cursor_file, last_rabbit):
+        """Record the last rabbit used by round robin placement.
+
+        Parameters:
+        cursor_file : Path to the cursor file
+        last_rabbit : Rabbit name
+
+        Returns:
+        Nothing
+        """
+        tmp_file = f"{cursor_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as stream:
+            json.dump({"lastRabbit": last_rabbit}, stream)
+        os.replace(tmp_file, cursor_file)
+
+    def __init__(self, settings, rabbits):
+        """Initialize the allocator.
+
+        Parameters:
+        settings : Dictionary of planning settings (see settings_from_config)
+        rabbits : Inventory dictionary of Storage objects keyed by name
+
+        Returns:
+        Nothing
+        """
+        self.settings = settings
+        for key in Allocator.SETTINGS:
+            setattr(self, key, settings[key])
+        self.rabbits = rabbits
+
+        # Exclusions are compiled once for the lookups in the placement loops
+        self.exclude_rabbits = ExclusionMatcher(settings["exclude_rabbits"])
+        self.exclude_computes = ExclusionMatcher(settings["exclude_computes"])
+        self.view = CapacityView(rabbits)
+
+        # When True, placements are checked against the remaining capacity
+        # of each rabbit rather than its total capacity
+        self.enforce_capacity = False
+
+        # Optional dictionary of rabbit name to the compute entries that may
+        # be used for per compute allocations.  None uses every compute.
+        self.available_computes = None
+
+        # Bookkeeping for the most recent plan, charges are keyed by rabbit
+        # name and hold [bytes, allocation count]
+        self.charges = {}
+        self.selected_computes = {}
+
+        # Assignable compute names per rabbit, see ready_computes()
+        self._ready_computes = {}
+
+        # Spread strategy state.  The workflow name keys random and hash
+        # placement (the breakdown name is used when it is None), and
+        # last_rabbit is where round robin placement resumes after.
+        self.workflow_name = None
+        self.last_rabbit = None
+        self._plan_cursor = None
+        self._ring = None
+        self._rank_key = None
+        self._rank = None
+
+        # Optional rabbit scorer, any object with a score(name) method.
+        # Candidates are tried lowest score first, see order().
+        self.scorer = Telemetry(self.telemetry, self.telemetry_ttl) if self.telemetry else None
+
+    def _charge(self, r, size):
+        """Consume capacity on a rabbit and remember it for rollback()."""
+        r.remaining_storage -= size
+        r.allocationCount += 1
+        self.last_rabbit = r.name
+        self.view.charge(r.name, size)
+        charge = self.charges.setdefault(r.name, [0, 0])
+        charge[0] += size
+        charge[1] += 1
+
+    def release(self, charges):
+        """Return previously charged capacity to the rabbits.
+
+        Parameters:
+        charges : Charges dictionary from a completed plan
+
+        Returns:
+        Nothing
+        """
+        for rabbit_name, (size, count) in charges.items():
+            r = self.rabbits[rabbit_name]
+            r.remaining_storage += size
+            r.allocationCount -= count
+            self.view.release(rabbit_name, size, count)
+
+    def rollback(self):
+        """Return the capacity consumed by the most recent plan to the rabbits.
+
+        The round robin cursor goes back to where the plan started, so a
+        failed attempt does not move it.
+
+        Parameters:
+        None
+
+        Returns:
+        Nothing
+        """
+        if self.charges:
+            self.last_rabbit = self._plan_cursor
+        self.release(self.charges)
+        self.charges = {}
+        self.selected_computes = {}
+
+    def _hash_rank(self, key):
+        """Rank the rabbits by the order a walk of the hashing ring from key meets them."""
+        if self._ring is None:
+            self._ring = sorted((Allocator.hash_value(f"{name}#{replica}"), name)
+                                for name in self.view.names for replica in range(Allocator.HASH_REPLICAS))
+        rank = {}
+        start = bisect.bisect(self._ring, (Allocator.hash_value(key), ""))
+        for idx in range(len(self._ring)):
+            name = self._ring[(start + idx) % len(self._ring)][1]
+            if name not in rank:
+                rank[name] = len(rank)
+                if len(rank) == len(self.view):
+                    break
+        return rank
+
+    def order(self, names, key):
+        """Order candidate rabbit names by the placement strategy.
+
+        With a scorer each rabbit's score is raised by its place in the
+        strategy order, up to STRATEGY_WEIGHT for the last rabbit, so a
+        small score difference does not override the strategy.
+
+        Parameters:
+        names : Rabbit names in inventory order
+        key : Workflow (or breakdown) name keying random and hash placement
+
+        Returns:
+        List of rabbit names in the order they should be tried
+        """
+        if len(names) < 2:
+            return names
+        ordered = self._strategy_order(names, key)
+        if self.scorer is None:
+            return ordered
+        step = Allocator.STRATEGY_WEIGHT / (len(ordered) - 1)
+        blended = {name: self.scorer.score(name) + idx * step for idx, name in enumerate(ordered)}
+        return sorted(ordered, key=blended.__getitem__)
+
+    def _strategy_order(self, names, key):
+        if self.strategy == "first":
+            return names
+        index = self.view.index
+        if self.strategy == "roundrobin":
+            start = index[self.last_rabbit] + 1 if self.last_rabbit in index else 0
+            return sorted(names, key=lambda name: (index[name] - start) % len(self.view))
+        if self.strategy == "leastallocated":
+            load = self.view.load()
+            allocations = self.view.allocations
+            return sorted(names, key=lambda name: (load[index[name]], allocations[index[name]], index[name]))
+
+        if self._rank_key != key:
+            if self.strategy == "random":
+                shuffled = list(self.view.names)
+                random.Random(f"{self.seed}:{key}").shuffle(shuffled)
+                self._rank = {name: idx for idx, name in enumerate(shuffled)}
+            else:
+                self._rank = self._hash_rank(key)
+            self._rank_key = key
+        return sorted(names, key=self._rank.__getitem__)
+
+    def plan_servers(self, breakdowns):
+        """Plan the server allocations for a list of directive breakdowns.
+
+        Parameters:
+        breakdowns : List of DirectiveBreakdown objects
+
+        Returns:
+        List of breakdown allocations, one per breakdown, in the form
+        {"name": ..., "serverObj": ..., "allocationSet": [...]}
+        """
+        rabbits = self.rabbits
+        all_breakdown_allocations = []
+        self.charges = {}
+        self.selected_computes = {}
+        self._plan_cursor = self.last_rabbit
+        label_constrained_nodes = {}
+
+        # Iterate each directive breakdown (1 per #dw)
+        for breakdown in breakdowns:
+            Console.debug(Console.WORDY, Console.FULL_BAR)
+            Console.debug(Console.WORDY, f"Processing breakdown {breakdown.name} for #dw {breakdown.dw_name}")
+            key = self.workflow_name or breakdown.name
+            allocations = breakdown.allocationSet
+            breakdown_allocations = {"name": breakdown.name, "serverObj": breakdown.server_obj, "allocationSet": []}
+            all_breakdown_allocations.append(breakdown_allocations)
+            all_selected_rabbits = {}
+            rabbits_in_breakdown = {}
+            alloc_idx = 0
+            across_servers = []
+            single_server = []
+            per_compute = []
+
+            # Collect the allocations for this directive breakdown
+            for alloc in allocations:
+
+                alloc_idx += 1
+                Console.debug(Console.WORDY, f"...collecting allocation {alloc_idx}, type {alloc.label} - {alloc.allocationStrategy}")
+                if alloc.is_across_servers:
+                    across_servers.append(alloc)
+
+                elif alloc.is_single_server:
+                    single_server.append(alloc)
+
+                elif alloc.is_per_compute:
+                    per_compute.append(alloc)
+
+            recipe = None
+            if breakdown.dw_name in self.alloc_recipe:
+                recipe = self.alloc_recipe[breakdown.dw_name]
+                Console.debug(Console.WORDY, "Breakdown has a PRESCRIPTIVE allocation")
+
+            # *****************************************************************
+            # Address per compute allocations first, they have no constraints
+            # *****************************************************************
+            if len(per_compute) == 0:
+                Console.debug(Console.WORDY, "No 'AllocatePerCompute' to process")
+            else:
+                Console.debug(Console.WORDY, "Processing 'AllocatePerCompute'")
+                Console.debug(Console.WORDY, "-" * 40)
+                idx = 0
+                for alloc in per_compute:
+                    idx += 1
+                    selected_rabbits = {}  # Rabbits are selected per allocation
+                    computes_satisfied = 0
+                    Console.debug(Console.WORDY, f"Processing allocation {idx}")
+                    if recipe:
+                        if alloc.label not in recipe["allocs"]:
+                            msg = f"Prescriptive alloc did not contain recipe for {alloc.label}"
+                            raise DWSError(msg, DWSError.DWS_GENERAL)
+                        else:
+                            selected_rabbits = {}  # Rabbits are selected per allocation
+                            alloc_obj = recipe["allocs"][alloc.label]
+                            Console.debug(Console.MIN, f"   Processing element {alloc.label}")
+                            allocation_count = 0
+                            for server in alloc_obj["servers"]:
+                                rabbit = {"name": server["name"], "allocationCount": server["allocations"]}
+                                allocation_count += server["allocations"]
+                                selected_rabbits[server["name"]] = rabbit
+                                all_selected_rabbits[server["name"]] = rabbit
+                                rabbits_in_breakdown[server["name"]] = rabbit
+
+                                Console.debug(Console.MIN, "   nnfnode(s) to be assigned: "
+                                              f"{[k[0] for k in selected_rabbits.items()]}")
+
+                            assignment = {"label": alloc.label, "allocationSize": alloc.minimumCapacity, "storage": [selected_rabbits[x] for x in selected_rabbits]}
+                            breakdown_allocations["allocationSet"].append(assignment)
+                            if Console.level_enabled(Console.WORDY):
+                                Console.debug(Console.WORDY, f"   allocation {idx} details:")
+                                Console.pretty_json(assignment)
+                            Console.debug(Console.WORDY, "-" * 40)
+                    else:
+                        # Without capacity enforcement per compute allocations
+                        # are not checked for capacity
+                        if self.enforce_capacity:
+                            rabbit_names = self.view.candidates(alloc.minimumCapacity)
+                        else:
+                            rabbit_names = self.view.names
+                        rabbit_names = self.order(rabbit_names, key)
+                        for rabbit_name in rabbit_names:
+                            r = rabbits[rabbit_name]
+                            Console.debug(Console.WORDY, f"  Looking at rabbit '{rabbit_name}'")
+                            alloc_count = 0
+                            if self.exclude_rabbits.matches(rabbit_name):
+                                Console.debug(Console.MIN, f"    Excluding rabbit node {rabbit_name}")
+                                continue
+                            if self.available_computes is None:
+                                computes = r.computes
+                            else:
+                                computes = self.available_computes.get(rabbit_name, ())
+                            for c in computes:
+                                Console.debug(Console.WORDY, f"  Looking at compute '{c['name']}'")
+                                if self.exclude_computes.matches(c['name']):
+                                    Console.debug(Console.MIN, f"    Excluding compute node {c['name']}")
+                                    continue
+                                if self.enforce_capacity and r.remaining_storage < alloc.minimumCapacity:
+                                    Console.debug(Console.MIN, f"    rabbit {rabbit_name} has insufficient storage remaining")
+                                    break
+
+                                # Increase the allocation count for this rabbit
+                                if rabbit_name in selected_rabbits:
+                                    rabbit = selected_rabbits[rabbit_name]
+                                    rabbit['allocationCount'] += 1
+                                else:
+                                    rabbit = {"name": rabbit_name, "allocationCount": 1}
+
+                                selected_rabbits[rabbit_name] = rabbit
+                                self.selected_computes[c['name']] = rabbit_name
+                                self._charge(r, alloc.minimumCapacity)
+                                computes_satisfied += 1
+                                alloc_count += 1
+
+                                # Break out of the compute loop if we have enough computes
+                                if computes_satisfied >= self.nodes:
+                                    break
+
+                            Console.debug(Console.MIN, f"    {alloc_count} allocations on '{rabbit_name}'")
+
+                            # Break out of the rabbit loop
+                            if computes_satisfied >= self.nodes:
+                                break
+
+                        # If we went through all of our rabbits and still didn't find
+                        # enough compute nodes, the assign cannot be completed
+                        if computes_satisfied < self.nodes:
+                            msg = "There are not enough compute nodes to meet the required node count of"\
+                                f" {self.nodes} for an allocation of type '{alloc.label}'."
+                            raise DWSError(msg, DWSError.DWS_INSUFFICIENT_RESOURCES)
+                        else:
+                            Console.debug(Console.MIN, f"{len(selected_rabbits)} rabbit(s) selected for {self.nodes} '{alloc.label}' allocations.")
+
+                        Console.debug(Console.MIN, " nnfnode(s) to be assigned: "
+                                      f"{[k[0] for k in selected_rabbits.items()]}")
+
+                        assignment = {"label": alloc.label, "allocationSize": alloc.minimumCapacity, "storage": [selected_rabbits[x] for x in selected_rabbits]}
+                        breakdown_allocations["allocationSet"].append(assignment)
+                        if Console.level_enabled(Console.WORDY):
+                            Console.debug(Console.WORDY, "AllocatePerCompute details:")
+                            Console.pretty_json(assignment)
+                            Console.debug(Console.WORDY, Console.HALF_BAR)
+                            Console.pretty_json(breakdown_allocations)
+
+            # *****************************************************************
+            # Address single server allocations (e.g. MGT/MDT)
+            # *****************************************************************
+            if len(single_server) == 0:
+                Console.debug(Console.WORDY, "No 'AllocateSingleServer' to process")
+            else:
+                Console.debug(Console.WORDY, "Processing 'AllocateSingleServer'")
+                Console.debug(Console.WORDY, "-" * 40)
+                idx = 0
+                for alloc in single_server:
+                    idx += 1
+                    selected_rabbits = {}  # Rabbits are selected per allocation
+                    Console.debug(Console.MIN, f"   Processing allocation {idx}: {alloc.label}")
+
+                    if recipe:
+                        if alloc.label not in recipe["allocs"]:
+                            msg = f"Prescriptive alloc did not contain recipe for {alloc.label}"
+                            raise DWSError(msg, DWSError.DWS_GENERAL)
+                        else:
+                            alloc_obj = recipe["allocs"][alloc.label]
+                            Console.debug(Console.MIN, f"   Processing element {alloc.label}")
+                            for server in alloc_obj["servers"]:
+                                rabbit = {"name": server["name"], "allocationCount": server["allocations"]}
+                                selected_rabbits[server["name"]] = rabbit
+                                all_selected_rabbits[server["name"]] = rabbit
+                                rabbits_in_breakdown[server["name"]] = rabbit
+
+                                Console.debug(Console.MIN, "   nnfnode(s) to be assigned: "
+                                              f"{[k[0] for k in selected_rabbits.items()]}")
+
+                                allocation_size = round(alloc.minimumCapacity / server["allocations"])
+                                assignment = {"label": alloc.label, "allocationSize": allocation_size, "storage": [selected_rabbits[x] for x in selected_rabbits]}
+                                breakdown_allocations["allocationSet"].append(assignment)
+                                if Console.level_enabled(Console.WORDY):
+                                    Console.debug(Console.WORDY, f"   allocation {idx} details:")
+                                    Console.pretty_json(assignment)
+                                break
+
+                    else:
+                        # Determine if this allocation type cannot coexist
+                        if alloc.has_colocation_constraints:
+                            Console.debug(Console.MIN, f"   Allocation {alloc.label} has colocation constraints")
+                            if alloc.label not in label_constrained_nodes:
+                                Console.debug(Console.MIN, f"   Added constraint label {alloc.label}")
+                                label_constrained_nodes[alloc.label] = []
+
+                        # Scan rabbits with adequate capacity to see if we have
+                        # a place for this allocation
+                        candidates = self.order(self.view.candidates(alloc.minimumCapacity, remaining=self.enforce_capacity), key)
+                        Console.debug(Console.MIN, f"   {len(candidates)} of {len(rabbits)} rabbits have capacity for {alloc.label}")
+                        idx = 0
+                        for rabbit_name in candidates:
+                            r = rabbits[rabbit_name]
+                            Console.debug(Console.MIN, f"   Looking at rabbit {rabbit_name} for {alloc.label}")
+                            rabbit_eligible = True
+                            idx += 1
+
+                            # Determine if this rabbit is eligible from a
+                            # colocation constraint perspective
+                            if alloc.has_colocation_constraints and rabbit_name in label_constrained_nodes[alloc.label]:
+                                rabbit_eligible = False
+                                Console.debug(Console.MIN, f"     Rabbit is not eligible as it already has an {alloc.label}")
+                                continue
+
+                            # In the interest of distributing components across
+                            # rabbits, see if the user wants to reuse or not reuse
+                            # rabbits for Single Server allocations.  Controlled
+                            # by the --noreuse flag
+                            if rabbit_eligible and rabbit_name in all_selected_rabbits and (not self.reuse_rabbit) and idx < len(candidates):
+                                rabbit_eligible = False
+                                Console.debug(Console.MIN, "     Rabbit is eligible but has already been used and --noreuse specified")
+                                continue
+
+                            if rabbit_eligible:
+                                Console.debug(Console.MIN, "     Rabbit is eligible")
+                                # We found a rabbit to host this allocation
+                                rabbit = {"name": r.name, "allocationCount": 1}
+                                selected_rabbits[r.name] = rabbit
+                                all_selected_rabbits[r.name] = rabbit
+                                rabbits_in_breakdown[r.name] = rabbit
+
+                                self._charge(r, alloc.minimumCapacity)
+
+                                Console.debug(Console.WORDY, f"   Selecting '{rabbit_name}' for allocation type '{alloc.label}'")
+                                Console.debug(Console.WORDY, f"   Rabbit remaining storage: {r.remaining_storage}")
+
+                            Console.debug(Console.MIN, "   nnfnode(s) to be assigned: "
+                                          f"{[k[0] for k in selected_rabbits.items()]}")
+
+                            assignment = {"label": alloc.label, "allocationSize": alloc.minimumCapacity, "storage": [selected_rabbits[x] for x in selected_rabbits]}
+                            breakdown_allocations["allocationSet"].append(assignment)
+                            if Console.level_enabled(Console.WORDY):
+                                Console.debug(Console.WORDY, f"   allocation {idx} details:")
+                                Console.pretty_json(assignment)
+                            break
+
+                        if len(selected_rabbits) == 0:
+                            msg = f"Unable to locate a rabbit to serve '{alloc.label}'"
+                            raise DWSError(msg, DWSError.DWS_INSUFFICIENT_RESOURCES)
+
+            # *****************************************************************
+            # Address allocations across servers (e.g. OST)
+            # *****************************************************************
+            if len(across_servers) == 0:
+                Console.debug(Console.WORDY, "No 'AllocateAcrossServers' to process")
+            else:
+                Console.debug(Console.WORDY, "Processing 'AllocateAcrossServers'")
+                Console.debug(Console.WORDY, "-" * 40)
+
+                for alloc in across_servers:
+                    selected_rabbits = {}  # Rabbits are selected per allocation
+                    if recipe:
+                        if alloc.label not in recipe["allocs"]:
+                            msg = f"Prescriptive alloc did not contain recipe for {alloc.label}"
+                            raise DWSError(msg, DWSError.DWS_GENERAL)
+                        else:
+                            alloc_obj = recipe["allocs"][alloc.label]
+                            Console.debug(Console.MIN, f"   Processing element {alloc.label}")
+                            allocation_count = 0
+                            for server in alloc_obj["servers"]:
+                                rabbit = {"name": server["name"], "allocationCount": server["allocations"]}
+                                allocation_count += server["allocations"]
+                                selected_rabbits[server["name"]] = rabbit
+                                all_selected_rabbits[server["name"]] = rabbit
+                                rabbits_in_breakdown[server["name"]] = rabbit
+
+                                Console.debug(Console.MIN, "   nnfnode(s) to be assigned: "
+                                              f"{[k[0] for k in selected_rabbits.items()]}")
+
+                            allocation_size = round(alloc.minimumCapacity / allocation_count)
+                            assignment = {"label": alloc.label, "allocationSize": allocation_size, "storage": [selected_rabbits[x] for x in selected_rabbits]}
+                            breakdown_allocations["allocationSet"].append(assignment)
+                            if Console.level_enabled(Console.WORDY):
+                                Console.debug(Console.WORDY, "   allocation details:")
+                                Console.pretty_json(assignment)
+                            Console.debug(Console.WORDY, "-" * 40)
+                    else:
+                        alloc_size = round(alloc.minimumCapacity / self.ost_count)
+                        Console.debug(Console.MIN, f"type: {alloc.label}, min capacity: {alloc.minimumCapacity}, "
+                                                   f"rabbits: {self.ost_count}, per rabbit: {self.ost_per_rabbit}, alloc size: {alloc_size}")
+
+                        # Pass 1: Look for rabbits other than the MGT/MDT hosts
+                        ost_size = alloc_size * self.ost_per_rabbit
+                        if self.enforce_capacity:
+                            rabbit_names = self.view.candidates(ost_size)
+                        else:
+                            rabbit_names = self.view.names
+                        rabbit_names = self.order(rabbit_names, key)
+                        ost_rabbit_count = 0
+                        for rabbit_name in rabbit_names:
+                            r = rabbits[rabbit_name]
+                            if rabbit_name in all_selected_rabbits:
+                                Console.debug(Console.WORDY, f"Rabbit {rabbit_name} has already been used, skipping for now")
+                                continue
+
+                            ost_rabbit_count += 1
+                            rabbit = {"name": r.name, "allocationCount": self.ost_per_rabbit}
+                            selected_rabbits[r.name] = rabbit
+                            rabbits_in_breakdown[r.name] = rabbit
+                            self._charge(r, ost_size)
+
+                            Console.debug(Console.WORDY, f"   Selecting '{r.name}' for allocation type '{alloc.label}'")
+
+                            if ost_rabbit_count >= self.ost_count:
+                                break
+
+                        # Pass 2: If we need more rabbits
+                        if ost_rabbit_count < self.ost_count:
+                            for rabbit_name in all_selected_rabbits:
+                                r = rabbits[rabbit_name]
+                                if self.enforce_capacity and r.remaining_storage < ost_size:
+                                    continue
+                                ost_rabbit_count += 1
+                                rabbit = {"name": r.name, "allocationCount": self.ost_per_rabbit}
+                                selected_rabbits[r.name] = rabbit
+                                rabbits_in_breakdown[r.name] = rabbit
+                                self._charge(r, ost_size)
+
+                                Console.debug(Console.WORDY, f"   Selecting '{r.name}' for allocation type '{alloc.label}'")
+
+                                if ost_rabbit_count >= self.ost_count:
+                                    break
+
+                        # After Pass2, we have failed if we haven't found enough rabbits
+                        if ost_rabbit_count < self.ost_count:
+                            msg = f"Require {self.ost_count} rabbits for {alloc.label} but only found {ost_rabbit_count}'"
+                            raise DWSError(msg, DWSError.DWS_INSUFFICIENT_RESOURCES)
+
+                        assignment = {"label": alloc.label, "allocationSize": round(alloc_size), "storage": [selected_rabbits[x] for x in selected_rabbits]}
+                        breakdown_allocations["allocationSet"].append(assignment)
+                        if Console.level_enabled(Console.WORDY):
+                            Console.debug(Console.WORDY, "AllocateSingleServer details:")
+                            Console.pretty_json(assignment)
+
+                        continue
+
+            # All allocations processed
+            Console.debug(Console.MIN, f"All allocations processed for {breakdown.name}")
+            if Console.level_enabled(Console.MIN):
+                Console.pretty_json(all_breakdown_allocations)
+                Console.output(Console.FULL_BAR)
+
+        return all_breakdown_allocations
+
+    def breakdown_demand(self, breakdown):
+        """Largest amount of capacity a breakdown needs on a single rabbit."""
+        demand = 0
+        for alloc in breakdown.allocationSet:
+            size = alloc.minimumCapacity
+            if alloc.is_across_servers:
+                size = round(size / self.ost_count) * self.ost_per_rabbit
+            demand = max(demand, size)
+        return demand
+
+    def plan_workflow(self, breakdowns):
+        """Plan all of a workflow's breakdowns together against one capacity view.
+
+        Breakdowns that need the most capacity on a single rabbit are placed
+        first so the smaller ones fit around them.  If that order cannot be
+        placed the breakdowns are tried in the order given and then, for
+        small workflows, in every other order.
+
+        Parameters:
+        breakdowns : List of DirectiveBreakdown objects
+
+        Returns:
+        List of breakdown allocations in the order of breakdowns, see plan_servers()
+        """
+        demand_order = tuple(sorted(range(len(breakdowns)), key=lambda idx: -self.breakdown_demand(breakdowns[idx])))
+        orders = [demand_order, tuple(range(len(breakdowns)))]
+        if len(breakdowns) <= Allocator.MAX_PERMUTED_BREAKDOWNS:
+            orders += itertools.permutations(range(len(breakdowns)))
+
+        error = None
+        for order in dict.fromkeys(orders):
+            try:
+                plan = self.plan_servers([breakdowns[idx] for idx in order])
+            except DWSError as ex:
+                Console.debug(Console.MIN, f"Breakdown order {order} could not be placed: {ex.message}")
+                self.rollback()
+                error = ex
+                continue
+            all_breakdown_allocations = [None] * len(breakdowns)
+            for position, idx in enumerate(order):
+                all_breakdown_allocations[idx] = plan[position]
+            return all_breakdown_allocations
+        raise error
+
+    def ready_computes(self, rabbit):
+        """Names of the computes attached to a rabbit that may be assigned.
+
+        Only available_computes are considered when it is set.  Excluded
+        computes are dropped, as are computes that are not Ready unless
+        ignore_ready is set.  The list is built once per rabbit.
+
+        Parameters:
+        rabbit : Storage object
+
+        Returns:
+        List of compute names in the order the rabbit lists them
+        """
+        computes = self._ready_computes.get(rabbit.name)
+        if computes is None:
+            computes = []
+            if self.available_computes is None:
+                candidates = rabbit.computes
+            else:
+                candidates = self.available_computes.get(rabbit.name, ())
+            for c in candidates:
+                compute_name = c['name']
+                if self.exclude_computes.matches(compute_name):
+                    Console.debug(Console.MIN, f"Compute node {compute_name} is in exclude list, excluding")
+                    continue
+                if not self.ignore_ready and c['status'].lower() != "ready":
+                    Console.debug(Console.MIN, f"Compute node {compute_name} is not ready, excluding")
+                    continue
+                computes.append(compute_name)
+            self._ready_computes[rabbit.name] = computes
+        return computes
+
+    def plan_computes(self, preferred=None, limits=None, taken=None):
+        """Choose the computes for a workflow.
+
+        Rabbits already holding the workflow's storage are walked first,
+        followed by the rest of the inventory in order.  The walk stops as
+        soon as enough computes have been chosen.
+
+        Parameters:
+        preferred : Rabbit names to walk first, in order of preference
+        limits : Dictionary of rabbit name to the most computes it may supply,
+                 rabbits not listed supply up to 16
+        taken : Set of compute names already given to other workflows
+
+        Returns:
+        List of compute names; shorter than nodes if there are too few computes
+        """
+        limits = limits or {}
+        taken = taken or ()
+
+        # Ordered set of rabbit names, preferred rabbits first
+        rabbit_names = dict.fromkeys(preferred or [])
+        for rabbit_name in self.rabbits:
+            if self.exclude_rabbits.matches(rabbit_name):
+                Console.debug(Console.MIN, f"Excluding nnf node {rabbit_name}")
+                continue
+            rabbit_names.setdefault(rabbit_name)
+        Console.debug(Console.WORDY, f"Rabbits in order of preference: {list(rabbit_names)}")
+
+        # Ordered set of assigned compute names
+        computes_assigned = {}
+        for rabbit_name in rabbit_names:
+            if len(computes_assigned) >= self.nodes:
+                break
+            rabbit = self.rabbits.get(rabbit_name)
+            if rabbit is None:
+                Console.debug(Console.MIN, f"Rabbit {rabbit_name} is not in the inventory, skipping")
+                continue
+            compute_limit = limits.get(rabbit_name, 16)
+            Console.debug(Console.WORDY, f"Looking at rabbit {rabbit_name}, compute limit set to {compute_limit}")
+            for compute_name in self.ready_computes(rabbit):
+                if compute_limit <= 0 or len(computes_assigned) >= self.nodes:
+                    break
+                if compute_name not in computes_assigned and compute_name not in taken:
+                    computes_assigned[compute_name] = rabbit_name
+                    compute_limit -= 1
+
+        return list(computes_assigned)
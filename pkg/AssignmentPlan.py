@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility resolved server and compute assignment plan
+
+import json
+import os
+
+from .Dws import DWSError
+
+
+class AssignmentPlan:
+    """A fully resolved set of Servers and Computes patches, one entry per workflow.
+
+    Each patch carries the resourceVersion of the CR it was planned
+    against so that applying it fails with a conflict if the CR changed in
+    the meantime.  The resourceVersion of every Storage the plan placed
+    allocations on is recorded as well.
+
+    Plan format (JSON):
+        version: 1
+        workflows:
+          - name: wfr-demo
+            servers:
+              - name: wfr-demo-0
+                namespace: default
+                resourceVersion: "1234"
+                allocationSets: [...]
+            computes:
+              name: wfr-demo
+              namespace: default
+              resourceVersion: "1235"
+              data: [{name: rabbit-01-c00}, ...]
+            storage:
+              rabbit-01: "987"
+    """
+
+    # Bump when the plan format changes
+    PLAN_VERSION = 1
+
+    def __init__(self, workflows=None):
+        """Initialize the plan.
+
+        Parameters:
+        workflows : List of workflow entries, None for an empty plan
+
+        Returns:
+        Nothing
+        """
+        self.workflows = workflows or []
+
+    def load(plan_file):
+        """Load a plan written by save().
+
+        Parameters:
+        plan_file : Path to the plan
+
+        Returns:
+        AssignmentPlan object
+        """
+        try:
+            with open(plan_file, "r") as stream:
+                body = json.load(stream)
+        except ValueError as ex:
+            raise DWSError(f"Plan '{plan_file}' is not valid JSON: {ex}", DWSError.DWS_GENERAL)
+        if not isinstance(body, dict) or body.get("version") != AssignmentPlan.PLAN_VERSION:
+            raise DWSError(f"Plan '{plan_file}' is not a version {AssignmentPlan.PLAN_VERSION} assignment plan", DWSError.DWS_GENERAL)
+        return AssignmentPlan(body.get("workflows") or [])
+
+    def add_workflow(self, name, servers, computes, storage):
+        """Add a workflow's patches to the plan.
+
+        Parameters:
+        name : Workflow name
+        servers : List of Servers patches {name, namespace, resourceVersion, allocationSets}
+        computes : Computes patch {name, namespace, resourceVersion, data}, None to leave computes alone
+        storage : Dictionary of Storage name to the resourceVersion planned against
+
+        Returns:
+        The workflow entry
+        """
+        entry = {"name": name, "servers": servers, "computes": computes, "storage": storage}
+        self.workflows.append(entry)
+        return entry
+
+    def to_json(self):
+        return {"version": AssignmentPlan.PLAN_VERSION, "workflows": self.workflows}
+
+    def save(self, plan_file):
+        """Write the plan, replacing any existing file.
+
+        Parameters:
+        plan_file : Path to the plan
+
+        Returns:
+        Nothing
+        """
+        tmp_path = f"{plan_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as stream:
+            json.dump(self.to_json(), stream, indent=2)
+        os.replace(tmp_path, plan_file)
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility maximum concurrency capacity planner
+
+import time
+
+import yaml
+
+from .Console import Console
+from .Dws import DWSError
+from .Simulator import Simulator
+
+
+class CapacityPlan:
+    """Finds how many jobs of a job mix can run on an inventory at once.
+
+    Jobs are admitted in mix order (each round places 'count' jobs of every
+    class) with the placement rules of ASSIGNSERVERS, each job taking the
+    capacity and computes left by the jobs before it.  Three answers are
+    produced:
+
+    upperBound - the first job whose computes, bytes, or allocations of at
+                 least a given size exceed what the whole inventory holds.
+                 Allocations of size s can use at most floor(capacity / s)
+                 slots on each rabbit, which makes this a bin packing bound.
+    greedy     - jobs placed one after another until one does not fit.
+    searched   - for small cases, a depth first search over the distinct
+                 placements the planner makes from every starting rabbit.
+                 This is not every possible packing, so its answer is only
+                 known to be the maximum ('exact') when it reaches the bound.
+    """
+
+    # Exact search is only attempted when the bound is at most this many jobs
+    EXACT_MAX_JOBS = 16
+
+    # ...and the inventory has at most this many rabbits
+    EXACT_MAX_RABBITS = 32
+
+    # Search states visited before the exact search gives up
+    EXACT_MAX_STATES = 20000
+
+    # Upper bound on the jobs counted, in case a class needs no resources
+    MAX_JOBS = 1000000
+
+    def load_mix(mix_file):
+        """Load a job mix from a YAML or JSON file.
+
+        The file holds a list of job classes, either at the top level or
+        under 'jobs:'.  Each class has a node count, a list of #DW
+        directives, and the number of jobs of the class per round (default 1).
+
+        Parameters:
+        mix_file : Path to the job mix file
+
+        Returns:
+        List of job class dictionaries
+        """
+        with open(mix_file, "r") as stream:
+            mix = yaml.load(stream, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+        if isinstance(mix, dict):
+            mix = mix.get("jobs", [])
+        if not isinstance(mix, list) or not mix:
+            raise DWSError(f"Job mix '{mix_file}' does not contain a list of jobs", DWSError.DWS_GENERAL)
+
+        classes = []
+        for idx, entry in enumerate(mix):
+            try:
+                directives = entry.get("directives", [])
+                if isinstance(directives, str):
+                    directives = [directives]
+                classes.append({"name": str(entry.get("name", f"job-{idx}")),
+                                "nodes": int(entry.get("nodes", 1)),
+                                "count": int(entry.get("count", 1)),
+                                "directives": directives})
+            except (AttributeError, TypeError, ValueError):
+                raise DWSError(f"Job mix entry {idx} is not valid: {entry}", DWSError.DWS_GENERAL)
+            if classes[-1]["count"] < 1 or classes[-1]["nodes"] < 1:
+                raise DWSError(f"Job mix entry {idx} must have a count and nodes of at least 1", DWSError.DWS_GENERAL)
+        return classes
+
+    def __init__(self, settings, rabbits, classes):
+        """Initialize the planner.
+
+        Parameters:
+        settings : Allocator settings dictionary
+        rabbits : Inventory dictionary of Storage objects keyed by name
+        classes : List of job classes from load_mix()
+
+        Returns:
+        Nothing
+        """
+        names = set()
+        for job_class in classes:
+            if job_class["name"] in names:
+                raise DWSError(f"Job mix has more than one job class named '{job_class['name']}'", DWSError.DWS_GENERAL)
+            names.add(job_class["name"])
+        self.classes = classes
+        self.sequence = [job_class for job_class in classes for _ in range(job_class["count"])]
+        self.engine = Simulator(settings, rabbits, [])
+        self.states = 0
+        self._demands = {}
+        self._visited = set()
+        # Deepest failure seen by the exact search: depth, binding resource, message
+        self._failure = (0, None, None)
+
+    def _job(self, idx):
+        """The idx'th job admitted."""
+        job_class = self.sequence[idx % len(self.sequence)]
+        return {"name": f"{job_class['name']}-{idx}", "nodes": job_class["nodes"],
+                "directives": job_class["directives"], "class": job_class["name"]}
+
+    def _probe(self, job_class):
+        """Plan one job of a class on the empty inventory and measure its demand."""
+        engine = self.engine
+        demand = {"nodes": job_class["nodes"], "bytes": 0, "chunks": {}}
+        engine.allocator.nodes = job_class["nodes"]
+        engine.allocator.workflow_name = job_class["name"]
+        try:
+            for breakdown in engine.allocator.plan_workflow(engine.breakdowns_for(job_class)):
+                for assignment in breakdown["allocationSet"]:
+                    count = sum(storage["allocationCount"] for storage in assignment["storage"])
+                    demand["bytes"] += assignment["allocationSize"] * count
+                    size = assignment["allocationSize"]
+                    demand["chunks"][size] = demand["chunks"].get(size, 0) + count
+        except DWSError as ex:
+            demand["message"] = ex.message
+        finally:
+            engine.allocator.rollback()
+        return demand
+
+    def upper_bound(self, demands):
+        """Count the jobs admitted before the inventory as a whole runs out.
+
+        Parameters:
+        demands : Dictionary of class name to demand from _probe()
+
+        Returns:
+        Tuple: number of jobs, name of the binding resource, message
+        """
+        engine = self.engine
+        sizes = sorted({size for demand in demands.values() for size in demand["chunks"]})
+        supply = {"computes": len(engine.free_computes),
+                  "storage": sum(r.remaining_storage for r in engine.rabbits.values())}
+        for size in sizes:
+            supply[f"allocations>={size}"] = sum(max(r.remaining_storage, 0) // size for r in engine.rabbits.values())
+
+        used = dict.fromkeys(supply, 0)
+        for idx in range(CapacityPlan.MAX_JOBS):
+            demand = demands[self.sequence[idx % len(self.sequence)]["name"]]
+            if "message" in demand:
+                return idx, "storage", demand["message"]
+            used["computes"] += demand["nodes"]
+            used["storage"] += demand["bytes"]
+            for size in sizes:
+                used[f"allocations>={size}"] += sum(count for chunk, count in demand["chunks"].items() if chunk >= size)
+            for resource, amount in supply.items():
+                if used[resource] > amount:
+                    return idx, resource, f"Job {idx} would need more {resource} than the inventory holds"
+        return CapacityPlan.MAX_JOBS, None, None
+
+    def _binding(self, job):
+        """Name the resource that kept a job from being placed."""
+        engine = self.engine
+        if len(engine.free_computes) < job["nodes"]:
+            return "computes"
+        free = sum(max(r.remaining_storage, 0) for r in engine.rabbits.values())
+        demand = self._demands[job["class"]]
+        if free < demand["bytes"]:
+            return "storage"
+        # Enough bytes in total but not where the placement rules need them
+        return "rabbits"
+
+    def greedy(self, limit):
+        """Place jobs in mix order until one does not fit.
+
+        Parameters:
+        limit : Stop after this many jobs
+
+        Returns:
+        Tuple: list of placed (charges, computes), binding resource, message
+        """
+        placed = []
+        while len(placed) < limit:
+            job = self._job(len(placed))
+            try:
+                charges, computes = self.engine.place(job)
+            except DWSError as ex:
+                return placed, self._binding(job), ex.message
+            placed.append((charges, computes))
+        return placed, None, None
+
+    def _search(self, depth, limit, best):
+        """Depth first search for the most jobs placed, returns the best depth found."""
+        if depth >= limit or self.states >= CapacityPlan.EXACT_MAX_STATES:
+            return max(best, depth)
+        best = max(best, depth)
+        engine = self.engine
+        key = (depth,
+               tuple(r.remaining_storage for r in engine.rabbits.values()),
+               tuple(len(free) for free in engine.rabbit_free_computes.values()))
+        if key in self._visited:
+            return best
+        self._visited.add(key)
+        self.states += 1
+
+        job = self._job(depth)
+        names = list(engine.rabbits)
+        tried = set()
+        saved = (engine.allocator.strategy, engine.allocator.last_rabbit)
+        engine.allocator.strategy = "roundrobin"
+        try:
+            for start in range(len(names)):
+                engine.allocator.last_rabbit = names[start - 1]
+                try:
+                    charges, computes = engine.place(job)
+                except DWSError as ex:
+                    if depth > self._failure[0]:
+                        self._failure = (depth, self._binding(job), ex.message)
+                    continue
+                signature = (tuple(sorted((name, tuple(charge)) for name, charge in charges.items())),
+                             tuple(sorted(computes)))
+                if signature not in tried:
+                    tried.add(signature)
+                    best = self._search(depth + 1, limit, best)
+                engine.remove(charges, computes)
+                if best >= limit:
+                    break
+        finally:
+            engine.allocator.strategy, engine.allocator.last_rabbit = saved
+        return best
+
+    def run(self):
+        """Find the maximum concurrency of the job mix.
+
+        Parameters:
+        None
+
+        Returns:
+        Dictionary of capacity planning results
+        """
+        start_time = time.time()
+        engine = self.engine
+        self._demands = {job_class["name"]: self._probe(job_class) for job_class in self.classes}
+        bound, bound_binding, bound_message = self.upper_bound(self._demands)
+        Console.debug(Console.MIN, f"Capacity plan upper bound {bound} jobs, bound by {bound_binding}")
+
+        placed, binding, message = self.greedy(bound)
+        greedy = len(placed)
+        remaining = {"storage": sum(r.remaining_storage for r in engine.rabbits.values()),
+                     "computes": len(engine.free_computes)}
+        for charges, computes in reversed(placed):
+            engine.remove(charges, computes)
+
+        best = greedy
+        searched = False
+        if best < bound and bound <= CapacityPlan.EXACT_MAX_JOBS and len(engine.rabbits) <= CapacityPlan.EXACT_MAX_RABBITS:
+            self._failure = (greedy, binding, message)
+            best = self._search(0, bound, greedy)
+            searched = self.states < CapacityPlan.EXACT_MAX_STATES
+            Console.debug(Console.MIN, f"Exact search visited {self.states} states, best {best} jobs")
+        if best >= bound:
+            # The next job cannot fit however the earlier ones are packed
+            binding, message = bound_binding, bound_message
+        elif best > greedy:
+            _, binding, message = self._failure
+
+        per_class = {job_class["name"]: 0 for job_class in self.classes}
+        for idx in range(best):
+            per_class[self._job(idx)["class"]] += 1
+
+        classes = []
+        for job_class in self.classes:
+            demand = self._demands[job_class["name"]]
+            classes.append({"name": job_class["name"], "nodes": job_class["nodes"], "count": job_class["count"],
+                            "directives": job_class["directives"], "bytes": demand["bytes"],
+                            "allocations": sum(demand["chunks"].values())})
+
+        result = {"classes": classes,
+                  "concurrency": best,
+                  "byClass": per_class,
+                  "greedy": greedy,
+                  "upperBound": bound,
+                  "upperBoundBinding": bound_binding,
+                  "exact": best >= bound,
+                  "searched": searched,
+                  "searchStates": self.states,
+                  "binding": binding,
+                  "greedyRemaining": remaining,
+                  "elapsedSeconds": round(time.time() - start_time, 3)}
+        if message is not None:
+            result["message"] = message
+        return result
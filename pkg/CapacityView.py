@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility array backed inventory capacity
+
+from .ColumnarInventory import ColumnarInventory
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+class CapacityView:
+    """Array backed view of inventory capacity, allocation counts, and readiness.
+
+    Rabbits are held in inventory order so that filtering preserves the
+    order the allocator would have walked them in.  NumPy arrays are used
+    when NumPy is installed, otherwise plain lists.
+    """
+
+    def __init__(self, rabbits, use_numpy=None):
+        """Build the view from an inventory.
+
+        Parameters:
+        rabbits : Inventory dictionary of Storage objects keyed by name
+        use_numpy : Force NumPy on or off, None uses NumPy when available
+
+        Returns:
+        Nothing
+        """
+        self.use_numpy = (np is not None) if use_numpy is None else (use_numpy and np is not None)
+        self.names = list(rabbits.keys())
+        self.index = {name: idx for idx, name in enumerate(self.names)}
+
+        if isinstance(rabbits, ColumnarInventory):
+            self._from_columns(rabbits)
+            return
+
+        capacity = [r.capacity for r in rabbits.values()]
+        remaining = [r.remaining_storage for r in rabbits.values()]
+        allocations = [r.allocationCount for r in rabbits.values()]
+        ready = [r.is_ready for r in rabbits.values()]
+
+        if self.use_numpy:
+            self.capacity = np.array(capacity, dtype=np.int64)
+            self.remaining = np.array(remaining, dtype=np.int64)
+            self.allocations = np.array(allocations, dtype=np.int64)
+            self.ready = np.array(ready, dtype=bool)
+        else:
+            self.capacity = capacity
+            self.remaining = remaining
+            self.allocations = allocations
+            self.ready = ready
+
+    def _from_columns(self, inventory):
+        """Copy the columns of a ColumnarInventory without visiting each rabbit."""
+        ready_code = inventory.statuses.index("Ready") if "Ready" in inventory.statuses else -1
+        if self.use_numpy:
+            rows = np.array(inventory.rows, dtype=np.int64)
+            self.capacity = np.frombuffer(inventory.capacity, dtype=np.int64)[rows]
+            self.remaining = np.frombuffer(inventory.remaining, dtype=np.int64)[rows]
+            self.allocations = np.frombuffer(inventory.allocations, dtype=np.int64)[rows]
+            self.ready = np.frombuffer(inventory.status, dtype=np.uint8)[rows] == ready_code
+        else:
+            self.capacity = [inventory.capacity[idx] for idx in inventory.rows]
+            self.remaining = [inventory.remaining[idx] for idx in inventory.rows]
+            self.allocations = [inventory.allocations[idx] for idx in inventory.rows]
+            self.ready = [inventory.status[idx] == ready_code for idx in inventory.rows]
+
+    def __len__(self):
+        return len(self.names)
+
+    def charge(self, name, size, count=1):
+        """Consume capacity on a rabbit.
+
+        Parameters:
+        name : Rabbit name
+        size : Number of bytes consumed
+        count : Number of allocations consumed
+
+        Returns:
+        Nothing
+        """
+        idx = self.index[name]
+        self.remaining[idx] -= size
+        self.allocations[idx] += count
+
+    def release(self, name, size, count=1):
+        """Return capacity to a rabbit (the inverse of charge)."""
+        self.charge(name, -size, -count)
+
+    def fits(self, size, remaining=True, ready_only=False):
+        """Mask of the rabbits that can take an allocation of size bytes.
+
+        Parameters:
+        size : Allocation size in bytes
+        remaining : Check the remaining capacity (inclusive) rather than the
+                    total capacity (exclusive, as Storage.has_sufficient_capacity)
+        ready_only : Only include Ready rabbits
+
+        Returns:
+        Boolean array (or list) in inventory order
+        """
+        if self.use_numpy:
+            mask = self.remaining >= size if remaining else self.capacity > size
+            if ready_only:
+                mask &= self.ready
+            return mask
+        if remaining:
+            mask = [free >= size for free in self.remaining]
+        else:
+            mask = [total > size for total in self.capacity]
+        if ready_only:
+            mask = [m and r for m, r in zip(mask, self.ready)]
+        return mask
+
+    def candidates(self, size, remaining=True, ready_only=False):
+        """Names of the rabbits that can take an allocation, in inventory order.
+
+        Parameters:
+        size : Allocation size in bytes
+        remaining : See fits()
+        ready_only : See fits()
+
+        Returns:
+        List of rabbit names
+        """
+        mask = self.fits(size, remaining, ready_only)
+        if self.use_numpy:
+            return [self.names[idx] for idx in np.flatnonzero(mask)]
+        return [name for name, fit in zip(self.names, mask) if fit]
+
+    def count_fitting(self, size, remaining=True, ready_only=False):
+        """Number of rabbits that can take an allocation of size bytes."""
+        mask = self.fits(size, remaining, ready_only)
+        if self.use_numpy:
+            return int(np.count_nonzero(mask))
+        return sum(mask)
+
+    def _values(self, column, names):
+        if names is None:
+            return column
+        indices = [self.index[name] for name in names]
+        if self.use_numpy:
+            return column[indices]
+        return [column[idx] for idx in indices]
+
+    def min_capacity(self, names=None):
+        """Smallest total capacity among the named rabbits (all by default)."""
+        values = self._values(self.capacity, names)
+        if len(values) == 0:
+            return None
+        return int(np.min(values)) if self.use_numpy else min(values)
+
+    def max_capacity(self, names=None):
+        """Largest total capacity among the named rabbits (all by default)."""
+        values = self._values(self.capacity, names)
+        if len(values) == 0:
+            return None
+        return int(np.max(values)) if self.use_numpy else max(values)
+
+    def total_remaining(self, names=None):
+        """Sum of the remaining capacity among the named rabbits (all by default)."""
+        values = self._values(self.remaining, names)
+        return int(np.sum(values)) if self.use_numpy else sum(values)
+
+    def load(self):
+        """Fraction of each rabbit's capacity that is allocated, in inventory order."""
+        if self.use_numpy:
+            safe = np.where(self.capacity > 0, self.capacity, 1)
+            return np.where(self.capacity > 0, 1 - self.remaining / safe, 0.0).tolist()
+        return [1 - free / total if total else 0.0 for free, total in zip(self.remaining, self.capacity)]
+
+    def ready_count(self):
+        """Number of Ready rabbits."""
+        if self.use_numpy:
+            return int(np.count_nonzero(self.ready))
+        return sum(self.ready)
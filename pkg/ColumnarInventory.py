@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility compact column oriented inventory
+
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+
+from .Console import Console
+
+
+class ColumnarRabbit:
+    """One rabbit of a ColumnarInventory, usable wherever a Storage object is.
+
+    Reads and writes go straight to the inventory's columns, so planning
+    state (remaining_storage, allocationCount) charged through one row
+    object is seen by every other.
+    """
+
+    __slots__ = ("inventory", "idx", "_computes")
+
+    def __init__(self, inventory, idx):
+        self.inventory = inventory
+        self.idx = idx
+        self._computes = None
+
+    @property
+    def name(self):
+        return self.inventory.all_names[self.idx]
+
+    @property
+    def status(self):
+        return self.inventory.statuses[self.inventory.status[self.idx]]
+
+    @property
+    def is_ready(self):
+        return self.status == "Ready"
+
+    @property
+    def capacity(self):
+        return self.inventory.capacity[self.idx]
+
+    @property
+    def remaining_storage(self):
+        return self.inventory.remaining[self.idx]
+
+    @remaining_storage.setter
+    def remaining_storage(self, value):
+        self.inventory.remaining[self.idx] = value
+
+    @property
+    def allocationCount(self):
+        return self.inventory.allocations[self.idx]
+
+    @allocationCount.setter
+    def allocationCount(self, value):
+        self.inventory.allocations[self.idx] = value
+
+    @property
+    def computes(self):
+        """The computes as Storage.computes lists them, built once per row."""
+        if self._computes is None:
+            self._computes = self.inventory.computes_of(self.idx)
+        return self._computes
+
+    @property
+    def raw_storage(self):
+        """A minimal Storage CR with the fields the inventory keeps."""
+        return {"metadata": {"name": self.name},
+                "status": {"status": self.status, "capacity": self.capacity,
+                           "access": {"computes": [dict(c) for c in self.computes]}}}
+
+    def has_sufficient_capacity(self, requestedCapacity):
+        return requestedCapacity < self.capacity
+
+    def allocs_remaining(self, alloc_size):
+        return self.capacity // alloc_size
+
+    def to_json(self):
+        return {"name": self.name, "status": self.status, "capacity": self.capacity, "computes": self.computes}
+
+
+class ColumnarInventory:
+    """Inventory held as columns rather than one Storage object per rabbit.
+
+    Rabbit capacity, remaining capacity, allocation count, and status are
+    each one array indexed by rabbit.  The computes of every rabbit are
+    stored back to back, rabbit i owning compute entries
+    compute_ptr[i]:compute_ptr[i + 1] (compressed sparse row adjacency).
+    Names are kept as one UTF-8 blob per kind with an offsets column, and
+    status strings are interned into a small table referenced by a byte.
+
+    The columns can be written to a file and memory mapped back; the
+    mapping is copy on write, so planning never modifies the file.  The
+    inventory behaves as a read only dictionary of rabbit name to
+    ColumnarRabbit, so the Allocator and the offline operations use it in
+    place of a dictionary of Storage objects.
+
+    Compute entries keep their name and status only.
+    """
+
+    MAGIC = b"DWSCOL1\0"
+
+    # Column name to array typecode
+    COLUMNS = {"capacity": "q", "remaining": "q", "allocations": "q", "status": "B",
+               "compute_ptr": "q", "compute_status": "B",
+               "rabbit_name_ptr": "q", "rabbit_names": "B",
+               "compute_name_ptr": "q", "compute_names": "B"}
+
+    def __init__(self, columns, statuses, rows=None, mapping=None):
+        """Initialize the inventory from its columns.
+
+        Parameters:
+        columns : Dictionary of column name (see COLUMNS) to array or memoryview
+        statuses : List of status strings the status columns index
+        rows : Indices of the rabbits included, None for every rabbit
+        mapping : mmap the columns are views of, kept open with the inventory
+
+        Returns:
+        Nothing
+        """
+        for name in ColumnarInventory.COLUMNS:
+            setattr(self, name, columns[name])
+        self.statuses = statuses
+        self._mapping = mapping
+        self.all_names = ColumnarInventory._decode_all(self.rabbit_name_ptr, self.rabbit_names)
+        self.rows = list(range(len(self.capacity))) if rows is None else rows
+        self._index = {self.all_names[idx]: idx for idx in self.rows}
+        self._rabbits = {}
+
+    # *********************************************
+    # * Building
+    # *********************************************
+    def build(rabbits):
+        """Build an inventory from (name, capacity, status, computes) tuples.
+
+        Parameters:
+        rabbits : Iterable of (name, capacity, status, computes) where
+                  computes is a list of {"name": ..., "status": ...}
+
+        Returns:
+        ColumnarInventory object
+        """
+        columns = {name: array.array(typecode) for name, typecode in ColumnarInventory.COLUMNS.items()}
+        statuses = {}
+        rabbit_names = bytearray()
+        compute_names = bytearray()
+        seen = set()
+
+        def status_code(status):
+            code = statuses.setdefault(status, len(statuses))
+            if code > 255:
+                raise Exception(f"Too many distinct status values for a columnar inventory, '{status}' is the 257th")
+            return code
+
+        columns["compute_ptr"].append(0)
+        columns["rabbit_name_ptr"].append(0)
+        columns["compute_name_ptr"].append(0)
+        for name, capacity, status, computes in rabbits:
+            if name in seen:
+                raise Exception(f"Duplicate nnf name '{name} found in file")
+            seen.add(name)
+            columns["capacity"].append(capacity)
+            columns["remaining"].append(capacity)
+            columns["allocations"].append(0)
+            columns["status"].append(status_code(status))
+            rabbit_names += name.encode()
+            columns["rabbit_name_ptr"].append(len(rabbit_names))
+            for c in computes:
+                compute_names += c["name"].encode()
+                columns["compute_name_ptr"].append(len(compute_names))
+                columns["compute_status"].append(status_code(c.get("status", "Ready")))
+            columns["compute_ptr"].append(len(columns["compute_status"]))
+        columns["rabbit_names"] = array.array("B", rabbit_names)
+        columns["compute_names"] = array.array("B", compute_names)
+        return ColumnarInventory(columns, list(statuses))
+
+    def from_document(inventory_data):
+        """Build an inventory from a parsed inventory file.
+
+        Parameters:
+        inventory_data : Parsed 'system: nnf-nodes:' document
+
+        Returns:
+        ColumnarInventory object
+        """
+        if 'system' not in inventory_data:
+            raise Exception("'system' is missing from the file")
+        if 'nnf-nodes' not in inventory_data['system']:
+            Console.output("'nnf-nodes:' array missing from file")
+            return ColumnarInventory.build([])
+
+        def rows():
+            for node in inventory_data['system']['nnf-nodes']:
+                name = node['metadata']['name']
+                status = node['status']
+                computes = [c for c in status['access'].get('computes', []) if c['name'] != name]
+                yield name, status['capacity'], status['status'], computes
+        return ColumnarInventory.build(rows())
+
+    def from_storages(rabbits):
+        """Build an inventory from a dictionary of Storage objects.
+
+        Parameters:
+        rabbits : Inventory dictionary of Storage objects keyed by name
+
+        Returns:
+        ColumnarInventory object
+        """
+        return ColumnarInventory.build((r.name, r.capacity, r.status, r.computes) for r in rabbits.values())
+
+    def select(self, predicate):
+        """The rabbits a predicate accepts, sharing this inventory's columns.
+
+        Parameters:
+        predicate : Function of a ColumnarRabbit returning True to keep it
+
+        Returns:
+        ColumnarInventory object
+        """
+        columns = {name: getattr(self, name) for name in ColumnarInventory.COLUMNS}
+        rows = [idx for idx in self.rows if predicate(self.rabbit(idx))]
+        return ColumnarInventory(columns, self.statuses, rows, self._mapping)
+
+    # *********************************************
+    # * File format
+    # *********************************************
+    def save(self, path, key):
+        """Write the columns of every rabbit, replacing any existing file.
+
+        Layout: MAGIC, a little endian uint64 header length, the JSON
+        header, then each column aligned to 8 bytes in native byte order.
+
+        Parameters:
+        path : Path of the file
+        key : JSON serializable value load() must be given to accept the file
+
+        Returns:
+        Nothing
+        """
+        layout = {}
+        offset = 0
+        blobs = []
+        for name, typecode in ColumnarInventory.COLUMNS.items():
+            blob = memoryview(getattr(self, name)).cast("B")
+            layout[name] = [typecode, offset, len(blob)]
+            blobs.append(blob)
+            offset += (len(blob) + 7) & ~7
+        header = json.dumps({"key": key, "byteorder": sys.byteorder, "statuses": self.statuses,
+                             "columns": layout}).encode()
+        start = len(ColumnarInventory.MAGIC) + 8 + len(header)
+        start = (start + 7) & ~7
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as stream:
+            stream.write(ColumnarInventory.MAGIC)
+            stream.write(struct.pack("<Q", len(header)))
+            stream.write(header)
+            stream.write(b"\0" * (start - stream.tell()))
+            for blob in blobs:
+                stream.write(blob)
+                stream.write(b"\0" * (-len(blob) & 7))
+        os.replace(tmp_path, path)
+
+    def load(path, key):
+        """Memory map a file written by save().
+
+        Parameters:
+        path : Path of the file
+        key : Value the file must have been saved with
+
+        Returns:
+        ColumnarInventory object, None if the file is missing, unreadable, or
+        was saved with a different key
+        """
+        try:
+            with open(path, "rb") as stream:
+                mapping = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (OSError, ValueError) as ex:
+            if not isinstance(ex, FileNotFoundError):
+                Console.debug(Console.MIN, f"Columnar inventory {path} not loaded: {ex}")
+            return None
+        try:
+            magic_size = len(ColumnarInventory.MAGIC)
+            if mapping[:magic_size] != ColumnarInventory.MAGIC:
+                raise ValueError("not a columnar inventory")
+            header_size = struct.unpack("<Q", mapping[magic_size:magic_size + 8])[0]
+            header = json.loads(mapping[magic_size + 8:magic_size + 8 + header_size])
+            if header.get("key") != key or header.get("byteorder") != sys.byteorder:
+                Console.debug(Console.WORDY, f"Columnar inventory {path} is stale")
+                return None
+            start = (magic_size + 8 + header_size + 7) & ~7
+            view = memoryview(mapping)
+            columns = {}
+            for name, typecode in ColumnarInventory.COLUMNS.items():
+                saved_typecode, offset, size = header["columns"][name]
+                if saved_typecode != typecode or start + offset + size > len(mapping):
+                    raise ValueError(f"column {name} is damaged")
+                columns[name] = view[start + offset:start + offset + size].cast(typecode)
+            return ColumnarInventory(columns, header["statuses"], mapping=mapping)
+        except (ValueError, KeyError, TypeError, struct.error) as ex:
+            Console.debug(Console.MIN, f"Columnar inventory {path} not loaded: {ex}")
+            return None
+
+    # *********************************************
+    # * Access
+    # *********************************************
+    def _decode_all(ptr, blob):
+        data = bytes(blob)
+        return [sys.intern(data[ptr[idx]:ptr[idx + 1]].decode()) for idx in range(len(ptr) - 1)]
+
+    def compute_names_of(self, idx):
+        """Names of the computes of the rabbit at column index idx."""
+        ptr = self.compute_name_ptr
+        first, last = self.compute_ptr[idx], self.compute_ptr[idx + 1]
+        data = bytes(self.compute_names[ptr[first]:ptr[last]])
+        base = ptr[first]
+        return [data[ptr[cidx] - base:ptr[cidx + 1] - base].decode() for cidx in range(first, last)]
+
+    def computes_of(self, idx):
+        """Computes of the rabbit at column index idx as {"name": ..., "status": ...}."""
+        first = self.compute_ptr[idx]
+        return [{"name": name, "status": self.statuses[self.compute_status[first + offset]]}
+                for offset, name in enumerate(self.compute_names_of(idx))]
+
+    def rabbit(self, idx):
+        """Row object for the rabbit at column index idx."""
+        r = self._rabbits.get(idx)
+        if r is None:
+            r = self._rabbits[idx] = ColumnarRabbit(self, idx)
+        return r
+
+    def column_index(self, name):
+        return self._index[name]
+
+    @property
+    def names(self):
+        """Names of the rabbits included, in inventory order."""
+        return [self.all_names[idx] for idx in self.rows]
+
+    @property
+    def compute_count(self):
+        return sum(self.compute_ptr[idx + 1] - self.compute_ptr[idx] for idx in self.rows)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the columns."""
+        return sum(memoryview(getattr(self, name)).nbytes for name in ColumnarInventory.COLUMNS)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __getitem__(self, name):
+        return self.rabbit(self._index[name])
+
+    def get(self, name, default=None):
+        idx = self._index.get(name)
+        return default if idx is None else self.rabbit(idx)
+
+    def keys(self):
+        return self.names
+
+    def values(self):
+        return [self.rabbit(idx) for idx in self.rows]
+
+    def items(self):
+        return [(self.all_names[idx], self.rabbit(idx)) for idx in self.rows]
@@ -27,7 +27,14 @@ import random
 import json
 import yaml
 
+from .Allocator import Allocator
 from .Console import Console
+from .Dws import DWSError
+from .ExclusionMatcher import ExclusionMatcher
+from .InventoryGenerator import InventoryGenerator
+from .InventoryQuery import InventoryQuery
+from .InventoryWatch import InventoryWatch
+from .Telemetry import Telemetry
 
 
 class Config:
@@ -36,6 +43,21 @@ class Config:
     K8S_VERSION = "v1alpha1"
     DWSUTIL_VERSION = "0.2"
 
+    # Operations that work entirely from local files and never contact k8s
+    OFFLINE_OPERATIONS = {"WFR": ["FITCHECK", "SIMULATE", "SWEEP"], "INVENTORY": ["GENERATE"]}
+
+    # Operations that only need a cluster when no inventory file is given
+    INVENTORY_OPERATIONS = {"WFR": ["CAPACITYPLAN"], "INVENTORY": ["QUERY", "SUMMARY"]}
+
+    # Read-only operations that can run against several k8s contexts at once
+    FANOUT_OPERATIONS = {"WFR": ["LIST", "INVESTIGATE"],
+                         "INVENTORY": ["QUERY", "SHOW", "SUMMARY", "UTILIZATION"],
+                         "STORAGE": ["LIST"],
+                         "SYSTEM": ["INVESTIGATE", "RESOURCELIST"]}
+
+    # Output formats for --stream
+    STREAM_FORMATS = ["ndjson", "json"]
+
     def infinite_sequence():
         num = random.randint(0, 9)
         while True:
@@ -71,6 +93,8 @@ class Config:
         self.k8s_active_context = ""
         self.k8s_active_context_source = None
         self.k8s_contexts = []
+        self.k8s_fanout_contexts = []
+        self.k8s_all_contexts = False
         self.wfr_name = ""
         self.wfr_name_source = "default"
         self.job_id = 5555
@@ -93,6 +117,8 @@ class Config:
         self.dwsport = ""
         self.inventory_file = None
         self.inventory_file_source = None
+        self.inventory_cache = True
+        self.columnar = False
         self.nodes = 1
         self.nodelist = None
         self.pretty = True
@@ -101,6 +127,37 @@ class Config:
         self.ost_per_rabbit = 1
         self.alloc_recipe = {}
         self.alloc_raw = []
+        self.plan_cache_dir = None
+        self.plan_cache_size = 128
+        self.topology_cache_file = None
+        self.trace_file = None
+        self.mix_file = None
+        self.plan_out_file = None
+        self.apply_file = None
+        self.export_file = None
+        self.since_file = None
+        self.storage_file = None
+        self.queries = []
+        self.stream_format = None
+        self.generate_rabbits = 10
+        self.generate_computes = 16
+        self.generate_capacity = InventoryGenerator.DEFAULT_CAPACITY
+        self.not_ready = 0.0
+        self.computes_not_ready = 0.0
+        self.rabbit_pattern = InventoryGenerator.DEFAULT_RABBIT_PATTERN
+        self.compute_pattern = InventoryGenerator.DEFAULT_COMPUTE_PATTERN
+        self.sample_interval = 3600
+        self.strategy = "first"
+        self.seed = 0
+        self.telemetry = None
+        self.telemetry_ttl = Telemetry.DEFAULT_TTL
+        self.debounce = InventoryWatch.DEFAULT_DEBOUNCE
+        self.watch_seconds = None
+        self.replan = False
+        self.cursor_file = None
+        self.grid = None
+        self.workers = None
+        self.ledger_file = None
 
         self.operation_count = 1
         self.singlethread = False
@@ -176,46 +233,77 @@ class Config:
         self.output_usage_item_detail(1, "   allocations per server may be specified by suffixing the server name with :<count>, default is 1")
         self.output_usage_item_detail(1, "   Note: You must specify all components, mgt, mdt, and ost")
         self.output_usage_item("-c/--config <configfile>", "Specify simulator configuration file")
+        self.output_usage_item("--columnar", "Hold an inventory file as compact columns, memory mapped from '<file>.dwscols'")
         self.output_usage_item("--dw '#DW ....'", "Add a DataWarp directive, may occur multiple times")
         self.output_usage_item("--exr rabbit1,rabbit2,...rabbitN", "Exclude the listed rabbits when assigning resources")
         self.output_usage_item("--exc compute1,compute2,...computeN", "Exclude the listed computes when assigning resources")
+        self.output_usage_item_detail(1, "Exclusions for --exr/--exc may be names, hostlist ranges (compute_r01_[01-16]), globs (compute-1*), or regexes (re:compute-(01|02))")
+        self.output_usage_item("--grid <file|spec>", "Settings grid for SWEEP, a YAML file or e.g. 'ostcount=1,2,4;noreuse=true,false'")
+        self.output_usage_item("--exrfile <file>", "Exclude the rabbits listed in <file>, one or more per line")
+        self.output_usage_item("--excfile <file>", "Exclude the computes listed in <file>, one or more per line")
 #        self.output_usage_item("--force", "Force an operation that would ordinarily be prevented")
         self.output_usage_item("-i/--inventory <inventoryfile>", "Override cluster inventory for the simulator using the file provided")
+        self.output_usage_item("--interval <seconds>", "Virtual seconds between load samples for SIMULATE, default=3600")
         self.output_usage_item("--ignoreready", "Ignore ready status of computes and rabbits")
         self.output_usage_item("-j/--jobid <job_id>", "Specify the job id to be used in the Workflow Resource")
         self.output_usage_item("-k/--kcfg <configfile>", "Specify kubernetes configuration file")
         self.output_usage_item("--kctx <context>", "Kubernetes context to use")
+        self.output_usage_item_detail(1, "A list of contexts (--kctx dp0,dp1b) runs the operation against each of them concurrently")
+        self.output_usage_item("--all-contexts", "Run the operation against every context in the kubernetes configuration concurrently")
+        self.output_usage_item_detail(1, "Contexts may be used with: wfr list/investigate, inventory show/utilization, storage list, system investigate/resourcelist")
+        self.output_usage_item("--ledger <ledgerfile>", "Storage and computes already in use (YAML or JSON) for FITCHECK")
+        self.output_usage_item("--mix <mixfile>", "Job classes (YAML or JSON) with nodes, directives, and count per round for CAPACITYPLAN")
         self.output_usage_item("--munge", "Automatically add process id to the workflow resource name, default is not to munge")
         self.output_usage_item("--mungecompute", "Munge compute names if they are named 'Compute x', default is not to munge")
         self.output_usage_item("-n/--name <wfr_name>", "Specify the name of the Workflow Resource")
         self.output_usage_item("--node <number>", "Specify the number of compute nodes, default=1")
+        self.output_usage_item("--noinventorycache", "Always parse the inventory file, do not read or write '<file>.dwscache'")
 #        self.output_usage_item("--nodelist compute1,compute2,compute3,...computeN", "Specify the list of compute nodes to be used")
         self.output_usage_item("--notimestamp", "Remove timestamping from the output")
         self.output_usage_item("--opcount <number>", "Perform the requested operation <number> times, default=1")
         self.output_usage_item("--ostcount <number>", "Number of OST HOSTS for Lustre, default=2")
         self.output_usage_item("--ostperrabbit <number>", "Number of OSTs per Rabbit for Lustre, default=1")
+        self.output_usage_item("--plancache <directory>", "Keep server allocation plans on disk in <directory> for reuse")
+        self.output_usage_item("--plancachesize <number>", "Maximum number of cached allocation plans, default=128")
         self.output_usage_item("--pretty", "Format JSON output")
         self.output_usage_item("-q", "Suppress non-operational output")
         self.output_usage_item("--regex", "Enable regex pattern matching for operations that allow regexes")
         self.output_usage_item("--noreuse", "Do not use the same rabbit for lustre components if possible")
         self.output_usage_item("--showconfig", "Show configuration and quit without doing anything")
 #        self.output_usage_item("--singlethread", "Do not multithread bulk operations")
+        self.output_usage_item("--strategy <strategy>", "Placement strategy for server allocations, default=first")
+        self.output_usage_item_detail(1, "first, roundrobin, random, leastallocated, or hash (consistent hashing on the workflow name)")
+        self.output_usage_item("--seed <number>", "Seed for the random placement strategy and GENERATE, default=0")
+        self.output_usage_item("--cursorfile <file>", "Remember where the roundrobin placement strategy resumes in <file>")
+        self.output_usage_item("--telemetry <source>", "Prefer rabbits with less load from a metrics file or unix:<socket path>")
+        self.output_usage_item("--telemetryttl <seconds>", f"Seconds telemetry metrics are reused, default={Telemetry.DEFAULT_TTL}")
+        self.output_usage_item("--topologycache <file>", "Keep the rabbit to compute topology in <file>, refreshed by Storage resourceVersion")
+        self.output_usage_item("--trace <tracefile>", "Job trace (YAML or JSON) to replay for SIMULATE")
         self.output_usage_item("-u/--userid <user_id>", "Specify the user id to be used in the Workflow Resource")
         self.output_usage_item("-g/--groupid <group_id>", "Specify the group id to be used in the Workflow Resource")
         self.output_usage_item("-v", "Incrementally increase verbosity with each flag provided")
         self.output_usage_item("--version", "Show version and exit")
         self.output_usage_item("-w/--wlmid <wlm_id>", "Specify the WLM id to be used in the Workflow Resource")
+        self.output_usage_item("--workers <number>", "Number of worker processes for SWEEP, default is one per core")
         Console.outputnotsp("")
         self.output_usage_item("--context <context>", "Provide the 'context' for the operation.  Default is 'WFR'")
         self.output_usage_item("--operation <operation>", "Provide the 'operation' to be performed.  Valid operations are:")
         self.output_usage_item_detail(1, "Note: 'context' and 'operation' ARE NOT CASE SENSITIVE")
         self.output_usage_item_detail(1, "When context = WFR")
+        self.output_usage_item_detail(3, "ASSIGN - Plan servers and computes for the WFR (regex allowed), then apply the plan")
+        self.output_usage_item_detail(4, "--planout <planfile> - Write the plan with the resourceVersions it is based on instead of applying it")
+        self.output_usage_item_detail(4, "--apply <planfile> - Apply a plan written by --planout, patches to CRs that changed since are rejected")
         self.output_usage_item_detail(3, "ASSIGNCOMPUTES - Choose computes based on the directivebreakdown")
         self.output_usage_item_detail(3, "ASSIGNSERVERS - Choose rabbits based on the directivebreakdown")
+        self.output_usage_item_detail(3, "CAPACITYPLAN - How many jobs of a mix fit at once on the cluster or an inventory file, and what runs out first")
+        self.output_usage_item_detail(4, "--mix <mixfile> - Job classes to admit in rounds, default is the --dw directives and --nodes")
         self.output_usage_item_detail(3, "CREATE - Create the specified WFR")
         self.output_usage_item_detail(3, "DELETE - Delete the WFR matching the specified name (regex allowed)")
         self.output_usage_item_detail(4, "--nowait - Do not wait for WFR to be Ready before deletion")
         self.output_usage_item_detail(4, f"-t/--timeout <seconds> - Wait the specified number of seconds for the WFR to be Ready (default {self.timeout_seconds}")
+        self.output_usage_item_detail(3, "FITCHECK - Check whether the --dw directives and --nodes fit an inventory file now, without a WFR")
+        self.output_usage_item_detail(4, "-i/--inventory <inventoryfile> - Inventory to check against (required)")
+        self.output_usage_item_detail(4, "--ledger <ledgerfile> - Allocated bytes per rabbit and computes in use")
         self.output_usage_item_detail(3, "GET - Get the named workflow resource")
         self.output_usage_item_detail(3, "INVESTIGATE - Analyze the named WFR and associated objects")
         self.output_usage_item_detail(3, "LIST - List all workflows the system knows about")
@@ -223,8 +311,35 @@ class Config:
         self.output_usage_item_detail(4, "--nowait - Do not wait for WFR to be Ready before progressing")
         self.output_usage_item_detail(4, f"-t/--timeout <seconds> - Wait the specified number of seconds for the WFR to be Ready (default {self.timeout_seconds}")
         self.output_usage_item_detail(3, "PROGRESSTEARDOWN - Progress directly to 'teardown' desired state regardless of current state (regex allowed)")
+        self.output_usage_item_detail(3, "SIMULATE - Replay a job trace against an inventory file offline")
+        self.output_usage_item_detail(4, "-i/--inventory <inventoryfile> - Inventory to simulate against (required)")
+        self.output_usage_item_detail(4, "--trace <tracefile> - Jobs with arrival, duration, nodes, and directives (required)")
+        self.output_usage_item_detail(3, "SWEEP - Rank a grid of placement settings for the --dw directives against an inventory file")
+        self.output_usage_item_detail(4, "--grid <file|spec> - Grid of ostcount, ostperrabbit, noreuse, strategy, and nodes values")
         self.output_usage_item_detail(1, "When context = INVENTORY")
+        self.output_usage_item_detail(3, "EXPORT - Write the cluster's Storage CRs as an inventory file usable with -i/--inventory")
+        self.output_usage_item_detail(4, "--exportfile <file> - Snapshot to write")
+        self.output_usage_item_detail(4, "--since <file> - Bring a snapshot written by EXPORT up to date with only the Storages that changed")
+        self.output_usage_item_detail(3, "GENERATE - Write a synthetic inventory file and/or Storage CR JSON of any size, without a cluster")
+        self.output_usage_item_detail(4, "--exportfile <file> - Inventory file to write")
+        self.output_usage_item_detail(4, "--storagefile <file> - JSON List of Storage CRs to write")
+        self.output_usage_item_detail(4, "--rabbits <number> - Number of rabbits, default=10")
+        self.output_usage_item_detail(4, "--computes <number> - Number of computes per rabbit, default=16")
+        self.output_usage_item_detail(4, "--capacity <spec> - Rabbit capacity: 40TB, uniform:10TB-40TB, normal:30TB,5TB, or choice:10TB,20TB")
+        self.output_usage_item_detail(4, "--notready <fraction>[,<fraction>] - Fraction of the rabbits, and of the computes, that are NotReady")
+        self.output_usage_item_detail(4, "--namepattern <rabbit>[,<compute>] - Name patterns with {r} rabbit, {c} compute in rabbit, {n} compute number")
+        self.output_usage_item_detail(3, "QUERY - List the rabbits matching filter expressions, from the cluster or an inventory file")
+        self.output_usage_item_detail(4, "--query <expression> - e.g. 'status == Ready and capacity >= 20TB and readycomputes >= 12', may occur multiple times")
+        self.output_usage_item_detail(4, "Fields: name, status, compute (==, !=, ~ pattern) and capacity, computes, readycomputes (==, !=, <, <=, >, >=)")
+        self.output_usage_item_detail(4, "Combine with and, or, not, and parentheses")
         self.output_usage_item_detail(3, "SHOW - Displays the nnf nodes and inventory from the cluster or inventory file")
+        self.output_usage_item_detail(4, "--stream <ndjson|json> - Write each nnf node as it is read, one per line (ndjson) or as one incrementally written document (json)")
+        self.output_usage_item_detail(3, "SUMMARY - Rabbit and compute totals, capacity percentiles, and computes per rabbit, from the cluster or an inventory file")
+        self.output_usage_item_detail(3, "WATCH - Follow the Storage CRs and report rabbit and compute readiness and capacity changes")
+        self.output_usage_item_detail(4, f"--debounce <seconds> - Report a rabbit once its changes have settled this long, default={InventoryWatch.DEFAULT_DEBOUNCE}")
+        self.output_usage_item_detail(4, "--replan - Re-plan the assigned workflows on each changed rabbit and patch their Servers and Computes CRs (reported only with --preview)")
+        self.output_usage_item_detail(4, "--watchseconds <seconds> - Stop after this many seconds, default is to watch until interrupted")
+        self.output_usage_item_detail(3, "UTILIZATION - Per rabbit allocated capacity and compute usage from the servers and computes CRs, with skew and fragmentation")
         self.output_usage_item_detail(1, "When context = STORAGE")
         self.output_usage_item_detail(3, "LIST - List all Storage CRs the system knows about")
         self.output_usage_item_detail(1, "When context = SYSTEM")
@@ -279,6 +394,12 @@ class Config:
             if not os.path.exists(self.k8s_config):
                 self.usage(f"Kubernetes configuration file '{self.k8s_config}' does not exist")
 
+        if self.is_fanout():
+            if self.operation not in Config.FANOUT_OPERATIONS.get(self.context, []):
+                self.usage(f"Operation {self.operation} for {self.context} can not be run against multiple contexts")
+            if self.is_offline():
+                self.usage("Multiple contexts can not be used with an operation that does not contact a cluster")
+
         if self.context == "WFR" and self.operation in ["CREATE", "GET", "ASSIGNCOMPUTES", "ASSIGNSERVERS", "DELETE", "PROGRESS", "PROGRESSTEARDOWN", "INVESTIGATE"]:
             if self.wfr_name is None or self.wfr_name.strip() == '':
                 self.usage(f"Workflow name is required for operation {self.operation}")
@@ -292,12 +413,109 @@ class Config:
             if not os.path.exists(self.inventory_file):
                 self.usage(f"Inventory '{self.inventory_file}' does not exist")
 
+        if self.context == "WFR" and self.operation == "SIMULATE":
+            if self.inventory_file is None:
+                self.usage("An inventory file is required for operation SIMULATE")
+            if self.trace_file is None:
+                self.usage("A job trace is required for operation SIMULATE")
+            if not os.path.exists(self.trace_file):
+                self.usage(f"Trace '{self.trace_file}' does not exist")
+            if self.sample_interval <= 0:
+                self.usage("--interval must be greater than 0")
+
+        if self.context == "WFR" and self.operation == "ASSIGN":
+            if self.apply_file is None and (self.wfr_name is None or self.wfr_name.strip() == ''):
+                self.usage("Workflow name is required for operation ASSIGN unless --apply is given")
+            if self.apply_file is not None and self.plan_out_file is not None:
+                self.usage("--planout and --apply can not be used together")
+            if self.apply_file is not None and not os.path.exists(self.apply_file):
+                self.usage(f"Plan '{self.apply_file}' does not exist")
+
+        if self.context == "INVENTORY" and self.operation == "WATCH":
+            if self.debounce < 0:
+                self.usage("--debounce can not be negative")
+            if self.watch_seconds is not None and self.watch_seconds <= 0:
+                self.usage("--watchseconds must be greater than 0")
+
+        if self.replan and (self.context != "INVENTORY" or self.operation != "WATCH"):
+            self.usage("--replan is only valid for operation WATCH in context INVENTORY")
+
+        if self.stream_format is not None:
+            if self.stream_format not in Config.STREAM_FORMATS:
+                self.usage(f"Unknown stream format '{self.stream_format}', valid formats are {Config.STREAM_FORMATS}")
+            if self.context != "INVENTORY" or self.operation != "SHOW":
+                self.usage("--stream is only valid for operation SHOW in context INVENTORY")
+            if self.is_fanout():
+                self.usage("--stream can not be used with multiple contexts")
+
+        if self.context == "INVENTORY" and self.operation == "QUERY":
+            if len(self.queries) == 0:
+                self.usage("At least one --query expression is required for operation QUERY")
+            for query in self.queries:
+                try:
+                    InventoryQuery.parse(query)
+                except DWSError as ex:
+                    self.usage(ex.message)
+
+        if self.context == "INVENTORY" and self.operation == "GENERATE":
+            if self.export_file is None and self.storage_file is None:
+                self.usage("An --exportfile or --storagefile is required for operation GENERATE")
+            if self.generate_rabbits <= 0:
+                self.usage("--rabbits must be greater than 0")
+            if self.generate_computes < 0:
+                self.usage("--computes can not be negative")
+            if not (0 <= self.not_ready <= 1 and 0 <= self.computes_not_ready <= 1):
+                self.usage("--notready fractions must be between 0 and 1")
+            try:
+                InventoryGenerator.parse_capacity(self.generate_capacity)
+                InventoryGenerator.check_patterns(self.rabbit_pattern, self.compute_pattern)
+            except DWSError as ex:
+                self.usage(ex.message)
+
+        if self.context == "INVENTORY" and self.operation == "EXPORT":
+            if self.export_file is None and self.since_file is None:
+                self.usage("An --exportfile or --since snapshot is required for operation EXPORT")
+            if self.since_file is not None and not os.path.exists(self.since_file):
+                self.usage(f"Snapshot '{self.since_file}' does not exist")
+
+        if self.context == "WFR" and self.operation == "CAPACITYPLAN":
+            if self.mix_file is None and len(self.dwdirectives) == 0:
+                self.usage("A --mix file or at least one --dw directive is required for operation CAPACITYPLAN")
+            if self.mix_file is not None and not os.path.exists(self.mix_file):
+                self.usage(f"Job mix '{self.mix_file}' does not exist")
+
+        if self.context == "WFR" and self.operation == "FITCHECK":
+            if self.inventory_file is None:
+                self.usage("An inventory file is required for operation FITCHECK")
+            if self.ledger_file is not None and not os.path.exists(self.ledger_file):
+                self.usage(f"Ledger '{self.ledger_file}' does not exist")
+
+        if self.context == "WFR" and self.operation == "SWEEP":
+            if self.inventory_file is None:
+                self.usage("An inventory file is required for operation SWEEP")
+            if len(self.dwdirectives) == 0:
+                self.usage("At least one --dw directive is required for operation SWEEP")
+
+        if self.telemetry is not None and not self.telemetry.startswith("unix:"):
+            if not os.path.exists(self.telemetry):
+                self.usage(f"Telemetry '{self.telemetry}' does not exist")
+
+        if self.strategy not in Allocator.STRATEGIES:
+            self.usage(f"Unknown strategy '{self.strategy}', valid strategies are {Allocator.STRATEGIES}")
+
         if len(self.alloc_raw) > 0 and len(self.exclude_rabbits) > 0:
             self.usage("--alloc flag/config cannot be used with --exr flag/config")
 
         # Strip spaces off of exclude list elements
-        self.exclude_rabbits = [r.strip().lower() for r in self.exclude_rabbits]
-        self.exclude_computes = [c.strip().lower() for c in self.exclude_computes]
+        self.exclude_rabbits = [ExclusionMatcher.normalize(r) for r in self.exclude_rabbits]
+        self.exclude_computes = [ExclusionMatcher.normalize(c) for c in self.exclude_computes]
+
+        # Make sure the exclusions compile
+        try:
+            ExclusionMatcher(self.exclude_rabbits)
+            ExclusionMatcher(self.exclude_computes)
+        except DWSError as ex:
+            self.usage(ex.message)
 
     def output_config_item(self, item, value, source=None):
         """Used to output formatted configuration information to the console.
@@ -335,6 +553,10 @@ class Config:
             self.output_config_item("K8S default", self.k8s_default)
             self.output_config_item("Available contexts", self.k8s_contexts)
             self.output_config_item("Using K8S context", self.k8s_active_context, self.k8s_active_context_source)
+        if self.k8s_all_contexts:
+            self.output_config_item("Fan-out contexts", "All")
+        elif self.k8s_fanout_contexts:
+            self.output_config_item("Fan-out contexts", self.k8s_fanout_contexts)
 
         if init_flags_only:
             return
@@ -351,6 +573,45 @@ class Config:
         self.output_config_item("Exclude computes", self.exclude_computes)
         self.output_config_item("Exclude rabbits", self.exclude_rabbits)
         self.output_config_item("Inventory file", self.inventory_file)
+        self.output_config_item("Inventory cache", self.inventory_cache)
+        self.output_config_item("Columnar inventory", self.columnar)
+        self.output_config_item("Plan cache", self.plan_cache_dir)
+        self.output_config_item("Topology cache", self.topology_cache_file)
+        if self.ledger_file is not None:
+            self.output_config_item("Ledger", self.ledger_file)
+        self.output_config_item("Strategy", self.strategy)
+        if self.strategy == "random":
+            self.output_config_item("Seed", self.seed)
+        if self.cursor_file is not None:
+            self.output_config_item("Cursor file", self.cursor_file)
+        if self.telemetry is not None:
+            self.output_config_item("Telemetry", f"{self.telemetry} (ttl {self.telemetry_ttl}s)")
+        if self.trace_file is not None:
+            self.output_config_item("Trace file", self.trace_file)
+        if self.mix_file is not None:
+            self.output_config_item("Job mix", self.mix_file)
+        if self.plan_out_file is not None:
+            self.output_config_item("Plan out", self.plan_out_file)
+        if self.apply_file is not None:
+            self.output_config_item("Apply plan", self.apply_file)
+        if self.context == "INVENTORY" and self.operation == "WATCH":
+            self.output_config_item("Debounce", f"{self.debounce}s")
+            self.output_config_item("Watch seconds", self.watch_seconds)
+            self.output_config_item("Re-plan", self.replan)
+        if self.export_file is not None:
+            self.output_config_item("Export file", self.export_file)
+        if self.since_file is not None:
+            self.output_config_item("Since snapshot", self.since_file)
+        for query in self.queries:
+            self.output_config_item("Query", query)
+        if self.stream_format is not None:
+            self.output_config_item("Stream", self.stream_format)
+        if self.context == "INVENTORY" and self.operation == "GENERATE":
+            self.output_config_item("Storage file", self.storage_file)
+            self.output_config_item("Rabbits", f"{self.generate_rabbits} x {self.generate_computes} computes")
+            self.output_config_item("Capacity", self.generate_capacity)
+            self.output_config_item("Not ready", f"{self.not_ready} rabbits, {self.computes_not_ready} computes")
+            self.output_config_item("Name patterns", f"{self.rabbit_pattern}, {self.compute_pattern}")
 #        self.output_config_item("nodes", self.nodelist)
         if len(self.dwdirectives) == 0:
             self.output_config_item("dw directives", "None")
@@ -387,6 +648,20 @@ class Config:
             return None, 0
         return self.argv[index], index+1
 
+    def read_exclusion_file(self, path):
+        """Read exclusion patterns from a file, displaying usage on failure.
+
+        Parameters:
+        path : Path to the exclusion file
+
+        Returns:
+        List of exclusion patterns
+        """
+        try:
+            return ExclusionMatcher.read_file(path)
+        except OSError as ex:
+            self.usage(f"Unable to read exclusion file '{path}': {ex.strerror}")
+
     def process_alloc(self, alloc_str):
         """Process the the argument to the --alloc flag
 
@@ -502,6 +777,20 @@ class Config:
                 self.exclude_computes += arg.split(",")
                 continue
 
+            if arg in ["--excfile"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A file of compute nodes to exclude must be specified with --excfile   e.g. --excfile drained.txt")
+                self.exclude_computes += self.read_exclusion_file(arg)
+                continue
+
+            if arg in ["--exrfile"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A file of rabbit nodes to exclude must be specified with --exrfile   e.g. --exrfile drained.txt")
+                self.exclude_rabbits += self.read_exclusion_file(arg)
+                continue
+
             if arg in ["--exr"]:
                 arg, aidx = self.get_arg(aidx)
                 if arg is None:
@@ -525,6 +814,27 @@ class Config:
                 self.ignore_ready = True
                 continue
 
+            if arg in ["--grid"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A grid file or specification must be specified with --grid   e.g. --grid 'ostcount=1,2,4;ostperrabbit=1,2'")
+                self.grid = arg
+                continue
+
+            if arg in ["--ledger"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A ledger file must be specified with --ledger   e.g. --ledger ledger.yaml")
+                self.ledger_file = arg
+                continue
+
+            if arg in ["--interval"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A number of seconds must be specified with --interval   e.g. --interval 600")
+                self.sample_interval = int(arg)
+                continue
+
             if arg in ["-j", "--jobid"]:
                 arg, aidx = self.get_arg(aidx)
                 if arg is None:
@@ -547,8 +857,130 @@ class Config:
                 arg, aidx = self.get_arg(aidx)
                 if arg is None:
                     self.usage("A kubernetes context must be specified with the -kctx   e.g. -kctx dp1b")
-                self.k8s_active_context = arg
+                contexts = [context.strip() for context in arg.split(",") if context.strip() != ""]
+                if not contexts:
+                    self.usage("A kubernetes context must be specified with the -kctx   e.g. -kctx dp1b")
+                self.k8s_active_context = contexts[0]
                 self.k8s_active_context_source = "CLI"
+                self.k8s_fanout_contexts = contexts if len(contexts) > 1 else []
+                continue
+
+            if arg in ["--all-contexts"]:
+                self.k8s_all_contexts = True
+                continue
+
+            if arg in ["--planout", "--plan-out"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A plan file must be specified with --planout   e.g. --planout plan.json")
+                self.plan_out_file = arg
+                continue
+
+            if arg in ["--apply"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A plan file must be specified with --apply   e.g. --apply plan.json")
+                self.apply_file = arg
+                continue
+
+            if arg in ["--debounce"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A number of seconds must be specified with --debounce   e.g. --debounce 0.5")
+                self.debounce = float(arg)
+                continue
+
+            if arg in ["--replan"]:
+                self.replan = True
+                continue
+
+            if arg in ["--watchseconds"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A number of seconds must be specified with --watchseconds   e.g. --watchseconds 600")
+                self.watch_seconds = float(arg)
+                continue
+
+            if arg in ["--exportfile"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A snapshot file must be specified with --exportfile   e.g. --exportfile inventory.yaml")
+                self.export_file = os.path.expandvars(os.path.expanduser(arg))
+                continue
+
+            if arg in ["--stream"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A format must be specified with --stream   e.g. --stream ndjson")
+                self.stream_format = arg.lower()
+                continue
+
+            if arg in ["--query"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("An expression must be specified with --query   e.g. --query \"compute == x1000c0s0b0n0\"")
+                self.queries.append(arg)
+                continue
+
+            if arg in ["--storagefile"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A JSON file must be specified with --storagefile   e.g. --storagefile storages.json")
+                self.storage_file = os.path.expandvars(os.path.expanduser(arg))
+                continue
+
+            if arg in ["--rabbits"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A number must be specified with --rabbits   e.g. --rabbits 1000")
+                self.generate_rabbits = int(arg)
+                continue
+
+            if arg in ["--computes"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A number must be specified with --computes   e.g. --computes 16")
+                self.generate_computes = int(arg)
+                continue
+
+            if arg in ["--capacity"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A capacity must be specified with --capacity   e.g. --capacity uniform:10TB-40TB")
+                self.generate_capacity = arg
+                continue
+
+            if arg in ["--notready"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A fraction must be specified with --notready   e.g. --notready 0.05,0.01")
+                fractions = arg.split(",")
+                self.not_ready = float(fractions[0])
+                self.computes_not_ready = float(fractions[1]) if len(fractions) > 1 else 0.0
+                continue
+
+            if arg in ["--namepattern"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A name pattern must be specified with --namepattern   e.g. --namepattern rabbit-{r},compute-{n}")
+                patterns = arg.split(",")
+                self.rabbit_pattern = patterns[0]
+                if len(patterns) > 1:
+                    self.compute_pattern = patterns[1]
+                continue
+
+            if arg in ["--since"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A snapshot file must be specified with --since   e.g. --since inventory.yaml")
+                self.since_file = os.path.expandvars(os.path.expanduser(arg))
+                continue
+
+            if arg in ["--mix"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A job mix file must be specified with --mix   e.g. --mix jobmix.yaml")
+                self.mix_file = arg
                 continue
 
             if arg in ["--munge"]:
@@ -569,6 +1001,14 @@ class Config:
                 self.nodes = int(arg)
                 continue
 
+            if arg in ["--columnar"]:
+                self.columnar = True
+                continue
+
+            if arg in ["--noinventorycache"]:
+                self.inventory_cache = False
+                continue
+
             if arg in ["--noreuse"]:
                 self.reuse_rabbit = False
                 continue
@@ -609,6 +1049,20 @@ class Config:
                 self.ost_per_rabbit = int(arg)
                 continue
 
+            if arg in ["--plancache"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A directory must be specified with --plancache   e.g. --plancache ~/.dwsutil/plans")
+                self.plan_cache_dir = os.path.expandvars(os.path.expanduser(arg))
+                continue
+
+            if arg in ["--plancachesize"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A <number> of plans must be specified with --plancachesize   e.g. --plancachesize 256")
+                self.plan_cache_size = int(arg)
+                continue
+
             if arg in ["--pretty"]:
                 self.pretty = True
                 Console.pretty = True
@@ -633,6 +1087,55 @@ class Config:
                 self.timeout_seconds = int(arg)
                 continue
 
+            if arg in ["--seed"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A number must be specified with --seed   e.g. --seed 42")
+                self.seed = int(arg)
+                continue
+
+            if arg in ["--telemetry"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A metrics file or unix:<socket path> must be specified with --telemetry   e.g. --telemetry unix:/run/rabbit-metrics.sock")
+                self.telemetry = arg if arg.startswith("unix:") else os.path.expandvars(os.path.expanduser(arg))
+                continue
+
+            if arg in ["--telemetryttl"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A number of seconds must be specified with --telemetryttl   e.g. --telemetryttl 60")
+                self.telemetry_ttl = int(arg)
+                continue
+
+            if arg in ["--cursorfile"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A cursor file must be specified with --cursorfile   e.g. --cursorfile ~/.dwsutil-cursor")
+                self.cursor_file = os.path.expandvars(os.path.expanduser(arg))
+                continue
+
+            if arg in ["--strategy"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A placement strategy must be specified with --strategy   e.g. --strategy first")
+                self.strategy = arg.lower()
+                continue
+
+            if arg in ["--topologycache"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A file must be specified with --topologycache   e.g. --topologycache ~/.dwsutil/topology.json")
+                self.topology_cache_file = os.path.expandvars(os.path.expanduser(arg))
+                continue
+
+            if arg in ["--trace"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A job trace file must be specified with --trace   e.g. --trace jobs.yaml")
+                self.trace_file = arg
+                continue
+
             if arg in ["-u", "--userid"]:
                 arg, aidx = self.get_arg(aidx)
                 if arg is None:
@@ -647,6 +1150,13 @@ class Config:
                 self.group_id = int(self.replace_vars(arg))
                 continue
 
+            if arg in ["--workers"]:
+                arg, aidx = self.get_arg(aidx)
+                if arg is None:
+                    self.usage("A <number> of worker processes must be specified with --workers   e.g. --workers 8")
+                self.workers = int(arg)
+                continue
+
             if arg in ["-w", "--wlmid"]:
                 arg, aidx = self.get_arg(aidx)
                 if arg is None:
@@ -764,6 +1274,9 @@ class Config:
                 if kctx is not None:
                     self.k8s_active_context = kctx
                     self.k8s_active_context_source = "Config file"
+                kctxs = self.get_config_entry(cfg, "k8s", "contexts", None)
+                if kctxs is not None:
+                    self.k8s_fanout_contexts = kctxs if isinstance(kctxs, list) else [c.strip() for c in str(kctxs).split(",") if c.strip() != ""]
 
                 # *******************************
                 # * Config section
@@ -794,6 +1307,14 @@ class Config:
                     for exclude in excludes:
                         self.exclude_rabbits.append(exclude["name"])
 
+                exclude_file = self.get_config_entry(cfg, "config", "exclude_computes_file", None)
+                if exclude_file is not None:
+                    self.exclude_computes += self.read_exclusion_file(os.path.expandvars(exclude_file))
+
+                exclude_file = self.get_config_entry(cfg, "config", "exclude_rabbits_file", None)
+                if exclude_file is not None:
+                    self.exclude_rabbits += self.read_exclusion_file(os.path.expandvars(exclude_file))
+
                 ignore_ready = self.get_config_entry(cfg, "config", "ignoreready", None)
                 if ignore_ready is not None:
                     self.ignore_ready = ignore_ready
@@ -802,6 +1323,14 @@ class Config:
                 if self.inventory_file is not None:
                     self.inventory_file = os.path.expandvars(self.inventory_file)
 
+                inventory_cache = self.get_config_entry(cfg, "config", "inventorycache", None)
+                if inventory_cache is not None:
+                    self.inventory_cache = inventory_cache
+
+                columnar = self.get_config_entry(cfg, "config", "columnar", None)
+                if columnar is not None:
+                    self.columnar = columnar
+
                 jobid = self.get_config_entry(cfg, "config", "jobid", None)
                 if jobid is not None:
                     if (isinstance(jobid, str)):
@@ -824,6 +1353,42 @@ class Config:
                 if ostcount is not None:
                     self.ost_per_rabbit = ostper
 
+                strategy = self.get_config_entry(cfg, "config", "strategy", None)
+                if strategy is not None:
+                    self.strategy = strategy.lower()
+
+                seed = self.get_config_entry(cfg, "config", "seed", None)
+                if seed is not None:
+                    self.seed = seed
+
+                telemetry = self.get_config_entry(cfg, "config", "telemetry", None)
+                if telemetry is not None:
+                    self.telemetry = telemetry if telemetry.startswith("unix:") else os.path.expandvars(os.path.expanduser(telemetry))
+
+                telemetry_ttl = self.get_config_entry(cfg, "config", "telemetryttl", None)
+                if telemetry_ttl is not None:
+                    self.telemetry_ttl = telemetry_ttl
+
+                cursor_file = self.get_config_entry(cfg, "config", "cursorfile", None)
+                if cursor_file is not None:
+                    self.cursor_file = os.path.expandvars(os.path.expanduser(cursor_file))
+
+                ledger = self.get_config_entry(cfg, "config", "ledger", None)
+                if ledger is not None:
+                    self.ledger_file = os.path.expandvars(os.path.expanduser(ledger))
+
+                plan_cache = self.get_config_entry(cfg, "config", "plancache", None)
+                if plan_cache is not None:
+                    self.plan_cache_dir = os.path.expandvars(os.path.expanduser(plan_cache))
+
+                plan_cache_size = self.get_config_entry(cfg, "config", "plancachesize", None)
+                if plan_cache_size is not None:
+                    self.plan_cache_size = plan_cache_size
+
+                topology_cache = self.get_config_entry(cfg, "config", "topologycache", None)
+                if topology_cache is not None:
+                    self.topology_cache_file = os.path.expandvars(os.path.expanduser(topology_cache))
+
                 preview = self.get_config_entry(cfg, "config", "preview", None)
                 if preview is not None:
                     self.preview = preview
@@ -865,5 +1430,15 @@ class Config:
                 if wlmid is not None:
                     self.wlm_id = wlmid
 
+    def is_offline(self):
+        """Returns True if the current operation does not need a cluster."""
+        if self.operation in Config.OFFLINE_OPERATIONS.get(self.context, []):
+            return True
+        return self.inventory_file is not None and self.operation in Config.INVENTORY_OPERATIONS.get(self.context, [])
+
+    def is_fanout(self):
+        """Returns True if the operation runs against more than one k8s context."""
+        return self.k8s_all_contexts or len(self.k8s_fanout_contexts) > 1
+
     def to_json(self):
         return json.dumps({x: self.__dict__[x] for x in self.__dict__ if x not in ['seq_gen']})
@@ -20,9 +20,11 @@
 # Console output class
 # Use to control and format console output
 
+import contextlib
 import datetime
 import inspect
 import json
+import threading
 
 
 class FunctionTrace:
@@ -92,6 +94,9 @@ class Console:
     HALF_BAR = "-" * 40
     FULL_BAR = "-" * 60
 
+    # Per thread list of captured output, see capture()
+    _captured = threading.local()
+
     def caller_name(skip=2):
         """Get a name of a caller in the format module.class.method.
 
@@ -162,13 +167,37 @@ class Console:
 
         print(f"{msg_prefix}{msg}")
 
-    def output(msg, msg_prefix="", output_timestamp=None):
+    @contextlib.contextmanager
+    def capture():
+        """Collect the output of the current thread instead of printing it.
+            Debug output is still printed.
+
+        Parameters:
+        None
+
+        Returns:
+        List the output is appended to, one entry per output() call
+
+        Example usage:
+            with Console.capture() as lines:
+                ... output to be collected ...
+        """
+        lines = []
+        previous = getattr(Console._captured, "lines", None)
+        Console._captured.lines = lines
+        try:
+            yield lines
+        finally:
+            Console._captured.lines = previous
+
+    def output(msg, msg_prefix="", output_timestamp=None, capture=True):
         """Send output to the console.
 
         Parameters:
         msg : Message to output to the console
         msg_prefix : Prefix message with prefix
         output_timestamp : If False, disable any timestamp display
+        capture : If False, print even when the thread's output is captured
 
         Returns:
         Nothing
@@ -182,7 +211,11 @@ class Console:
         else:
             tsp = ""
 
-        print(f"{tsp}{msg_prefix}{msg}")
+        lines = getattr(Console._captured, "lines", None) if capture else None
+        if lines is not None:
+            lines.append(f"{tsp}{msg_prefix}{msg}")
+        else:
+            print(f"{tsp}{msg_prefix}{msg}")
 
     def pretty_json(dict, indent=4, output_timestamp=False):
         """Send json to the console.  If Console.pretty is true, it is
@@ -238,7 +271,7 @@ class Console:
         """
         if level <= Console.verbosity:
             Console.output(
-                msg, f"(DBG {level}) {msg_prefix}", output_timestamp)
+                msg, f"(DBG {level}) {msg_prefix}", output_timestamp, capture=False)
 
     def trace_function():
         """Used to perform function tracing as part of console output.
@@ -255,4 +288,7 @@ class Console:
                     ... method body ...
 
         """
+        # Walking the stack is expensive, only do it when tracing is enabled
+        if not Console.level_enabled(Console.MAX):
+            return FunctionTrace("")
         return FunctionTrace(Console.caller_name())
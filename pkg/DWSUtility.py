@@ -19,25 +19,48 @@
 #
 # DWS Utility main class
 
+import concurrent.futures
+import copy
+import itertools
+import json
 import sys
-import yaml
 import re
-from functools import reduce
 import queue
 import texttable
 import datetime
+import time
 
 import kubernetes.config as k8s_config
 
+from .Allocator import Allocator
+from .AssignmentPlan import AssignmentPlan
+from .CapacityPlan import CapacityPlan
+from .ExclusionMatcher import ExclusionMatcher
 from .Config import Config
 from .Console import Console
 from .Dws import DWS, DWSError
+from .FitCheck import FitCheck
+from .InventoryFile import InventoryFile
+from .InventoryGenerator import InventoryGenerator
+from .InventoryQuery import InventoryQuery
+from .InventorySnapshot import InventorySnapshot
+from .InventorySummary import InventorySummary
+from .InventoryWatch import InventoryWatch
+from .PlanCache import PlanCache
+from .Replanner import Replanner
+from .Simulator import Simulator
+from .Sweep import Sweep
+from .TopologyCache import TopologyCache
+from .Utilization import Utilization
 from .crd.Storage import Storage
 
 
 class DWSUtility:
     """Contains the dwsutil base implementation."""
 
+    # Most Servers CRs patched at the same time
+    PATCH_WORKERS = 8
+
     HPE_DWS_CRDS = [
         "clientmounts.dws.cray.hpe.com",
         "computes.dws.cray.hpe.com",
@@ -96,6 +119,9 @@ class DWSUtility:
     def __init__(self, sim_folder):
         self.config = Config(DWSUtility.command_line_args())
         self.wfr_queue = queue.Queue()
+        self.plan_cache = PlanCache(self.config.plan_cache_size, self.config.plan_cache_dir)
+        self.topology_cache = TopologyCache(self.config.topology_cache_file)
+        self.replan_versions = {}
 
     def dump_config_as_json(self):
         """Dump the current configuration to the console as json."""
@@ -117,8 +143,7 @@ class DWSUtility:
         tsp = Console.timestamp
 
         Console.timestamp = False
-        apic = k8s_config.kube_config.ApiClient()
-        host = apic.configuration.host
+        host = self.dws.api_host()
         self.config.output_config_item("DWS API Endpoint", host)
         self.config.output_configuration(init_flags_only=True)
         Console.timestamp = tsp
@@ -921,31 +946,42 @@ class DWSUtility:
         """
         Console.debug(Console.MIN, "Loading inventory file"
                                    f" {self.config.inventory_file}")
-        with open(self.config.inventory_file, "r") as stream:
-            nnf_inventory = {}
-            inventory_data = yaml.safe_load(stream)
-            if 'system' not in inventory_data:
-                raise Exception("'system' is missing from the file")
+        inventory_file = InventoryFile(self.config.inventory_file, self.config.inventory_cache)
+        if self.config.columnar:
+            nnf_inventory = inventory_file.load_columns()
+            Console.debug(Console.MIN, f"...{len(nnf_inventory)} nnf-nodes and {nnf_inventory.compute_count} computes"
+                                       f" in {nnf_inventory.nbytes} bytes of columns"
+                                       f"{' (mapped)' if inventory_file.cached else ''}")
+            if only_ready_nodes:
+                nnf_inventory = nnf_inventory.select(lambda r: r.is_ready)
+            return nnf_inventory
+        inventory_data = inventory_file.load()
+        if inventory_file.cached:
+            Console.debug(Console.MIN, "...using compiled inventory"
+                                       f" {inventory_file.cache_file}")
+        nnf_inventory = {}
+        if 'system' not in inventory_data:
+            raise Exception("'system' is missing from the file")
+        else:
+            if 'nnf-nodes' not in inventory_data['system']:
+                Console.output("'nnf-nodes:' array missing from file")
             else:
-                if 'nnf-nodes' not in inventory_data['system']:
-                    Console.output("'nnf-nodes:' array missing from file")
-                else:
-                    for node in inventory_data['system']['nnf-nodes']:
-                        node_obj = Storage(node)
-                        Console.debug(Console.MIN, "...Processing nnf-node"
-                                                   f" '{node_obj.name}'")
-                        Console.debug(Console.WORDY, "......computes:"
-                                                     f" {node_obj.computes}")
-                        if only_ready_nodes and not node_obj.is_ready:
-                            Console.debug(Console.MIN, "...nnf-node is not"
-                                                       " ready, skipping")
-                            continue
+                for node in inventory_data['system']['nnf-nodes']:
+                    node_obj = Storage(node, copy_raw=False)
+                    Console.debug(Console.MIN, "...Processing nnf-node"
+                                               f" '{node_obj.name}'")
+                    Console.debug(Console.WORDY, "......computes:"
+                                                 f" {node_obj.computes}")
+                    if only_ready_nodes and not node_obj.is_ready:
+                        Console.debug(Console.MIN, "...nnf-node is not"
+                                                   " ready, skipping")
+                        continue
 
-                        if node_obj.name in nnf_inventory:
-                            raise Exception(f"Duplicate nnf name "
-                                            f"'{node_obj.name} found in file")
-                        nnf_inventory[node_obj.name] = node_obj
-            return nnf_inventory
+                    if node_obj.name in nnf_inventory:
+                        raise Exception(f"Duplicate nnf name "
+                                        f"'{node_obj.name} found in file")
+                    nnf_inventory[node_obj.name] = node_obj
+        return nnf_inventory
 
     def do_get_inventory(self, only_ready_nodes=False):
         """Returns inventory dictionary from file if inventory file has been
@@ -958,14 +994,41 @@ class DWSUtility:
            Inventory dictionary
         """
         if self.config.inventory_file is not None:
-            return self.do_load_inventory_file(only_ready_nodes), f"File-{self.config.inventory_file}"
-        source = "Cluster"
+            return self.do_load_inventory_file(only_ready_nodes), self.inventory_source()
+        rabbits = self.dws.inventory_build_from_cluster(only_ready_nodes)
+        if self.config.topology_cache_file is not None:
+            self.topology_cache.apply(rabbits, prune=not only_ready_nodes)
+            self.topology_cache.save()
+        return rabbits, self.inventory_source()
+
+    def inventory_source(self):
+        """Describes where the inventory comes from, the file or the cluster's API server."""
+        if self.config.inventory_file is not None:
+            return f"File-{self.config.inventory_file}"
         try:
-            apic = k8s_config.kube_config.ApiClient()
-            source = f"Cluster-{apic.configuration.host}"
+            return f"Cluster-{self.dws.api_host()}"
         except Exception:
-            pass
-        return self.dws.inventory_build_from_cluster(only_ready_nodes), source
+            return "Cluster"
+
+    def iter_inventory(self):
+        """Yields the nnf nodes one at a time.  The cluster is read a page
+           of Storages at a time, so only one page is held at once.
+
+           Returns:
+           Generator of Storage (or ColumnarRabbit) objects
+        """
+        if self.config.inventory_file is not None:
+            rabbits = self.do_load_inventory_file()
+            for name in rabbits:
+                yield rabbits[name]
+            return
+        for page in self.dws.list_cluster_custom_object_pages("storages"):
+            rabbits = {s["metadata"]["name"]: Storage(s, copy_raw=False) for s in page["items"]}
+            if self.config.topology_cache_file is not None:
+                self.topology_cache.apply(rabbits, prune=False)
+            yield from rabbits.values()
+        if self.config.topology_cache_file is not None:
+            self.topology_cache.save()
 
     def do_assign_resources(self):
         """Assign server and compute resources to the specified Workflow CR."""
@@ -980,6 +1043,9 @@ class DWSUtility:
             msg = f"Inventory from {source} does not contain any nnf nodes that can be assigned"
             raise DWSError(msg, DWSError.DWS_NO_INVENTORY)
 
+        exclude_rabbits = ExclusionMatcher(self.config.exclude_rabbits)
+        exclude_computes = ExclusionMatcher(self.config.exclude_computes)
+
         # Build a master dict of computes that could be assigned
         Console.debug(Console.WORDY, f"Building master list of nnf and compute nodes, {len(rabbits)} NNF nodes available")
         for node_name, node in rabbits.items():
@@ -987,7 +1053,7 @@ class DWSUtility:
                 kind_env_detected = True
                 Console.debug(Console.MIN, f"Node {node.name} indicates KIND environment, compute nodes WILL NOT be assigned")
 
-            if node.name.strip().lower() in self.config.exclude_rabbits:
+            if exclude_rabbits.matches(node.name):
                 Console.debug(Console.MIN, f"Excluding nnf node {node.name}")
                 continue
 
@@ -998,7 +1064,7 @@ class DWSUtility:
                                   " not ready and will be skipped")
                     continue
 
-                if c['name'].strip().lower() in self.config.exclude_computes:
+                if exclude_computes.matches(c['name']):
                     Console.debug(Console.MIN, f"...Excluding compute node {c['name']}")
                     continue
 
@@ -1026,6 +1092,22 @@ class DWSUtility:
 
         all_breakdown_allocations = []
         label_constrained_nodes = {}
+        writes_avoided = 0
+
+        # Candidate rabbits are ordered by --strategy as ASSIGNSERVERS orders them
+        settings = Allocator.settings_from_config(self.config)
+        if settings["strategy"] == "leastallocated":
+            self.load_server_usage(rabbits)
+        allocator = Allocator(settings, rabbits)
+        allocator.workflow_name = wfr.name
+        allocator.last_rabbit = Allocator.load_cursor(self.config.cursor_file)
+        view = allocator.view
+
+        def charge(r, size):
+            r.remaining_storage -= size
+            r.allocationCount += 1
+            view.charge(r.name, size)
+            allocator.last_rabbit = r.name
 
         # Iterate each directive breakdown (1 per #dw)
         for breakdown in breakdowns:
@@ -1065,14 +1147,16 @@ class DWSUtility:
                 Console.debug(Console.WORDY, "-" * 40)
                 selected_rabbits = {}  # Rabbits are selected per allocation
                 for alloc in per_compute:
-                    for c in computes:
+                    sufficient = set(view.candidates(alloc.minimumCapacity, remaining=False))
+                    rank = {name: idx for idx, name in enumerate(allocator.order(list(rabbits), wfr.name))}
+                    for c in sorted(computes, key=lambda c: rank[c["storageName"]]):
                         rabbit_name = c["storageName"]
                         r = rabbits[rabbit_name]
 
                         Console.debug(Console.WORDY, f"   looking at compute {c['computeName']} on rabbit {rabbit_name}")
 
                         # If this rabbit has adequate capacity
-                        if r.has_sufficient_capacity(alloc.minimumCapacity):
+                        if rabbit_name in sufficient:
                             # Composite key protects against duplicates
                             compute_key = f"{rabbit_name}-{c['computeName']}"
 
@@ -1086,8 +1170,7 @@ class DWSUtility:
                                 rabbit = {"name": r.name, "allocationCount": 1}
                             selected_rabbits[r.name] = rabbit
                             rabbits_in_breakdown[r.name] = rabbit
-                            r.remaining_storage -= alloc.minimumCapacity
-                            r.allocationCount += 1
+                            charge(r, alloc.minimumCapacity)
 
                             Console.debug(Console.WORDY, f"   selecting compute node '{c['computeName']}' on '{rabbit_name}', {len(selected_computes)} of {self.config.nodes} selected")
                             Console.debug(Console.WORDY, f"   rabbit remaining storage: {r.remaining_storage}")
@@ -1149,8 +1232,10 @@ class DWSUtility:
                             label_constrained_nodes[alloc.label] = []
 
                     # Scan rabbits to see if we have a place for this allocation
+                    sufficient = set(view.candidates(alloc.minimumCapacity, remaining=False))
                     idx = 0
-                    for node_name, r in rabbits.items():
+                    for node_name in allocator.order(list(rabbits), wfr.name):
+                        r = rabbits[node_name]
                         Console.debug(Console.MIN, f"   Looking at rabbit {node_name} for {alloc.label}")
                         rabbit_eligible = True
                         idx += 1
@@ -1176,15 +1261,13 @@ class DWSUtility:
                             # We found a rabbit to host this allocation
 
                             # If this rabbit has adequate capacity
-                            if r.has_sufficient_capacity(alloc.minimumCapacity):
+                            if node_name in sufficient:
                                 # Increase the allocation count for this rabbit
                                 rabbit = {"name": r.name, "allocationCount": 1}
                                 selected_rabbits[r.name] = rabbit
                                 all_selected_rabbits[r.name] = rabbit
                                 rabbits_in_breakdown[r.name] = rabbit
-
-                                r.remaining_storage -= alloc.minimumCapacity
-                                r.allocationCount += 1
+                                charge(r, alloc.minimumCapacity)
 
                                 Console.debug(Console.WORDY, f"   Selecting '{node_name}' for allocation type '{alloc.label}'")
                                 Console.debug(Console.WORDY, f"   Rabbit remaining storage: {r.remaining_storage}")
@@ -1230,9 +1313,9 @@ class DWSUtility:
                     selected_rabbits = {}  # Rabbits are selected per allocation
 
                     # Determine if selected rabbits can handle remaining capacity
-                    min_capacity = reduce(lambda a, b: a if a < b else b, [rabbits[r].capacity for r in rabbits_in_breakdown])
+                    min_capacity = view.min_capacity(rabbits_in_breakdown)
                     Console.debug(Console.WORDY, f"Min capacity of selected rabbits: {min_capacity}")
-                    max_capacity = reduce(lambda a, b: a if a > b else b, [rabbits[r].capacity for r in rabbits_in_breakdown])
+                    max_capacity = view.max_capacity(rabbits_in_breakdown)
                     Console.debug(Console.WORDY, f"Max capacity of selected rabbits: {max_capacity}")
 
                     # If the selected rabbits can handle the allocations
@@ -1243,9 +1326,7 @@ class DWSUtility:
                             rabbit = {"name": r.name, "allocationCount": 1}
                             selected_rabbits[r.name] = rabbit
                             rabbits_in_breakdown[r.name] = rabbit
-
-                            r.remaining_storage -= alloc_size
-                            r.allocationCount += 1
+                            charge(r, alloc_size)
 
                             Console.debug(Console.WORDY, f"   Selecting '{r.name}' for allocation type '{alloc.label}'")
                             Console.debug(Console.WORDY, f"   Rabbit remaining storage: {r.remaining_storage}")
@@ -1292,7 +1373,8 @@ class DWSUtility:
                 svr_results = {'name': breakdown.name, "alloc": alloc_idx, "result": "succeeded", "allocationSet": ba}
                 if not self.config.preview:
                     try:
-                        self.dws.wfr_update_servers(ba)
+                        if not self.dws.wfr_update_servers(ba):
+                            writes_avoided += 1
                     except DWSError as ex:
                         svr_results = {'name': breakdown.name, "alloc": alloc_idx, "result": "failed", "message": ex.message}
                 else:
@@ -1301,19 +1383,24 @@ class DWSUtility:
 
                 final_allocations.append(svr_results)
 
-        assign_results = {'name': wfr.name,
-                          'result': 'succeeded',
-                          'computes': compute_nodes,
-                          'breakdowns': all_breakdown_allocations}
+        if settings["strategy"] == "roundrobin" and self.config.cursor_file is not None and not self.config.preview:
+            Allocator.save_cursor(self.config.cursor_file, allocator.last_rabbit)
 
         if not self.config.preview:
             if not kind_env_detected:
-                self.dws.wfr_update_computes(wfr, compute_nodes)
+                if not self.dws.wfr_update_computes(wfr, compute_nodes):
+                    writes_avoided += 1
             else:
                 Console.debug(Console.MIN, f"Kind environment: compute resources not actually assigned to WFR {wfr.name}")
         else:
             Console.debug(Console.MIN, f"Preview mode: compute resources not actually assigned to WFR {wfr.name}")
 
+        assign_results = {'name': wfr.name,
+                          'result': 'succeeded',
+                          'writesAvoided': writes_avoided,
+                          'computes': compute_nodes,
+                          'breakdowns': all_breakdown_allocations}
+
         Console.pretty_json({"action": "assignresources",
                              "preview": self.config.preview,
                              "results": assign_results})
@@ -1366,68 +1453,309 @@ class DWSUtility:
 
         Console.debug(Console.WORDY, "Retrieving inventory")
         rabbits, source = self.do_get_inventory(only_ready_nodes=True)
-        for rabbit_name, r in rabbits.items():
-            if not kind_env_detected and rabbit_name.strip().lower().startswith("kind"):
+        for rabbit_name in rabbits:
+            if rabbit_name.strip().lower().startswith("kind"):
                 kind_env_detected = True
                 Console.debug(Console.MIN, f"Node {rabbit_name} indicates KIND environment, compute nodes WILL NOT be assigned")
-
-            if rabbit_name.strip().lower() in self.config.exclude_rabbits:
-                Console.debug(Console.MIN, f"Excluding nnf node {rabbit_name}")
-                continue
-
-            if rabbit_name not in rabbit_names:
-                rabbit_names.append(rabbit_name)
-
-        Console.debug(Console.WORDY, f"Rabbits in order of preference: {rabbit_names}")
-
-        compute_count = 0
-        computes_assigned = []
-        for rabbit_name in rabbit_names:
-            rabbit = rabbits[rabbit_name]
-            Console.debug(Console.WORDY, f"Looking at rabbit {rabbit.name}")
-            compute_limit = 16
-            if is_xfs and rabbit_name in rabbit_allocations:
-                compute_limit = rabbit_allocations[rabbit_name]
-            Console.debug(Console.WORDY, f"..compute limit set to {compute_limit}")
-            for c in rabbit.computes:
-                compute_name = c['name']
-                Console.debug(Console.WORDY, f"  Looking at compute '{compute_name}'")
-                if compute_name.strip().lower() in self.config.exclude_computes:
-                    Console.debug(Console.MIN, f"Compute node {compute_name} is in exclude list, excluding")
-                    continue
-                if compute_name not in computes_assigned:
-                    if not self.config.ignore_ready:
-                        if c['status'].lower() != "ready":
-                            Console.debug(Console.MIN, f"Compute node {compute_name} is not ready, excluding")
-                            continue
-                    compute_count += 1
-                    compute_limit -= 1
-                    computes_assigned.append(compute_name)
-                    if compute_count >= self.config.nodes:
-                        break
-                if compute_limit <= 0:
-                    Console.debug(Console.WORDY, "  Compute limit reached for this rabbit")
-                    break
-            if compute_count >= self.config.nodes:
                 break
 
+        allocator = Allocator(Allocator.settings_from_config(self.config), rabbits)
+        computes_assigned = allocator.plan_computes(rabbit_names, rabbit_allocations if is_xfs else None)
+        compute_count = len(computes_assigned)
+
         if compute_count < self.config.nodes:
             msg = f"Insufficient compute resources to meet node requirement of {self.config.nodes} nodes"
             raise DWSError(msg, DWSError.DWS_INCOMPLETE)
 
         Console.debug(Console.WORDY, f"Computes to be assigned: {computes_assigned}")
+        writes_avoided = 0
         if not self.config.preview:
             if not kind_env_detected:
-                self.dws.wfr_update_computes(wfr, computes_assigned)
+                writes_avoided = 0 if self.dws.wfr_update_computes(wfr, computes_assigned) else 1
 
         assign_results = {'name': wfr.name,
                           'result': 'succeeded',
+                          'writesAvoided': writes_avoided,
                           'computes': computes_assigned}
 
         Console.pretty_json({"action": "assigncomputes",
                              "preview": self.config.preview,
                              "results": assign_results})
 
+    def load_server_usage(self, rabbits):
+        """Charge the rabbits with the allocations the Servers CRs already hold.
+
+        Parameters:
+        rabbits : Inventory dictionary of Storage objects
+
+        Returns:
+        Nothing
+        """
+        servers = self.dws.list_cluster_custom_object_paged("servers")
+        for usage in Utilization(rabbits, servers).report()["rabbits"]:
+            r = rabbits[usage["name"]]
+            r.remaining_storage = usage["remaining"]
+            r.allocationCount = usage["allocationCount"]
+
+    def plan_servers(self, rabbits, breakdowns, workflow_name=None):
+        """Plan server allocations, consulting the plan cache first.
+
+        Parameters:
+        rabbits : Inventory dictionary of ready Storage objects
+        breakdowns : List of DirectiveBreakdown objects
+        workflow_name : Workflow the breakdowns belong to, None for the configured name
+
+        Returns:
+        Tuple: list of breakdown allocations, True if served from the cache
+        """
+        settings = Allocator.settings_from_config(self.config)
+        key = None
+        if settings["strategy"] in Allocator.CACHEABLE_STRATEGIES and settings["telemetry"] is None:
+            key = self.plan_cache.key(rabbits, breakdowns, settings)
+            allocation_sets = self.plan_cache.get(key)
+            if allocation_sets is not None:
+                # Charge the rabbits as planning would, so later workflows
+                # of a batch see the capacity this one takes
+                for allocation_set in allocation_sets:
+                    for assignment in allocation_set:
+                        for storage in assignment["storage"]:
+                            r = rabbits[storage["name"]]
+                            r.remaining_storage -= assignment["allocationSize"] * storage["allocationCount"]
+                            r.allocationCount += storage["allocationCount"]
+                return [{"name": bd.name, "serverObj": bd.server_obj, "allocationSet": allocation_set}
+                        for bd, allocation_set in zip(breakdowns, allocation_sets)], True
+
+        # Least allocated placement needs what the Servers CRs already hold
+        if settings["strategy"] == "leastallocated":
+            self.load_server_usage(rabbits)
+
+        # All breakdowns are planned together so each sees the capacity
+        # the others take
+        allocator = Allocator(settings, rabbits)
+        allocator.enforce_capacity = True
+        allocator.workflow_name = workflow_name or self.config.wfr_name
+        allocator.last_rabbit = Allocator.load_cursor(self.config.cursor_file)
+        all_breakdown_allocations = allocator.plan_workflow(breakdowns)
+        if key is not None:
+            self.plan_cache.put(key, [ba["allocationSet"] for ba in all_breakdown_allocations])
+        if settings["strategy"] == "roundrobin" and self.config.cursor_file is not None and not self.config.preview:
+            Allocator.save_cursor(self.config.cursor_file, allocator.last_rabbit)
+        return all_breakdown_allocations, False
+
+    def merge_server_patches(all_breakdown_allocations):
+        """Merge the breakdown allocations that share a Servers CR into a single patch.
+
+        Parameters:
+        all_breakdown_allocations : List of breakdown allocations from plan_servers()
+
+        Returns:
+        List of breakdown allocations, one per Servers CR
+        """
+        patches = {}
+        for ba in all_breakdown_allocations:
+            server_obj = tuple(ba["serverObj"])
+            if server_obj in patches:
+                patches[server_obj]["allocationSet"] = patches[server_obj]["allocationSet"] + ba["allocationSet"]
+            else:
+                patches[server_obj] = {"name": ba["name"], "serverObj": ba["serverObj"], "allocationSet": ba["allocationSet"]}
+        return list(patches.values())
+
+    def patch_servers(self, all_breakdown_allocations):
+        """Patch each Servers CR once, concurrently.
+
+        Parameters:
+        all_breakdown_allocations : List of breakdown allocations from plan_servers()
+
+        Returns:
+        List of failures, each {"name": ..., "message": ...}
+        Number of Servers CRs that already held their allocation sets and were not written
+        """
+        patches = DWSUtility.merge_server_patches(all_breakdown_allocations)
+
+        def patch(ba):
+            try:
+                return self.dws.wfr_update_servers(ba), None
+            except DWSError as ex:
+                return True, {"name": ba["name"], "message": ex.message}
+
+        workers = 1 if self.config.singlethread else min(len(patches), DWSUtility.PATCH_WORKERS)
+        Console.debug(Console.WORDY, f"Patching {len(patches)} servers with {max(workers, 1)} thread(s)")
+        if workers <= 1:
+            results = [patch(ba) for ba in patches]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(patch, patches))
+        failures = [failure for _, failure in results if failure is not None]
+        writes_avoided = sum(1 for written, _ in results if not written)
+        return failures, writes_avoided
+
+    def plan_assignment(self, wfr_name, rabbits, plan):
+        """Resolve the Servers and Computes patches for a workflow without writing them.
+
+        Parameters:
+        wfr_name : Name of the Workflow CR
+        rabbits : Inventory dictionary of ready Storage objects
+        plan : AssignmentPlan the workflow is added to
+
+        Returns:
+        The workflow entry added to the plan
+        """
+        wfr = self.dws.wfr_get(wfr_name)
+        breakdowns = self.dws.wfr_get_directiveBreakdowns(wfr)
+        if len(breakdowns) == 0:
+            msg = f"Workflow Resource named '{wfr.name}' has no directive breakdowns"
+            raise DWSError(msg, DWSError.DWS_INCOMPLETE)
+
+        all_breakdown_allocations, _ = self.plan_servers(rabbits, breakdowns, wfr.name)
+        servers = []
+        rabbit_names = []
+        rabbit_allocations = {}
+        is_xfs = False
+        for ba in DWSUtility.merge_server_patches(all_breakdown_allocations):
+            name, namespace = ba["serverObj"]
+            server = self.dws.crd_get_raw("servers", name, namespace)
+            servers.append({"name": name, "namespace": namespace,
+                            "resourceVersion": server["metadata"].get("resourceVersion"),
+                            "unchanged": (server.get("spec") or {}).get("allocationSets") == ba["allocationSet"],
+                            "allocationSets": ba["allocationSet"]})
+            for alloc in ba["allocationSet"]:
+                for storage in alloc["storage"]:
+                    rabbit_names.append(storage["name"])
+                    rabbit_allocations[storage["name"]] = storage["allocationCount"]
+                    if alloc["label"] == "xfs":
+                        is_xfs = True
+
+        # Computes are chosen the way ASSIGNCOMPUTES chooses them from the Servers CRs
+        computes = None
+        kind_env_detected = any(rabbit_name.strip().lower().startswith("kind") for rabbit_name in rabbits)
+        if kind_env_detected:
+            Console.debug(Console.MIN, "KIND environment detected, compute nodes WILL NOT be assigned")
+        elif wfr.compute_obj_name is not None:
+            # Computes given to the workflows planned before this one are not reused
+            taken = {c["name"] for entry in plan.workflows if entry["computes"] is not None
+                     for c in entry["computes"]["data"]}
+            allocator = Allocator(Allocator.settings_from_config(self.config), rabbits)
+            computes_assigned = allocator.plan_computes(rabbit_names, rabbit_allocations if is_xfs else None, taken)
+            if len(computes_assigned) < self.config.nodes:
+                msg = f"Insufficient compute resources to meet node requirement of {self.config.nodes} nodes"
+                raise DWSError(msg, DWSError.DWS_INCOMPLETE)
+            name, namespace = wfr.compute_obj_name
+            compute = self.dws.crd_get_raw("computes", name, namespace)
+            computes = {"name": name, "namespace": namespace,
+                        "resourceVersion": compute["metadata"].get("resourceVersion"),
+                        "unchanged": [c.get("name") for c in compute.get("data") or []] == computes_assigned,
+                        "data": [{"name": c} for c in computes_assigned]}
+
+        storage = {rabbit_name: rabbits[rabbit_name].raw_storage["metadata"].get("resourceVersion")
+                   for rabbit_name in dict.fromkeys(rabbit_names) if rabbit_name in rabbits}
+        return plan.add_workflow(wfr.name, servers, computes, storage)
+
+    def apply_workflow(self, entry, storage_versions):
+        """Apply one workflow entry of an assignment plan.
+
+        Parameters:
+        entry : Workflow entry from an AssignmentPlan
+        storage_versions : Dictionary of Storage name to its current resourceVersion
+
+        Returns:
+        Result dictionary for the workflow
+        """
+        result = {"name": entry["name"], "result": "succeeded", "writesAvoided": 0}
+        stale = [name for name, rv in entry["storage"].items() if rv is not None and storage_versions.get(name) != rv]
+        try:
+            if stale:
+                msg = f"Storage {', '.join(sorted(stale))} changed since the plan was made"
+                raise DWSError(msg, DWSError.DWS_CONFLICT)
+            # Entries that matched when the plan was made are checked again,
+            # any that have since changed are patched under the precondition
+            for server in entry["servers"]:
+                if server.get("unchanged"):
+                    current = self.dws.crd_get_raw("servers", server["name"], server["namespace"])
+                    if (current.get("spec") or {}).get("allocationSets") == server["allocationSets"]:
+                        result["writesAvoided"] += 1
+                        continue
+                self.dws.crd_patch_raw("servers", server["name"], server["namespace"],
+                                       {"spec": {"allocationSets": server["allocationSets"]}}, server["resourceVersion"])
+            computes = entry["computes"]
+            if computes is not None and computes.get("unchanged"):
+                current = self.dws.crd_get_raw("computes", computes["name"], computes["namespace"])
+                if [c.get("name") for c in current.get("data") or []] == [c["name"] for c in computes["data"]]:
+                    result["writesAvoided"] += 1
+                    computes = None
+            if computes is not None:
+                self.dws.crd_patch_raw("computes", computes["name"], computes["namespace"],
+                                       {"data": computes["data"]}, computes["resourceVersion"])
+        except DWSError as ex:
+            result["result"] = "conflict" if ex.code == DWSError.DWS_CONFLICT else "failed"
+            result["message"] = ex.message
+            result["code"] = ex.code
+        return result
+
+    def apply_plan(self, plan):
+        """Apply an assignment plan, one workflow per thread.
+
+        Parameters:
+        plan : AssignmentPlan to apply
+
+        Returns:
+        List of result dictionaries, one per workflow
+        """
+        storage_versions = {}
+        if any(entry["storage"] for entry in plan.workflows):
+            for storage in self.dws.list_cluster_custom_object_paged("storages"):
+                storage_versions[storage["metadata"]["name"]] = storage["metadata"].get("resourceVersion")
+
+        workers = 1 if self.config.singlethread else min(len(plan.workflows), DWSUtility.PATCH_WORKERS)
+        Console.debug(Console.WORDY, f"Applying {len(plan.workflows)} workflow(s) with {max(workers, 1)} thread(s)")
+        if workers <= 1:
+            return [self.apply_workflow(entry, storage_versions) for entry in plan.workflows]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.apply_workflow, plan.workflows, itertools.repeat(storage_versions)))
+
+    def do_assign(self):
+        """Plan servers and computes for Workflow CRs, then write or apply the plan."""
+        if self.config.apply_file is not None:
+            plan = AssignmentPlan.load(self.config.apply_file)
+        else:
+            rabbits, source = self.do_get_inventory(only_ready_nodes=True)
+            if not self.config.ignore_ready:
+                rabbits = {rabbit_name: r for rabbit_name, r in rabbits.items() if r.is_ready}
+            if len(rabbits) < 1:
+                msg = f"Inventory from {source} does not contain any nnf nodes that can be assigned"
+                raise DWSError(msg, DWSError.DWS_NO_INVENTORY)
+
+            wfr_list = [self.config.wfr_name]
+            if self.config.regexEnabled:
+                regex = f"^{self.config.wfr_name}$"
+                wfr_list = [wfr_name for wfr_name in self.dws.wfr_list_names() if re.match(regex, wfr_name)]
+
+            plan = AssignmentPlan()
+            for wfr_name in wfr_list:
+                Console.debug(Console.MIN, f"Planning assignment for '{wfr_name}'")
+                self.plan_assignment(wfr_name, rabbits, plan)
+
+            if self.config.plan_out_file is not None:
+                plan.save(self.config.plan_out_file)
+                Console.pretty_json({"action": "assign",
+                                     "planOut": self.config.plan_out_file,
+                                     "results": plan.to_json()})
+                return 0
+
+        if self.config.preview:
+            Console.debug(Console.MIN, "Preview mode: assignment plan not applied")
+            Console.pretty_json({"action": "assign", "preview": True, "results": plan.to_json()})
+            return 0
+
+        results = self.apply_plan(plan)
+        Console.pretty_json({"action": "assign",
+                             "preview": False,
+                             "results": results})
+
+        codes = [result["code"] for result in results if "code" in result]
+        if not codes:
+            return 0
+        return codes[0] if len(results) == 1 else DWSError.DWS_SOME_OPERATION_FAILED
+
     def do_assign_servers(self):
         """Assign server resources to the specified Workflow CR."""
 
@@ -1460,379 +1788,472 @@ class DWSUtility:
             msg = f"Workflow Resource named '{wfr.name}' has no directive breakdowns"
             raise DWSError(msg, DWSError.DWS_INCOMPLETE)
 
-        all_breakdown_allocations = []
-        label_constrained_nodes = {}
-
-        # Iterate each directive breakdown (1 per #dw)
-        for breakdown in breakdowns:
-            Console.debug(Console.WORDY, Console.FULL_BAR)
-            Console.debug(Console.WORDY, f"Processing breakdown {breakdown.name} for #dw {breakdown.dw_name}")
-            allocations = breakdown.allocationSet
-            breakdown_allocations = {"name": breakdown.name, "serverObj": breakdown.server_obj, "allocationSet": []}
-            all_breakdown_allocations.append(breakdown_allocations)
-            all_selected_rabbits = {}
-            rabbits_in_breakdown = {}
-            alloc_idx = 0
-            across_servers = []
-            single_server = []
-            per_compute = []
+        all_breakdown_allocations, cached = self.plan_servers(rabbits, breakdowns)
 
-            # Collect the allocations for this directive breakdown
-            for alloc in allocations:
+        failures = []
+        writes_avoided = 0
+        if not self.config.preview:
+            failures, writes_avoided = self.patch_servers(all_breakdown_allocations)
+        else:
+            Console.debug(Console.MIN, f"Preview mode: nnf resources not actually assigned to WFR {wfr.name}")
 
-                alloc_idx += 1
-                Console.debug(Console.WORDY, f"...collecting allocation {alloc_idx}, type {alloc.label} - {alloc.allocationStrategy}")
-                if alloc.is_across_servers:
-                    across_servers.append(alloc)
+        assign_results = {'name': wfr.name,
+                          'result': 'failed' if failures else 'succeeded',
+                          'cached': cached,
+                          'writesAvoided': writes_avoided,
+                          'breakdowns': all_breakdown_allocations}
+        if failures:
+            assign_results['failures'] = failures
 
-                elif alloc.is_single_server:
-                    single_server.append(alloc)
+        Console.pretty_json({"action": "assignservers",
+                             "preview": self.config.preview,
+                             "results": assign_results})
 
-                elif alloc.is_per_compute:
-                    per_compute.append(alloc)
+        return DWSError.DWS_SOME_OPERATION_FAILED if failures else 0
 
-            recipe = None
-            if breakdown.dw_name in self.config.alloc_recipe:
-                recipe = self.config.alloc_recipe[breakdown.dw_name]
-                Console.debug(Console.WORDY, "Breakdown has a PRESCRIPTIVE allocation")
+    def do_simulate(self):
+        """Replay a job trace against the inventory file in virtual time."""
+        rabbits, source = self.do_get_inventory()
+        if len(rabbits) < 1:
+            msg = f"Inventory from {source} does not contain any nnf nodes"
+            raise DWSError(msg, DWSError.DWS_NO_INVENTORY)
 
-            # *****************************************************************
-            # Address per compute allocations first, they have no constraints
-            # *****************************************************************
-            if len(per_compute) == 0:
-                Console.debug(Console.WORDY, "No 'AllocatePerCompute' to process")
-            else:
-                Console.debug(Console.WORDY, "Processing 'AllocatePerCompute'")
-                Console.debug(Console.WORDY, "-" * 40)
-                idx = 0
-                for alloc in per_compute:
-                    idx += 1
-                    selected_rabbits = {}  # Rabbits are selected per allocation
-                    computes_satisfied = 0
-                    Console.debug(Console.WORDY, f"Processing allocation {idx}")
-                    if recipe:
-                        # Console.pretty_json(recipe)
-                        if alloc.label not in recipe["allocs"]:
-                            msg = f"Prescriptive alloc did not contain recipe for {alloc.label}"
-                            raise DWSError(msg, DWSError.DWS_GENERAL)
-                        else:
-                            selected_rabbits = {}  # Rabbits are selected per allocation
-                            alloc_obj = recipe["allocs"][alloc.label]
-                            Console.debug(Console.MIN, f"   Processing element {alloc.label}")
-                            allocation_count = 0
-                            for server in alloc_obj["servers"]:
-                                rabbit = {"name": server["name"], "allocationCount": server["allocations"]}
-                                allocation_count += server["allocations"]
-                                selected_rabbits[server["name"]] = rabbit
-                                all_selected_rabbits[server["name"]] = rabbit
-                                rabbits_in_breakdown[server["name"]] = rabbit
-
-                                Console.debug(Console.MIN, "   nnfnode(s) to be assigned: "
-                                              f"{[k[0] for k in selected_rabbits.items()]}")
-
-                            assignment = {"label": alloc.label, "allocationSize": alloc.minimumCapacity, "storage": [selected_rabbits[x] for x in selected_rabbits]}
-                            breakdown_allocations["allocationSet"].append(assignment)
-                            if Console.level_enabled(Console.WORDY):
-                                Console.debug(Console.WORDY, f"   allocation {idx} details:")
-                                Console.pretty_json(assignment)
-                            Console.debug(Console.WORDY, "-" * 40)
-                    else:
-                        for rabbit_name, r in rabbits.items():
-                            Console.debug(Console.WORDY, f"  Looking at rabbit '{rabbit_name}'")
-                            alloc_count = 0
-                            if rabbit_name.strip().lower() in self.config.exclude_rabbits:
-                                Console.debug(Console.MIN, f"    Excluding rabbit node {rabbit_name}")
-                                continue
-                            for c in r.computes:
-                                Console.debug(Console.WORDY, f"  Looking at compute '{c['name']}'")
-                                if c['name'].strip().lower() in self.config.exclude_computes:
-                                    Console.debug(Console.MIN, f"    Excluding compute node {c['name']}")
-                                    continue
+        jobs = Simulator.load_trace(self.config.trace_file)
+        Console.debug(Console.MIN, f"Simulating {len(jobs)} jobs against {len(rabbits)} nnf nodes")
+        results = Simulator(Allocator.settings_from_config(self.config), rabbits, jobs, self.config.sample_interval).run()
+        results["source"] = source
+        results["trace"] = self.config.trace_file
 
-                                # Increase the allocation count for this rabbit
-                                if rabbit_name in selected_rabbits:
-                                    rabbit = selected_rabbits[rabbit_name]
-                                    rabbit['allocationCount'] += 1
-                                else:
-                                    rabbit = {"name": rabbit_name, "allocationCount": 1}
+        Console.pretty_json({"action": "simulate", "results": results})
+        return 0
 
-                                selected_rabbits[rabbit_name] = rabbit
-                                computes_satisfied += 1
-                                alloc_count += 1
+    def do_capacity_plan(self):
+        """Find how many jobs of the job mix fit at once on the inventory."""
+        rabbits, source = self.do_get_inventory(only_ready_nodes=not self.config.ignore_ready)
+        if len(rabbits) < 1:
+            msg = f"Inventory from {source} does not contain any nnf nodes that can be assigned"
+            raise DWSError(msg, DWSError.DWS_NO_INVENTORY)
 
-                                # Break out of the compute loop if we have enough computes
-                                if computes_satisfied >= self.config.nodes:
-                                    break
+        if self.config.mix_file is not None:
+            classes = CapacityPlan.load_mix(self.config.mix_file)
+        else:
+            classes = [{"name": "job", "nodes": self.config.nodes, "count": 1, "directives": self.config.dwdirectives}]
+        results = CapacityPlan(Allocator.settings_from_config(self.config), rabbits, classes).run()
+        results["source"] = source
 
-                            Console.debug(Console.MIN, f"    {alloc_count} allocations on '{rabbit_name}'")
+        Console.pretty_json({"action": "capacityplan", "results": results})
+        return 0
 
-                            # Break out of the rabbit loop
-                            if computes_satisfied >= self.config.nodes:
-                                break
+    def do_fitcheck(self):
+        """Check whether the directives and node count fit the inventory file right now."""
+        rabbits, source = self.do_get_inventory(only_ready_nodes=not self.config.ignore_ready)
+        if len(rabbits) < 1:
+            msg = f"Inventory from {source} does not contain any nnf nodes that can be assigned"
+            raise DWSError(msg, DWSError.DWS_NO_INVENTORY)
 
-                            # If we selected the specified number of nodes....
-                            if computes_satisfied == self.config.nodes:
-                                Console.debug(Console.MIN, f"{self.config.nodes}"
-                                              " computes successfully selected")
-                                break
+        ledger = FitCheck.load_ledger(self.config.ledger_file)
+        results = FitCheck(Allocator.settings_from_config(self.config), rabbits, ledger).check(self.config.dwdirectives)
+        results["source"] = source
 
-                        # If we went through all of our rabbits and still didn't find
-                        # enough compute nodes, the assign cannot be completed
-                        if computes_satisfied < self.config.nodes:
-                            msg = "There are not enough compute nodes to meet the required node count of"\
-                                f" {self.config.nodes} for an allocation of type '{alloc.label}'."
-                            raise DWSError(msg, DWSError.DWS_INSUFFICIENT_RESOURCES)
-                        else:
-                            Console.debug(Console.MIN, f"{len(selected_rabbits)} rabbit(s) selected for {self.config.nodes} '{alloc.label}' allocations.")
+        Console.pretty_json({"action": "fitcheck", "results": results})
+        return 0 if results["feasible"] else DWSError.DWS_INSUFFICIENT_RESOURCES
 
-                        Console.debug(Console.MIN, " nnfnode(s) to be assigned: "
-                                      f"{[k[0] for k in selected_rabbits.items()]}")
+    def do_sweep(self):
+        """Rank a grid of placement settings for the directives against the inventory file."""
+        rabbits, source = self.do_get_inventory(only_ready_nodes=not self.config.ignore_ready)
+        if len(rabbits) < 1:
+            msg = f"Inventory from {source} does not contain any nnf nodes that can be assigned"
+            raise DWSError(msg, DWSError.DWS_NO_INVENTORY)
 
-                        assignment = {"label": alloc.label, "allocationSize": alloc.minimumCapacity, "storage": [selected_rabbits[x] for x in selected_rabbits]}
-                        breakdown_allocations["allocationSet"].append(assignment)
-                        if Console.level_enabled(Console.WORDY):
-                            Console.debug(Console.WORDY, "AllocatePerCompute details:")
-                            Console.pretty_json(assignment)
-                            Console.debug(Console.WORDY, Console.HALF_BAR)
-                            Console.pretty_json(breakdown_allocations)
+        grid = Sweep.parse_grid(self.config.grid)
+        results = Sweep(Allocator.settings_from_config(self.config), rabbits,
+                        self.config.dwdirectives, grid, self.config.workers).run()
+        results["source"] = source
+        results["grid"] = grid
 
-            # *****************************************************************
-            # Address single server allocations (e.g. MGT/MDT)
-            # *****************************************************************
-            if len(single_server) == 0:
-                Console.debug(Console.WORDY, "No 'AllocateSingleServer' to process")
-            else:
-                Console.debug(Console.WORDY, "Processing 'AllocateSingleServer'")
-                Console.debug(Console.WORDY, "-" * 40)
-                idx = 0
-                for alloc in single_server:
-                    idx += 1
-                    selected_rabbits = {}  # Rabbits are selected per allocation
-                    Console.debug(Console.MIN, f"   Processing allocation {idx}: {alloc.label}")
+        Console.pretty_json({"action": "sweep", "results": results})
+        return 0
 
-                    if recipe:
-                        # Console.pretty_json(recipe)
-                        if alloc.label not in recipe["allocs"]:
-                            msg = f"Prescriptive alloc did not contain recipe for {alloc.label}"
-                            raise DWSError(msg, DWSError.DWS_GENERAL)
-                        else:
-                            alloc_obj = recipe["allocs"][alloc.label]
-                            Console.debug(Console.MIN, f"   Processing element {alloc.label}")
-                            for server in alloc_obj["servers"]:
-                                rabbit = {"name": server["name"], "allocationCount": server["allocations"]}
-                                selected_rabbits[server["name"]] = rabbit
-                                all_selected_rabbits[server["name"]] = rabbit
-                                rabbits_in_breakdown[server["name"]] = rabbit
-
-                                Console.debug(Console.MIN, "   nnfnode(s) to be assigned: "
-                                              f"{[k[0] for k in selected_rabbits.items()]}")
-
-                                allocation_size = round(alloc.minimumCapacity / server["allocations"])
-                                assignment = {"label": alloc.label, "allocationSize": allocation_size, "storage": [selected_rabbits[x] for x in selected_rabbits]}
-                                breakdown_allocations["allocationSet"].append(assignment)
-                                if Console.level_enabled(Console.WORDY):
-                                    Console.debug(Console.WORDY, f"   allocation {idx} details:")
-                                    Console.pretty_json(assignment)
-                                break
-                                Console.debug(Console.WORDY, "-" * 40)
+    def do_stream_inventory(self):
+        """Write the inventory to the console one nnf node at a time, as
+           NDJSON or as the same document do_show_inventory() dumps."""
+        count = 0
+        if self.config.stream_format == "ndjson":
+            for nnf_obj in self.iter_inventory():
+                Console.output(json.dumps(nnf_obj.to_json()), output_timestamp=False)
+                count += 1
+        else:
+            # Keys in the order pretty_json() sorts them.  Each node is held
+            # until the next one arrives, to know whether it needs a comma.
+            Console.output('{"nnfnodes": [', output_timestamp=False)
+            pending = None
+            for nnf_obj in self.iter_inventory():
+                if pending is not None:
+                    Console.output(f"{pending},", output_timestamp=False)
+                pending = json.dumps(nnf_obj.to_json(), sort_keys=Console.pretty)
+                count += 1
+            if pending is not None:
+                Console.output(pending, output_timestamp=False)
+            Console.output(f"], \"source\": {json.dumps(self.inventory_source())}}}", output_timestamp=False)
+        Console.debug(Console.MIN, f"Streamed {count} nnf nodes")
+        return 0
 
-                    else:
-                        # Determine if this allocation type cannot coexist
-                        if alloc.has_colocation_constraints:
-                            Console.debug(Console.MIN, f"   Allocation {alloc.label} has colocation constraints")
-                            if alloc.label not in label_constrained_nodes:
-                                Console.debug(Console.MIN, f"   Added constraint label {alloc.label}")
-                                label_constrained_nodes[alloc.label] = []
-
-                        # Scan rabbits to see if we have a place for this allocation
-                        idx = 0
-                        for rabbit_name, r in rabbits.items():
-                            Console.debug(Console.MIN, f"   Looking at rabbit {rabbit_name} for {alloc.label}")
-                            rabbit_eligible = True
-                            idx += 1
-
-                            # Determine if this rabbit is eligible from a
-                            # colocation constraint perspective
-                            if alloc.has_colocation_constraints and rabbit_name in label_constrained_nodes[alloc.label]:
-                                rabbit_eligible = False
-                                Console.debug(Console.MIN, f"     Rabbit is not eligible as it already has an {alloc.label}")
-                                continue
-
-                            # In the interest of distributing components across
-                            # rabbits, see if the user wants to reuse or not reuse
-                            # rabbits for Single Server allocations.  Controlled
-                            # by the --noreuse flag
-                            if rabbit_eligible and rabbit_name in all_selected_rabbits and (not self.config.reuse_rabbit) and idx < len(rabbits):
-                                rabbit_eligible = False
-                                Console.debug(Console.MIN, "     Rabbit is eligible but has already been used and --noreuse specified")
-                                continue
-
-                            if rabbit_eligible:
-                                Console.debug(Console.MIN, "     Rabbit is eligible")
-                                # We found a rabbit to host this allocation
-
-                                # If this rabbit has adequate capacity
-                                if r.has_sufficient_capacity(alloc.minimumCapacity):
-                                    # Increase the allocation count for this rabbit
-                                    rabbit = {"name": r.name, "allocationCount": 1}
-                                    selected_rabbits[r.name] = rabbit
-                                    all_selected_rabbits[r.name] = rabbit
-                                    rabbits_in_breakdown[r.name] = rabbit
-
-                                    r.remaining_storage -= alloc.minimumCapacity
-                                    r.allocationCount += 1
-
-                                    Console.debug(Console.WORDY, f"   Selecting '{rabbit_name}' for allocation type '{alloc.label}'")
-                                    Console.debug(Console.WORDY, f"   Rabbit remaining storage: {r.remaining_storage}")
-
-                                else:
-                                    Console.debug(Console.MIN, f"   rabbit {rabbit_name} has"
-                                                  " insufficient storage to be considered")
-
-                            Console.debug(Console.MIN, "   nnfnode(s) to be assigned: "
-                                          f"{[k[0] for k in selected_rabbits.items()]}")
-
-                            assignment = {"label": alloc.label, "allocationSize": alloc.minimumCapacity, "storage": [selected_rabbits[x] for x in selected_rabbits]}
-                            breakdown_allocations["allocationSet"].append(assignment)
-                            if Console.level_enabled(Console.WORDY):
-                                Console.debug(Console.WORDY, f"   allocation {idx} details:")
-                                Console.pretty_json(assignment)
-                            break
-                            Console.debug(Console.WORDY, "-" * 40)
+    def do_show_inventory(self):
+        """Dump the loaded inventory to the console."""
+        if self.config.stream_format is not None:
+            return self.do_stream_inventory()
+        rabbits, source = self.do_get_inventory()
+        json = {
+            "source": source,
+            "nnfnodes": []
+        }
+        for nnf_name, nnf_obj in rabbits.items():
+            nnf_json = nnf_obj.to_json()
+            json["nnfnodes"].append(nnf_json)
+        Console.pretty_json(json)
+        return 0
 
-                        if len(selected_rabbits) == 0:
-                            msg = f"Unable to locate a rabbit to serve '{alloc.label}'"
-                            raise DWSError(msg, DWSError.DWS_INSUFFICIENT_RESOURCES)
+    def do_query_inventory(self):
+        """Dump the rabbits matching each --query expression to the console."""
+        start_time = time.time()
+        rabbits, source = self.do_get_inventory()
+        index = InventoryQuery(rabbits)
+        Console.debug(Console.MIN, f"Indexed {len(rabbits)} nnf nodes in {round(time.time() - start_time, 3)}s")
+
+        queries = []
+        for expression in self.config.queries:
+            query_start = time.time()
+            names = index.query(expression)
+            matches = []
+            for name in names:
+                rabbit = rabbits[name]
+                computes = rabbit.computes
+                matches.append({"name": name,
+                                "status": rabbit.status,
+                                "capacity": rabbit.capacity,
+                                "computes": len(computes),
+                                "readyComputes": len([c for c in computes if c.get("status") == "Ready"])})
+            queries.append({"query": expression,
+                            "count": len(matches),
+                            "rabbits": matches,
+                            "elapsedSeconds": round(time.time() - query_start, 6)})
+
+        Console.pretty_json({"action": "query",
+                             "results": {"source": source,
+                                         "nnfnodes": len(rabbits),
+                                         "queries": queries,
+                                         "elapsedSeconds": round(time.time() - start_time, 3)}})
+        return 0
 
-            # *****************************************************************
-            # Address allocations across servers (e.g. OST)
-            # *****************************************************************
-            if len(across_servers) == 0:
-                Console.debug(Console.WORDY, "No 'AllocateAcrossServers' to process")
+    def do_summarize_inventory(self):
+        """Dump inventory totals, capacity percentiles, and computes per rabbit
+           to the console, from one pass over the Storage JSON (or the columns
+           with --columnar) without building Storage objects."""
+        start_time = time.time()
+        summary = InventorySummary()
+        if self.config.inventory_file is None:
+            for page in self.dws.list_cluster_custom_object_pages("storages"):
+                for storage in page["items"]:
+                    summary.add_storage(storage)
+        else:
+            inventory_file = InventoryFile(self.config.inventory_file, self.config.inventory_cache)
+            if self.config.columnar:
+                summary.add_columns(inventory_file.load_columns())
             else:
-                Console.debug(Console.WORDY, "Processing 'AllocateAcrossServers'")
-                Console.debug(Console.WORDY, "-" * 40)
+                inventory_data = inventory_file.load()
+                if 'system' not in inventory_data:
+                    raise Exception("'system' is missing from the file")
+                for storage in inventory_data['system'].get('nnf-nodes') or []:
+                    summary.add_storage(storage)
+
+        results = {"source": self.inventory_source()}
+        results.update(summary.to_json())
+        results["elapsedSeconds"] = round(time.time() - start_time, 3)
+        Console.pretty_json({"action": "summary", "results": results})
+        return 0
 
-                for alloc in across_servers:
-                    selected_rabbits = {}  # Rabbits are selected per allocation
-                    if recipe:
-                        # Console.pretty_json(recipe)
-                        if alloc.label not in recipe["allocs"]:
-                            msg = f"Prescriptive alloc did not contain recipe for {alloc.label}"
-                            raise DWSError(msg, DWSError.DWS_GENERAL)
-                        else:
-                            alloc_obj = recipe["allocs"][alloc.label]
-                            Console.debug(Console.MIN, f"   Processing element {alloc.label}")
-                            allocation_count = 0
-                            for server in alloc_obj["servers"]:
-                                rabbit = {"name": server["name"], "allocationCount": server["allocations"]}
-                                allocation_count += server["allocations"]
-                                selected_rabbits[server["name"]] = rabbit
-                                all_selected_rabbits[server["name"]] = rabbit
-                                rabbits_in_breakdown[server["name"]] = rabbit
-
-                                Console.debug(Console.MIN, "   nnfnode(s) to be assigned: "
-                                              f"{[k[0] for k in selected_rabbits.items()]}")
-
-                            allocation_size = round(alloc.minimumCapacity / allocation_count)
-                            assignment = {"label": alloc.label, "allocationSize": allocation_size, "storage": [selected_rabbits[x] for x in selected_rabbits]}
-                            breakdown_allocations["allocationSet"].append(assignment)
-                            if Console.level_enabled(Console.WORDY):
-                                Console.debug(Console.WORDY, f"   allocation {idx} details:")
-                                Console.pretty_json(assignment)
-                            Console.debug(Console.WORDY, "-" * 40)
-                    else:
-                        alloc_size = round(alloc.minimumCapacity / self.config.ost_count)
-                        Console.debug(Console.MIN, f"type: {alloc.label}, min capacity: {alloc.minimumCapacity}, rabbits: {self.config.ost_count}, per rabbit: {self.config.ost_per_rabbit}, alloc size: {alloc_size}")
-
-                        # Pass 1: Look for rabbits other than the MGT/MDT hosts
-                        ost_rabbit_count = 0
-                        for rabbit_name, r in rabbits.items():
-                            if rabbit_name in all_selected_rabbits:
-                                Console.debug(Console.WORDY, f"Rabbit {rabbit_name} has already been used, skipping for now")
-                                continue
-
-                            ost_rabbit_count += 1
-                            r = rabbits[rabbit_name]
-                            rabbit = {"name": r.name, "allocationCount": self.config.ost_per_rabbit}
-                            selected_rabbits[r.name] = rabbit
-                            rabbits_in_breakdown[r.name] = rabbit
+    def do_export_inventory(self):
+        """Write the cluster's Storage CRs as an inventory file, refreshing a snapshot when --since is given."""
+        start_time = time.time()
+        snapshot_file = self.config.export_file or self.config.since_file
+        mode = "full"
+        counts = None
+        if self.config.since_file is not None:
+            snapshot = InventorySnapshot.load(self.config.since_file)
+            if snapshot.resource_version is not None:
+                events, resource_version = self.dws.list_changes_since("storages", snapshot.resource_version, InventorySnapshot.WATCH_SECONDS)
+                if events is not None:
+                    Console.debug(Console.MIN, f"{len(events)} Storage change(s) since {snapshot.resource_version}")
+                    counts = snapshot.apply(events, resource_version)
+                    mode = "delta"
+        else:
+            snapshot = InventorySnapshot()
+
+        # No snapshot or one too old to resume from, list everything
+        if counts is None:
+            storages, resource_version = self.dws.list_cluster_custom_object_versioned("storages")
+            counts = snapshot.reconcile(storages, resource_version)
+
+        snapshot.save(snapshot_file)
+        results = {"file": snapshot_file,
+                   "mode": mode,
+                   "resourceVersion": snapshot.resource_version,
+                   "nnfnodes": len(snapshot.nodes)}
+        results.update(counts)
+        results["elapsedSeconds"] = round(time.time() - start_time, 3)
+        Console.pretty_json({"action": "export", "results": results})
+        return 0
 
-                            Console.debug(Console.WORDY, f"   Selecting '{r.name}' for allocation type '{alloc.label}'")
+    def do_generate_inventory(self):
+        """Write a synthetic inventory file and/or Storage CR JSON."""
+        start_time = time.time()
+        generator = InventoryGenerator(self.config.generate_rabbits, self.config.generate_computes,
+                                       self.config.generate_capacity, self.config.not_ready, self.config.computes_not_ready,
+                                       self.config.rabbit_pattern, self.config.compute_pattern, self.config.seed)
+        storages = generator.storages()
+        Console.debug(Console.MIN, f"Generated {len(storages)} Storages in {round(time.time() - start_time, 3)}s")
+        if self.config.export_file is not None:
+            InventoryGenerator.write_inventory(storages, self.config.export_file)
+        if self.config.storage_file is not None:
+            InventoryGenerator.write_storages(storages, self.config.storage_file)
+
+        computes = [c for s in storages for c in s["status"]["access"]["computes"]]
+        results = {"inventoryFile": self.config.export_file,
+                   "storageFile": self.config.storage_file,
+                   "rabbits": len(storages),
+                   "notReadyRabbits": len([s for s in storages if s["status"]["status"] != "Ready"]),
+                   "computes": len(computes),
+                   "notReadyComputes": len([c for c in computes if c["status"] != "Ready"]),
+                   "capacity": sum(s["status"]["capacity"] for s in storages),
+                   "seed": self.config.seed,
+                   "elapsedSeconds": round(time.time() - start_time, 3)}
+        Console.pretty_json({"action": "generate", "results": results})
+        return 0
 
-                            if ost_rabbit_count >= self.config.ost_count:
-                                break
+    def load_replanner(self, storages):
+        """Build a Replanner holding the placement of every assigned workflow.
 
-                        # Pass 2: If we need more rabbits
-                        if ost_rabbit_count < self.config.ost_count:
-                            for rabbit_name, r in all_selected_rabbits.items():
-                                ost_rabbit_count += 1
-                                r = rabbits[rabbit_name]
-                                rabbit = {"name": r.name, "allocationCount": self.config.ost_per_rabbit}
-                                selected_rabbits[r.name] = rabbit
-                                rabbits_in_breakdown[r.name] = rabbit
+        Parameters:
+        storages : Every Storage JSON in the cluster
 
-                                Console.debug(Console.WORDY, f"   Selecting '{r.name}' for allocation type '{alloc.label}'")
+        Returns:
+        Replanner object
+        """
+        rabbits = {storage["metadata"]["name"]: Storage(storage) for storage in storages}
+        replanner = Replanner(Allocator.settings_from_config(self.config), rabbits)
+        # resourceVersion of each Servers and Computes CR read, keyed by
+        # (kind, name, namespace), so patches are rejected if they change
+        self.replan_versions = {}
+        for wfr_name in self.dws.wfr_list_names():
+            try:
+                wfr = self.dws.wfr_get(wfr_name)
+                breakdowns = self.dws.wfr_get_directiveBreakdowns(wfr)
+                versions = {}
+                allocation_sets = []
+                for breakdown in breakdowns:
+                    allocation_set = []
+                    if breakdown.server_obj is not None:
+                        server = self.dws.crd_get_raw("servers", *breakdown.server_obj)
+                        allocation_set = (server.get("spec") or {}).get("allocationSets") or []
+                        versions[("servers", *breakdown.server_obj)] = (server.get("metadata") or {}).get("resourceVersion")
+                    allocation_sets.append(allocation_set)
+                computes = []
+                if wfr.compute_obj_name is not None:
+                    compute = self.dws.crd_get_raw("computes", *wfr.compute_obj_name)
+                    computes = [c["name"] for c in compute.get("data") or []]
+                    versions[("computes", *wfr.compute_obj_name)] = (compute.get("metadata") or {}).get("resourceVersion")
+            except DWSError as ex:
+                Console.debug(Console.MIN, f"Workflow {wfr_name} will not be re-planned: {ex.message}")
+                continue
+            if not any(allocation_sets) and not computes:
+                Console.debug(Console.WORDY, f"Workflow {wfr_name} is not assigned yet, not re-planned")
+                continue
+            replanner.load_workflow(wfr.name, breakdowns, allocation_sets, computes, computes_obj=wfr.compute_obj_name)
+            self.replan_versions.update(versions)
+        Console.debug(Console.MIN, f"Re-planning {len(replanner.workflows)} assigned workflow(s)")
+        return replanner
 
-                                if ost_rabbit_count >= self.config.ost_count:
-                                    break
+    def replan_changes(self, replanner, records):
+        """Re-plan the workflows on the changed rabbits and apply the patches.
 
-                        # After Pass2, we have failed if we haven't found enough rabbits
-                        if ost_rabbit_count < self.config.ost_count:
-                            msg = f"Require {self.config.ost_count} rabbits for {alloc.label} but only found {ost_rabbit_count}'"
-                            raise DWSError(msg, DWSError.DWS_INSUFFICIENT_RESOURCES)
+        Parameters:
+        replanner : Replanner from load_replanner()
+        records : Records flushed by InventoryWatch
 
-                        assignment = {"label": alloc.label, "allocationSize": round(alloc_size), "storage": [selected_rabbits[x] for x in selected_rabbits]}
-                        breakdown_allocations["allocationSet"].append(assignment)
-                        if Console.level_enabled(Console.WORDY):
-                            Console.debug(Console.WORDY, "AllocateSingleServer details:")
-                            Console.pretty_json(assignment)
+        Returns:
+        Dictionary of the patches, the number applied, and any failures
+        """
+        patches = []
+        failures = []
+        for record in records:
+            if record.get("flapped"):
+                continue
+            try:
+                result = replanner.update_storage(self.dws.crd_get_raw("storages", record["name"]))
+            except DWSError as ex:
+                if ex.code != DWSError.DWS_NOTFOUND:
+                    failures.append({"rabbit": record["name"], "message": ex.message})
+                    continue
+                result = replanner.remove_storage(record["name"])
+            patches += result["patches"]
+            failures += result["failures"]
 
-                        continue
+        applied = 0
+        if self.config.preview:
+            Console.debug(Console.MIN, f"Preview mode: {len(patches)} re-planned patch(es) not applied")
+        else:
+            for patch in patches:
+                if patch["name"] is None:
+                    continue
+                if patch["kind"] == "servers":
+                    body = {"spec": {"allocationSets": patch["allocationSets"]}}
+                else:
+                    body = {"data": [{"name": c} for c in patch["computes"]]}
+                key = (patch["kind"], patch["name"], patch["namespace"])
+                try:
+                    patched = self.dws.crd_patch_raw(patch["kind"], patch["name"], patch["namespace"], body,
+                                                     self.replan_versions.get(key))
+                    self.replan_versions[key] = patched["metadata"].get("resourceVersion")
+                    applied += 1
+                except DWSError as ex:
+                    failures.append({"workflow": patch["workflow"], "kind": patch["kind"], "message": ex.message})
+        return {"patches": patches, "applied": applied, "failures": failures}
+
+    def do_watch_inventory(self):
+        """Report Storage readiness and capacity changes as they happen,
+           re-planning the affected workflows with --replan."""
+        watch = InventoryWatch(self.dws, self.config.debounce)
+        replanner = None
+
+        def loaded(storages):
+            nonlocal replanner
+            replanner = self.load_replanner(storages)
+
+        def emit(records):
+            body = {"action": "watch",
+                    "time": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "changes": records}
+            if replanner is not None:
+                body["replan"] = self.replan_changes(replanner, records)
+            Console.pretty_json(body)
 
-            # All allocations processed
-            Console.debug(Console.MIN, f"All allocations processed for {breakdown.name}")
-            if Console.level_enabled(Console.MIN):
-                Console.pretty_json(all_breakdown_allocations)
-                Console.output(Console.FULL_BAR)
+        try:
+            watch.run(emit, self.config.watch_seconds, loaded if self.config.replan else None)
+        except KeyboardInterrupt:
+            records = watch.flush(force=True)
+            if records:
+                emit(records)
+
+        results = {"storages": len(watch.state),
+                   "resourceVersion": watch.resource_version,
+                   "reconnects": watch.reconnects,
+                   "relists": watch.relists}
+        if replanner is not None:
+            results["workflows"] = len(replanner.workflows)
+        Console.pretty_json({"action": "watch", "results": results})
+        return 0
 
-            alloc_idx = 0
-            final_allocations = []
-            for ba in all_breakdown_allocations:
-                svr_results = {'name': breakdown.name, "alloc": alloc_idx, "result": "succeeded", "allocationSet": ba}
-                if not self.config.preview:
-                    try:
-                        self.dws.wfr_update_servers(ba)
-                    except DWSError as ex:
-                        svr_results = {'name': breakdown.name, "alloc": alloc_idx, "result": "failed", "message": ex.message}
-                else:
-                    Console.debug(Console.MIN, f"Preview mode: nnf resources not actually assigned to WFR {wfr.name}")
-                alloc_idx += 1
+    def do_inventory_utilization(self):
+        """Report allocated capacity, compute usage, skew, and fragmentation per rabbit."""
+        start_time = time.time()
+        # Storages, like Servers and Computes, are listed a page at a time
+        rabbits = {r.name: r for r in self.iter_inventory()}
+        source = self.inventory_source()
+        servers = self.dws.list_cluster_custom_object_paged("servers")
+        computes = self.dws.list_cluster_custom_object_paged("computes")
+        Console.debug(Console.MIN, f"Joining {len(rabbits)} nnf nodes with {len(servers)} servers and {len(computes)} computes")
+
+        results = Utilization(rabbits, servers, computes).report()
+        results["source"] = source
+        results["elapsedSeconds"] = round(time.time() - start_time, 3)
+        Console.pretty_json({"action": "utilization", "results": results})
+        return 0
 
-                final_allocations.append(svr_results)
+    def resolve_fanout_contexts(self):
+        """The k8s contexts to run the operation against.
 
-        assign_results = {'name': wfr.name,
-                          'result': 'succeeded',
-                          'breakdowns': all_breakdown_allocations}
+        Parameters:
+        None
 
-        Console.pretty_json({"action": "assignservers",
-                             "preview": self.config.preview,
-                             "results": assign_results})
+        Returns:
+        List of context names
+        """
+        contexts, _ = k8s_config.list_kube_config_contexts(config_file=self.config.k8s_config or None)
+        available = [context['name'] for context in contexts or []]
+        if self.config.k8s_all_contexts:
+            if not available:
+                self.config.usage("No contexts found in the kubernetes configuration")
+            return available
+        missing = [context for context in self.config.k8s_fanout_contexts if context not in available]
+        if missing:
+            self.config.usage(f"Specified contexts {missing} not found.  Available contexts are {available}.")
+        return self.config.k8s_fanout_contexts
+
+    def run_context(self, context):
+        """Run the operation against one k8s context with its own client,
+           collecting its output rather than printing it.
+
+        Parameters:
+        context : Name of the k8s context
 
-        return 0
+        Returns:
+        Dictionary with the context, return code, JSON results, any other
+        output lines, and elapsed seconds
+        """
+        start_time = time.time()
+        worker = copy.copy(self)
+        worker.config = copy.copy(self.config)
+        worker.config.k8s_active_context = context
+        worker.config.k8s_active_context_source = "Fan-out"
+        # Caches are not shared between the threads; each context keeps its
+        # own topology file since Storage names repeat across clusters
+        worker.plan_cache = PlanCache(self.config.plan_cache_size, self.config.plan_cache_dir)
+        if self.config.topology_cache_file is not None:
+            worker.config.topology_cache_file = f"{self.config.topology_cache_file}.{re.sub(r'[^A-Za-z0-9_.-]', '_', context)}"
+        worker.topology_cache = TopologyCache(worker.config.topology_cache_file)
+        with Console.capture() as lines:
+            try:
+                api_client = k8s_config.new_client_from_config(config_file=self.config.k8s_config or None, context=context)
+                worker.dws = DWS(worker.config, api_client)
+                ret_code = worker.dispatch()
+            except DWSError as ex:
+                Console.pretty_json(ex.to_json())
+                ret_code = ex.code
+            except Exception as ex:
+                # One unreachable cluster must not hide the others
+                Console.pretty_json(DWSError(str(ex), DWSError.DWS_K8S_ERROR).to_json())
+                ret_code = DWSError.DWS_K8S_ERROR
 
-    def do_show_inventory(self):
-        """Dump the loaded inventory to the console."""
-        rabbits, source = self.do_get_inventory()
-        json = {
-            "source": source,
-            "nnfnodes": []
-        }
-        for nnf_name, nnf_obj in rabbits.items():
-            nnf_json = nnf_obj.to_json()
-            json["nnfnodes"].append(nnf_json)
-        Console.pretty_json(json)
-        return 0
+        results = []
+        output = []
+        for line in lines:
+            try:
+                results.append(json.loads(line))
+            except ValueError:
+                output.append(line)
+        entry = {"context": context, "returnCode": ret_code, "results": results}
+        if output:
+            entry["output"] = output
+        entry["elapsedSeconds"] = round(time.time() - start_time, 3)
+        return entry
+
+    def do_fanout(self):
+        """Run the operation against several k8s contexts concurrently and
+           dump the merged results, tagged by context, to the console."""
+        start_time = time.time()
+        contexts = self.resolve_fanout_contexts()
+        Console.debug(Console.MIN, f"Running {self.config.context} {self.config.operation} against {contexts}")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(contexts)) as executor:
+            entries = list(executor.map(self.run_context, contexts))
+
+        failed = [entry["context"] for entry in entries if entry["returnCode"] != 0]
+        Console.pretty_json({"action": "fanout",
+                             "context": self.config.context.lower(),
+                             "operation": self.config.operation.lower(),
+                             "results": {"contexts": entries,
+                                         "failedContexts": failed,
+                                         "elapsedSeconds": round(time.time() - start_time, 3)}})
+        return DWSError.DWS_SOME_OPERATION_FAILED if failed else 0
 
     def initialize_dws(self):
         self.dws = DWS(self.config)
@@ -1884,71 +2305,117 @@ class DWSUtility:
         ret_code = 0
 
         try:
-            self.initialize_run()
+            if self.config.is_offline():
+                self.preamble(1)
+                if self.config.showconfigonly:
+                    self.config.output_configuration()
+            else:
+                self.initialize_run()
 
             # If user specified flag to only display the config, stop now
             if self.config.showconfigonly:
                 return
 
-            self.initialize_dws()
-
-            # Process Workflow operations
-            error_msg = None
-            if self.config.context == "WFR":
-
-                if self.config.operation == "LIST":
-                    ret_code = self.do_list_wfr()
-                elif self.config.operation == "DELETE":
-                    ret_code = self.do_delete_wfr(self.config.wfr_name)
-                elif self.config.operation == "GET":
-                    ret_code = self.do_get_wfr(self.config.wfr_name)
-                elif self.config.operation == "CREATE":
-                    ret_code = self.do_create_wfr()
-                elif self.config.operation == "ASSIGNSERVERS":
-                    ret_code = self.do_assign_servers()
-                elif self.config.operation == "ASSIGNCOMPUTES":
-                    ret_code = self.do_assign_computes()
-                elif self.config.operation == "PROGRESS":
-                    ret_code = self.do_progress_wfr()
-                elif self.config.operation == "PROGRESSTEARDOWN":
-                    ret_code = self.do_progressteardown_wfr()
-                elif self.config.operation == "INVESTIGATE":
-                    ret_code = self.do_investigate_wfr()
-                else:
-                    self.config.usage(f"Unrecognized operation {self.config.operation} specified for {self.config.context}")
-
-            # Process Inventory operations
-            elif self.config.context == "INVENTORY":
-                if self.config.operation == "SHOW":
-                    ret_code = self.do_show_inventory()
-                else:
-                    self.config.usage(f"Unrecognized operation {self.config.operation} specified for {self.config.context}")
-
-            # Process Storage operations
-            elif self.config.context == "STORAGE":
-                if self.config.operation == "LIST":
-                    ret_code = self.do_list_storage()
-                else:
-                    self.config.usage(f"Unrecognized operation {self.config.operation} specified for {self.config.context}")
-
-            # Process System operations
-            elif self.config.context == "SYSTEM":
-                if self.config.operation == "INVESTIGATE":
-                    ret_code = self.do_investigate_system()
-                elif self.config.operation == "RESOURCELIST":
-                    ret_code = self.do_resource_list()
-                elif self.config.operation == "RESOURCEPURGE":
-                    ret_code = self.do_resource_purge()
-                else:
-                    self.config.usage(f"Unrecognized operation {self.config.operation} specified for {self.config.context}")
+            if self.config.is_fanout():
+                return self.do_fanout()
 
-            else:
-                self.config.usage(f"Unrecognized context {self.config.context}")
+            if not self.config.is_offline():
+                self.initialize_dws()
 
-            if error_msg:
-                Console.error(error_msg)
+            ret_code = self.dispatch()
         except DWSError as ex:
             Console.pretty_json(ex.to_json())
             return ex.code
 
         return ret_code
+
+    def dispatch(self):
+        """Run the configured context and operation.
+
+        Parameters:
+        None
+
+        Returns:
+        Return code of the operation
+        """
+        ret_code = 0
+
+        # Process Workflow operations
+        error_msg = None
+        if self.config.context == "WFR":
+
+            if self.config.operation == "LIST":
+                ret_code = self.do_list_wfr()
+            elif self.config.operation == "DELETE":
+                ret_code = self.do_delete_wfr(self.config.wfr_name)
+            elif self.config.operation == "GET":
+                ret_code = self.do_get_wfr(self.config.wfr_name)
+            elif self.config.operation == "CREATE":
+                ret_code = self.do_create_wfr()
+            elif self.config.operation == "ASSIGN":
+                ret_code = self.do_assign()
+            elif self.config.operation == "ASSIGNSERVERS":
+                ret_code = self.do_assign_servers()
+            elif self.config.operation == "ASSIGNCOMPUTES":
+                ret_code = self.do_assign_computes()
+            elif self.config.operation == "PROGRESS":
+                ret_code = self.do_progress_wfr()
+            elif self.config.operation == "PROGRESSTEARDOWN":
+                ret_code = self.do_progressteardown_wfr()
+            elif self.config.operation == "INVESTIGATE":
+                ret_code = self.do_investigate_wfr()
+            elif self.config.operation == "CAPACITYPLAN":
+                ret_code = self.do_capacity_plan()
+            elif self.config.operation == "FITCHECK":
+                ret_code = self.do_fitcheck()
+            elif self.config.operation == "SIMULATE":
+                ret_code = self.do_simulate()
+            elif self.config.operation == "SWEEP":
+                ret_code = self.do_sweep()
+            else:
+                self.config.usage(f"Unrecognized operation {self.config.operation} specified for {self.config.context}")
+
+        # Process Inventory operations
+        elif self.config.context == "INVENTORY":
+            if self.config.operation == "SHOW":
+                ret_code = self.do_show_inventory()
+            elif self.config.operation == "EXPORT":
+                ret_code = self.do_export_inventory()
+            elif self.config.operation == "GENERATE":
+                ret_code = self.do_generate_inventory()
+            elif self.config.operation == "QUERY":
+                ret_code = self.do_query_inventory()
+            elif self.config.operation == "SUMMARY":
+                ret_code = self.do_summarize_inventory()
+            elif self.config.operation == "WATCH":
+                ret_code = self.do_watch_inventory()
+            elif self.config.operation == "UTILIZATION":
+                ret_code = self.do_inventory_utilization()
+            else:
+                self.config.usage(f"Unrecognized operation {self.config.operation} specified for {self.config.context}")
+
+        # Process Storage operations
+        elif self.config.context == "STORAGE":
+            if self.config.operation == "LIST":
+                ret_code = self.do_list_storage()
+            else:
+                self.config.usage(f"Unrecognized operation {self.config.operation} specified for {self.config.context}")
+
+        # Process System operations
+        elif self.config.context == "SYSTEM":
+            if self.config.operation == "INVESTIGATE":
+                ret_code = self.do_investigate_system()
+            elif self.config.operation == "RESOURCELIST":
+                ret_code = self.do_resource_list()
+            elif self.config.operation == "RESOURCEPURGE":
+                ret_code = self.do_resource_purge()
+            else:
+                self.config.usage(f"Unrecognized operation {self.config.operation} specified for {self.config.context}")
+
+        else:
+            self.config.usage(f"Unrecognized context {self.config.context}")
+
+        if error_msg:
+            Console.error(error_msg)
+
+        return ret_code
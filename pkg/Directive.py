@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility #DW directive parsing
+
+import re
+
+from .Dws import DWSError
+
+
+class Directive:
+    """Parses a #DW directive and derives its allocation requirements locally.
+
+    This mirrors the allocationSets the NNF driver publishes in a
+    DirectiveBreakdown so planning can happen without creating a Workflow.
+    """
+
+    # Sizes used by the NNF driver for the Lustre metadata targets
+    MGT_CAPACITY = 1000000000
+    MDT_CAPACITY = 1000000000000
+
+    PER_COMPUTE_TYPES = ["xfs", "gfs2", "raw"]
+    STORAGE_COMMANDS = ["jobdw", "create_persistent"]
+
+    UNITS = {"": 1, "B": 1,
+             "K": 10**3, "KB": 10**3, "M": 10**6, "MB": 10**6, "G": 10**9, "GB": 10**9,
+             "T": 10**12, "TB": 10**12, "P": 10**15, "PB": 10**15,
+             "KIB": 2**10, "MIB": 2**20, "GIB": 2**30, "TIB": 2**40, "PIB": 2**50}
+
+    def parse_capacity(capacity):
+        """Convert a #DW capacity string such as '10GB' or '1TiB' to bytes.
+
+        Parameters:
+        capacity : Capacity string or number
+
+        Returns:
+        Number of bytes as an int
+        """
+        if isinstance(capacity, (int, float)):
+            return int(capacity)
+        match = re.match(r"^\s*([0-9]+(?:\.[0-9]+)?)\s*([a-zA-Z]*)\s*$", str(capacity))
+        if not match or match.group(2).upper() not in Directive.UNITS:
+            raise DWSError(f"Invalid capacity '{capacity}'", DWSError.DWS_GENERAL)
+        return int(float(match.group(1)) * Directive.UNITS[match.group(2).upper()])
+
+    def __init__(self, dw):
+        """Parse the directive.
+
+        Parameters:
+        dw : The #DW directive string
+
+        Returns:
+        Nothing
+        """
+        self.dw = dw
+        parts = dw.split()
+        if len(parts) < 2 or parts[0].lower() != "#dw":
+            raise DWSError(f"Invalid directive '{dw}'", DWSError.DWS_GENERAL)
+        self.command = parts[1].lower()
+        self.args = {}
+        for arg in parts[2:]:
+            key, _, value = arg.partition("=")
+            self.args[key.lower()] = value.strip("'\"")
+
+    @property
+    def name(self):
+        """Returns the name argument of the directive."""
+        return self.args.get("name")
+
+    @property
+    def type(self):
+        """Returns the filesystem type of the directive."""
+        return self.args.get("type", "").lower()
+
+    @property
+    def capacity(self):
+        """Returns the requested capacity in bytes."""
+        if "capacity" not in self.args:
+            return 0
+        return Directive.parse_capacity(self.args["capacity"])
+
+    @property
+    def needs_storage(self):
+        """True if this directive results in server allocations."""
+        return self.command in Directive.STORAGE_COMMANDS and "capacity" in self.args
+
+    def allocation_sets(self):
+        """Returns the allocationSets the driver would publish for this directive."""
+        if not self.needs_storage:
+            return []
+
+        rabbit_constraint = {"labels": ["dws.cray.hpe.com/storage=Rabbit"]}
+        if self.type in Directive.PER_COMPUTE_TYPES:
+            return [{"allocationStrategy": "AllocatePerCompute",
+                     "constraints": rabbit_constraint,
+                     "label": self.type,
+                     "minimumCapacity": self.capacity}]
+
+        if self.type == "lustre":
+            return [{"allocationStrategy": "AllocateSingleServer",
+                     "constraints": {"colocation": [{"key": "lustre-mgt", "type": "exclusive"}]},
+                     "label": "mgt",
+                     "minimumCapacity": Directive.MGT_CAPACITY},
+                    {"allocationStrategy": "AllocateSingleServer",
+                     "constraints": {"colocation": [{"key": "lustre-mdt", "type": "exclusive"}]},
+                     "label": "mdt",
+                     "minimumCapacity": Directive.MDT_CAPACITY},
+                    {"allocationStrategy": "AllocateAcrossServers",
+                     "constraints": rabbit_constraint,
+                     "label": "ost",
+                     "minimumCapacity": self.capacity}]
+
+        raise DWSError(f"Unsupported filesystem type '{self.type}' in '{self.dw}'", DWSError.DWS_GENERAL)
+
+    def breakdown_json(self, breakdown_name=None, namespace="default"):
+        """Build a DirectiveBreakdown CR for this directive.
+
+        Parameters:
+        breakdown_name : Name for the breakdown, defaults to the #dw name
+        namespace : Namespace for the breakdown and its Servers reference
+
+        Returns:
+        DirectiveBreakdown JSON or None if the directive needs no storage
+        """
+        if not self.needs_storage:
+            return None
+        if breakdown_name is None:
+            breakdown_name = self.name or self.type
+        return {
+            "metadata": {"name": breakdown_name, "namespace": namespace},
+            "spec": {"directive": self.dw},
+            "status": {
+                "storage": {
+                    "allocationSets": self.allocation_sets(),
+                    "reference": {"kind": "Servers", "name": breakdown_name, "namespace": namespace}
+                },
+                "ready": True
+            }
+        }
@@ -43,6 +43,7 @@ class DWSError(Exception):
     DWS_NO_INVENTORY = 106
     DWS_SOME_OPERATION_FAILED = 107
     DWS_INSUFFICIENT_RESOURCES = 108
+    DWS_CONFLICT = 109
 
     DWS_K8S_ERROR = 500
 
@@ -85,21 +86,38 @@ class DWSError(Exception):
 class DWS:
     """Wrapper class for interfacing with Data Workflow Services (DWS)."""
 
+    # Objects per request when listing a kind a page at a time
+    PAGE_SIZE = 500
+
     @property
     def k8sapi(self):
         """Returns the internal _k8sapi interface."""
         return self._k8sapi
 
-    def __init__(self, config):
-        """Initialize dws, creates an instance of the k8s CustomObjectsApi."""
+    def __init__(self, config, api_client=None):
+        """Initialize dws, creates an instance of the k8s CustomObjectsApi.
+
+        Parameters:
+        config : Config object
+        api_client : k8s ApiClient for a specific context, None for the loaded default
+
+        Returns:
+        Nothing
+        """
         with Console.trace_function():
             self.config = config
-            self._k8sapi = k8s_client.CustomObjectsApi()
+            self.api_client = api_client
+            self._k8sapi = k8s_client.CustomObjectsApi(api_client)
+
+    def api_host(self):
+        """Returns the API server this object talks to."""
+        api_client = self.api_client if self.api_client is not None else k8s_client.ApiClient()
+        return api_client.configuration.host
 
     def pods_list(self):
         with Console.trace_function():
             try:
-                v1 = k8s_client.CoreV1Api()
+                v1 = k8s_client.CoreV1Api(self.api_client)
                 pods = v1.list_pod_for_all_namespaces(watch=False)
                 return pods
             except k8s_client.exceptions.ApiException as err:  # pragma: no cover
@@ -117,7 +135,7 @@ class DWS:
 
                 V1ContainerImage.names = V1ContainerImage.names.setter(names)
 
-                api = k8s_client.CoreV1Api()
+                api = k8s_client.CoreV1Api(self.api_client)
                 response = api.list_node()
                 return response
             except k8s_client.exceptions.ApiException as err:   # pragma: no cover
@@ -125,7 +143,7 @@ class DWS:
 
     def crd_list(self):
         with Console.trace_function():
-            crd_api = k8s_client.ApiextensionsV1Api()
+            crd_api = k8s_client.ApiextensionsV1Api(self.api_client)
             try:
                 crds = crd_api.list_custom_resource_definition()
                 return crds
@@ -145,7 +163,7 @@ class DWS:
         """
 
         with Console.trace_function():
-            crd_api = k8s_client.CustomObjectsApi()
+            crd_api = k8s_client.CustomObjectsApi(self.api_client)
             try:
                 crd = crd_api.get_namespaced_custom_object(group, version, namespace, crdkind, name)
                 return crd
@@ -155,6 +173,36 @@ class DWS:
                     raise DWSError(msg, DWSError.DWS_NOTFOUND, err)
                 raise DWSError(err.body, DWSError.DWS_K8S_ERROR, err)  # pragma: no cover
 
+    def crd_patch_raw(self, crdkind, name, namespace, body, resource_version=None, group="dws.cray.hpe.com", version="v1alpha1"):
+        """Merge patch a CR by name, optionally only if it is unchanged.
+
+        Parameters:
+        crdkind : Kubernetes kind (plural) of the CR
+        name : Name of the CR
+        namespace : Namespace of the CR
+        body : Patch body
+        resource_version : When given, the patch is rejected with DWS_CONFLICT
+                           unless the CR is still at this resourceVersion
+
+        Returns:
+        JSON of the patched CR
+        """
+
+        with Console.trace_function():
+            if resource_version is not None:
+                body = dict(body)
+                body["metadata"] = {"resourceVersion": resource_version}
+            try:
+                return self.k8sapi.patch_namespaced_custom_object(group, version, namespace, crdkind, name, body)
+            except k8s_client.exceptions.ApiException as err:
+                if err.status == 404:
+                    msg = f"{crdkind} named '{namespace}.{name}' was not found"
+                    raise DWSError(msg, DWSError.DWS_NOTFOUND, err)
+                if err.status == 409:
+                    msg = f"{crdkind} named '{namespace}.{name}' changed since resourceVersion {resource_version}"
+                    raise DWSError(msg, DWSError.DWS_CONFLICT, err)
+                raise DWSError(err.body, DWSError.DWS_K8S_ERROR, err)  # pragma: no cover
+
     # Inventory Routines
     def inventory_build_from_cluster(self, only_ready_storage=False, group="dws.cray.hpe.com", version="v1alpha1"):
         """Retrieve and build the inventory tree from the cluster.
@@ -169,7 +217,7 @@ class DWS:
 
         with Console.trace_function():
             nnf_inventory = {}
-            crd_api = k8s_client.CustomObjectsApi()
+            crd_api = k8s_client.CustomObjectsApi(self.api_client)
             try:
                 storage_list = crd_api.list_cluster_custom_object(group, version, "storages")
 
@@ -177,7 +225,7 @@ class DWS:
                     Console.pretty_json(storage_list)
 
                 for storage in storage_list['items']:
-                    storage_obj = Storage(storage)
+                    storage_obj = Storage(storage, copy_raw=False)
                     if only_ready_storage and not storage_obj.is_ready:
                         Console.debug(Console.MIN, f"...storage-node {storage_obj.name}"
                                                    " is not ready, skipping")
@@ -200,7 +248,7 @@ class DWS:
 
         with Console.trace_function():
             names = []
-            crd_api = k8s_client.CustomObjectsApi()
+            crd_api = k8s_client.CustomObjectsApi(self.api_client)
             try:
                 storage_list = crd_api.list_cluster_custom_object(group, version, "storages")
                 for storage in storage_list['items']:
@@ -241,11 +289,11 @@ class DWS:
 
         with Console.trace_function():
             storages = []
-            crd_api = k8s_client.CustomObjectsApi()
+            crd_api = k8s_client.CustomObjectsApi(self.api_client)
             try:
                 storage_list = crd_api.list_cluster_custom_object("dws.cray.hpe.com", "v1alpha1", "storages")
                 for storage_raw in storage_list['items']:
-                    storages.append(Storage(storage_raw))
+                    storages.append(Storage(storage_raw, copy_raw=False))
                 return storages
             except k8s_client.exceptions.ApiException as err:  # pragma: no cover
                 raise DWSError(err.body, DWSError.DWS_K8S_ERROR, err)
@@ -263,7 +311,7 @@ class DWS:
 
         with Console.trace_function():
             resources = []
-            crd_api = k8s_client.CustomObjectsApi()
+            crd_api = k8s_client.CustomObjectsApi(self.api_client)
             try:
                 res_list = crd_api.list_cluster_custom_object(group, version, plural)
                 for res in res_list['items']:
@@ -272,6 +320,122 @@ class DWS:
             except k8s_client.exceptions.ApiException as err:  # pragma: no cover
                 raise DWSError(err.body, DWSError.DWS_K8S_ERROR, err)
 
+    def list_cluster_custom_object_paged(self, plural, group="dws.cray.hpe.com", version="v1alpha1", page_size=None):
+        """Retrieve every resource object of a kind, one page at a time.
+
+        Parameters:
+        plural: Kind of the CRD, in plural form
+        group: Group of the CRD
+        page_size: Objects per request, defaults to DWS.PAGE_SIZE
+
+        Returns:
+        a list of resource objects of the given kind, across all namespaces
+        """
+
+        resources, _ = self.list_cluster_custom_object_versioned(plural, group, version, page_size)
+        return resources
+
+    def list_cluster_custom_object_pages(self, plural, group="dws.cray.hpe.com", version="v1alpha1", page_size=None):
+        """Retrieve every resource object of a kind, one page at a time.
+
+        Parameters:
+        plural: Kind of the CRD, in plural form
+        group: Group of the CRD
+        page_size: Objects per request, defaults to DWS.PAGE_SIZE
+
+        Returns:
+        Generator of list responses, each with a page of 'items' and the
+        list 'metadata'
+        """
+
+        with Console.trace_function():
+            kwargs = {"limit": page_size or DWS.PAGE_SIZE}
+            try:
+                while True:
+                    res_list = self.k8sapi.list_cluster_custom_object(group, version, plural, **kwargs)
+                    yield res_list
+                    kwargs["_continue"] = (res_list.get('metadata') or {}).get('continue')
+                    if not kwargs["_continue"]:
+                        return
+            except k8s_client.exceptions.ApiException as err:  # pragma: no cover
+                raise DWSError(err.body, DWSError.DWS_K8S_ERROR, err)
+
+    def list_cluster_custom_object_versioned(self, plural, group="dws.cray.hpe.com", version="v1alpha1", page_size=None):
+        """Retrieve every resource object of a kind along with the list's resourceVersion.
+
+        Parameters:
+        plural: Kind of the CRD, in plural form
+        group: Group of the CRD
+        page_size: Objects per request, defaults to DWS.PAGE_SIZE
+
+        Returns:
+        a list of resource objects of the given kind, across all namespaces
+        resourceVersion the list is consistent with, a watch can resume from it
+        """
+
+        with Console.trace_function():
+            resources = []
+            list_version = None
+            for res_list in self.list_cluster_custom_object_pages(plural, group, version, page_size):
+                resources += res_list['items']
+                # Continued pages are served from the first page's snapshot
+                if list_version is None:
+                    list_version = (res_list.get('metadata') or {}).get('resourceVersion')
+            return resources, list_version
+
+    def watch_changes(self, plural, resource_version, timeout_seconds, group="dws.cray.hpe.com", version="v1alpha1"):
+        """Stream the changes to a kind since a list's resourceVersion, with bookmarks.
+
+        Parameters:
+        plural: Kind of the CRD, in plural form
+        resource_version: resourceVersion to resume from
+        timeout_seconds: Seconds before the server ends the stream
+        group: Group of the CRD
+
+        Returns:
+        Generator of watch events {type, object}.  A resource_version too old
+        to resume from is reported as an ERROR event with object code 410.
+        """
+
+        with Console.trace_function():
+            watch = k8s_watch.Watch()
+            try:
+                for event in watch.stream(self.k8sapi.list_cluster_custom_object, group, version, plural,
+                                          resource_version=resource_version, timeout_seconds=timeout_seconds,
+                                          allow_watch_bookmarks=True):
+                    yield event
+                    if event['type'] == 'ERROR':
+                        return
+            except k8s_client.exceptions.ApiException as err:
+                if err.status == 410:
+                    yield {"type": "ERROR", "object": {"code": 410, "message": err.reason}}
+                    return
+                raise DWSError(err.body, DWSError.DWS_K8S_ERROR, err)
+
+    def list_changes_since(self, plural, resource_version, timeout_seconds, group="dws.cray.hpe.com", version="v1alpha1"):
+        """Retrieve the changes to a kind since a list's resourceVersion.
+
+        Parameters:
+        plural: Kind of the CRD, in plural form
+        resource_version: resourceVersion from list_cluster_custom_object_versioned()
+        timeout_seconds: Seconds to collect changes for
+        group: Group of the CRD
+
+        Returns:
+        List of watch events {type, object}, None if resource_version is too old to resume from
+        resourceVersion the events bring the list up to
+        """
+
+        events = []
+        for event in self.watch_changes(plural, resource_version, timeout_seconds, group, version):
+            if event['type'] == 'ERROR':
+                Console.debug(Console.MIN, f"Watch of {plural} from {resource_version} failed: {event['object']}")
+                return None, resource_version
+            resource_version = event['object'].get('metadata', {}).get('resourceVersion') or resource_version
+            if event['type'] != 'BOOKMARK':
+                events.append(event)
+        return events, resource_version
+
     def get_custom_resource_definition(self, crd_name):
         """Retrieve a Custom Resource Definition (CRD) object
 
@@ -285,7 +449,7 @@ class DWS:
         # The ApiextensionsV1Api.list_custom_resource_definition() is a
         # heavy hammer.  The following is more targeted.
         with Console.trace_function():
-            api = k8s_client.ApiClient()
+            api = self.api_client if self.api_client is not None else k8s_client.ApiClient()
             try:
                 crd_obj, _, _ = api.call_api(
                     f"/apis/apiextensions.k8s.io/v1/customresourcedefinitions/{crd_name}",
@@ -367,7 +531,7 @@ class DWS:
 
         with Console.trace_function():
             wfr_names = []
-            crd_api = k8s_client.CustomObjectsApi()
+            crd_api = k8s_client.CustomObjectsApi(self.api_client)
             try:
                 wfr_list = crd_api.list_cluster_custom_object(group, version, "workflows")
                 for wfr in wfr_list['items']:
@@ -388,7 +552,7 @@ class DWS:
         """
 
         with Console.trace_function():
-            crd_api = k8s_client.CustomObjectsApi()
+            crd_api = k8s_client.CustomObjectsApi(self.api_client)
             try:
                 watch = k8s_watch.Watch()
                 for event in watch.stream(crd_api.list_cluster_custom_object, group, version, "workflows", timeout_seconds=timeout_seconds):
@@ -632,6 +796,23 @@ class DWS:
                     raise DWSError(msg, DWSError.DWS_NOTFOUND, err)
                 raise DWSError(err.body, DWSError.DWS_K8S_ERROR, err)
 
+    def get_unless_missing(self, crdkind, name, namespace, group="dws.cray.hpe.com", version="v1alpha1"):
+        """Retrieve a CR for comparison before it is patched.
+
+        Parameters:
+        crdkind : Kubernetes kind (plural) of the CR
+        name : Name of the CR
+        namespace : Namespace of the CR
+
+        Returns:
+        JSON of the CR, None if it could not be read (the patch reports why)
+        """
+        try:
+            return self.k8sapi.get_namespaced_custom_object(group, version, namespace, crdkind, name)
+        except k8s_client.exceptions.ApiException as err:
+            Console.debug(Console.WORDY, f"Unable to read {crdkind} {namespace}.{name} before patching: {err.reason}")
+            return None
+
     def wfr_update_computes(self, wfr, computes, group="dws.cray.hpe.com", version="v1alpha1"):
         """Update computes for a given Workflow.
 
@@ -640,7 +821,7 @@ class DWS:
         computes : List of compute names for the Workflow
 
         Returns:
-        Nothing
+        True if the Computes CR was patched, False if it already held the computes
         """
 
         with Console.trace_function():
@@ -649,8 +830,14 @@ class DWS:
             compute_list = [{'name': c} for c in computes]
             body_json = {"data": compute_list}
 
+            current = self.get_unless_missing("computes", compute_name, compute_namespace, group, version)
+            if current is not None and [c.get('name') for c in current.get('data') or []] == list(computes):
+                Console.debug(Console.WORDY, f"Computes {compute_namespace}.{compute_name} already up to date, not patched")
+                return False
+
             api_response = self.k8sapi.patch_namespaced_custom_object(group, version, compute_namespace, "computes", compute_name, body_json)
             Console.debug(Console.WORDY, api_response)
+            return True
 
     def wfr_update_servers(self, breakdown, group="dws.cray.hpe.com", version="v1alpha1"):
         """Update servers(nnfnodes) for a given Workflow.
@@ -660,12 +847,17 @@ class DWS:
         nnfnodes : List of servers nnfnodes for the Workflow
 
         Returns:
-        Nothing
+        True if the Servers CR was patched, False if it already held the allocation sets
         """
 
         with Console.trace_function():
             serverName, serverNamespace = breakdown['serverObj']
 
+            current = self.get_unless_missing("servers", serverName, serverNamespace, group, version)
+            if current is not None and (current.get('spec') or {}).get('allocationSets') == breakdown["allocationSet"]:
+                Console.debug(Console.WORDY, f"Servers {serverNamespace}.{serverName} already up to date, not patched")
+                return False
+
             bodyJson = {
                 "spec": {"allocationSets": breakdown["allocationSet"]}
             }
@@ -677,6 +869,7 @@ class DWS:
             api_response = self.k8sapi.patch_namespaced_custom_object(group, version, serverNamespace, "servers", serverName, bodyJson)
 
             Console.debug(Console.WORDY, api_response)
+            return True
 
     # TODO: Remove
     def wfr_update_servers_orig(self, breakdown, minimumAlloc, nnfnodes, group="dws.cray.hpe.com", version="v1alpha1"):
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility node exclusion matching
+
+import fnmatch
+import re
+
+from .Dws import DWSError
+
+
+class ExclusionMatcher:
+    """Matches node names against a compiled list of exclusions.
+
+    Exclusions may be:
+        exact names            compute-01
+        hostlist ranges        compute_r01_[01-16], nid[001-004,010]
+        globs                  compute-1*
+        regular expressions    re:compute-(01|02)
+
+    Exact names and expanded hostlist ranges go in a hash set, globs and
+    regular expressions are compiled into a single pattern.  Matching is
+    case insensitive and ignores surrounding whitespace.
+    """
+
+    REGEX_PREFIX = "re:"
+    HOSTLIST_RANGE = re.compile(r"\[([0-9]+(?:-[0-9]+)?(?:,[0-9]+(?:-[0-9]+)?)*)\]")
+    MAX_EXPANSION = 1000000
+
+    def normalize(pattern):
+        """Strip a pattern and lowercase it unless it is a regular expression."""
+        pattern = pattern.strip()
+        if pattern.startswith(ExclusionMatcher.REGEX_PREFIX):
+            return pattern
+        return pattern.lower()
+
+    def expand_hostlist(pattern):
+        """Expand Slurm style hostlist ranges in a pattern.
+
+        Parameters:
+        pattern : Pattern such as 'r[1-2]-c[01-16]'
+
+        Returns:
+        List of names; the pattern itself if it has no ranges
+        """
+        match = ExclusionMatcher.HOSTLIST_RANGE.search(pattern)
+        if not match:
+            return [pattern]
+
+        values = []
+        for part in match.group(1).split(","):
+            low, _, high = part.partition("-")
+            if not high:
+                values.append(low)
+                continue
+            if int(high) < int(low):
+                raise DWSError(f"Invalid hostlist range '{part}' in '{pattern}'", DWSError.DWS_GENERAL)
+            values += [str(num).zfill(len(low)) for num in range(int(low), int(high) + 1)]
+
+        suffixes = ExclusionMatcher.expand_hostlist(pattern[match.end():])
+        if len(values) * len(suffixes) > ExclusionMatcher.MAX_EXPANSION:
+            raise DWSError(f"Hostlist '{pattern}' expands to too many names", DWSError.DWS_GENERAL)
+        prefix = pattern[:match.start()]
+        return [f"{prefix}{value}{suffix}" for value in values for suffix in suffixes]
+
+    def read_file(path):
+        """Read exclusion patterns from a file.
+
+        Patterns are separated by whitespace or commas, '#' starts a comment.
+
+        Parameters:
+        path : Path to the exclusion file
+
+        Returns:
+        List of patterns
+        """
+        patterns = []
+        with open(path, "r") as stream:
+            for line in stream:
+                line = line.split("#", 1)[0]
+                patterns += [p for p in re.split(r"[\s,]+", line) if p]
+        return patterns
+
+    def __init__(self, patterns=None):
+        """Compile the exclusions.
+
+        Parameters:
+        patterns : List of exclusion patterns
+
+        Returns:
+        Nothing
+        """
+        self.patterns = []
+        self.exact = set()
+        self._expressions = []
+        self._compiled = None
+        for pattern in patterns or []:
+            self.add(pattern)
+
+    def add(self, pattern):
+        """Add an exclusion pattern.
+
+        Parameters:
+        pattern : Exclusion pattern
+
+        Returns:
+        Nothing
+        """
+        pattern = ExclusionMatcher.normalize(pattern)
+        if not pattern:
+            return
+        self.patterns.append(pattern)
+
+        if pattern.startswith(ExclusionMatcher.REGEX_PREFIX):
+            expression = pattern[len(ExclusionMatcher.REGEX_PREFIX):]
+            try:
+                re.compile(expression)
+            except re.error as ex:
+                raise DWSError(f"Invalid exclusion regex '{expression}': {ex}", DWSError.DWS_GENERAL)
+            self._expressions.append(expression)
+            self._compiled = None
+            return
+
+        for name in ExclusionMatcher.expand_hostlist(pattern):
+            if any(ch in name for ch in "*?["):
+                self._expressions.append(fnmatch.translate(name))
+                self._compiled = None
+            else:
+                self.exact.add(name)
+
+    def matches(self, name):
+        """Returns True if the name is excluded."""
+        name = name.strip().lower()
+        if name in self.exact:
+            return True
+        if not self._expressions:
+            return False
+        if self._compiled is None:
+            self._compiled = re.compile("|".join(f"(?:{e})" for e in self._expressions), re.IGNORECASE)
+        return self._compiled.fullmatch(name) is not None
+
+    @property
+    def is_exact(self):
+        """Returns True if every pattern is an exact name or hostlist range."""
+        return not self._expressions
+
+    def __contains__(self, name):
+        return self.matches(name)
+
+    def __len__(self):
+        return len(self.patterns)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility admission fit check
+
+import time
+
+import yaml
+
+from .Allocator import Allocator
+from .Directive import Directive
+from .Dws import DWSError
+from .crd.DirectiveBreakdown import DirectiveBreakdown
+
+
+class FitCheck:
+    """Answers whether directives and a node count fit the inventory right now.
+
+    Allocation requirements are derived from the #DW directives locally and
+    planned against an inventory whose capacity has been reduced by a
+    capacity ledger of the storage and computes already in use.  Nothing is
+    created on the cluster.
+
+    Ledger format (YAML or JSON):
+        rabbits:
+          rabbit-01:
+            allocated: 2000000000000
+            allocationCount: 3
+        computes:
+          - rabbit-01-c00
+    """
+
+    def load_ledger(ledger_file):
+        """Load a capacity ledger file.
+
+        Parameters:
+        ledger_file : Path to the ledger, None for an empty ledger
+
+        Returns:
+        Ledger dictionary with 'rabbits' and 'computes' entries
+        """
+        ledger = {}
+        if ledger_file is not None:
+            with open(ledger_file, "r") as stream:
+                ledger = yaml.load(stream, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)) or {}
+            if not isinstance(ledger, dict):
+                raise DWSError(f"Ledger '{ledger_file}' must contain a dictionary", DWSError.DWS_GENERAL)
+        return {"rabbits": ledger.get("rabbits") or {},
+                "computes": ledger.get("computes") or []}
+
+    def __init__(self, settings, rabbits, ledger=None):
+        """Apply the ledger to the inventory.
+
+        Parameters:
+        settings : Allocator settings dictionary
+        rabbits : Inventory dictionary of Storage objects keyed by name
+        ledger : Ledger from load_ledger(), None for an idle system
+
+        Returns:
+        Nothing
+        """
+        ledger = ledger or {"rabbits": {}, "computes": []}
+        busy = set(ledger["computes"])
+        for rabbit_name, usage in ledger["rabbits"].items():
+            r = rabbits.get(rabbit_name)
+            if r is None:
+                continue
+            r.remaining_storage = r.capacity - usage.get("allocated", 0)
+            r.allocationCount = usage.get("allocationCount", 0)
+
+        self.allocator = Allocator(settings, rabbits)
+        self.allocator.enforce_capacity = True
+        self.allocator.available_computes = {rabbit_name: [c for c in r.computes if c['name'] not in busy]
+                                             for rabbit_name, r in rabbits.items()}
+
+    def check(self, directives):
+        """Plan the directives and computes without taking any resources.
+
+        Parameters:
+        directives : List of #DW directives
+
+        Returns:
+        Dictionary with 'feasible' and either the proposed placement or
+        the reason it does not fit
+        """
+        start_time = time.perf_counter()
+        allocator = self.allocator
+        result = {"feasible": True, "nodes": allocator.nodes}
+        breakdowns = []
+        for dw in directives:
+            raw = Directive(dw).breakdown_json()
+            if raw is not None:
+                breakdowns.append(DirectiveBreakdown(raw))
+
+        try:
+            servers = allocator.plan_workflow(breakdowns)
+
+            # Per compute allocations pick their computes, anything else
+            # prefers the computes behind the rabbits the plan used
+            computes = list(allocator.selected_computes)
+            if len(computes) < allocator.nodes:
+                computes = allocator.plan_computes(list(allocator.charges))
+            if len(computes) < allocator.nodes:
+                msg = f"Insufficient compute resources to meet node requirement of {allocator.nodes} nodes"
+                raise DWSError(msg, DWSError.DWS_INSUFFICIENT_RESOURCES)
+            result["servers"] = [{"directive": bd.dw, "allocationSets": s["allocationSet"]}
+                                 for bd, s in zip(breakdowns, servers)]
+            result["computes"] = computes[:allocator.nodes]
+        except DWSError as ex:
+            result["feasible"] = False
+            result["message"] = ex.message
+        finally:
+            allocator.rollback()
+
+        result["elapsedMs"] = round((time.perf_counter() - start_time) * 1000, 3)
+        return result
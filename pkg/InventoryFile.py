@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility inventory file reader with a compiled cache
+
+import json
+import os
+
+import yaml
+
+from .ColumnarInventory import ColumnarInventory
+from .Console import Console
+
+
+class InventoryFile:
+    """Reads an inventory file, keeping a compiled copy next to it.
+
+    The YAML is parsed with the libyaml loader when PyYAML was built with
+    it.  The parsed document is then written as JSON to '<file>.dwscache'
+    after a header line holding the absolute path, modification time, and
+    size of the YAML.  Later reads check the header before decoding the
+    rest and use the compiled copy only when all three still match,
+    otherwise the YAML is parsed again and the compiled copy replaced.
+    JSON is used so that a planted cache file can at worst hold the wrong
+    data, it cannot run code.  A compiled copy that cannot be written
+    (e.g. a read-only directory) is skipped.
+
+    load_columns() keeps a ColumnarInventory in '<file>.dwscols' instead,
+    under the same key, and memory maps it on later reads.
+    """
+
+    # Part of the compiled file, bump when its layout changes
+    CACHE_VERSION = 2
+    CACHE_SUFFIX = ".dwscache"
+    COLUMNS_SUFFIX = ".dwscols"
+
+    def __init__(self, inventory_file, use_cache=True):
+        """Initialize the inventory file reader.
+
+        Parameters:
+        inventory_file : Path of the YAML inventory file
+        use_cache : False to always parse the YAML and leave no compiled copy
+
+        Returns:
+        Nothing
+        """
+        self.inventory_file = inventory_file
+        self.cache_file = f"{inventory_file}{InventoryFile.CACHE_SUFFIX}"
+        self.columns_file = f"{inventory_file}{InventoryFile.COLUMNS_SUFFIX}"
+        self.use_cache = use_cache
+        self.cached = False
+
+    def key(self):
+        """Identity of the YAML file the compiled copy must match.
+
+        Parameters:
+        None
+
+        Returns:
+        Tuple of cache version, absolute path, mtime in nanoseconds, and size
+        """
+        st = os.stat(self.inventory_file)
+        return (InventoryFile.CACHE_VERSION, os.path.abspath(self.inventory_file), st.st_mtime_ns, st.st_size)
+
+    def read_cache(self, key):
+        """Read the compiled copy, None when it is missing, unreadable, or stale.
+
+        Parameters:
+        key : Identity from key()
+
+        Returns:
+        Parsed inventory document or None
+        """
+        try:
+            with open(self.cache_file, "r") as stream:
+                # The header is checked before the inventory is decoded
+                if stream.readline() != json.dumps(list(key)) + "\n":
+                    Console.debug(Console.WORDY, f"Inventory cache {self.cache_file} is stale")
+                    return None
+                inventory_data = json.load(stream)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as ex:
+            Console.debug(Console.MIN, f"Inventory cache {self.cache_file} not loaded: {ex}")
+            return None
+        return inventory_data if isinstance(inventory_data, dict) else None
+
+    def write_cache(self, key, inventory_data):
+        """Replace the compiled copy, failures are only reported at debug level.
+
+        Parameters:
+        key : Identity from key()
+        inventory_data : Parsed inventory document
+
+        Returns:
+        Nothing
+        """
+        tmp_path = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as stream:
+                stream.write(json.dumps(list(key)) + "\n")
+                json.dump(inventory_data, stream, separators=(",", ":"))
+            os.replace(tmp_path, self.cache_file)
+        except (OSError, TypeError, ValueError) as ex:
+            Console.debug(Console.MIN, f"Unable to write inventory cache {self.cache_file}: {ex}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def load(self):
+        """Parse the inventory file, from the compiled copy when it is current.
+
+        Parameters:
+        None
+
+        Returns:
+        Parsed inventory document, owned by the caller
+        """
+        self.cached = False
+        key = self.key() if self.use_cache else None
+        if key is not None:
+            inventory_data = self.read_cache(key)
+            if inventory_data is not None:
+                Console.debug(Console.WORDY, f"Inventory loaded from cache {self.cache_file}")
+                self.cached = True
+                return inventory_data
+
+        inventory_data = self.parse()
+        if key is not None and isinstance(inventory_data, dict):
+            self.write_cache(key, inventory_data)
+        return inventory_data
+
+    def parse(self):
+        """Parse the YAML, ignoring any compiled copy.
+
+        Parameters:
+        None
+
+        Returns:
+        Parsed inventory document
+        """
+        with open(self.inventory_file, "r") as stream:
+            return yaml.load(stream, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+    def load_columns(self):
+        """Load the inventory as a ColumnarInventory, memory mapped when current.
+
+        Parameters:
+        None
+
+        Returns:
+        ColumnarInventory of every nnf node in the file
+        """
+        self.cached = False
+        key = list(self.key()) if self.use_cache else None
+        if key is not None:
+            inventory = ColumnarInventory.load(self.columns_file, key)
+            if inventory is not None:
+                Console.debug(Console.WORDY, f"Inventory mapped from {self.columns_file}")
+                self.cached = True
+                return inventory
+
+        inventory = ColumnarInventory.from_document(self.parse())
+        if key is not None:
+            try:
+                inventory.save(self.columns_file, key)
+            except OSError as ex:
+                Console.debug(Console.MIN, f"Unable to write columnar inventory {self.columns_file}: {ex}")
+        return inventory
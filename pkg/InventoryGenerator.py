@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility synthetic inventory generator
+
+
+import json
+import os
+import random
+import string
+
+from .Directive import Directive
+from .Dws import DWSError
+
+
+class InventoryGenerator:
+    """Builds synthetic inventories of any size for benchmarks and tests.
+
+    Every rabbit is a Storage CR with 'computes' computes.  The same rabbits
+    can be written as an inventory file for --inventory and as a JSON List of
+    Storage CRs.  The output depends only on the settings and the seed.
+
+    Capacity specifications:
+        40TB                    every rabbit has 40TB
+        uniform:10TB-40TB       uniformly distributed between the two
+        normal:30TB,5TB         normally distributed with that mean and deviation
+        choice:10TB,20TB,40TB   one of the listed capacities
+
+    Name patterns take {r} for the rabbit number, {c} for the compute number
+    within its rabbit, and {n} for the compute number across the system.
+    Numbers start at 1 and are zero padded to the width of the largest one.
+    """
+
+    DEFAULT_CAPACITY = "39582418599936"
+    DEFAULT_RABBIT_PATTERN = "rabbit-{r}"
+    DEFAULT_COMPUTE_PATTERN = "compute-{r}-{c}"
+
+    STORAGE_API_VERSION = "dws.cray.hpe.com/v1alpha1"
+
+    def parse_capacity(spec):
+        """Parse a capacity specification.
+
+        Parameters:
+        spec : Capacity specification, see the class description
+
+        Returns:
+        Tuple of the distribution name and a list of byte counts
+        """
+        kind, sep, values = str(spec).partition(":")
+        if not sep:
+            kind, values = "fixed", kind
+        kind = kind.strip().lower()
+        separator = "-" if kind == "uniform" else ","
+        capacities = [Directive.parse_capacity(v) for v in values.split(separator)]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2}
+        if kind not in ["fixed", "uniform", "normal", "choice"] or len(capacities) != expected.get(kind, len(capacities)):
+            raise DWSError(f"Invalid capacity specification '{spec}'", DWSError.DWS_GENERAL)
+        if kind == "uniform" and capacities[0] > capacities[1]:
+            raise DWSError(f"Invalid capacity specification '{spec}', the minimum is larger than the maximum", DWSError.DWS_GENERAL)
+        return kind, capacities
+
+    def pattern_fields(pattern, allowed):
+        """Raise a DWSError unless a name pattern uses only plain allowed fields.
+
+        Parameters:
+        pattern : Name pattern
+        allowed : Field names the pattern may use
+
+        Returns:
+        Set of the field names used
+        """
+        try:
+            parsed = list(string.Formatter().parse(pattern))
+        except ValueError as ex:
+            raise DWSError(f"Name pattern '{pattern}' is not valid: {ex}", DWSError.DWS_GENERAL)
+        fields = set()
+        for _, field, spec, conversion in parsed:
+            if field is None:
+                continue
+            if field not in allowed:
+                msg = f"Name pattern '{pattern}' has unknown field {{{field}}}, use {', '.join(f'{{{f}}}' for f in allowed)}"
+                raise DWSError(msg, DWSError.DWS_GENERAL)
+            if spec or conversion:
+                # Numbers are already zero padded, see the class description
+                raise DWSError(f"Name pattern '{pattern}' may not format {{{field}}}, use {{{field}}} alone", DWSError.DWS_GENERAL)
+            fields.add(field)
+        return fields
+
+    def check_patterns(rabbit_pattern, compute_pattern):
+        """Raise a DWSError unless the patterns give every rabbit and compute a unique name.
+
+        A compute named like a rabbit depends on the counts as well as the
+        patterns, storages() checks for that.
+
+        Parameters:
+        rabbit_pattern : Rabbit name pattern
+        compute_pattern : Compute name pattern
+
+        Returns:
+        Nothing
+        """
+        if "r" not in InventoryGenerator.pattern_fields(rabbit_pattern, ["r"]):
+            raise DWSError(f"Rabbit name pattern '{rabbit_pattern}' must contain {{r}}", DWSError.DWS_GENERAL)
+        fields = InventoryGenerator.pattern_fields(compute_pattern, ["r", "c", "n"])
+        if "n" not in fields and ("r" not in fields or "c" not in fields):
+            raise DWSError(f"Compute name pattern '{compute_pattern}' must contain {{n}} or both {{r}} and {{c}}", DWSError.DWS_GENERAL)
+
+    def __init__(self, rabbits, computes, capacity=None, not_ready=0.0, computes_not_ready=0.0,
+                 rabbit_pattern=None, compute_pattern=None, seed=0):
+        """Initialize the generator.
+
+        Parameters:
+        rabbits : Number of rabbits
+        computes : Number of computes per rabbit
+        capacity : Capacity specification, DEFAULT_CAPACITY when None
+        not_ready : Fraction of the rabbits that are NotReady
+        computes_not_ready : Fraction of the computes that are NotReady
+        rabbit_pattern : Rabbit name pattern, DEFAULT_RABBIT_PATTERN when None
+        compute_pattern : Compute name pattern, DEFAULT_COMPUTE_PATTERN when None
+        seed : Random seed
+
+        Returns:
+        Nothing
+        """
+        self.rabbits = rabbits
+        self.computes = computes
+        self.capacity = InventoryGenerator.parse_capacity(capacity or InventoryGenerator.DEFAULT_CAPACITY)
+        self.not_ready = not_ready
+        self.computes_not_ready = computes_not_ready
+        self.rabbit_pattern = rabbit_pattern or InventoryGenerator.DEFAULT_RABBIT_PATTERN
+        self.compute_pattern = compute_pattern or InventoryGenerator.DEFAULT_COMPUTE_PATTERN
+        self.seed = seed
+        InventoryGenerator.check_patterns(self.rabbit_pattern, self.compute_pattern)
+
+    def sample_capacity(self, rng):
+        kind, capacities = self.capacity
+        if kind == "fixed":
+            return capacities[0]
+        if kind == "uniform":
+            return rng.randint(capacities[0], capacities[1])
+        if kind == "normal":
+            return max(0, int(rng.gauss(capacities[0], capacities[1])))
+        return rng.choice(capacities)
+
+    def storages(self):
+        """Build the Storage CRs.
+
+        Parameters:
+        None
+
+        Returns:
+        List of Storage JSON, in rabbit order
+        """
+        rng = random.Random(self.seed)
+        total_computes = self.rabbits * self.computes
+        not_ready = set(rng.sample(range(self.rabbits), round(self.rabbits * self.not_ready)))
+        computes_not_ready = set(rng.sample(range(total_computes), round(total_computes * self.computes_not_ready)))
+        r_width = len(str(self.rabbits))
+        c_width = len(str(self.computes))
+        n_width = len(str(total_computes))
+
+        rabbit_names = [self.rabbit_pattern.format(r=str(r + 1).zfill(r_width)) for r in range(self.rabbits)]
+        rabbit_set = set(rabbit_names)
+
+        storages = []
+        for r, name in enumerate(rabbit_names):
+            r_num = str(r + 1).zfill(r_width)
+            computes = []
+            for c in range(self.computes):
+                n = r * self.computes + c
+                compute_name = self.compute_pattern.format(r=r_num, c=str(c + 1).zfill(c_width), n=str(n + 1).zfill(n_width))
+                if compute_name in rabbit_set:
+                    msg = f"Name patterns '{self.rabbit_pattern}' and '{self.compute_pattern}' both name '{compute_name}'"
+                    raise DWSError(msg, DWSError.DWS_GENERAL)
+                computes.append({"name": compute_name,
+                                 "status": "NotReady" if n in computes_not_ready else "Ready"})
+            status = "NotReady" if r in not_ready else "Ready"
+            storages.append({
+                "apiVersion": InventoryGenerator.STORAGE_API_VERSION,
+                "kind": "Storage",
+                "metadata": {"name": name, "namespace": "default"},
+                "status": {
+                    "access": {
+                        "computes": computes,
+                        "protocol": "PCIe",
+                        "servers": [{"name": name, "status": status}]
+                    },
+                    "capacity": self.sample_capacity(rng),
+                    "status": status,
+                    "type": "NVMe"
+                }
+            })
+        return storages
+
+    def write_inventory(storages, inventory_file):
+        """Write the Storage CRs as an inventory file, replacing any existing file.
+           Each rabbit is written as a single line of JSON, which is also YAML
+           and is far quicker to emit than block style YAML.
+
+        Parameters:
+        storages : List of Storage JSON from storages()
+        inventory_file : Path of the inventory file
+
+        Returns:
+        Nothing
+        """
+        tmp_path = f"{inventory_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as stream:
+            stream.write("system:\n  nnf-nodes:\n")
+            for storage in storages:
+                stream.write(f"    - {json.dumps(storage)}\n")
+        os.replace(tmp_path, inventory_file)
+
+    def write_storages(storages, storage_file):
+        """Write the Storage CRs as a JSON List, replacing any existing file.
+
+        Parameters:
+        storages : List of Storage JSON from storages()
+        storage_file : Path of the JSON file
+
+        Returns:
+        Nothing
+        """
+        tmp_path = f"{storage_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as stream:
+            json.dump({"apiVersion": "v1", "kind": "List", "items": storages}, stream)
+        os.replace(tmp_path, storage_file)
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility indexed inventory queries
+
+
+import bisect
+import re
+
+from .Directive import Directive
+from .Dws import DWSError
+from .ExclusionMatcher import ExclusionMatcher
+
+
+class InventoryQuery:
+    """Answers filter expressions over an inventory from indexes built once.
+
+    Expressions compare rabbit fields and are combined with 'and', 'or',
+    'not', and parentheses:
+        status == Ready and capacity >= 20TB and readycomputes >= 12
+        compute == x1000c0s0b0n0
+        name ~ rabbit-[01-16] or not status == Ready
+
+    Fields:
+        name            rabbit name
+        status          rabbit status
+        compute         name of any of the rabbit's computes
+        capacity        rabbit capacity, values may have units (20TB, 1TiB)
+        computes        number of computes
+        readycomputes   number of Ready computes
+
+    name, status, and compute take '==', '!=', and '~' (a name, hostlist
+    range, glob, or re: regex as used by --exr/--exc).  The numeric fields
+    take '==', '!=', '<', '<=', '>', and '>='.  Values containing spaces,
+    parentheses, or operators must be quoted.
+
+    Names, statuses, and computes are indexed by hash and the numeric fields
+    by sorted value, so each comparison is a lookup or a binary search and
+    the results are combined as sets of rabbit names.
+    """
+
+    STRING_FIELDS = ["name", "status", "compute"]
+    NUMERIC_FIELDS = ["capacity", "computes", "readycomputes"]
+    STRING_OPERATORS = ["==", "!=", "~"]
+    NUMERIC_OPERATORS = ["==", "!=", "<", "<=", ">", ">="]
+
+    TOKEN = re.compile(r"""\s*(?:(?P<paren>[()])|(?P<op>==|!=|<=|>=|<|>|~)|"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<word>[^\s()!=<>~"']+))""")
+
+    def __init__(self, rabbits):
+        """Build the indexes.
+
+        Parameters:
+        rabbits : Inventory dictionary of Storage (or ColumnarInventory) keyed by name
+
+        Returns:
+        Nothing
+        """
+        self.rabbits = rabbits
+        self.names = {}
+        self.statuses = {}
+        self.computes = {}
+        numeric = {field: [] for field in InventoryQuery.NUMERIC_FIELDS}
+        for name, rabbit in rabbits.items():
+            self.names[name.lower()] = name
+            self.statuses.setdefault(str(rabbit.status).lower(), set()).add(name)
+            computes = rabbit.computes
+            for compute in computes:
+                self.computes.setdefault(compute["name"].lower(), set()).add(name)
+            numeric["capacity"].append((rabbit.capacity, name))
+            numeric["computes"].append((len(computes), name))
+            numeric["readycomputes"].append((len([c for c in computes if c.get("status") == "Ready"]), name))
+
+        # Parallel sorted value and name lists per numeric field
+        self.sorted = {}
+        for field, pairs in numeric.items():
+            pairs.sort()
+            self.sorted[field] = ([value for value, _ in pairs], [name for _, name in pairs])
+        self.all = set(rabbits.keys())
+
+    def tokenize(expression):
+        tokens = []
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = InventoryQuery.TOKEN.match(expression, position)
+            if not match or match.end() == position:
+                raise DWSError(f"Unexpected '{expression[position:].strip()}' in query '{expression}'", DWSError.DWS_GENERAL)
+            position = match.end()
+            if match.group("paren") is not None:
+                tokens.append(("paren", match.group("paren")))
+            elif match.group("op") is not None:
+                tokens.append(("op", match.group("op")))
+            elif match.group("dq") is not None or match.group("sq") is not None:
+                tokens.append(("value", match.group("dq") if match.group("dq") is not None else match.group("sq")))
+            elif match.group("word").lower() in ["and", "or", "not"]:
+                tokens.append((match.group("word").lower(), None))
+            else:
+                tokens.append(("value", match.group("word")))
+        return tokens
+
+    def parse(expression):
+        """Parse a filter expression.
+
+        Parameters:
+        expression : Filter expression, see the class description
+
+        Returns:
+        Expression tree of ("and"|"or", left, right), ("not", operand), and
+        ("cmp", field, operator, value) tuples
+        """
+        tokens = InventoryQuery.tokenize(expression)
+        position = 0
+
+        def peek():
+            return tokens[position] if position < len(tokens) else (None, None)
+
+        def take(kind, what):
+            nonlocal position
+            token = peek()
+            if token[0] != kind:
+                found = "the end" if token[0] is None else f"'{token[1] or token[0]}'"
+                raise DWSError(f"Expected {what} but found {found} in query '{expression}'", DWSError.DWS_GENERAL)
+            position += 1
+            return token[1]
+
+        def parse_or():
+            nonlocal position
+            node = parse_and()
+            while peek()[0] == "or":
+                position += 1
+                node = ("or", node, parse_and())
+            return node
+
+        def parse_and():
+            nonlocal position
+            node = parse_not()
+            while peek()[0] == "and":
+                position += 1
+                node = ("and", node, parse_not())
+            return node
+
+        def parse_not():
+            nonlocal position
+            if peek()[0] == "not":
+                position += 1
+                return ("not", parse_not())
+            if peek() == ("paren", "("):
+                position += 1
+                node = parse_or()
+                if peek() != ("paren", ")"):
+                    found = "the end" if peek()[0] is None else f"'{peek()[1] or peek()[0]}'"
+                    raise DWSError(f"Expected ')' but found {found} in query '{expression}'", DWSError.DWS_GENERAL)
+                position += 1
+                return node
+            field = take("value", "a field").lower()
+            operator = take("op", "an operator")
+            value = take("value", "a value")
+            if field in InventoryQuery.STRING_FIELDS:
+                if operator not in InventoryQuery.STRING_OPERATORS:
+                    raise DWSError(f"'{field}' can not be compared with '{operator}' in query '{expression}'", DWSError.DWS_GENERAL)
+                if operator == "~":
+                    value = ExclusionMatcher([value])
+            elif field in InventoryQuery.NUMERIC_FIELDS:
+                if operator not in InventoryQuery.NUMERIC_OPERATORS:
+                    raise DWSError(f"'{field}' can not be compared with '{operator}' in query '{expression}'", DWSError.DWS_GENERAL)
+                value = Directive.parse_capacity(value) if field == "capacity" else InventoryQuery.parse_count(value, expression)
+            else:
+                raise DWSError(f"Unknown field '{field}' in query '{expression}', fields are"
+                               f" {InventoryQuery.STRING_FIELDS + InventoryQuery.NUMERIC_FIELDS}", DWSError.DWS_GENERAL)
+            return ("cmp", field, operator, value)
+
+        tree = parse_or()
+        if position != len(tokens):
+            raise DWSError(f"Unexpected '{tokens[position][1] or tokens[position][0]}' in query '{expression}'", DWSError.DWS_GENERAL)
+        return tree
+
+    def parse_count(value, expression):
+        try:
+            return int(value)
+        except ValueError:
+            raise DWSError(f"'{value}' is not a number in query '{expression}'", DWSError.DWS_GENERAL)
+
+    def _lookup(self, index, matcher):
+        """Names under the index keys a matcher accepts, by hash for exact names."""
+        if matcher.is_exact:
+            keys = [key for key in matcher.exact if key in index]
+        else:
+            keys = [key for key in index if matcher.matches(key)]
+        names = set()
+        for key in keys:
+            found = index[key]
+            names |= found if isinstance(found, set) else {found}
+        return names
+
+    def _compare(self, field, operator, value):
+        if field in InventoryQuery.NUMERIC_FIELDS:
+            values, names = self.sorted[field]
+            if operator == "==":
+                return set(names[bisect.bisect_left(values, value):bisect.bisect_right(values, value)])
+            if operator == "!=":
+                return self.all - set(names[bisect.bisect_left(values, value):bisect.bisect_right(values, value)])
+            if operator == "<":
+                return set(names[:bisect.bisect_left(values, value)])
+            if operator == "<=":
+                return set(names[:bisect.bisect_right(values, value)])
+            if operator == ">":
+                return set(names[bisect.bisect_right(values, value):])
+            return set(names[bisect.bisect_left(values, value):])
+
+        index = {"name": self.names, "status": self.statuses, "compute": self.computes}[field]
+        if operator == "~":
+            return self._lookup(index, value)
+        found = index.get(value.strip().lower(), set())
+        found = found if isinstance(found, set) else {found}
+        return self.all - found if operator == "!=" else set(found)
+
+    def evaluate(self, tree):
+        """Names of the rabbits an expression tree accepts.
+
+        Parameters:
+        tree : Expression tree from parse()
+
+        Returns:
+        Set of rabbit names
+        """
+        if tree[0] == "and":
+            return self.evaluate(tree[1]) & self.evaluate(tree[2])
+        if tree[0] == "or":
+            return self.evaluate(tree[1]) | self.evaluate(tree[2])
+        if tree[0] == "not":
+            return self.all - self.evaluate(tree[1])
+        return self._compare(tree[1], tree[2], tree[3])
+
+    def query(self, expression):
+        """Names of the rabbits matching a filter expression.
+
+        Parameters:
+        expression : Filter expression, see the class description
+
+        Returns:
+        Sorted list of rabbit names
+        """
+        return sorted(self.evaluate(InventoryQuery.parse(expression)))
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility cluster inventory snapshot
+
+import os
+
+import yaml
+
+from .Dws import DWSError
+
+
+class InventorySnapshot:
+    """The cluster's Storage CRs in the format read by --inventory.
+
+    The snapshot records the resourceVersion of the Storage list it is
+    consistent with, so that it can later be brought up to date from the
+    changes since that version rather than by listing every Storage again.
+
+    Snapshot format (YAML):
+        system:
+          resourceVersion: "5271982"
+          nnf-nodes:
+            - metadata: {name: rabbit-01, resourceVersion: "5271979", ...}
+              status: {status: Ready, capacity: ..., access: {computes: [...]}}
+    """
+
+    # Seconds of changes collected when refreshing a snapshot
+    WATCH_SECONDS = 2
+
+    def __init__(self, nodes=None, resource_version=None):
+        """Initialize the snapshot.
+
+        Parameters:
+        nodes : Dictionary of Storage name to Storage JSON, None for an empty snapshot
+        resource_version : resourceVersion of the Storage list the nodes are consistent with
+
+        Returns:
+        Nothing
+        """
+        self.nodes = nodes or {}
+        self.resource_version = resource_version
+
+    def load(snapshot_file):
+        """Load a snapshot written by save().
+
+        Parameters:
+        snapshot_file : Path to the snapshot
+
+        Returns:
+        InventorySnapshot object
+        """
+        with open(snapshot_file, "r") as stream:
+            body = yaml.load(stream, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+        system = body.get("system") if isinstance(body, dict) else None
+        if not isinstance(system, dict) or "nnf-nodes" not in system:
+            raise DWSError(f"Snapshot '{snapshot_file}' has no 'system: nnf-nodes:'", DWSError.DWS_GENERAL)
+        nodes = {node["metadata"]["name"]: node for node in system["nnf-nodes"] or []}
+        return InventorySnapshot(nodes, system.get("resourceVersion"))
+
+    def strip(storage):
+        """Drop the server managed bookkeeping that planning never reads.
+
+        Parameters:
+        storage : Storage JSON, modified in place
+
+        Returns:
+        storage
+        """
+        metadata = storage.get("metadata") or {}
+        metadata.pop("managedFields", None)
+        annotations = metadata.get("annotations") or {}
+        annotations.pop("kubectl.kubernetes.io/last-applied-configuration", None)
+        if "annotations" in metadata and not annotations:
+            del metadata["annotations"]
+        return storage
+
+    def reconcile(self, storages, resource_version):
+        """Replace the snapshot with a full Storage list.
+
+        Parameters:
+        storages : Every Storage JSON in the cluster
+        resource_version : resourceVersion of the list
+
+        Returns:
+        Dictionary of added, modified, deleted, and unchanged counts
+        """
+        counts = {"added": 0, "modified": 0, "deleted": 0, "unchanged": 0}
+        nodes = {}
+        for storage in storages:
+            name = storage["metadata"]["name"]
+            previous = self.nodes.get(name)
+            if previous is None:
+                counts["added"] += 1
+            elif previous["metadata"].get("resourceVersion") != storage["metadata"].get("resourceVersion"):
+                counts["modified"] += 1
+            else:
+                counts["unchanged"] += 1
+                nodes[name] = previous
+                continue
+            nodes[name] = InventorySnapshot.strip(storage)
+        counts["deleted"] = len([name for name in self.nodes if name not in nodes])
+        self.nodes = nodes
+        self.resource_version = resource_version
+        return counts
+
+    def apply(self, events, resource_version):
+        """Patch the snapshot with the watch events since its resourceVersion.
+
+        Parameters:
+        events : List of watch events {type, object} from DWS.list_changes_since()
+        resource_version : resourceVersion the events bring the snapshot up to
+
+        Returns:
+        Dictionary of added, modified, deleted, and unchanged counts
+        """
+        # A Storage can change several times, each is counted once
+        existing = set(self.nodes)
+        changed = set()
+        for event in events:
+            if event["type"] not in ["ADDED", "MODIFIED", "DELETED"]:
+                continue
+            storage = event["object"]
+            name = storage["metadata"]["name"]
+            changed.add(name)
+            if event["type"] == "DELETED":
+                self.nodes.pop(name, None)
+            else:
+                self.nodes[name] = InventorySnapshot.strip(storage)
+        counts = {"added": len([name for name in changed if name in self.nodes and name not in existing]),
+                  "modified": len([name for name in changed if name in self.nodes and name in existing]),
+                  "deleted": len([name for name in changed if name not in self.nodes and name in existing])}
+        counts["unchanged"] = len(existing - changed)
+        self.resource_version = resource_version
+        return counts
+
+    def to_json(self):
+        return {"system": {"resourceVersion": self.resource_version,
+                           "nnf-nodes": [self.nodes[name] for name in sorted(self.nodes)]}}
+
+    def save(self, snapshot_file):
+        """Write the snapshot, replacing any existing file.
+
+        Parameters:
+        snapshot_file : Path to the snapshot
+
+        Returns:
+        Nothing
+        """
+        tmp_path = f"{snapshot_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as stream:
+            yaml.dump(self.to_json(), stream, Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper), sort_keys=False)
+        os.replace(tmp_path, snapshot_file)
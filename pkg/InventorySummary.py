@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility inventory summary statistics
+
+import array
+
+
+class InventorySummary:
+    """Aggregate counts and capacity statistics of an inventory.
+
+    Rabbits are added one at a time, from the raw Storage JSON or straight
+    from the columns of a ColumnarInventory, so no Storage objects are
+    built.  Only the capacity of each rabbit (one array entry) and a
+    histogram of computes per rabbit are kept, the percentiles are exact.
+    """
+
+    PERCENTILES = [50, 90, 99]
+
+    def __init__(self):
+        """Initialize an empty summary.
+
+        Parameters:
+        None
+
+        Returns:
+        Nothing
+        """
+        self.rabbits = 0
+        self.ready_rabbits = 0
+        self.computes = 0
+        self.ready_computes = 0
+        self.ready_capacity = 0
+        self.capacities = array.array("q")
+        self.statuses = {}
+
+        # Number of computes to the number of rabbits with that many
+        self.computes_per_rabbit = {}
+
+    def add(self, status, capacity, computes, ready_computes):
+        """Count one rabbit.
+
+        Parameters:
+        status : Rabbit status
+        capacity : Rabbit capacity in bytes
+        computes : Number of computes attached to the rabbit
+        ready_computes : Number of those computes that are Ready
+
+        Returns:
+        Nothing
+        """
+        self.rabbits += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status == "Ready":
+            self.ready_rabbits += 1
+            self.ready_capacity += capacity
+        self.capacities.append(capacity)
+        self.computes += computes
+        self.ready_computes += ready_computes
+        self.computes_per_rabbit[computes] = self.computes_per_rabbit.get(computes, 0) + 1
+
+    def add_storage(self, storage):
+        """Count a rabbit from its raw Storage JSON.
+
+        Parameters:
+        storage : Storage JSON, from the cluster or an inventory file
+
+        Returns:
+        Nothing
+        """
+        name = storage["metadata"]["name"]
+        status = storage["status"]
+        computes = 0
+        ready_computes = 0
+        # The rabbit lists itself among its computes, see Storage.computes
+        for c in (status.get("access") or {}).get("computes") or []:
+            if c["name"] != name:
+                computes += 1
+                if c.get("status") == "Ready":
+                    ready_computes += 1
+        self.add(status["status"], status["capacity"], computes, ready_computes)
+
+    def add_columns(self, inventory):
+        """Count every rabbit of a ColumnarInventory from its columns.
+
+        Parameters:
+        inventory : ColumnarInventory object
+
+        Returns:
+        Nothing
+        """
+        statuses = inventory.statuses
+        ready = statuses.index("Ready") if "Ready" in statuses else None
+        capacity = inventory.capacity
+        status = inventory.status
+        ptr = inventory.compute_ptr
+        compute_status = inventory.compute_status
+        for idx in inventory.rows:
+            first, last = ptr[idx], ptr[idx + 1]
+            ready_computes = 0 if ready is None else bytes(compute_status[first:last]).count(ready)
+            self.add(statuses[status[idx]], capacity[idx], last - first, ready_computes)
+
+    def percentile(values, pct):
+        """Nearest rank percentile of sorted values, None when there are none.
+
+        Parameters:
+        values : Sorted sequence of numbers
+        pct : Percentile from 0 to 100
+
+        Returns:
+        The smallest value at or above pct percent of the values
+        """
+        if len(values) == 0:
+            return None
+        rank = max(1, -(-pct * len(values) // 100))
+        return values[rank - 1]
+
+    def histogram_percentile(self, pct):
+        """Nearest rank percentile of the computes per rabbit, from the histogram."""
+        if self.rabbits == 0:
+            return None
+        rank = max(1, -(-pct * self.rabbits // 100))
+        seen = 0
+        for computes in sorted(self.computes_per_rabbit):
+            seen += self.computes_per_rabbit[computes]
+            if seen >= rank:
+                return computes
+
+    def to_json(self):
+        """The summary as a JSON document.
+
+        Parameters:
+        None
+
+        Returns:
+        Dictionary of rabbit, compute, capacity, and computes per rabbit statistics
+        """
+        capacities = sorted(self.capacities)
+        total_capacity = sum(capacities)
+        capacity = {"total": total_capacity,
+                    "ready": self.ready_capacity,
+                    "min": capacities[0] if capacities else None,
+                    "max": capacities[-1] if capacities else None,
+                    "mean": round(total_capacity / self.rabbits) if self.rabbits else None}
+        for pct in InventorySummary.PERCENTILES:
+            capacity[f"p{pct}"] = InventorySummary.percentile(capacities, pct)
+
+        per_rabbit = {"min": min(self.computes_per_rabbit) if self.computes_per_rabbit else None,
+                      "max": max(self.computes_per_rabbit) if self.computes_per_rabbit else None,
+                      "mean": round(self.computes / self.rabbits, 2) if self.rabbits else None}
+        for pct in InventorySummary.PERCENTILES:
+            per_rabbit[f"p{pct}"] = self.histogram_percentile(pct)
+        per_rabbit["histogram"] = {str(computes): self.computes_per_rabbit[computes]
+                                   for computes in sorted(self.computes_per_rabbit)}
+
+        return {"rabbits": {"total": self.rabbits, "ready": self.ready_rabbits,
+                            "statuses": {status: self.statuses[status] for status in sorted(self.statuses, key=str)}},
+                "computes": {"total": self.computes, "ready": self.ready_computes},
+                "capacity": capacity,
+                "computesPerRabbit": per_rabbit}
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility inventory watch
+
+import queue
+import threading
+import time
+
+from .Console import Console
+
+
+class InventoryWatch:
+    """Follows the Storage CRs and reports readiness and capacity changes.
+
+    The Storages are listed once, then kept current from watch events.
+    Only changes to a rabbit's status or capacity, or to the status of its
+    computes (including computes appearing or disappearing), are tracked.
+    Changes are debounced per rabbit: a rabbit is reported once it has been
+    quiet for the debounce interval (or after MAX_DELAY debounce intervals
+    if it keeps changing), with its changes coalesced into the net
+    difference.  A rabbit that changed and changed back is reported as
+    flapped.
+
+    The watch resumes from the last resourceVersion it saw, including those
+    from bookmark events, whenever the stream ends or the connection drops.
+    When the server no longer has that version the Storages are listed
+    again and the differences reported as changes.
+    """
+
+    DEFAULT_DEBOUNCE = 2.0
+
+    # A rabbit that keeps changing is reported after this many debounce intervals
+    MAX_DELAY = 5
+
+    # Seconds the server keeps each watch stream open
+    WATCH_TIMEOUT = 300
+
+    # Seconds between reconnect attempts, doubling up to the maximum
+    RETRY_SECONDS = 1
+    MAX_RETRY_SECONDS = 30
+
+    def __init__(self, dws, debounce=None, clock=time.monotonic):
+        """Initialize the watch.
+
+        Parameters:
+        dws : DWS object used to list and watch the Storages
+        debounce : Seconds a rabbit must be quiet before it is reported
+        clock : Function returning the current time in seconds
+
+        Returns:
+        Nothing
+        """
+        self.dws = dws
+        self.debounce = InventoryWatch.DEFAULT_DEBOUNCE if debounce is None else debounce
+        self.clock = clock
+        self.state = {}
+        self.resource_version = None
+        self.reconnects = 0
+        self.relists = 0
+
+        # Rabbit name to {"before": summary, "first": time, "last": time, "events": count}
+        self.pending = {}
+
+    def summarize(storage):
+        """The readiness and capacity fields of a Storage CR.
+
+        Parameters:
+        storage : Storage JSON
+
+        Returns:
+        Dictionary with status, capacity, and compute name to status
+        """
+        status = storage.get("status") or {}
+        name = storage["metadata"]["name"]
+        computes = (status.get("access") or {}).get("computes") or []
+        return {"status": status.get("status"),
+                "capacity": status.get("capacity"),
+                "computes": {c["name"]: c.get("status") for c in computes if c["name"] != name}}
+
+    def diff(before, after):
+        """Changes between two summaries.
+
+        Parameters:
+        before : Summary from summarize(), None if the rabbit was absent
+        after : Summary from summarize(), None if the rabbit is gone
+
+        Returns:
+        List of changes, each {"field": ..., "from": ..., "to": ...} and a
+        "compute" name for compute changes
+        """
+        if before == after:
+            return []
+        if before is None or after is None:
+            return [{"field": "rabbit", "from": "Absent" if before is None else "Present",
+                     "to": "Absent" if after is None else "Present"}]
+        changes = []
+        for field in ["status", "capacity"]:
+            if before[field] != after[field]:
+                changes.append({"field": field, "from": before[field], "to": after[field]})
+        for compute in sorted(set(before["computes"]) | set(after["computes"])):
+            old = before["computes"].get(compute, "Absent")
+            new = after["computes"].get(compute, "Absent")
+            if old != new:
+                changes.append({"field": "compute", "compute": compute, "from": old, "to": new})
+        return changes
+
+    def load(self, storages, resource_version):
+        """Take the state from a full Storage list.
+
+        Parameters:
+        storages : Every Storage JSON in the cluster
+        resource_version : resourceVersion of the list
+
+        Returns:
+        Nothing
+        """
+        self.state = {s["metadata"]["name"]: InventoryWatch.summarize(s) for s in storages}
+        self.resource_version = resource_version
+
+    def _change(self, name, after, now):
+        before = self.state.get(name)
+        if before == after:
+            return
+        entry = self.pending.get(name)
+        if entry is None:
+            entry = self.pending[name] = {"before": before, "first": now, "events": 0}
+        entry["last"] = now
+        entry["events"] += 1
+        if after is None:
+            self.state.pop(name, None)
+        else:
+            self.state[name] = after
+
+    def apply(self, event, now=None):
+        """Apply one watch event.
+
+        Parameters:
+        event : Watch event {type, object}
+        now : Time of the event, the clock by default
+
+        Returns:
+        Nothing
+        """
+        now = self.clock() if now is None else now
+        storage = event["object"]
+        resource_version = (storage.get("metadata") or {}).get("resourceVersion")
+        if resource_version:
+            self.resource_version = resource_version
+        if event["type"] == "DELETED":
+            self._change(storage["metadata"]["name"], None, now)
+        elif event["type"] in ["ADDED", "MODIFIED"]:
+            self._change(storage["metadata"]["name"], InventoryWatch.summarize(storage), now)
+
+    def resync(self, storages, resource_version, now=None):
+        """Catch up from a full Storage list after the watch could not resume.
+
+        Parameters:
+        storages : Every Storage JSON in the cluster
+        resource_version : resourceVersion of the list
+
+        Returns:
+        Nothing
+        """
+        now = self.clock() if now is None else now
+        self.relists += 1
+        listed = {s["metadata"]["name"]: InventoryWatch.summarize(s) for s in storages}
+        for name in list(self.state):
+            if name not in listed:
+                self._change(name, None, now)
+        for name, summary in listed.items():
+            self._change(name, summary, now)
+        self.resource_version = resource_version
+
+    def flush(self, now=None, force=False):
+        """Report the rabbits whose changes have settled.
+
+        Parameters:
+        now : Current time, the clock by default
+        force : Report every pending rabbit regardless of the debounce
+
+        Returns:
+        List of {"name": ..., "changes": [...], "events": ...} records, with
+        "flapped": True for rabbits that ended where they started
+        """
+        now = self.clock() if now is None else now
+        records = []
+        for name in sorted(self.pending):
+            entry = self.pending[name]
+            settled = now - entry["last"] >= self.debounce
+            overdue = now - entry["first"] >= self.debounce * InventoryWatch.MAX_DELAY
+            if not (force or settled or overdue):
+                continue
+            del self.pending[name]
+            record = {"name": name, "changes": InventoryWatch.diff(entry["before"], self.state.get(name)),
+                      "events": entry["events"]}
+            if not record["changes"]:
+                record["flapped"] = True
+            records.append(record)
+        return records
+
+    def next_flush(self):
+        """Seconds until the earliest pending rabbit could be reported, None if none are pending."""
+        if not self.pending:
+            return None
+        now = self.clock()
+        return max(0.0, min(min(entry["last"] + self.debounce, entry["first"] + self.debounce * InventoryWatch.MAX_DELAY) - now
+                            for entry in self.pending.values()))
+
+    def _stream(self, events, stop):
+        """Watch thread body, queues events and relists until stop is set."""
+        retry = InventoryWatch.RETRY_SECONDS
+        resource_version = self.resource_version
+        while not stop.is_set():
+            try:
+                for event in self.dws.watch_changes("storages", resource_version, InventoryWatch.WATCH_TIMEOUT):
+                    if stop.is_set():
+                        return
+                    if event["type"] == "ERROR":
+                        # Too old to resume from, start over from a new list
+                        Console.debug(Console.MIN, f"Storage watch from {resource_version} expired, listing again")
+                        storages, resource_version = self.dws.list_cluster_custom_object_versioned("storages")
+                        events.put(("RELIST", storages, resource_version))
+                        break
+                    resource_version = (event["object"].get("metadata") or {}).get("resourceVersion") or resource_version
+                    events.put(("EVENT", event))
+                retry = InventoryWatch.RETRY_SECONDS
+            except Exception as ex:
+                Console.debug(Console.MIN, f"Storage watch interrupted, resuming from {resource_version} in {retry}s: {ex}")
+                events.put(("RECONNECT",))
+                stop.wait(retry)
+                retry = min(retry * 2, InventoryWatch.MAX_RETRY_SECONDS)
+
+    def run(self, emit, duration=None, loaded=None):
+        """List the Storages, then report changes until duration elapses.
+
+        Parameters:
+        emit : Function called with each list of flushed records
+        duration : Seconds to watch for, None to watch until interrupted
+        loaded : Function called with the listed Storages before watching
+
+        Returns:
+        Nothing
+        """
+        storages, resource_version = self.dws.list_cluster_custom_object_versioned("storages")
+        self.load(storages, resource_version)
+        if loaded is not None:
+            loaded(storages)
+        Console.debug(Console.MIN, f"Watching {len(self.state)} Storages from resourceVersion {resource_version}")
+
+        events = queue.Queue()
+        stop = threading.Event()
+        watcher = threading.Thread(target=self._stream, args=(events, stop), daemon=True)
+        watcher.start()
+        deadline = None if duration is None else self.clock() + duration
+        try:
+            while deadline is None or self.clock() < deadline:
+                waits = [wait for wait in [self.next_flush(), None if deadline is None else deadline - self.clock()]
+                         if wait is not None]
+                try:
+                    item = events.get(timeout=max(0.0, min(waits)) if waits else None)
+                    if item[0] == "EVENT":
+                        self.apply(item[1])
+                    elif item[0] == "RELIST":
+                        self.resync(item[1], item[2])
+                    elif item[0] == "RECONNECT":
+                        self.reconnects += 1
+                except queue.Empty:
+                    pass
+                records = self.flush()
+                if records:
+                    emit(records)
+        finally:
+            stop.set()
+        records = self.flush(force=True)
+        if records:
+            emit(records)
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility allocation plan cache
+
+import copy
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from .Console import Console
+
+
+class PlanCache:
+    """LRU cache of server allocation plans.
+
+    Plans are keyed by a fingerprint of the ready inventory, the breakdown
+    allocationSets, and the planning settings.  The cache always lives in
+    memory and may optionally be backed by a directory on disk.
+    """
+
+    # Part of every key, bump when the planner changes the plans it makes
+    PLAN_VERSION = 2
+
+    def __init__(self, max_entries=128, cache_dir=None):
+        """Initialize the plan cache.
+
+        Parameters:
+        max_entries : Maximum number of plans retained (memory and disk)
+        cache_dir : Directory for on-disk plans, None for memory only
+
+        Returns:
+        Nothing
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def inventory_fingerprint(rabbits):
+        """Return a list describing the parts of the inventory a plan uses.
+
+        The resourceVersion is included so that any change to a Storage
+        invalidates the plans built on it.  Inventory files have no
+        resourceVersion so the content itself is used.  The capacity still
+        remaining is included so that plans are not shared between an
+        empty inventory and one that earlier workflows have charged.
+
+        Parameters:
+        rabbits : Inventory dictionary of Storage objects keyed by name
+
+        Returns:
+        List suitable for hashing
+        """
+        fingerprint = []
+        for name, r in rabbits.items():
+            fingerprint.append([name,
+                                r.raw_storage['metadata'].get('resourceVersion', ""),
+                                r.status,
+                                r.capacity,
+                                r.remaining_storage,
+                                r.allocationCount,
+                                [[c['name'], c['status']] for c in r.computes]])
+        return fingerprint
+
+    def breakdown_fingerprint(breakdowns):
+        """Return a list describing the shape of the directive breakdowns.
+
+        Only the #dw name (used for --alloc recipes) and the allocationSets
+        matter, so identical #DW shapes from different workflows share plans.
+
+        Parameters:
+        breakdowns : List of DirectiveBreakdown objects
+
+        Returns:
+        List suitable for hashing
+        """
+        return [[bd.dw_name, [alloc.dict for alloc in bd.allocationSet]] for bd in breakdowns]
+
+    def key(self, rabbits, breakdowns, settings):
+        """Compute the cache key for a plan.
+
+        Parameters:
+        rabbits : Inventory dictionary of Storage objects keyed by name
+        breakdowns : List of DirectiveBreakdown objects
+        settings : Allocator settings dictionary
+
+        Returns:
+        Hex digest string
+        """
+        body = json.dumps([PlanCache.PLAN_VERSION,
+                           PlanCache.inventory_fingerprint(rabbits),
+                           PlanCache.breakdown_fingerprint(breakdowns),
+                           settings], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Retrieve a cached plan.
+
+        Parameters:
+        key : Cache key from key()
+
+        Returns:
+        List of allocationSets (one per breakdown) or None if not cached
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            Console.debug(Console.MIN, f"Plan cache hit (memory) {key[:12]}")
+            return copy.deepcopy(self._entries[key])
+
+        if self.cache_dir is not None:
+            path = self._path(key)
+            try:
+                with open(path, "r") as stream:
+                    value = json.load(stream)
+                # Touch the file so eviction is least recently used
+                os.utime(path)
+                self._remember(key, value)
+                self.hits += 1
+                Console.debug(Console.MIN, f"Plan cache hit (disk) {key[:12]}")
+                return copy.deepcopy(value)
+            except (OSError, ValueError):
+                pass
+
+        self.misses += 1
+        Console.debug(Console.MIN, f"Plan cache miss {key[:12]}")
+        return None
+
+    def put(self, key, value):
+        """Store a plan in the cache.
+
+        Parameters:
+        key : Cache key from key()
+        value : List of allocationSets (one per breakdown)
+
+        Returns:
+        Nothing
+        """
+        self._remember(key, copy.deepcopy(value))
+
+        if self.cache_dir is not None:
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w") as stream:
+                    json.dump(value, stream)
+                os.replace(tmp_path, path)
+            except OSError as ex:
+                Console.debug(Console.MIN, f"Unable to write plan cache entry {path}: {ex}")
+                return
+            self._evict_disk()
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _evict_disk(self):
+        """Remove the least recently used on-disk plans beyond max_entries."""
+        try:
+            entries = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir) if f.endswith(".json")]
+        except OSError:
+            return
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda p: os.stat(p).st_mtime)
+        for path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility incremental re-planning
+
+import copy
+
+from .Allocator import Allocator
+from .Console import Console
+from .Dws import DWSError
+from .ExclusionMatcher import ExclusionMatcher
+from .crd.Storage import Storage
+
+
+class Replanner:
+    """Keeps the placement of every workflow and repairs it as the inventory changes.
+
+    The plan is held per breakdown together with two indexes:
+        rabbit name  -> (workflow, breakdown) pairs with storage on the rabbit
+        compute name -> workflow the compute is assigned to
+
+    When a Storage CR changes only the breakdowns on a rabbit that can no
+    longer be used, and the workflows holding computes that are no longer
+    usable, are planned again.  The result is the minimal list of patches
+    for the Servers and Computes CRs, in the form:
+        {"kind": "servers", "workflow": ..., "name": ..., "namespace": ..., "allocationSets": [...]}
+        {"kind": "computes", "workflow": ..., "name": ..., "namespace": ..., "computes": [...]}
+    """
+
+    def __init__(self, settings, rabbits):
+        """Initialize the planner with an empty plan.
+
+        Parameters:
+        settings : Allocator settings dictionary
+        rabbits : Inventory dictionary of Storage objects keyed by name
+
+        Returns:
+        Nothing
+        """
+        self.settings = dict(settings)
+        self.exclude_rabbits = ExclusionMatcher(self.settings["exclude_rabbits"])
+        self.exclude_computes = ExclusionMatcher(self.settings["exclude_computes"])
+
+        # Every Storage in inventory order, usable or not
+        self.inventory = dict(rabbits)
+
+        # Workflow name -> {"nodes", "computesObj", "breakdowns", "computes"}
+        self.workflows = {}
+        self.rabbit_index = {}
+        self.compute_index = {}
+
+        # Rabbit name -> {compute name: compute} of usable, unassigned computes
+        self.free_computes = {}
+        for rabbit_name, r in self.inventory.items():
+            self.free_computes[rabbit_name] = self._usable_computes(r)
+
+    def _rabbit_usable(self, r):
+        if self.exclude_rabbits.matches(r.name):
+            return False
+        return r.is_ready or self.settings["ignore_ready"]
+
+    def _compute_usable(self, c):
+        if self.exclude_computes.matches(c['name']):
+            return False
+        return self.settings["ignore_ready"] or c.get('status', "Ready").lower() == "ready"
+
+    def _usable_computes(self, r):
+        return {c['name']: c for c in r.computes if self._compute_usable(c)}
+
+    def _allocator(self):
+        """Build an allocator over the usable rabbits and unassigned computes."""
+        rabbits = {name: r for name, r in self.inventory.items() if self._rabbit_usable(r)}
+        allocator = Allocator(self.settings, rabbits)
+        allocator.enforce_capacity = True
+        allocator.available_computes = {name: list(self.free_computes.get(name, {}).values()) for name in rabbits}
+        return allocator
+
+    def _index(self, workflow_name, idx, entry):
+        for rabbit_name in entry["charges"]:
+            self.rabbit_index.setdefault(rabbit_name, set()).add((workflow_name, idx))
+
+    def _unindex(self, workflow_name, idx, entry):
+        for rabbit_name in entry["charges"]:
+            refs = self.rabbit_index.get(rabbit_name)
+            if refs is not None:
+                refs.discard((workflow_name, idx))
+
+    def _charge(self, charges, sign=1):
+        for rabbit_name, (size, count) in charges.items():
+            r = self.inventory.get(rabbit_name)
+            if r is not None:
+                r.remaining_storage -= sign * size
+                r.allocationCount += sign * count
+
+    def _take_computes(self, workflow_name, computes):
+        for compute_name, rabbit_name in computes.items():
+            self.free_computes.get(rabbit_name, {}).pop(compute_name, None)
+            self.compute_index[compute_name] = workflow_name
+
+    def _return_computes(self, workflow_name, computes):
+        for compute_name, rabbit_name in computes.items():
+            if self.compute_index.get(compute_name) != workflow_name:
+                continue
+            del self.compute_index[compute_name]
+            r = self.inventory.get(rabbit_name)
+            if r is None:
+                continue
+            for c in r.computes:
+                if c['name'] == compute_name and self._compute_usable(c):
+                    self.free_computes[rabbit_name][compute_name] = c
+
+    def _plan_breakdown(self, allocator, workflow_name, idx):
+        """Plan one breakdown of a workflow, returns the error message on failure."""
+        workflow = self.workflows[workflow_name]
+        entry = workflow["breakdowns"][idx]
+        allocator.nodes = workflow["nodes"]
+        try:
+            plan = allocator.plan_servers([entry["breakdown"]])
+        except DWSError as ex:
+            allocator.rollback()
+            entry["charges"] = {}
+            entry["computes"] = {}
+            return ex.message
+        entry["allocationSet"] = plan[0]["allocationSet"]
+        entry["charges"] = {name: list(charge) for name, charge in allocator.charges.items()}
+        entry["computes"] = dict(allocator.selected_computes)
+        self._index(workflow_name, idx, entry)
+        return None
+
+    def _fill_computes(self, workflow_name, keep):
+        """Top up a workflow's computes from the free computes, preferring its own rabbits."""
+        workflow = self.workflows[workflow_name]
+        computes = dict(keep)
+        preferred = {}
+        for entry in workflow["breakdowns"]:
+            preferred.update(dict.fromkeys(entry["charges"]))
+        order = list(preferred) + [name for name in self.inventory if name not in preferred]
+        for rabbit_name in order:
+            if len(computes) >= workflow["nodes"]:
+                break
+            r = self.inventory[rabbit_name]
+            if not self._rabbit_usable(r):
+                continue
+            for compute_name in self.free_computes.get(rabbit_name, {}):
+                if len(computes) >= workflow["nodes"]:
+                    break
+                if compute_name not in computes:
+                    computes[compute_name] = rabbit_name
+        return computes
+
+    def _assign_computes(self, workflow_name, keep):
+        """Choose a workflow's computes, keeping the listed ones where possible."""
+        workflow = self.workflows[workflow_name]
+        per_compute = {}
+        for entry in workflow["breakdowns"]:
+            per_compute.update(entry["computes"])
+        if per_compute:
+            computes = per_compute
+        else:
+            computes = self._fill_computes(workflow_name, keep)
+        self._take_computes(workflow_name, computes)
+        return computes
+
+    def _servers_patch(self, workflow_name, entry):
+        name, namespace = entry["serverObj"] or [None, None]
+        return {"kind": "servers", "workflow": workflow_name, "name": name, "namespace": namespace,
+                "allocationSets": entry["allocationSet"]}
+
+    def _computes_patch(self, workflow_name):
+        workflow = self.workflows[workflow_name]
+        name, namespace = workflow["computesObj"] or [None, None]
+        return {"kind": "computes", "workflow": workflow_name, "name": name, "namespace": namespace,
+                "computes": list(workflow["computes"])}
+
+    def add_workflow(self, workflow_name, breakdowns, nodes, computes_obj=None):
+        """Plan a new workflow and add it to the plan.
+
+        Parameters:
+        workflow_name : Workflow name
+        breakdowns : List of DirectiveBreakdown objects
+        nodes : Number of computes
+        computes_obj : [name, namespace] of the workflow's Computes CR
+
+        Returns:
+        Dictionary with the 'patches' to apply and any 'failures'
+        """
+        if workflow_name in self.workflows:
+            raise DWSError(f"Workflow '{workflow_name}' is already planned", DWSError.DWS_GENERAL)
+        self.workflows[workflow_name] = {"nodes": nodes, "computesObj": computes_obj, "computes": {},
+                                         "breakdowns": [{"breakdown": bd, "serverObj": bd.server_obj, "allocationSet": [],
+                                                         "charges": {}, "computes": {}} for bd in breakdowns]}
+        allocator = self._allocator()
+        patches = []
+        failures = []
+        for idx, entry in enumerate(self.workflows[workflow_name]["breakdowns"]):
+            message = self._plan_breakdown(allocator, workflow_name, idx)
+            if message is not None:
+                failures.append({"workflow": workflow_name, "breakdown": entry["breakdown"].name, "message": message})
+                continue
+            patches.append(self._servers_patch(workflow_name, entry))
+
+        self.workflows[workflow_name]["computes"] = self._assign_computes(workflow_name, {})
+        patches.append(self._computes_patch(workflow_name))
+        return {"patches": patches, "failures": failures}
+
+    def load_workflow(self, workflow_name, breakdowns, allocation_sets, computes, nodes=None, computes_obj=None):
+        """Adopt a workflow that has already been assigned.
+
+        Parameters:
+        workflow_name : Workflow name
+        breakdowns : List of DirectiveBreakdown objects
+        allocation_sets : List of Servers allocationSets, one per breakdown
+        computes : List of compute names assigned to the workflow
+        nodes : Number of computes, defaults to len(computes)
+        computes_obj : [name, namespace] of the workflow's Computes CR
+
+        Returns:
+        Nothing
+        """
+        compute_rabbits = {}
+        for rabbit_name, r in self.inventory.items():
+            for c in r.computes:
+                compute_rabbits[c['name']] = rabbit_name
+        assigned = {name: compute_rabbits.get(name) for name in computes}
+
+        entries = []
+        for bd, allocation_set in zip(breakdowns, allocation_sets):
+            charges = {}
+            for alloc in allocation_set:
+                for storage in alloc["storage"]:
+                    charge = charges.setdefault(storage["name"], [0, 0])
+                    charge[0] += alloc["allocationSize"] * storage["allocationCount"]
+                    charge[1] += storage["allocationCount"]
+            per_compute = any(alloc.is_per_compute for alloc in bd.allocationSet)
+            entries.append({"breakdown": bd, "serverObj": bd.server_obj, "allocationSet": allocation_set,
+                            "charges": charges,
+                            "computes": {c: r for c, r in assigned.items() if per_compute and r in charges}})
+
+        self.workflows[workflow_name] = {"nodes": nodes if nodes is not None else len(computes),
+                                         "computesObj": computes_obj, "computes": assigned, "breakdowns": entries}
+        for idx, entry in enumerate(entries):
+            self._charge(entry["charges"])
+            self._index(workflow_name, idx, entry)
+        self._take_computes(workflow_name, assigned)
+
+    def update_storage(self, raw_storage):
+        """Apply a changed Storage CR and repair the workflows it affects.
+
+        Parameters:
+        raw_storage : JSON of the changed Storage CR
+
+        Returns:
+        Dictionary with the 'patches' to apply and any 'failures'
+        """
+        new = Storage(raw_storage)
+        rabbit_name = new.name
+        old = self.inventory.get(rabbit_name)
+        refs = set(self.rabbit_index.get(rabbit_name, ()))
+
+        # Carry the storage already placed on the rabbit over to the new object
+        for workflow_name, idx in refs:
+            size, count = self.workflows[workflow_name]["breakdowns"][idx]["charges"][rabbit_name]
+            new.remaining_storage -= size
+            new.allocationCount += count
+        self.inventory[rabbit_name] = new
+
+        # Breakdowns on a rabbit that is no longer usable or no longer has
+        # room for them are planned again
+        affected = set()
+        if not self._rabbit_usable(new) or new.remaining_storage < 0:
+            affected = refs
+
+        # Workflows holding computes that are no longer usable lose them
+        usable = self._usable_computes(new)
+        lost = {}
+        if old is not None:
+            for c in old.computes:
+                workflow_name = self.compute_index.get(c['name'])
+                if workflow_name is not None and c['name'] not in usable:
+                    lost.setdefault(workflow_name, set()).add(c['name'])
+        self.free_computes[rabbit_name] = {name: c for name, c in usable.items() if name not in self.compute_index}
+
+        for workflow_name, names in lost.items():
+            for idx, entry in enumerate(self.workflows[workflow_name]["breakdowns"]):
+                if any(name in entry["computes"] for name in names):
+                    affected.add((workflow_name, idx))
+
+        Console.debug(Console.MIN, f"Storage {rabbit_name} changed, {len(affected)} breakdown(s) and"
+                                   f" {len(lost)} workflow compute list(s) affected")
+
+        # Release everything that is about to be planned again
+        for workflow_name, idx in affected:
+            entry = self.workflows[workflow_name]["breakdowns"][idx]
+            self._charge(entry["charges"], sign=-1)
+            self._unindex(workflow_name, idx, entry)
+            entry["charges"] = {}
+        workflows = sorted(set(workflow_name for workflow_name, _ in affected) | set(lost))
+        for workflow_name in workflows:
+            self._return_computes(workflow_name, self.workflows[workflow_name]["computes"])
+
+        # One workflow at a time, each takes its computes before the next
+        # is planned against the computes left
+        patches = []
+        failures = []
+        for workflow_name in workflows:
+            allocator = self._allocator()
+            for idx in sorted(idx for name, idx in affected if name == workflow_name):
+                entry = self.workflows[workflow_name]["breakdowns"][idx]
+                previous = entry["allocationSet"]
+                message = self._plan_breakdown(allocator, workflow_name, idx)
+                if message is not None:
+                    failures.append({"workflow": workflow_name, "breakdown": entry["breakdown"].name, "message": message})
+                elif entry["allocationSet"] != previous:
+                    patches.append(self._servers_patch(workflow_name, entry))
+
+            workflow = self.workflows[workflow_name]
+            previous = workflow["computes"]
+            keep = {name: r for name, r in previous.items() if name not in lost.get(workflow_name, ())}
+            workflow["computes"] = self._assign_computes(workflow_name, keep)
+            if len(workflow["computes"]) < workflow["nodes"]:
+                msg = f"Insufficient compute resources to meet node requirement of {workflow['nodes']} nodes"
+                failures.append({"workflow": workflow_name, "message": msg})
+            if list(workflow["computes"]) != list(previous):
+                patches.append(self._computes_patch(workflow_name))
+
+        return {"patches": patches, "failures": failures}
+
+    def remove_storage(self, rabbit_name):
+        """Repair the workflows on a rabbit whose Storage CR was deleted.
+
+        The rabbit is kept as an unusable Storage with no computes.
+
+        Parameters:
+        rabbit_name : Name of the deleted Storage CR
+
+        Returns:
+        Dictionary with the 'patches' to apply and any 'failures'
+        """
+        old = self.inventory.get(rabbit_name)
+        if old is None:
+            return {"patches": [], "failures": []}
+        raw_storage = copy.deepcopy(old.raw_storage)
+        raw_storage["status"]["status"] = "Deleted"
+        raw_storage["status"]["access"]["computes"] = []
+        return self.update_storage(raw_storage)
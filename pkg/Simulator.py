@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility trace driven allocation simulator
+
+import heapq
+import itertools
+import json
+import re
+import time
+
+import yaml
+
+from .Allocator import Allocator
+from .Console import Console
+from .Directive import Directive
+from .Dws import DWSError
+from .ExclusionMatcher import ExclusionMatcher
+from .crd.DirectiveBreakdown import DirectiveBreakdown
+
+
+class Simulator:
+    """Replays a job trace against an inventory in virtual time.
+
+    Each job is planned with the same Allocator used by ASSIGNSERVERS, but
+    against the capacity and computes that remain after the jobs already
+    running.  Capacity and computes are returned when a job ends.
+    """
+
+    def load_trace(trace_file):
+        """Load a job trace from a YAML or JSON file.
+
+        The file holds a list of jobs, either at the top level or under
+        'jobs:'.  Each job has an arrival time and duration in seconds, a
+        node count, and a list of #DW directives.
+
+        Parameters:
+        trace_file : Path to the trace file
+
+        Returns:
+        List of job dictionaries sorted by arrival
+        """
+        with open(trace_file, "r") as stream:
+            if trace_file.endswith(".json"):
+                trace = json.load(stream)
+            else:
+                trace = yaml.load(stream, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+        if isinstance(trace, dict):
+            trace = trace.get("jobs", [])
+        if not isinstance(trace, list):
+            raise DWSError(f"Trace file '{trace_file}' does not contain a list of jobs", DWSError.DWS_GENERAL)
+
+        jobs = []
+        for idx, entry in enumerate(trace):
+            try:
+                directives = entry.get("directives", [])
+                if isinstance(directives, str):
+                    directives = [directives]
+                jobs.append({"name": str(entry.get("name", f"job-{idx}")),
+                             "arrival": float(entry["arrival"]),
+                             "duration": float(entry["duration"]),
+                             "nodes": int(entry.get("nodes", 1)),
+                             "directives": directives})
+            except (AttributeError, KeyError, TypeError, ValueError):
+                raise DWSError(f"Trace entry {idx} must have 'arrival' and 'duration': {entry}", DWSError.DWS_GENERAL)
+
+        jobs.sort(key=lambda job: job["arrival"])
+        return jobs
+
+    def __init__(self, settings, rabbits, jobs, sample_interval=3600):
+        """Initialize the simulator.
+
+        Parameters:
+        settings : Allocator settings dictionary
+        rabbits : Inventory dictionary of Storage objects keyed by name
+        jobs : List of jobs from load_trace()
+        sample_interval : Virtual seconds between load samples
+
+        Returns:
+        Nothing
+        """
+        self.settings = dict(settings)
+        self.jobs = jobs
+        self.sample_interval = sample_interval
+        self._breakdowns = {}
+
+        exclude_rabbits = ExclusionMatcher(self.settings["exclude_rabbits"])
+        exclude_computes = ExclusionMatcher(self.settings["exclude_computes"])
+
+        # Only rabbits and computes that could be assigned take part
+        self.rabbits = {}
+        self.computes = {}
+        self.free_computes = {}
+        self.rabbit_free_computes = {}
+        for rabbit_name, r in rabbits.items():
+            if exclude_rabbits.matches(rabbit_name):
+                continue
+            if not r.is_ready and not self.settings["ignore_ready"]:
+                continue
+            self.rabbits[rabbit_name] = r
+            free = {}
+            for c in r.computes:
+                if exclude_computes.matches(c['name']):
+                    continue
+                if c.get('status', "Ready") != "Ready" and not self.settings["ignore_ready"]:
+                    continue
+                free[c['name']] = c
+                self.computes[c['name']] = c
+                self.free_computes[c['name']] = rabbit_name
+            self.rabbit_free_computes[rabbit_name] = free
+
+        self.total_capacity = sum(r.capacity for r in self.rabbits.values())
+        self.total_computes = len(self.free_computes)
+
+        self.allocator = Allocator(self.settings, self.rabbits)
+        self.allocator.enforce_capacity = True
+        self.allocator.available_computes = {name: free.values() for name, free in self.rabbit_free_computes.items()}
+
+    def breakdowns_for(self, job):
+        """Returns the DirectiveBreakdown objects for a job, cached by #DW."""
+        breakdowns = []
+        for dw in job["directives"]:
+            if dw not in self._breakdowns:
+                raw = Directive(dw).breakdown_json()
+                self._breakdowns[dw] = DirectiveBreakdown(raw) if raw is not None else None
+            if self._breakdowns[dw] is not None:
+                breakdowns.append(self._breakdowns[dw])
+        return breakdowns
+
+    def _take_computes(self, computes):
+        for name in computes:
+            rabbit_name = self.free_computes.pop(name)
+            del self.rabbit_free_computes[rabbit_name][name]
+
+    def _return_computes(self, computes):
+        for name, rabbit_name in computes.items():
+            self.free_computes[name] = rabbit_name
+            self.rabbit_free_computes[rabbit_name][name] = self.computes[name]
+
+    def place(self, job):
+        """Plan a job and take its resources.
+
+        Parameters:
+        job : Job dictionary
+
+        Returns:
+        Tuple: charges dictionary, dictionary of compute name to rabbit name
+        """
+        self.allocator.nodes = job["nodes"]
+        self.allocator.workflow_name = job["name"]
+        try:
+            self.allocator.plan_workflow(self.breakdowns_for(job))
+
+            # Per compute allocations pick their computes, anything else
+            # takes the first free computes
+            computes = dict(self.allocator.selected_computes)
+            if len(computes) < job["nodes"]:
+                for name in self.free_computes:
+                    if name not in computes:
+                        computes[name] = self.free_computes[name]
+                        if len(computes) >= job["nodes"]:
+                            break
+            if len(computes) < job["nodes"]:
+                msg = f"There are not enough compute nodes to meet the required node count of {job['nodes']}"
+                raise DWSError(msg, DWSError.DWS_INSUFFICIENT_RESOURCES)
+        except DWSError:
+            self.allocator.rollback()
+            raise
+
+        computes = dict(itertools.islice(computes.items(), job["nodes"]))
+        self._take_computes(computes)
+        return self.allocator.charges, computes
+
+    def remove(self, charges, computes):
+        """Return the resources of a job placed with place().
+
+        Parameters:
+        charges : Charges dictionary from place()
+        computes : Dictionary of compute name to rabbit name from place()
+
+        Returns:
+        Nothing
+        """
+        self.allocator.release(charges)
+        self._return_computes(computes)
+
+    def _fragmentation(self):
+        """Fraction of free capacity stranded on rabbits with no free computes."""
+        free = 0
+        stranded = 0
+        for rabbit_name, r in self.rabbits.items():
+            free += r.remaining_storage
+            if len(self.rabbit_free_computes[rabbit_name]) == 0:
+                stranded += r.remaining_storage
+        return stranded / free if free > 0 else 0.0
+
+    def _sample(self, now, allocated):
+        return {"time": now,
+                "storageUtilization": round(allocated / self.total_capacity, 4) if self.total_capacity else 0.0,
+                "computeUtilization": round(1 - len(self.free_computes) / self.total_computes, 4) if self.total_computes else 0.0,
+                "fragmentation": round(self._fragmentation(), 4),
+                "load": [round(load, 4) for load in self.allocator.view.load()]}
+
+    def run(self):
+        """Replay the trace.
+
+        Parameters:
+        None
+
+        Returns:
+        Dictionary of simulation results
+        """
+        start_time = time.time()
+        running = []
+        seq = itertools.count()
+        accepted = 0
+        rejections = {}
+        allocated = 0
+        allocated_area = 0.0
+        busy_area = 0.0
+        samples = []
+
+        if not self.jobs:
+            raise DWSError("Trace contains no jobs", DWSError.DWS_GENERAL)
+
+        begin = self.jobs[0]["arrival"]
+        now = begin
+        next_sample = begin
+
+        def advance(to):
+            nonlocal now, allocated_area, busy_area, next_sample
+            while next_sample <= to:
+                allocated_area += allocated * (next_sample - now)
+                busy_area += (self.total_computes - len(self.free_computes)) * (next_sample - now)
+                now = next_sample
+                samples.append(self._sample(now, allocated))
+                next_sample += self.sample_interval
+            allocated_area += allocated * (to - now)
+            busy_area += (self.total_computes - len(self.free_computes)) * (to - now)
+            now = to
+
+        def release_until(limit):
+            nonlocal allocated
+            while running and running[0][0] <= limit:
+                end, _, charges, computes = heapq.heappop(running)
+                advance(end)
+                self.remove(charges, computes)
+                allocated -= sum(charge[0] for charge in charges.values())
+
+        for job in self.jobs:
+            release_until(job["arrival"])
+            advance(job["arrival"])
+            try:
+                charges, computes = self.place(job)
+            except DWSError as ex:
+                Console.debug(Console.WORDY, f"Job {job['name']} rejected: {ex.message}")
+                reason = re.sub(r"\b[0-9]+\b", "<n>", ex.message)
+                rejections[reason] = rejections.get(reason, 0) + 1
+                continue
+
+            accepted += 1
+            allocated += sum(charge[0] for charge in charges.values())
+            heapq.heappush(running, (job["arrival"] + job["duration"], next(seq), charges, computes))
+
+        release_until(float("inf"))
+        span = now - begin
+        rejected = len(self.jobs) - accepted
+
+        return {"jobs": len(self.jobs),
+                "accepted": accepted,
+                "rejected": rejected,
+                "rejectionRate": round(rejected / len(self.jobs), 4),
+                "rejections": rejections,
+                "span": span,
+                "storageUtilization": round(allocated_area / (span * self.total_capacity), 4) if span and self.total_capacity else 0.0,
+                "computeUtilization": round(busy_area / (span * self.total_computes), 4) if span and self.total_computes else 0.0,
+                "peakStorageUtilization": max((s["storageUtilization"] for s in samples), default=0.0),
+                "fragmentation": {"mean": round(sum(s["fragmentation"] for s in samples) / len(samples), 4) if samples else 0.0,
+                                  "max": max((s["fragmentation"] for s in samples), default=0.0)},
+                "rabbits": list(self.rabbits.keys()),
+                "samples": samples,
+                "elapsedSeconds": round(time.time() - start_time, 3)}
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility placement settings sweep
+
+import concurrent.futures
+import itertools
+import os
+import statistics
+import time
+
+import yaml
+
+from .Allocator import Allocator
+from .Console import Console
+from .Directive import Directive
+from .Dws import DWSError
+from .crd.DirectiveBreakdown import DirectiveBreakdown
+from .crd.Storage import Storage
+
+
+class Sweep:
+    """Evaluates a grid of placement settings against an inventory.
+
+    Every combination is planned with the Allocator on its own copy of the
+    inventory.  Combinations are spread over a process pool and ranked by
+    how evenly they spread capacity and how much headroom they leave.
+    """
+
+    # Grid keys and the Allocator setting each one drives
+    GRID_KEYS = {"ostcount": "ost_count",
+                 "ostperrabbit": "ost_per_rabbit",
+                 "noreuse": "reuse_rabbit",
+                 "strategy": "strategy",
+                 "nodes": "nodes"}
+
+    DEFAULT_GRID = {"ostcount": [1, 2, 4, 8],
+                    "ostperrabbit": [1, 2, 4],
+                    "noreuse": [False, True]}
+
+    # Per worker process state set by _init_worker
+    _rabbits = None
+    _breakdowns = None
+
+    def parse_value(value):
+        """Convert an inline grid value to a bool, int, or string."""
+        value = value.strip()
+        if value.lower() in ["true", "false"]:
+            return value.lower() == "true"
+        try:
+            return int(value)
+        except ValueError:
+            return value
+
+    def parse_grid(spec):
+        """Parse a grid from a YAML file or an inline specification.
+
+        The inline form is 'ostcount=1,2,4;ostperrabbit=1,2;noreuse=true,false'.
+
+        Parameters:
+        spec : Path to a YAML file or an inline grid, None for the default
+
+        Returns:
+        Dictionary of grid key to list of values
+        """
+        if spec is None:
+            grid = dict(Sweep.DEFAULT_GRID)
+            grid["strategy"] = list(Allocator.STRATEGIES)
+            return grid
+
+        if os.path.exists(spec):
+            with open(spec, "r") as stream:
+                grid = yaml.safe_load(stream)
+            if not isinstance(grid, dict):
+                raise DWSError(f"Grid file '{spec}' must contain a dictionary of settings", DWSError.DWS_GENERAL)
+        else:
+            grid = {}
+            for axis in spec.split(";"):
+                if not axis.strip():
+                    continue
+                key, sep, values = axis.partition("=")
+                if not sep:
+                    raise DWSError(f"Grid axis '{axis}' must be in the form key=value1,value2", DWSError.DWS_GENERAL)
+                grid[key.strip().lower()] = [Sweep.parse_value(v) for v in values.split(",")]
+
+        for key, values in grid.items():
+            if key not in Sweep.GRID_KEYS:
+                raise DWSError(f"Unknown grid setting '{key}', valid settings are {list(Sweep.GRID_KEYS.keys())}", DWSError.DWS_GENERAL)
+            if not isinstance(values, list):
+                grid[key] = [values]
+            if key == "strategy":
+                for strategy in grid[key]:
+                    if strategy not in Allocator.STRATEGIES:
+                        raise DWSError(f"Unknown strategy '{strategy}', valid strategies are {Allocator.STRATEGIES}", DWSError.DWS_GENERAL)
+        return grid
+
+    def combinations(grid):
+        """Expand a grid into a list of combinations (dictionaries of grid key to value)."""
+        keys = sorted(grid.keys())
+        return [dict(zip(keys, values)) for values in itertools.product(*[grid[key] for key in keys])]
+
+    def _init_worker(raw_storages, directives):
+        """Build the inventory and breakdowns once per worker process."""
+        Sweep._rabbits = {}
+        for raw in raw_storages:
+            r = Storage(raw)
+            Sweep._rabbits[r.name] = r
+        Sweep._breakdowns = []
+        for dw in directives:
+            raw = Directive(dw).breakdown_json()
+            if raw is not None:
+                Sweep._breakdowns.append(DirectiveBreakdown(raw))
+
+    def evaluate(settings, combination):
+        """Plan one combination and measure the result.
+
+        Parameters:
+        settings : Base Allocator settings
+        combination : Dictionary of grid key to value
+
+        Returns:
+        Dictionary describing the outcome
+        """
+        settings = dict(settings)
+        for key, value in combination.items():
+            settings[Sweep.GRID_KEYS[key]] = (not value) if key == "noreuse" else value
+
+        # Every combination starts from an empty inventory
+        rabbits = Sweep._rabbits
+        for r in rabbits.values():
+            r.remaining_storage = r.capacity
+            r.allocationCount = 0
+        breakdowns = Sweep._breakdowns
+
+        result = {"settings": combination, "feasible": True}
+        # Placed as assignservers would, against the capacity left
+        allocator = Allocator(settings, rabbits)
+        allocator.enforce_capacity = True
+        try:
+            allocator.plan_workflow(breakdowns)
+        except DWSError as ex:
+            result["feasible"] = False
+            result["message"] = ex.message
+            return result
+
+        used = [size for size, _ in allocator.charges.values()]
+        loads = [1 - r.remaining_storage / r.capacity for name, r in rabbits.items() if name in allocator.charges and r.capacity]
+        # Every rabbit the plan could have used counts, the unused ones as 0,
+        # so piling everything onto a few rabbits is not scored as even
+        placed = [allocator.charges.get(name, (0, 0))[0] for name in rabbits if not allocator.exclude_rabbits.matches(name)]
+        mean = statistics.mean(placed) if placed else 0
+        result["rabbitsUsed"] = len(used)
+        result["allocations"] = sum(count for _, count in allocator.charges.values())
+        result["bytesAllocated"] = sum(used)
+        # Coefficient of variation of bytes placed on the eligible rabbits, 0 is perfectly even
+        result["imbalance"] = round(statistics.pstdev(placed) / mean, 4) if mean else 0.0
+        # Smallest fraction of capacity left on any rabbit used
+        result["headroom"] = round(1 - max(loads), 4) if loads else 1.0
+        return result
+
+    def rank_key(result):
+        if not result["feasible"]:
+            return (1, 0, 0)
+        return (0, result["imbalance"], -result["headroom"])
+
+    def __init__(self, settings, rabbits, directives, grid, workers=None):
+        """Initialize the sweep.
+
+        Parameters:
+        settings : Base Allocator settings dictionary
+        rabbits : Inventory dictionary of Storage objects keyed by name
+        directives : List of #DW directives to place
+        grid : Grid from parse_grid()
+        workers : Number of worker processes, None for one per core
+
+        Returns:
+        Nothing
+        """
+        self.settings = settings
+        self.raw_storages = [r.raw_storage for r in rabbits.values()]
+        self.directives = directives
+        self.grid = grid
+        self.workers = workers or os.cpu_count() or 1
+
+    def run(self):
+        """Evaluate every combination and rank the results.
+
+        Parameters:
+        None
+
+        Returns:
+        Dictionary of sweep results, ranked best first
+        """
+        start_time = time.time()
+        combinations = Sweep.combinations(self.grid)
+        workers = min(self.workers, len(combinations))
+        Console.debug(Console.MIN, f"Sweeping {len(combinations)} combinations with {workers} worker(s)")
+
+        if workers <= 1:
+            Sweep._init_worker(self.raw_storages, self.directives)
+            results = [Sweep.evaluate(self.settings, combination) for combination in combinations]
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                        initializer=Sweep._init_worker,
+                                                        initargs=(self.raw_storages, self.directives)) as executor:
+                results = list(executor.map(Sweep.evaluate, itertools.repeat(self.settings), combinations,
+                                            chunksize=max(1, len(combinations) // (workers * 4))))
+
+        results.sort(key=Sweep.rank_key)
+        for rank, result in enumerate(results, start=1):
+            result["rank"] = rank
+
+        return {"combinations": len(combinations),
+                "feasible": sum(1 for result in results if result["feasible"]),
+                "workers": workers,
+                "ranking": results,
+                "elapsedSeconds": round(time.time() - start_time, 3)}
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility rabbit load telemetry
+
+import json
+import math
+import socket
+import time
+
+import yaml
+
+from .Console import Console
+
+
+class Telemetry:
+    """Scores rabbits from external load telemetry, lower scores are preferred.
+
+    Metrics are read from a YAML/JSON file or, when the source is
+    'unix:<path>', from a Unix socket that writes the same document and
+    closes the connection.  They are cached for ttl seconds.
+
+    Metrics format:
+        rabbits:
+          rabbit-01:
+            queueDepth: 12          # outstanding data movement requests
+            bandwidth: 2000000000   # current bytes per second
+            driveHealth: 0.75       # 1.0 healthy, 0.0 failed
+
+    Queue depth and bandwidth are normalized by the largest value reported
+    so each is between 0 and 1, drive health contributes 1 - driveHealth.
+    A rabbit's score is the weighted sum; rabbits missing from the metrics,
+    or with a metric that is not a non-negative number, get the mean score.
+    """
+
+    # Score weight of each metric
+    WEIGHTS = {"queueDepth": 1.0, "bandwidth": 1.0, "driveHealth": 2.0}
+
+    # Value of a metric a rabbit does not report
+    DEFAULTS = {"queueDepth": 0.0, "bandwidth": 0.0, "driveHealth": 1.0}
+
+    # Seconds metrics are reused before being read again
+    DEFAULT_TTL = 30
+
+    # Seconds to wait on a Unix socket source
+    SOCKET_TIMEOUT = 2
+
+    def __init__(self, source, ttl=DEFAULT_TTL, weights=None):
+        """Initialize the telemetry source.
+
+        Parameters:
+        source : Metrics file path or 'unix:<socket path>'
+        ttl : Seconds metrics are cached
+        weights : Dictionary of metric weights, None for WEIGHTS
+
+        Returns:
+        Nothing
+        """
+        self.source = source
+        self.ttl = ttl
+        self.weights = weights or Telemetry.WEIGHTS
+        self.reads = 0
+        self._scores = None
+        self._default = 0.0
+        self._expires = 0
+
+    def read(self):
+        """Read the metrics document from the source.
+
+        Parameters:
+        None
+
+        Returns:
+        Dictionary of metrics keyed by rabbit name
+        """
+        if self.source.startswith("unix:"):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(Telemetry.SOCKET_TIMEOUT)
+                sock.connect(self.source[len("unix:"):])
+                chunks = []
+                while True:
+                    chunk = sock.recv(65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+            body = json.loads(b"".join(chunks).decode("utf-8"))
+        else:
+            with open(self.source, "r") as stream:
+                body = yaml.load(stream, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+        self.reads += 1
+        metrics = (body or {}).get("rabbits") or {}
+        if not isinstance(metrics, dict):
+            raise ValueError("'rabbits' is not a dictionary of rabbit metrics")
+        return metrics
+
+    def values(name, m):
+        """Coerce a rabbit's metrics to floats.
+
+        Parameters:
+        name : Rabbit name
+        m : Metrics dictionary of the rabbit
+
+        Returns:
+        Dictionary of metric to value, None if any metric is not a non-negative number
+        """
+        if not isinstance(m, dict):
+            Console.debug(Console.MIN, f"Telemetry for {name} is not a dictionary, ignored")
+            return None
+        values = {}
+        for key, default in Telemetry.DEFAULTS.items():
+            value = m.get(key, default)
+            try:
+                if isinstance(value, bool):
+                    raise TypeError("not a number")
+                value = float(value)
+                if not math.isfinite(value) or value < 0:
+                    raise ValueError("not a non-negative number")
+            except (TypeError, ValueError):
+                Console.debug(Console.MIN, f"Telemetry for {name} has an invalid {key} {value!r}, ignored")
+                return None
+            values[key] = value
+        return values
+
+    def scores(self):
+        """Return the score of every rabbit in the metrics, reading them if expired.
+
+        A source that can't be read keeps the previous scores, or scores
+        every rabbit equally if there are none.
+
+        Parameters:
+        None
+
+        Returns:
+        Dictionary of score keyed by rabbit name
+        """
+        now = time.monotonic()
+        if self._scores is not None and now < self._expires:
+            return self._scores
+        try:
+            metrics = self.read()
+        except (OSError, ValueError, AttributeError, yaml.YAMLError) as ex:
+            Console.debug(Console.MIN, f"Unable to read telemetry from {self.source}: {ex}")
+            metrics = None
+        self._expires = now + self.ttl
+        if metrics is None:
+            if self._scores is None:
+                self._scores = {}
+            return self._scores
+
+        valid = {}
+        for name, m in metrics.items():
+            values = Telemetry.values(name, m)
+            if values is not None:
+                valid[name] = values
+
+        peaks = {}
+        for key in ["queueDepth", "bandwidth"]:
+            peaks[key] = max((m[key] for m in valid.values()), default=0) or 1
+        scores = {}
+        for name, m in valid.items():
+            scores[name] = (self.weights["queueDepth"] * m["queueDepth"] / peaks["queueDepth"]
+                            + self.weights["bandwidth"] * m["bandwidth"] / peaks["bandwidth"]
+                            + self.weights["driveHealth"] * (1.0 - m["driveHealth"]))
+        self._scores = scores
+        self._default = sum(scores.values()) / len(scores) if scores else 0.0
+        return scores
+
+    def score(self, name):
+        """Return the score of a rabbit.
+
+        Parameters:
+        name : Rabbit name
+
+        Returns:
+        Score, lower is preferred
+        """
+        return self.scores().get(name, self._default)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility rabbit to compute topology cache
+
+import json
+import os
+
+from .Console import Console
+
+
+class TopologyCache:
+    """On-disk cache of the rabbit to compute adjacency.
+
+    Each Storage's filtered computes list is stored under its name along
+    with the Storage resourceVersion and generation.  When the inventory is
+    loaded, Storages whose version matches the cache get their computes
+    from the cache; only the Storages that changed are rebuilt and written
+    back.  Storages without a resourceVersion or generation, such as those
+    read from an inventory file, are not cached.
+    """
+
+    # Part of the file, bump when the entry format changes
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_file):
+        """Initialize the topology cache.
+
+        Parameters:
+        cache_file : Path of the cache file, created on first save
+
+        Returns:
+        Nothing
+        """
+        self.cache_file = cache_file
+        self.hits = 0
+        self.misses = 0
+        self._entries = None
+        self._dirty = False
+
+    def load(self):
+        """Read the cache file, an unreadable or outdated file is an empty cache.
+
+        Parameters:
+        None
+
+        Returns:
+        Dictionary of cache entries keyed by Storage name
+        """
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.cache_file, "r") as stream:
+                    body = json.load(stream)
+                if body.get("version") == TopologyCache.CACHE_VERSION:
+                    self._entries = body.get("storages") or {}
+            except (OSError, ValueError, AttributeError) as ex:
+                Console.debug(Console.MIN, f"Topology cache {self.cache_file} not loaded: {ex}")
+        return self._entries
+
+    def apply(self, rabbits, prune=True):
+        """Seed each Storage's computes from the cache, refreshing changed Storages.
+
+        Parameters:
+        rabbits : Inventory dictionary of Storage objects keyed by name
+        prune : Drop cached Storages that are not in rabbits, False when
+                rabbits is only part of the inventory
+
+        Returns:
+        Number of Storages rebuilt
+        """
+        entries = self.load()
+        rebuilt = 0
+        for name, r in rabbits.items():
+            version = r.resource_version
+            if version is None:
+                continue
+            entry = entries.get(name)
+            if entry is not None and entry.get("version") == version:
+                r.computes = entry["computes"]
+                self.hits += 1
+                continue
+            entries[name] = {"version": version, "computes": r.computes}
+            self.misses += 1
+            self._dirty = True
+            rebuilt += 1
+
+        # Storages that have left the cluster
+        if prune:
+            for name in [name for name in entries if name not in rabbits]:
+                del entries[name]
+                self._dirty = True
+
+        Console.debug(Console.MIN, f"Topology cache: {self.hits} reused, {rebuilt} rebuilt")
+        return rebuilt
+
+    def save(self):
+        """Write the cache file if anything changed.
+
+        Parameters:
+        None
+
+        Returns:
+        Nothing
+        """
+        if not self._dirty:
+            return
+        directory = os.path.dirname(self.cache_file)
+        tmp_path = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w") as stream:
+                json.dump({"version": TopologyCache.CACHE_VERSION, "storages": self._entries}, stream,
+                          separators=(",", ":"))
+            os.replace(tmp_path, self.cache_file)
+            self._dirty = False
+        except OSError as ex:
+            Console.debug(Console.MIN, f"Unable to write topology cache {self.cache_file}: {ex}")
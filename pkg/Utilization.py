@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# DWS Utility rabbit utilization report
+
+import statistics
+
+
+class Utilization:
+    """Joins the inventory with the Servers and Computes CRs to report per rabbit usage.
+
+    Each list is walked once; allocations and computes are joined to the
+    rabbits through dictionaries keyed by rabbit and compute name.
+    """
+
+    # Rabbits this many standard deviations above the mean utilization are hot spots
+    HOT_SPOT_SIGMA = 2
+
+    def __init__(self, rabbits, servers, computes=None):
+        """Initialize the report.
+
+        Parameters:
+        rabbits : Inventory dictionary of Storage objects keyed by name
+        servers : List of raw Servers CRs
+        computes : List of raw Computes CRs, None to skip compute usage
+
+        Returns:
+        Nothing
+        """
+        self.rabbits = rabbits
+        self.servers = servers
+        self.computes = computes or []
+
+    def report(self):
+        """Build the utilization report.
+
+        Parameters:
+        None
+
+        Returns:
+        Dictionary with per rabbit usage, totals, skew, and fragmentation
+        """
+        usage = {}
+        compute_rabbit = {}
+        for name, r in self.rabbits.items():
+            usage[name] = {"name": name, "status": r.status, "capacity": r.capacity,
+                           "allocatedBytes": 0, "allocationCount": 0, "servers": 0,
+                           "computes": 0, "computesInUse": 0}
+            for c in r.computes:
+                compute_rabbit[c['name']] = name
+                usage[name]["computes"] += 1
+
+        unknown = {}
+        for server in self.servers:
+            used = set()
+            for alloc in server.get('spec', {}).get('allocationSets') or []:
+                for storage in alloc.get('storage') or []:
+                    size = alloc['allocationSize'] * storage['allocationCount']
+                    rabbit = usage.get(storage['name'])
+                    if rabbit is None:
+                        unknown[storage['name']] = unknown.get(storage['name'], 0) + size
+                        continue
+                    rabbit["allocatedBytes"] += size
+                    rabbit["allocationCount"] += storage['allocationCount']
+                    used.add(storage['name'])
+            for name in used:
+                usage[name]["servers"] += 1
+
+        in_use = set()
+        for compute in self.computes:
+            for c in compute.get('data') or []:
+                rabbit_name = compute_rabbit.get(c['name'])
+                if rabbit_name is not None and c['name'] not in in_use:
+                    in_use.add(c['name'])
+                    usage[rabbit_name]["computesInUse"] += 1
+
+        free = 0
+        stranded = 0
+        loads = []
+        for rabbit in usage.values():
+            rabbit["remaining"] = rabbit["capacity"] - rabbit["allocatedBytes"]
+            rabbit["utilization"] = round(rabbit["allocatedBytes"] / rabbit["capacity"], 4) if rabbit["capacity"] else 0.0
+            if rabbit["status"] != "Ready":
+                continue
+            loads.append(rabbit["utilization"])
+            remaining = max(rabbit["remaining"], 0)
+            free += remaining
+            # Free capacity behind a rabbit whose computes are all busy can't be used
+            if self.computes and rabbit["computes"] > 0 and rabbit["computesInUse"] >= rabbit["computes"]:
+                stranded += remaining
+
+        mean = statistics.mean(loads) if loads else 0.0
+        stdev = statistics.pstdev(loads) if loads else 0.0
+        hot_spots = sorted((rabbit for rabbit in usage.values()
+                            if rabbit["status"] == "Ready" and stdev > 0 and rabbit["utilization"] > mean + Utilization.HOT_SPOT_SIGMA * stdev),
+                           key=lambda rabbit: rabbit["utilization"], reverse=True)
+
+        capacity = sum(rabbit["capacity"] for rabbit in usage.values())
+        allocated = sum(rabbit["allocatedBytes"] for rabbit in usage.values())
+        return {"rabbits": list(usage.values()),
+                "totals": {"rabbits": len(usage),
+                           "servers": len(self.servers),
+                           "capacity": capacity,
+                           "allocatedBytes": allocated,
+                           "allocationCount": sum(rabbit["allocationCount"] for rabbit in usage.values()),
+                           "remaining": capacity - allocated,
+                           "utilization": round(allocated / capacity, 4) if capacity else 0.0,
+                           "computes": len(compute_rabbit),
+                           "computesInUse": len(in_use)},
+                # Coefficient of variation of the Ready rabbits' utilization, 0 is perfectly even
+                "skewIndex": round(stdev / mean, 4) if mean else 0.0,
+                "hotSpots": [rabbit["name"] for rabbit in hot_spots],
+                # Fraction of free capacity on Ready rabbits whose computes are all in use
+                "fragmentation": round(stranded / free, 4) if free else 0.0,
+                "unknownRabbits": unknown}
@@ -30,6 +30,7 @@ class DirectiveBreakdown:
             if not raw_breakdown:
                 raise Exception("raw_breakdown cannot be None")
             self._raw_breakdown = copy.deepcopy(raw_breakdown)
+            self._allocations = None
 
     @property
     def name(self):
@@ -65,6 +66,8 @@ class DirectiveBreakdown:
     @property
     def allocationSet(self):
         """Returns a list of Allocation objects for this breakdown."""
+        if self._allocations is not None:
+            return self._allocations
         allocations = []
         if 'storage' not in self._raw_breakdown['status']:
             return None
@@ -72,4 +75,5 @@ class DirectiveBreakdown:
         for allocobj in allocationsets:
             obj = Allocation(allocobj)
             allocations.append(obj)
+        self._allocations = allocations
         return allocations
@@ -25,11 +25,17 @@ from ..Console import Console
 
 class Storage:
     """Encapsulates the Storage CR."""
-    def __init__(self, raw_storage):
+    def __init__(self, raw_storage, copy_raw=True):
         with Console.trace_function():
             if not raw_storage:
                 raise Exception("raw_storage is required")
-            self._raw_storage = copy.deepcopy(raw_storage)
+            # copy_raw=False adopts raw_storage, for callers that own a freshly parsed document
+            self._raw_storage = copy.deepcopy(raw_storage) if copy_raw else raw_storage
+            self._computes = None
+
+            # Planning state, consumed as allocations are assigned
+            self.remaining_storage = self._raw_storage.get('status', {}).get('capacity', 0)
+            self.allocationCount = 0
 
     @property
     def raw_storage(self):
@@ -40,6 +46,7 @@ class Storage:
     def raw_storage(self, raw_storage):
         """Setter for the internal Storage json."""
         self._raw_storage = copy.deepcopy(raw_storage)
+        self._computes = None
 
     @property
     def name(self):
@@ -61,12 +68,29 @@ class Storage:
         """Returns the Storage capacity."""
         return self.raw_storage['status']['capacity']
 
+    @property
+    def resource_version(self):
+        """Returns the Storage resourceVersion and generation, None if neither is present."""
+        metadata = self.raw_storage['metadata']
+        if 'resourceVersion' not in metadata and 'generation' not in metadata:
+            return None
+        return f"{metadata.get('resourceVersion', '')}/{metadata.get('generation', '')}"
+
     @property
     def computes(self):
         """Returns the Nnfnode servers list filtered for computes."""
-        # Some test environments, such as craystack-lop, may not have computes
-        # listed for every rabbit.
-        return list(filter(lambda obj: obj['name'] != self.name, self.raw_storage['status']['access'].get('computes', [])))
+        # The list is built once per raw_storage, callers must not modify it
+        if self._computes is None:
+            # Some test environments, such as craystack-lop, may not have computes
+            # listed for every rabbit.
+            name = self.name
+            self._computes = [obj for obj in self.raw_storage['status']['access'].get('computes', []) if obj['name'] != name]
+        return self._computes
+
+    @computes.setter
+    def computes(self, computes):
+        """Setter for the filtered computes list, e.g. from the topology cache."""
+        self._computes = computes
 
     def has_sufficient_capacity(self, requestedCapacity):
         """Returns True if Nnfnode can meet the requested capacity."""
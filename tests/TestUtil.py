@@ -20,6 +20,8 @@
 
 import random
 
+from pkg.crd.Storage import Storage
+
 
 class TestUtil(object):
     number_gen = None
@@ -41,6 +43,33 @@ class TestUtil(object):
         # print("Setting up BaseTest class")
         TestUtil.number_gen = TestUtil.number_generator()
 
+    @classmethod
+    def storage_json(cls, name, computes=16, capacity=39582418599936, status="Ready"):
+        """Build a Storage CR for a rabbit named 'name' with 'computes' computes."""
+        return {
+            "kind": "Storage",
+            "metadata": {"name": name, "namespace": "default", "resourceVersion": "1"},
+            "status": {
+                "access": {
+                    "computes": [{"name": f"{name}-c{idx:02d}", "status": "Ready"} for idx in range(computes)],
+                    "protocol": "PCIe",
+                    "servers": [{"name": name, "status": "Ready"}]
+                },
+                "capacity": capacity,
+                "status": status,
+                "type": "NVMe"
+            }
+        }
+
+    @classmethod
+    def storage_inventory(cls, rabbits=4, computes=16, capacity=39582418599936):
+        """Build an inventory dictionary of Storage objects."""
+        inventory = {}
+        for idx in range(rabbits):
+            name = f"rabbit-{idx:02d}"
+            inventory[name] = Storage(TestUtil.storage_json(name, computes, capacity))
+        return inventory
+
     # *********************************************
     # * Test JSON data
     # *********************************************
@@ -50,6 +79,9 @@ class TestUtil(object):
         "metadata": {
             "name": "mybreakdown"
         },
+        "spec": {
+            "directive": "#DW jobdw type=xfs capacity=5GB name=myxfs"
+        },
         "status": {
             "storage": {
                 "allocationSets": [
@@ -88,6 +120,45 @@ class TestUtil(object):
         }
     }
 
+    LUSTRE_BREAKDOWN_JSON = {
+        "metadata": {
+            "name": "mylustre-0"
+        },
+        "spec": {
+            "directive": "#DW jobdw type=lustre capacity=10GB name=mylustre"
+        },
+        "status": {
+            "storage": {
+                "allocationSets": [
+                    {
+                        "allocationStrategy": "AllocateSingleServer",
+                        "constraints": {"colocation": [{"key": "lustre-mgt", "type": "exclusive"}]},
+                        "label": "mgt",
+                        "minimumCapacity": 1000000000
+                    },
+                    {
+                        "allocationStrategy": "AllocateSingleServer",
+                        "constraints": {"colocation": [{"key": "lustre-mdt", "type": "exclusive"}]},
+                        "label": "mdt",
+                        "minimumCapacity": 1000000000000
+                    },
+                    {
+                        "allocationStrategy": "AllocateAcrossServers",
+                        "constraints": {},
+                        "label": "ost",
+                        "minimumCapacity": 10000000000
+                    }
+                ],
+                "reference": {
+                    "kind": "Servers",
+                    "name": "mylustre-0",
+                    "namespace": "default"
+                }
+            },
+            "ready": True
+        }
+    }
+
     BREAKDOWNNOSTORAGE_JSON = {
         "metadata": {
             "name": "mybreakdown"
@@ -0,0 +1,82 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Allocator compute selection benchmark
+#
+# Not part of the unit tests.  Run from the top of the repository with
+#     python3 -m tests.benchAllocator [computes ...]
+# Exits non-zero when the time per compute grows with the job size.
+
+import math
+import sys
+import time
+
+from pkg.Allocator import Allocator
+from pkg.Config import Config
+from pkg.InventoryGenerator import InventoryGenerator
+from pkg.crd.Storage import Storage
+
+# Job sizes in computes, each on an inventory of just enough rabbits
+SIZES = [16, 160, 1600, 8000, 20000]
+COMPUTES_PER_RABBIT = 16
+REPEATS = 5
+
+# Largest allowed growth in the time per compute from the second size to the
+# largest, a quadratic selection grows by the ratio of the sizes instead
+LINEAR_TOLERANCE = 3.0
+
+
+def time_plan_computes(settings, computes):
+    """Best time in seconds to choose 'computes' computes."""
+    generator = InventoryGenerator(math.ceil(computes / COMPUTES_PER_RABBIT), COMPUTES_PER_RABBIT, seed=1)
+    rabbits = {s["metadata"]["name"]: Storage(s) for s in generator.storages()}
+    settings = dict(settings)
+    settings["nodes"] = computes
+    best = None
+    for _ in range(REPEATS):
+        allocator = Allocator(settings, rabbits)
+        start = time.perf_counter()
+        allocator.plan_computes()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or SIZES
+    settings = Allocator.settings_from_config(Config(["dwsutil", "-c", "tests/empty.cfg"]))
+
+    per_compute = []
+    print(f"{'computes':>9} {'rabbits':>8} {'ms':>9} {'us/compute':>11}")
+    for computes in sizes:
+        elapsed = time_plan_computes(settings, computes)
+        per_compute.append(elapsed / computes)
+        print(f"{computes:>9} {math.ceil(computes / COMPUTES_PER_RABBIT):>8} {elapsed * 1000:>9.2f} {elapsed / computes * 1e6:>11.2f}")
+
+    if len(per_compute) > 2:
+        growth = per_compute[-1] / per_compute[1]
+        print(f"Time per compute grew {growth:.2f}x from {sizes[1]} to {sizes[-1]} computes")
+        if growth > LINEAR_TOLERANCE:
+            print(f"Scaling is worse than linear, more than {LINEAR_TOLERANCE}x")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
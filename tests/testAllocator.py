@@ -0,0 +1,291 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Allocator unit tests
+
+import os
+import tempfile
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.Allocator import Allocator
+from pkg.Config import Config
+from pkg.Directive import Directive
+from pkg.Dws import DWSError
+from pkg.PlanCache import PlanCache
+from pkg.crd.DirectiveBreakdown import DirectiveBreakdown
+from pkg.crd.Storage import Storage
+
+
+class TestAllocator(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def setUp(self):
+        self.config = Config(["dwsutil", "-c", "tests/empty.cfg"])
+        self.settings = Allocator.settings_from_config(self.config)
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_allocator_settings_from_config(self):
+        self.assertEqual(sorted(self.settings.keys()), sorted(Allocator.SETTINGS))
+        self.assertEqual(self.settings["nodes"], self.config.nodes)
+
+    def test_allocator_plan_xfs(self):
+        self.settings["nodes"] = 20
+        rabbits = TestUtil.storage_inventory(rabbits=2)
+        plan = Allocator(self.settings, rabbits).plan_servers([DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)])
+        storage = plan[0]["allocationSet"][0]["storage"]
+        self.assertEqual(storage, [{"name": "rabbit-00", "allocationCount": 16},
+                                   {"name": "rabbit-01", "allocationCount": 4}])
+
+    def test_allocator_plan_xfs_exclusions(self):
+        self.settings["nodes"] = 4
+        self.settings["exclude_rabbits"] = ["rabbit-[00-01]"]
+        self.settings["exclude_computes"] = ["rabbit-02-c0*"]
+        rabbits = TestUtil.storage_inventory(rabbits=3)
+        plan = Allocator(self.settings, rabbits).plan_servers([DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)])
+        self.assertEqual(plan[0]["allocationSet"][0]["storage"], [{"name": "rabbit-02", "allocationCount": 4}])
+
+    def test_allocator_plan_xfs_insufficient_computes(self):
+        self.settings["nodes"] = 100
+        rabbits = TestUtil.storage_inventory(rabbits=2)
+        with self.assertRaises(DWSError) as ex:
+            Allocator(self.settings, rabbits).plan_servers([DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)])
+        self.assertEqual(ex.exception.code, DWSError.DWS_INSUFFICIENT_RESOURCES)
+
+    def test_allocator_plan_lustre(self):
+        rabbits = TestUtil.storage_inventory(rabbits=4)
+        plan = Allocator(self.settings, rabbits).plan_servers([DirectiveBreakdown(TestUtil.LUSTRE_BREAKDOWN_JSON)])
+        labels = [a["label"] for a in plan[0]["allocationSet"]]
+        self.assertEqual(labels, ["mgt", "mdt", "ost"])
+        ost = plan[0]["allocationSet"][2]
+        self.assertEqual(len(ost["storage"]), self.config.ost_count)
+        self.assertEqual(ost["allocationSize"], round(10000000000 / self.config.ost_count))
+
+    def test_allocator_enforce_capacity(self):
+        rabbits = TestUtil.storage_inventory(rabbits=4, capacity=2000000000000)
+        allocator = Allocator(self.settings, rabbits)
+        allocator.enforce_capacity = True
+        rabbits["rabbit-00"].remaining_storage = 0
+        allocator.view.charge("rabbit-00", 2000000000000)
+
+        plan = allocator.plan_servers([DirectiveBreakdown(TestUtil.LUSTRE_BREAKDOWN_JSON)])
+        mgt = plan[0]["allocationSet"][0]
+        self.assertEqual(mgt["storage"], [{"name": "rabbit-01", "allocationCount": 1}])
+        self.assertIn("rabbit-01", allocator.charges)
+
+        allocator.rollback()
+        self.assertEqual(rabbits["rabbit-01"].remaining_storage, 2000000000000)
+        self.assertEqual(allocator.view.total_remaining(), 6000000000000)
+
+    def test_allocator_plan_computes(self):
+        self.settings["nodes"] = 20
+        rabbits = TestUtil.storage_inventory(rabbits=3)
+        rabbits["rabbit-02"].raw_storage["status"]["access"]["computes"][0]["status"] = "Offline"
+        computes = Allocator(self.settings, rabbits).plan_computes(["rabbit-02", "rabbit-02"])
+        self.assertEqual(len(computes), 20)
+        self.assertEqual(computes[0], "rabbit-02-c01")
+        self.assertEqual(computes[15], "rabbit-00-c00")
+
+    def test_allocator_plan_computes_limits(self):
+        self.settings["nodes"] = 6
+        self.settings["exclude_computes"] = ["rabbit-01-c00"]
+        rabbits = TestUtil.storage_inventory(rabbits=3)
+        computes = Allocator(self.settings, rabbits).plan_computes(["rabbit-01", "rabbit-00"], {"rabbit-01": 2, "rabbit-00": 3})
+        self.assertEqual(computes, ["rabbit-01-c01", "rabbit-01-c02",
+                                    "rabbit-00-c00", "rabbit-00-c01", "rabbit-00-c02",
+                                    "rabbit-02-c00"])
+
+    def test_allocator_plan_computes_insufficient(self):
+        self.settings["nodes"] = 40
+        rabbits = TestUtil.storage_inventory(rabbits=2)
+        self.assertEqual(len(Allocator(self.settings, rabbits).plan_computes()), 32)
+
+    def mgt_rabbits(self, allocator, workflows):
+        rabbits = []
+        for workflow_name in workflows:
+            allocator.workflow_name = workflow_name
+            plan = allocator.plan_servers([DirectiveBreakdown(TestUtil.LUSTRE_BREAKDOWN_JSON)])
+            rabbits.append(plan[0]["allocationSet"][0]["storage"][0]["name"])
+        return rabbits
+
+    def test_allocator_strategy_roundrobin(self):
+        self.settings["strategy"] = "roundrobin"
+        allocator = Allocator(self.settings, TestUtil.storage_inventory(rabbits=8))
+        # mgt, mdt, and two osts take four rabbits per plan
+        self.assertEqual(self.mgt_rabbits(allocator, ["a", "b", "c"]), ["rabbit-00", "rabbit-04", "rabbit-00"])
+
+        allocator = Allocator(self.settings, TestUtil.storage_inventory(rabbits=8))
+        allocator.last_rabbit = "rabbit-05"
+        self.assertEqual(self.mgt_rabbits(allocator, ["a"]), ["rabbit-06"])
+
+        # A plan that is rolled back leaves the cursor where it was
+        cursor = allocator.last_rabbit
+        allocator.plan_servers([DirectiveBreakdown(TestUtil.LUSTRE_BREAKDOWN_JSON)])
+        self.assertNotEqual(allocator.last_rabbit, cursor)
+        allocator.rollback()
+        self.assertEqual(allocator.last_rabbit, cursor)
+
+    def test_allocator_strategy_random(self):
+        self.settings["strategy"] = "random"
+        rabbits = TestUtil.storage_inventory(rabbits=16)
+        first = self.mgt_rabbits(Allocator(self.settings, rabbits), ["a", "b", "c", "d"])
+        self.assertEqual(self.mgt_rabbits(Allocator(self.settings, rabbits), ["a", "b", "c", "d"]), first)
+        self.assertGreater(len(set(first)), 1)
+
+        self.settings["seed"] = 7
+        self.assertNotEqual(self.mgt_rabbits(Allocator(self.settings, rabbits), ["a", "b", "c", "d"]), first)
+
+    def test_allocator_strategy_hash(self):
+        self.settings["strategy"] = "hash"
+        rabbits = TestUtil.storage_inventory(rabbits=16)
+        workflows = [f"wf-{idx}" for idx in range(20)]
+        before = self.mgt_rabbits(Allocator(self.settings, rabbits), workflows)
+        self.assertGreater(len(set(before)), 4)
+
+        # Removing a rabbit only moves the workflows that were on it
+        del rabbits["rabbit-03"]
+        after = self.mgt_rabbits(Allocator(self.settings, rabbits), workflows)
+        for old, new in zip(before, after):
+            if old != "rabbit-03":
+                self.assertEqual(old, new)
+
+    def test_allocator_strategy_leastallocated(self):
+        self.settings["strategy"] = "leastallocated"
+        rabbits = TestUtil.storage_inventory(rabbits=4)
+        rabbits["rabbit-00"].remaining_storage -= 10000000000000
+        allocator = Allocator(self.settings, rabbits)
+        self.assertEqual(self.mgt_rabbits(allocator, ["a"]), ["rabbit-01"])
+        # The first plan put its mdt on rabbit-02, the next one avoids it
+        plan = allocator.plan_servers([DirectiveBreakdown(TestUtil.LUSTRE_BREAKDOWN_JSON)])
+        self.assertEqual(plan[0]["allocationSet"][1]["storage"], [{"name": "rabbit-03", "allocationCount": 1}])
+
+    def test_allocator_telemetry(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "metrics.yaml")
+            with open(path, "w") as stream:
+                stream.write("rabbits:\n"
+                             "  rabbit-00: {queueDepth: 40, bandwidth: 1000}\n"
+                             "  rabbit-01: {driveHealth: 0.5}\n"
+                             "  rabbit-02: {queueDepth: 2, bandwidth: 100}\n")
+            self.settings["telemetry"] = path
+            allocator = Allocator(self.settings, TestUtil.storage_inventory(rabbits=5))
+            # rabbit-03 and rabbit-04 have no metrics and get the mean score,
+            # each rabbit's place in the strategy order adds up to 1
+            self.assertEqual(allocator.order(list(allocator.rabbits), "a"),
+                             ["rabbit-02", "rabbit-01", "rabbit-03", "rabbit-00", "rabbit-04"])
+            self.assertEqual(self.mgt_rabbits(allocator, ["a"]), ["rabbit-02"])
+
+            # A small difference in score does not override the strategy
+            with open(path, "w") as stream:
+                stream.write("rabbits:\n"
+                             "  rabbit-00: {driveHealth: 0.9}\n"
+                             "  rabbit-01: {driveHealth: 1.0}\n")
+            allocator = Allocator(self.settings, TestUtil.storage_inventory(rabbits=5))
+            self.assertEqual(allocator.order(list(allocator.rabbits), "a")[:2], ["rabbit-00", "rabbit-01"])
+
+    def test_allocator_cursor_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "cursor")
+            self.assertIsNone(Allocator.load_cursor(path))
+            Allocator.save_cursor(path, "rabbit-03")
+            self.assertEqual(Allocator.load_cursor(path), "rabbit-03")
+
+    def test_allocator_plan_workflow(self):
+        rabbits = {}
+        for idx, capacity in enumerate([10000000000000, 10000000000000, 4000000000000]):
+            name = f"rabbit-{idx:02d}"
+            rabbits[name] = Storage(TestUtil.storage_json(name, capacity=capacity))
+        breakdowns = [DirectiveBreakdown(Directive("#DW jobdw type=xfs capacity=4TB name=x").breakdown_json()),
+                      DirectiveBreakdown(Directive("#DW jobdw type=lustre capacity=12TB name=l").breakdown_json())]
+        allocator = Allocator(self.settings, rabbits)
+        allocator.enforce_capacity = True
+
+        # In the order given the xfs allocation takes the room an ost needs
+        with self.assertRaises(DWSError):
+            allocator.plan_servers(breakdowns)
+        allocator.rollback()
+
+        plan = allocator.plan_workflow(breakdowns)
+        self.assertEqual([ba["name"] for ba in plan], [bd.name for bd in breakdowns])
+        self.assertEqual(plan[0]["allocationSet"][0]["storage"], [{"name": "rabbit-02", "allocationCount": 1}])
+        self.assertEqual(sum(charge[1] for charge in allocator.charges.values()), 5)
+
+    def test_plan_cache_memory(self):
+        cache = PlanCache(max_entries=2)
+        rabbits = TestUtil.storage_inventory(rabbits=2)
+        breakdowns = [DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)]
+        key = cache.key(rabbits, breakdowns, self.settings)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, [["plan"]])
+        self.assertEqual(cache.get(key), [["plan"]])
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+        # LRU eviction
+        cache.put("a", [])
+        cache.get(key)
+        cache.put("b", [])
+        self.assertIsNotNone(cache.get(key))
+        self.assertIsNone(cache.get("a"))
+
+    def test_plan_cache_key_changes(self):
+        cache = PlanCache()
+        rabbits = TestUtil.storage_inventory(rabbits=2)
+        breakdowns = [DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)]
+        key = cache.key(rabbits, breakdowns, self.settings)
+
+        # Identical shapes from another workflow share the key
+        other = dict(TestUtil.BREAKDOWN_JSON)
+        other["metadata"] = {"name": "otherbreakdown"}
+        self.assertEqual(key, cache.key(rabbits, [DirectiveBreakdown(other)], self.settings))
+
+        # Any change to a Storage resourceVersion invalidates the key
+        rabbits["rabbit-01"].raw_storage["metadata"]["resourceVersion"] = "2"
+        self.assertNotEqual(key, cache.key(rabbits, breakdowns, self.settings))
+
+        self.settings["nodes"] += 1
+        self.assertNotEqual(cache.key(rabbits, breakdowns, self.settings),
+                            cache.key(rabbits, breakdowns, Allocator.settings_from_config(self.config)))
+
+    def test_plan_cache_disk(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = PlanCache(max_entries=2, cache_dir=cache_dir)
+            cache.put("a", [[{"label": "xfs"}]])
+            cache.put("b", [])
+            cache.put("c", [])
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+            # A new cache instance finds the entries on disk
+            cache = PlanCache(max_entries=2, cache_dir=cache_dir)
+            self.assertEqual(cache.get("c"), [])
+            self.assertIsNone(cache.get("nope"))
+
+
+if __name__ == '__main__':
+    unittest.main()
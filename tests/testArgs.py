@@ -18,6 +18,8 @@
 #
 # DWS unit tests
 
+import contextlib
+import io
 import unittest
 from unittest.mock import patch
 
@@ -201,6 +203,98 @@ class TestArgs(unittest.TestCase, TestUtil):
         config = Config(args)
         self.assertEqual(config.inventory_file, filename)
 
+    def test_arg_simulate(self):
+        args = ["dwsutil", "-c", "tests/empty.cfg", "--operation", "simulate", "-i", "tests/empty.inv",
+                "--trace", "tests/empty.inv", "--interval", "60"]
+        config = Config(args)
+        self.assertEqual(config.trace_file, "tests/empty.inv")
+        self.assertEqual(config.sample_interval, 60)
+        self.assertTrue(config.is_offline())
+
+    def test_arg_fitcheck(self):
+        args = ["dwsutil", "-c", "tests/empty.cfg", "--operation", "fitcheck", "-i", "tests/empty.inv",
+                "--ledger", "tests/empty.inv"]
+        config = Config(args)
+        self.assertEqual(config.ledger_file, "tests/empty.inv")
+        self.assertTrue(config.is_offline())
+
+    def test_arg_assign(self):
+        args = ["dwsutil", "-c", "tests/empty.cfg", "--operation", "assign", "-n", "wfr", "--plan-out", "plan.json"]
+        config = Config(args)
+        self.assertEqual(config.plan_out_file, "plan.json")
+        config = Config(["dwsutil", "-c", "tests/empty.cfg", "--operation", "assign", "--apply", "tests/empty.inv"])
+        self.assertEqual(config.apply_file, "tests/empty.inv")
+
+    def test_arg_export(self):
+        args = ["dwsutil", "-c", "tests/empty.cfg", "--context", "inventory", "--operation", "export", "--since", "tests/empty.inv"]
+        config = Config(args)
+        self.assertEqual(config.since_file, "tests/empty.inv")
+        config = Config(["dwsutil", "-c", "tests/empty.cfg", "--context", "inventory", "--operation", "export", "--exportfile", "inventory.yaml"])
+        self.assertEqual(config.export_file, "inventory.yaml")
+
+    def test_arg_kctx_list(self):
+        args = ["dwsutil", "-c", "tests/empty.cfg", "--context", "system", "--operation", "investigate", "--kctx", "dp0, dp1b"]
+        config = Config(args)
+        self.assertEqual(config.k8s_active_context, "dp0")
+        self.assertEqual(config.k8s_fanout_contexts, ["dp0", "dp1b"])
+        self.assertTrue(config.is_fanout())
+        config = Config(["dwsutil", "-c", "tests/empty.cfg", "--kctx", "dp0"])
+        self.assertFalse(config.is_fanout())
+
+    def test_arg_generate(self):
+        args = ["dwsutil", "-c", "tests/empty.cfg", "--context", "inventory", "--operation", "generate", "--exportfile", "big.yaml",
+                "--rabbits", "1000", "--computes", "32", "--capacity", "normal:30TB,5TB", "--notready", "0.05,0.01", "--namepattern", "nid-{r},x{n}"]
+        config = Config(args)
+        self.assertTrue(config.is_offline())
+        self.assertEqual((config.generate_rabbits, config.generate_computes), (1000, 32))
+        self.assertEqual((config.not_ready, config.computes_not_ready), (0.05, 0.01))
+        self.assertEqual((config.rabbit_pattern, config.compute_pattern), ("nid-{r}", "x{n}"))
+
+    def test_arg_query(self):
+        args = ["dwsutil", "-c", "tests/empty.cfg", "--context", "inventory", "--operation", "query", "-i", "tests/empty.inv",
+                "--query", "status == Ready and capacity >= 20TB", "--query", "compute == x1000c0s0b0n0"]
+        config = Config(args)
+        self.assertTrue(config.is_offline())
+        self.assertEqual(config.queries, ["status == Ready and capacity >= 20TB", "compute == x1000c0s0b0n0"])
+
+    def test_arg_stream(self):
+        args = ["dwsutil", "-c", "tests/empty.cfg", "--context", "inventory", "--operation", "show", "--stream", "NDJSON"]
+        config = Config(args)
+        self.assertEqual(config.stream_format, "ndjson")
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                Config(["dwsutil", "-c", "tests/empty.cfg", "--context", "inventory", "--operation", "show", "--stream", "yaml"])
+            with self.assertRaises(SystemExit):
+                Config(["dwsutil", "-c", "tests/empty.cfg", "--context", "storage", "--operation", "list", "--stream", "json"])
+
+    def test_arg_summary(self):
+        args = ["dwsutil", "-c", "tests/empty.cfg", "--context", "inventory", "--operation", "summary"]
+        config = Config(args)
+        self.assertFalse(config.is_offline())
+        config = Config(args + ["-i", "tests/empty.inv"])
+        self.assertTrue(config.is_offline())
+
+    def test_arg_watch(self):
+        args = ["dwsutil", "-c", "tests/empty.cfg", "--context", "inventory", "--operation", "watch", "--debounce", "0.5", "--watchseconds", "60"]
+        config = Config(args)
+        self.assertEqual(config.debounce, 0.5)
+        self.assertEqual(config.watch_seconds, 60)
+
+    def test_arg_replan(self):
+        config = Config(["dwsutil", "-c", "tests/empty.cfg", "--context", "inventory", "--operation", "watch", "--replan"])
+        self.assertTrue(config.replan)
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                Config(["dwsutil", "-c", "tests/empty.cfg", "--context", "inventory", "--operation", "show", "--replan"])
+
+    def test_arg_capacityplan(self):
+        args = ["dwsutil", "-c", "tests/empty.cfg", "--operation", "capacityplan", "--mix", "tests/empty.inv"]
+        config = Config(args)
+        self.assertEqual(config.mix_file, "tests/empty.inv")
+        self.assertFalse(config.is_offline())
+        config = Config(args + ["-i", "tests/empty.inv"])
+        self.assertTrue(config.is_offline())
+
     def test_arg_nodes_default(self):
         args = ["dwsutil", "-c", "tests/empty.cfg"]
         config = Config(args)
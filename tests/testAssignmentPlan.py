@@ -0,0 +1,61 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# AssignmentPlan unit tests
+
+import json
+import os
+import tempfile
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.AssignmentPlan import AssignmentPlan
+from pkg.Dws import DWSError
+
+
+class TestAssignmentPlan(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_assignmentplan_save_load(self):
+        plan = AssignmentPlan()
+        servers = [{"name": "wfr-0", "namespace": "default", "resourceVersion": "5",
+                    "allocationSets": [{"label": "xfs", "allocationSize": 1000, "storage": [{"name": "rabbit-00", "allocationCount": 1}]}]}]
+        plan.add_workflow("wfr", servers, None, {"rabbit-00": "1"})
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "plan.json")
+            plan.save(path)
+            loaded = AssignmentPlan.load(path)
+            self.assertEqual(loaded.workflows, plan.workflows)
+
+            with open(path, "w") as stream:
+                json.dump({"version": AssignmentPlan.PLAN_VERSION + 1, "workflows": []}, stream)
+            with self.assertRaises(DWSError):
+                AssignmentPlan.load(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
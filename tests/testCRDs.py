@@ -323,6 +323,19 @@ class TestCRDs(unittest.TestCase, TestUtil):
         storage = Storage(TestUtil.STORAGE_JSON)
         self.assertEqual(len(storage.computes), 16)
 
+    def test_storage_field_computes_cached(self):
+        storage = Storage(TestUtil.STORAGE_JSON)
+        self.assertIs(storage.computes, storage.computes)
+        json = storage.raw_storage
+        json["status"]["access"]["computes"] = json["status"]["access"]["computes"][:2]
+        storage.raw_storage = json
+        self.assertEqual(len(storage.computes), 2)
+
+    def test_storage_copy_raw(self):
+        raw = TestUtil.storage_json("rabbit-00")
+        self.assertIsNot(Storage(raw).raw_storage, raw)
+        self.assertIs(Storage(raw, copy_raw=False).raw_storage, raw)
+
     def test_storage_has_sufficient_capacity(self):
         storage = Storage(TestUtil.STORAGE_JSON)
         self.assertTrue(storage.has_sufficient_capacity(1000000))
@@ -0,0 +1,130 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# CapacityPlan unit tests
+
+import os
+import tempfile
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.Allocator import Allocator
+from pkg.CapacityPlan import CapacityPlan
+from pkg.Config import Config
+from pkg.Dws import DWSError
+from pkg.crd.Storage import Storage
+
+
+class TestCapacityPlan(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def setUp(self):
+        self.config = Config(["dwsutil", "-c", "tests/empty.cfg"])
+        self.settings = Allocator.settings_from_config(self.config)
+
+    def job_class(self, name, nodes, directive, count=1):
+        return {"name": name, "nodes": nodes, "count": count, "directives": [directive]}
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_capacityplan_computes_bind(self):
+        rabbits = TestUtil.storage_inventory(rabbits=4, computes=16, capacity=100000000000000)
+        classes = [self.job_class("big", 24, "#DW jobdw type=lustre capacity=1TB name=l")]
+        results = CapacityPlan(self.settings, rabbits, classes).run()
+        self.assertEqual((results["concurrency"], results["upperBound"], results["binding"]), (2, 2, "computes"))
+        self.assertTrue(results["exact"])
+        self.assertEqual(results["byClass"], {"big": 2})
+        # The inventory is left as it was found
+        self.assertEqual([r.remaining_storage for r in rabbits.values()], [r.capacity for r in rabbits.values()])
+
+    def test_capacityplan_storage_bind(self):
+        rabbits = TestUtil.storage_inventory(rabbits=4, computes=16, capacity=10000000000000)
+        classes = [self.job_class("xfs", 8, "#DW jobdw type=xfs capacity=1TB name=x"),
+                   self.job_class("small", 1, "#DW jobdw type=xfs capacity=1TB name=y", count=2)]
+        results = CapacityPlan(self.settings, rabbits, classes).run()
+        # Each round takes 10TB of the 40TB
+        self.assertEqual(results["concurrency"], 12)
+        self.assertEqual(results["byClass"], {"xfs": 4, "small": 8})
+        self.assertEqual(results["binding"], "storage")
+        self.assertEqual([c["bytes"] for c in results["classes"]], [8000000000000, 1000000000000])
+
+    def test_capacityplan_exact_search(self):
+        # Placing jobs one after another fits two, a different packing fits three
+        rabbits = {}
+        for idx, capacity in enumerate([6000000000000, 5000000000000]):
+            name = f"rabbit-{idx:02d}"
+            rabbits[name] = Storage(TestUtil.storage_json(name, computes=2, capacity=capacity))
+        classes = [self.job_class("a", 1, "#DW jobdw type=lustre capacity=2TB name=a")]
+        results = CapacityPlan(self.settings, rabbits, classes).run()
+        self.assertEqual((results["greedy"], results["concurrency"], results["upperBound"]), (2, 3, 3))
+        self.assertTrue(results["exact"])
+        self.assertTrue(results["searched"])
+        self.assertGreater(results["searchStates"], 0)
+
+    def test_capacityplan_search_below_bound(self):
+        # Only the compute on rabbit-00 can reach enough storage for an xfs job
+        rabbits = {}
+        for idx, (capacity, computes) in enumerate([(10000000000000, 1), (500000000000, 5)]):
+            name = f"rabbit-{idx:02d}"
+            rabbits[name] = Storage(TestUtil.storage_json(name, computes=computes, capacity=capacity))
+        classes = [self.job_class("a", 1, "#DW jobdw type=xfs capacity=1TB name=a")]
+        results = CapacityPlan(self.settings, rabbits, classes).run()
+        self.assertEqual((results["concurrency"], results["upperBound"], results["binding"]), (1, 6, "rabbits"))
+        # The search finished, but it does not try every packing
+        self.assertTrue(results["searched"])
+        self.assertFalse(results["exact"])
+
+    def test_capacityplan_duplicate_class(self):
+        rabbits = TestUtil.storage_inventory(rabbits=2, computes=4)
+        classes = [self.job_class("a", 1, "#DW jobdw type=xfs capacity=1TB name=a"),
+                   self.job_class("a", 2, "#DW jobdw type=lustre capacity=1TB name=b")]
+        with self.assertRaises(DWSError):
+            CapacityPlan(self.settings, rabbits, classes)
+
+    def test_capacityplan_load_mix(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "mix.yaml")
+            with open(path, "w") as stream:
+                stream.write("jobs:\n"
+                             "  - name: sim\n"
+                             "    nodes: 64\n"
+                             "    directives: '#DW jobdw type=lustre capacity=10TB name=l'\n"
+                             "  - nodes: 2\n"
+                             "    count: 3\n")
+            classes = CapacityPlan.load_mix(path)
+            self.assertEqual(classes[0], self.job_class("sim", 64, "#DW jobdw type=lustre capacity=10TB name=l"))
+            self.assertEqual((classes[1]["name"], classes[1]["count"], classes[1]["directives"]), ("job-1", 3, []))
+
+            with open(path, "w") as stream:
+                stream.write("- nodes: 0\n")
+            with self.assertRaises(DWSError):
+                CapacityPlan.load_mix(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
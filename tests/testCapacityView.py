@@ -0,0 +1,81 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# CapacityView unit tests
+
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.CapacityView import CapacityView, np
+from pkg.crd.Storage import Storage
+
+
+class TestCapacityView(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def inventory(self):
+        rabbits = {}
+        for idx, capacity in enumerate([100, 300, 200, 50]):
+            name = f"rabbit-{idx:02d}"
+            rabbits[name] = Storage(TestUtil.storage_json(name, computes=2, capacity=capacity,
+                                                          status="NotReady" if idx == 2 else "Ready"))
+        return rabbits
+
+    def check_view(self, use_numpy):
+        view = CapacityView(self.inventory(), use_numpy=use_numpy)
+        self.assertEqual(view.use_numpy, use_numpy)
+        self.assertEqual(len(view), 4)
+        self.assertEqual(view.candidates(100), ["rabbit-00", "rabbit-01", "rabbit-02"])
+        self.assertEqual(view.candidates(100, remaining=False), ["rabbit-01", "rabbit-02"])
+        self.assertEqual(view.candidates(100, ready_only=True), ["rabbit-00", "rabbit-01"])
+        self.assertEqual(view.count_fitting(60), 3)
+        self.assertEqual(view.ready_count(), 3)
+        self.assertEqual(view.min_capacity(), 50)
+        self.assertEqual(view.max_capacity(["rabbit-00", "rabbit-03"]), 100)
+        self.assertIsNone(view.min_capacity([]))
+
+        view.charge("rabbit-01", 250)
+        self.assertEqual(view.candidates(100), ["rabbit-00", "rabbit-02"])
+        self.assertEqual(view.total_remaining(), 400)
+        self.assertEqual([round(load, 2) for load in view.load()], [0.0, 0.83, 0.0, 0.0])
+        view.release("rabbit-01", 250)
+        self.assertEqual(view.total_remaining(), 650)
+        self.assertEqual(int(view.allocations[1]), 0)
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_capacity_view_python(self):
+        self.check_view(False)
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_capacity_view_numpy(self):
+        self.check_view(True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# ColumnarInventory unit tests
+
+import os
+import tempfile
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.Allocator import Allocator
+from pkg.CapacityView import CapacityView
+from pkg.ColumnarInventory import ColumnarInventory
+from pkg.Config import Config
+from pkg.crd.DirectiveBreakdown import DirectiveBreakdown
+
+
+class TestColumnarInventory(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def setUp(self):
+        self.settings = Allocator.settings_from_config(Config(["dwsutil", "-c", "tests/empty.cfg"]))
+
+    def inventory(self, rabbits=3, computes=4):
+        return ColumnarInventory.from_storages(TestUtil.storage_inventory(rabbits=rabbits, computes=computes))
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_columnar_rows(self):
+        storages = TestUtil.storage_inventory(rabbits=3, computes=4)
+        inventory = ColumnarInventory.from_storages(storages)
+        self.assertEqual(list(inventory), list(storages))
+        self.assertEqual(inventory.compute_count, 12)
+        self.assertIn("rabbit-01", inventory)
+        self.assertIsNone(inventory.get("rabbit-09"))
+        for name, r in inventory.items():
+            self.assertEqual(r.to_json(), storages[name].to_json())
+        self.assertIs(inventory["rabbit-01"], inventory["rabbit-01"])
+
+    def test_columnar_planning_state(self):
+        inventory = self.inventory()
+        r = inventory["rabbit-02"]
+        r.remaining_storage -= 1000
+        r.allocationCount += 1
+        self.assertEqual(inventory.remaining[2], r.capacity - 1000)
+        self.assertEqual(inventory.allocations[2], 1)
+
+    def test_columnar_select(self):
+        storages = TestUtil.storage_inventory(rabbits=3)
+        storages["rabbit-01"] = type(storages["rabbit-01"])(TestUtil.storage_json("rabbit-01", status="NotReady"))
+        inventory = ColumnarInventory.from_storages(storages)
+        ready = inventory.select(lambda r: r.is_ready)
+        self.assertEqual(ready.names, ["rabbit-00", "rabbit-02"])
+        self.assertNotIn("rabbit-01", ready)
+        self.assertEqual(CapacityView(ready).ready_count(), 2)
+        self.assertEqual(CapacityView(inventory, use_numpy=False).ready, [True, False, True])
+
+    def test_columnar_save_load(self):
+        inventory = self.inventory()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "inventory.dwscols")
+            inventory.save(path, ["key", 1])
+            with open(path, "rb") as stream:
+                saved = stream.read()
+
+            mapped = ColumnarInventory.load(path, ["key", 1])
+            self.assertEqual(mapped.items()[1][1].to_json(), inventory["rabbit-01"].to_json())
+
+            # Planning writes to a private copy of the mapping
+            mapped["rabbit-00"].remaining_storage = 0
+            with open(path, "rb") as stream:
+                self.assertEqual(stream.read(), saved)
+
+            self.assertIsNone(ColumnarInventory.load(path, ["key", 2]))
+            self.assertIsNone(ColumnarInventory.load(os.path.join(tmpdir, "missing"), ["key", 1]))
+
+    def test_columnar_allocator(self):
+        breakdowns = [DirectiveBreakdown(TestUtil.BREAKDOWN_JSON), DirectiveBreakdown(TestUtil.LUSTRE_BREAKDOWN_JSON)]
+        for strategy in ["first", "leastallocated"]:
+            self.settings["nodes"] = 20
+            self.settings["strategy"] = strategy
+            expected = Allocator(self.settings, TestUtil.storage_inventory(rabbits=4)).plan_servers(breakdowns)
+            inventory = ColumnarInventory.from_storages(TestUtil.storage_inventory(rabbits=4))
+            allocator = Allocator(self.settings, inventory)
+            self.assertEqual(allocator.plan_servers(breakdowns), expected)
+            self.assertEqual(allocator.plan_computes(["rabbit-01"]), Allocator(self.settings, TestUtil.storage_inventory(rabbits=4)).plan_computes(["rabbit-01"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,13 +18,24 @@
 #
 # DWS unit tests
 
+import contextlib
+import copy
+import io
+import json
+import os
+import tempfile
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 # import kubernetes.client
 
 from tests.TestUtil import TestUtil
+from pkg.Allocator import Allocator
+from pkg.AssignmentPlan import AssignmentPlan
 from pkg.DWSUtility import DWSUtility
+from pkg.Dws import DWS, DWSError
+from pkg.InventoryGenerator import InventoryGenerator
+from pkg.crd.DirectiveBreakdown import DirectiveBreakdown
 
 
 class TestDWS(unittest.TestCase, TestUtil):
@@ -73,6 +84,94 @@ class TestDWS(unittest.TestCase, TestUtil):
             dwsu = DWSUtility(".")
             self.assertTrue(dwsu.config is not None)
 
+    def test_dwsutility_plan_servers_cached(self):
+        with patch("pkg.DWSUtility.DWSUtility.command_line_args") as function_mock:
+            function_mock.return_value = self.args
+            dwsu = DWSUtility(".")
+        breakdowns = [DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)]
+        plan, cached = dwsu.plan_servers(TestUtil.storage_inventory(), breakdowns)
+        self.assertFalse(cached)
+        rabbits = TestUtil.storage_inventory()
+        cached_plan, cached = dwsu.plan_servers(rabbits, breakdowns)
+        self.assertTrue(cached)
+        self.assertEqual(plan, cached_plan)
+        # A cached plan takes its capacity like a planned one, and the next
+        # workflow is planned against what is left
+        self.assertEqual(rabbits["rabbit-00"].remaining_storage, rabbits["rabbit-00"].capacity - 10000000000)
+        _, cached = dwsu.plan_servers(rabbits, breakdowns)
+        self.assertFalse(cached)
+
+    def test_dwsutility_apply_plan(self):
+        with patch("pkg.DWSUtility.DWSUtility.command_line_args") as function_mock:
+            function_mock.return_value = self.args
+            dwsu = DWSUtility(".")
+        dwsu.dws = DWS(dwsu.config)
+        plan = AssignmentPlan()
+        computes = {"name": "wfr-a", "namespace": "default", "resourceVersion": "7", "data": [{"name": "rabbit-00-c00"}]}
+        plan.add_workflow("wfr-a", [{"name": "wfr-a-0", "namespace": "default", "resourceVersion": "5", "allocationSets": []}],
+                          computes, {"rabbit-00": "1"})
+        plan.add_workflow("wfr-b", [], None, {"rabbit-01": "1"})
+        storages = [{"metadata": {"name": "rabbit-00", "resourceVersion": "1"}},
+                    {"metadata": {"name": "rabbit-01", "resourceVersion": "2"}}]
+        with patch("pkg.Dws.DWS.list_cluster_custom_object_paged") as list_mock, \
+             patch("pkg.Dws.DWS.crd_patch_raw") as patch_mock:
+            list_mock.return_value = storages
+            results = dwsu.apply_plan(plan)
+        self.assertEqual([r["result"] for r in results], ["succeeded", "conflict"])
+        self.assertEqual(results[1]["code"], DWSError.DWS_CONFLICT)
+        self.assertEqual([c.args[0] for c in patch_mock.call_args_list], ["servers", "computes"])
+        self.assertEqual(patch_mock.call_args.args[-1], "7")
+
+    def test_dwsutility_apply_plan_unchanged(self):
+        with patch("pkg.DWSUtility.DWSUtility.command_line_args") as function_mock:
+            function_mock.return_value = self.args
+            dwsu = DWSUtility(".")
+        dwsu.dws = DWS(dwsu.config)
+        plan = AssignmentPlan()
+        computes = {"name": "wfr-a", "namespace": "default", "resourceVersion": "7", "unchanged": True, "data": []}
+        plan.add_workflow("wfr-a", [{"name": "wfr-a-0", "namespace": "default", "resourceVersion": "5", "unchanged": True, "allocationSets": []},
+                                    {"name": "wfr-a-1", "namespace": "default", "resourceVersion": "6", "unchanged": False, "allocationSets": []},
+                                    {"name": "wfr-a-2", "namespace": "default", "resourceVersion": "8", "unchanged": True, "allocationSets": []}],
+                          computes, {})
+        # wfr-a-2 was changed after the plan was made
+        current = {"wfr-a-0": {"spec": {"allocationSets": []}},
+                   "wfr-a-2": {"spec": {"allocationSets": [{"label": "xfs"}]}},
+                   "wfr-a": {"data": []}}
+        with patch("pkg.Dws.DWS.crd_get_raw") as get_mock, \
+             patch("pkg.Dws.DWS.crd_patch_raw") as patch_mock:
+            get_mock.side_effect = lambda kind, name, namespace: current[name]
+            results = dwsu.apply_plan(plan)
+        self.assertEqual(results[0]["result"], "succeeded")
+        self.assertEqual(results[0]["writesAvoided"], 2)
+        self.assertEqual([c.args[1] for c in patch_mock.call_args_list], ["wfr-a-1", "wfr-a-2"])
+        # ...and is patched under the resourceVersion it was planned against
+        self.assertEqual(patch_mock.call_args.args[-1], "8")
+
+    def test_dwsutility_plan_assignment_batch(self):
+        with patch("pkg.DWSUtility.DWSUtility.command_line_args") as function_mock:
+            function_mock.return_value = self.args
+            dwsu = DWSUtility(".")
+        dwsu.config.exclude_computes = []
+        dwsu.config.exclude_rabbits = []
+        workflows = {}
+        for name in ["wf-a", "wf-b"]:
+            workflows[name] = MagicMock()
+            workflows[name].name = name
+            workflows[name].compute_obj_name = [name, "default"]
+        dwsu.dws = MagicMock()
+        dwsu.dws.wfr_get.side_effect = lambda name: workflows[name]
+        dwsu.dws.wfr_get_directiveBreakdowns.return_value = [DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)]
+        dwsu.dws.crd_get_raw.return_value = {"metadata": {"resourceVersion": "1"}}
+
+        rabbits = TestUtil.storage_inventory(rabbits=2, computes=4)
+        plan = AssignmentPlan()
+        for name in workflows:
+            dwsu.plan_assignment(name, rabbits, plan)
+        computes = [[c["name"] for c in entry["computes"]["data"]] for entry in plan.workflows]
+        self.assertEqual(len(computes[0]), 2)
+        self.assertEqual(len(computes[1]), 2)
+        self.assertFalse(set(computes[0]) & set(computes[1]))
+
     def util_get_fake_inventory(self):
         return None
 
@@ -89,3 +188,244 @@ class TestDWS(unittest.TestCase, TestUtil):
                 # dwsu.do_assign_resources()
 
             self.assertTrue(dwsu.config is not None)
+
+    def test_dwsutility_assign_resources_strategy(self):
+        with patch("pkg.DWSUtility.DWSUtility.command_line_args") as function_mock:
+            function_mock.return_value = self.args + ["--strategy", "roundrobin"]
+            dwsu = DWSUtility(".")
+        dwsu.config.exclude_computes = []
+        dwsu.config.exclude_rabbits = []
+        dwsu.config.preview = True
+        dwsu.dws = MagicMock()
+        dwsu.dws.wfr_get.return_value.name = "wf-a"
+        dwsu.dws.wfr_get_directiveBreakdowns.return_value = [DirectiveBreakdown(TestUtil.LUSTRE_BREAKDOWN_JSON)]
+        dwsu.do_get_inventory = MagicMock(return_value=(TestUtil.storage_inventory(rabbits=4), "test"))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dwsu.config.cursor_file = os.path.join(tmpdir, "cursor")
+            Allocator.save_cursor(dwsu.config.cursor_file, "rabbit-01")
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                self.assertEqual(dwsu.do_assign_resources(), 0)
+        allocation_sets = json.loads(stdout.getvalue())["results"]["breakdowns"][0]["allocationSet"]
+        # Round robin resumes after the rabbit in the cursor file
+        self.assertEqual({a["label"]: [s["name"] for s in a["storage"]] for a in allocation_sets if a["label"] != "ost"},
+                         {"mgt": ["rabbit-02"], "mdt": ["rabbit-03"]})
+
+    def test_dwsutility_assign_resources_writes_avoided(self):
+        with patch("pkg.DWSUtility.DWSUtility.command_line_args") as function_mock:
+            function_mock.return_value = self.args
+            dwsu = DWSUtility(".")
+        dwsu.config.exclude_computes = []
+        dwsu.config.exclude_rabbits = []
+        dwsu.config.preview = False
+        dwsu.dws = MagicMock()
+        dwsu.dws.wfr_get.return_value.name = "wf-a"
+        dwsu.dws.wfr_get_directiveBreakdowns.return_value = [DirectiveBreakdown(TestUtil.LUSTRE_BREAKDOWN_JSON)]
+        dwsu.do_get_inventory = MagicMock(return_value=(TestUtil.storage_inventory(rabbits=4), "test"))
+        # The Servers CR already holds its allocation sets, the Computes CR does not
+        dwsu.dws.wfr_update_servers.return_value = False
+        dwsu.dws.wfr_update_computes.return_value = True
+
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(dwsu.do_assign_resources(), 0)
+        self.assertEqual(json.loads(stdout.getvalue())["results"]["writesAvoided"], 1)
+        dwsu.dws.wfr_update_computes.assert_called_once()
+
+    def test_dwsutility_fanout(self):
+        args = self.args + ["--context", "storage", "--operation", "list", "--kctx", "dp0,dp1b,kind"]
+        with patch("pkg.DWSUtility.DWSUtility.command_line_args") as function_mock:
+            function_mock.return_value = args
+            dwsu = DWSUtility(".")
+        self.assertTrue(dwsu.config.is_fanout())
+
+        def new_client(config_file=None, context=None):
+            if context == "kind":
+                raise Exception("connection refused")
+            return context
+
+        def storage_list_names(dws):
+            return [f"{dws.api_client}-rabbit-00"]
+
+        contexts = [{"name": "dp0"}, {"name": "dp1b"}, {"name": "kind"}]
+        stdout = io.StringIO()
+        with patch("pkg.DWSUtility.k8s_config.list_kube_config_contexts") as contexts_mock, \
+             patch("pkg.DWSUtility.k8s_config.new_client_from_config", side_effect=new_client), \
+             patch("pkg.Dws.DWS.storage_list_names", autospec=True, side_effect=storage_list_names), \
+             contextlib.redirect_stdout(stdout):
+            contexts_mock.return_value = (contexts, contexts[0])
+            ret_code = dwsu.do_fanout()
+
+        self.assertEqual(ret_code, DWSError.DWS_SOME_OPERATION_FAILED)
+        output = json.loads(stdout.getvalue())
+        self.assertEqual(output["action"], "fanout")
+        entries = output["results"]["contexts"]
+        self.assertEqual([e["context"] for e in entries], ["dp0", "dp1b", "kind"])
+        self.assertEqual(entries[0]["results"], [{"rabbits": ["dp0-rabbit-00"]}])
+        self.assertEqual(entries[1]["results"], [{"rabbits": ["dp1b-rabbit-00"]}])
+        self.assertEqual(entries[2]["returnCode"], DWSError.DWS_K8S_ERROR)
+        self.assertEqual(output["results"]["failedContexts"], ["kind"])
+
+    def test_dwsutility_fanout_caches(self):
+        args = self.args + ["--context", "storage", "--operation", "list", "--kctx", "dp0,arn:aws:eks/dp1"]
+        with patch("pkg.DWSUtility.DWSUtility.command_line_args") as function_mock:
+            function_mock.return_value = args
+            dwsu = DWSUtility(".")
+        dwsu.config.topology_cache_file = "/tmp/topology.json"
+
+        workers = {}
+
+        def dispatch(worker):
+            workers[worker.config.k8s_active_context] = worker
+            return 0
+
+        with patch("pkg.DWSUtility.k8s_config.new_client_from_config"), \
+             patch("pkg.DWSUtility.DWSUtility.dispatch", autospec=True, side_effect=dispatch):
+            for context in dwsu.config.k8s_fanout_contexts:
+                self.assertEqual(dwsu.run_context(context)["returnCode"], 0)
+
+        self.assertEqual(workers["dp0"].topology_cache.cache_file, "/tmp/topology.json.dp0")
+        self.assertEqual(workers["arn:aws:eks/dp1"].topology_cache.cache_file, "/tmp/topology.json.arn_aws_eks_dp1")
+        for worker in workers.values():
+            self.assertIsNot(worker.topology_cache, dwsu.topology_cache)
+            self.assertIsNot(worker.plan_cache, dwsu.plan_cache)
+        self.assertEqual(dwsu.config.topology_cache_file, "/tmp/topology.json")
+
+    def test_dwsutility_fanout_unsupported(self):
+        args = self.args + ["--context", "wfr", "--operation", "delete", "-n", "wfr", "--all-contexts"]
+        with patch("pkg.DWSUtility.DWSUtility.command_line_args") as function_mock, \
+             contextlib.redirect_stdout(io.StringIO()):
+            function_mock.return_value = args
+            with self.assertRaises(SystemExit):
+                DWSUtility(".")
+
+    def test_dwsutility_stream_inventory(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            inventory_file = os.path.join(tmpdir, "inventory.yaml")
+            InventoryGenerator.write_inventory(InventoryGenerator(5, 4, not_ready=0.2, seed=1).storages(), inventory_file)
+            args = self.args + ["--context", "inventory", "--operation", "show", "-i", inventory_file]
+            with patch("pkg.DWSUtility.DWSUtility.command_line_args") as function_mock:
+                function_mock.return_value = args
+                dwsu = DWSUtility(".")
+            self.check_stream_inventory(dwsu)
+
+    def check_stream_inventory(self, dwsu):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            dwsu.do_show_inventory()
+        shown = json.loads(stdout.getvalue())
+
+        dwsu.config.stream_format = "json"
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(dwsu.do_show_inventory(), 0)
+        self.assertEqual(json.loads(stdout.getvalue()), shown)
+
+        dwsu.config.stream_format = "ndjson"
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(dwsu.do_show_inventory(), 0)
+        nodes = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(nodes, shown["nnfnodes"])
+
+    def test_dwsutility_stream_inventory_cluster(self):
+        args = self.args + ["--context", "inventory", "--operation", "show", "--stream", "ndjson"]
+        with patch("pkg.DWSUtility.DWSUtility.command_line_args") as function_mock:
+            function_mock.return_value = args
+            dwsu = DWSUtility(".")
+        dwsu.config.inventory_file = None
+        dwsu.dws = DWS(dwsu.config)
+
+        def storage(name):
+            return {"kind": "Storage", "metadata": {"name": name},
+                    "status": {"status": "Ready", "capacity": 1000, "access": {"computes": []}}}
+
+        pages = [{"items": [storage("rabbit-00"), storage("rabbit-01")]}, {"items": [storage("rabbit-02")]}]
+        stdout = io.StringIO()
+        with patch("pkg.Dws.DWS.list_cluster_custom_object_pages", return_value=iter(pages)), \
+             contextlib.redirect_stdout(stdout):
+            self.assertEqual(dwsu.do_show_inventory(), 0)
+        nodes = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([n["name"] for n in nodes], ["rabbit-00", "rabbit-01", "rabbit-02"])
+
+    def test_dwsutility_summarize_inventory_cluster(self):
+        args = self.args + ["--context", "inventory", "--operation", "summary"]
+        with patch("pkg.DWSUtility.DWSUtility.command_line_args") as function_mock:
+            function_mock.return_value = args
+            dwsu = DWSUtility(".")
+        dwsu.config.inventory_file = None
+        dwsu.dws = DWS(dwsu.config)
+
+        pages = [{"items": [TestUtil.storage_json("rabbit-00"), TestUtil.storage_json("rabbit-01", status="NotReady")]},
+                 {"items": [TestUtil.storage_json("rabbit-02", computes=8)]}]
+        stdout = io.StringIO()
+        with patch("pkg.Dws.DWS.list_cluster_custom_object_pages", return_value=iter(pages)), \
+             patch("pkg.DWSUtility.Storage") as storage_mock, \
+             contextlib.redirect_stdout(stdout):
+            self.assertEqual(dwsu.do_summarize_inventory(), 0)
+        storage_mock.assert_not_called()
+        results = json.loads(stdout.getvalue())["results"]
+        self.assertEqual(results["rabbits"]["total"], 3)
+        self.assertEqual(results["rabbits"]["ready"], 2)
+        self.assertEqual(results["computes"]["total"], 40)
+        self.assertEqual(results["computesPerRabbit"]["histogram"], {"8": 1, "16": 2})
+
+    def test_dwsutility_watch_replan(self):
+        args = self.args + ["--context", "inventory", "--operation", "watch", "--replan"]
+        with patch("pkg.DWSUtility.DWSUtility.command_line_args") as function_mock:
+            function_mock.return_value = args
+            dwsu = DWSUtility(".")
+        dwsu.config.preview = False
+        dwsu.config.exclude_computes = []
+        dwsu.config.exclude_rabbits = []
+
+        storages = [TestUtil.storage_json(f"rabbit-{idx:02d}", computes=4) for idx in range(3)]
+        allocation_set = [{"label": "xfs", "allocationSize": 5000000000, "storage": [{"name": "rabbit-01", "allocationCount": 2}]}]
+        gone = copy.deepcopy(storages[1])
+        gone["status"]["status"] = "NotReady"
+        resources = {"servers": {"metadata": {"resourceVersion": "11"}, "spec": {"allocationSets": allocation_set}},
+                     "computes": {"metadata": {"resourceVersion": "12"},
+                                  "data": [{"name": "rabbit-01-c00"}, {"name": "rabbit-01-c01"}]},
+                     "storages": gone}
+
+        dwsu.dws = MagicMock()
+        dwsu.dws.wfr_list_names.return_value = ["wf-a"]
+        dwsu.dws.wfr_get.return_value.name = "wf-a"
+        dwsu.dws.wfr_get.return_value.compute_obj_name = ["wf-a", "default"]
+        dwsu.dws.wfr_get_directiveBreakdowns.return_value = [DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)]
+        dwsu.dws.crd_get_raw.side_effect = lambda kind, *args: resources[kind]
+
+        replanner = dwsu.load_replanner(storages)
+        self.assertEqual(list(replanner.workflows), ["wf-a"])
+
+        result = dwsu.replan_changes(replanner, [{"name": "rabbit-01", "events": 1,
+                                                  "changes": [{"field": "status", "from": "Ready", "to": "NotReady"}]}])
+        self.assertEqual(result["failures"], [])
+        self.assertEqual(result["applied"], 2)
+        patched = {call.args[0]: call.args[1:] for call in dwsu.dws.crd_patch_raw.call_args_list}
+        self.assertEqual(patched["servers"][:2], ("w-0", "default"))
+        self.assertEqual(patched["servers"][2]["spec"]["allocationSets"][0]["storage"], [{"name": "rabbit-00", "allocationCount": 2}])
+        self.assertEqual(patched["computes"][2], {"data": [{"name": "rabbit-00-c00"}, {"name": "rabbit-00-c01"}]})
+        # Patched only if unchanged since the watch read them
+        self.assertEqual((patched["servers"][3], patched["computes"][3]), ("11", "12"))
+
+    def test_dwsutility_utilization_paged(self):
+        args = self.args + ["--context", "inventory", "--operation", "utilization"]
+        with patch("pkg.DWSUtility.DWSUtility.command_line_args") as function_mock:
+            function_mock.return_value = args
+            dwsu = DWSUtility(".")
+        dwsu.config.inventory_file = None
+        dwsu.dws = MagicMock()
+        dwsu.dws.list_cluster_custom_object_pages.return_value = iter([{"items": [TestUtil.storage_json("rabbit-00")]},
+                                                                      {"items": [TestUtil.storage_json("rabbit-01")]}])
+        dwsu.dws.list_cluster_custom_object_paged.return_value = []
+        dwsu.dws.api_host.return_value = "https://127.0.0.1:6443"
+
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(dwsu.do_inventory_utilization(), 0)
+        dwsu.dws.inventory_build_from_cluster.assert_not_called()
+        self.assertEqual([call.args[0] for call in dwsu.dws.list_cluster_custom_object_paged.call_args_list], ["servers", "computes"])
+        results = json.loads(stdout.getvalue())["results"]
+        self.assertEqual(results["source"], "Cluster-https://127.0.0.1:6443")
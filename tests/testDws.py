@@ -147,6 +147,47 @@ class TestDWS(unittest.TestCase, TestUtil):
             wfrlist = self.dws.wfr_list_names()
             self.assertEqual(len(wfrlist), 2)
 
+    def test_dws_list_cluster_custom_object_paged(self):
+        pages = [{"metadata": {"continue": "next"}, "items": [{"metadata": {"name": "s1"}}]},
+                 {"metadata": {}, "items": [{"metadata": {"name": "s2"}}]}]
+        with patch("kubernetes.client.api.custom_objects_api.CustomObjectsApi.list_cluster_custom_object") as function_mock:
+            function_mock.side_effect = pages
+            servers = self.dws.list_cluster_custom_object_paged("servers", page_size=1)
+            self.assertEqual([s["metadata"]["name"] for s in servers], ["s1", "s2"])
+            self.assertEqual(function_mock.call_args.kwargs, {"limit": 1, "_continue": "next"})
+
+    def test_dws_list_cluster_custom_object_versioned(self):
+        pages = [{"metadata": {"continue": "next", "resourceVersion": "10"}, "items": [{"metadata": {"name": "s1"}}]},
+                 {"metadata": {"resourceVersion": "10"}, "items": [{"metadata": {"name": "s2"}}]}]
+        with patch("kubernetes.client.api.custom_objects_api.CustomObjectsApi.list_cluster_custom_object") as function_mock:
+            function_mock.side_effect = pages
+            storages, resource_version = self.dws.list_cluster_custom_object_versioned("storages", page_size=1)
+            self.assertEqual(len(storages), 2)
+            self.assertEqual(resource_version, "10")
+
+    def test_dws_list_changes_since(self):
+        events = [{"type": "MODIFIED", "object": {"metadata": {"name": "s1", "resourceVersion": "12"}}}]
+        with patch("kubernetes.watch.Watch.stream") as function_mock:
+            function_mock.return_value = iter(events)
+            changes, _ = self.dws.list_changes_since("storages", "10", 1)
+            self.assertEqual(changes, events)
+            self.assertEqual(function_mock.call_args.kwargs["resource_version"], "10")
+
+            function_mock.side_effect = kubernetes.client.exceptions.ApiException(status=410, reason="Gone")
+            changes, resource_version = self.dws.list_changes_since("storages", "10", 1)
+            self.assertIsNone(changes)
+            self.assertEqual(resource_version, "10")
+
+    def test_dws_crd_patch_raw(self):
+        with patch("kubernetes.client.api.custom_objects_api.CustomObjectsApi.patch_namespaced_custom_object") as function_mock:
+            self.dws.crd_patch_raw("servers", "s1", "default", {"spec": {}}, "42")
+            self.assertEqual(function_mock.call_args.args[-1], {"spec": {}, "metadata": {"resourceVersion": "42"}})
+
+            function_mock.side_effect = kubernetes.client.exceptions.ApiException(status=409, reason="Conflict")
+            with self.assertRaises(DWSError) as ex:
+                self.dws.crd_patch_raw("servers", "s1", "default", {"spec": {}}, "42")
+            self.assertEqual(ex.exception.code, DWSError.DWS_CONFLICT)
+
     def test_dws_wfr_get_raw(self):
         test_wfr_name = TestUtil.random_wfr()
         with patch("kubernetes.client.api.custom_objects_api.CustomObjectsApi.get_namespaced_custom_object") as function_mock:
@@ -356,10 +397,34 @@ class TestDWS(unittest.TestCase, TestUtil):
         test_breakdown_name = "mybreakdown"
         serverObj = {"name": "w-0", "namespace": "default"}
         ba = {"name": test_breakdown_name, "serverObj": serverObj, "allocationSet": []}
-        with patch("kubernetes.client.api.custom_objects_api.CustomObjectsApi.patch_namespaced_custom_object") as patch_mock:
-            patch_mock.side_effect = self.side_effect_breakdown_get
-            patch_mock.return_value = TestUtil.WFR_JSON
-            self.dws.wfr_update_servers(ba)
+        with patch("kubernetes.client.api.custom_objects_api.CustomObjectsApi.get_namespaced_custom_object") as get_mock:
+            get_mock.side_effect = kubernetes.client.exceptions.ApiException(status=404, reason="Not Found")
+            with patch("kubernetes.client.api.custom_objects_api.CustomObjectsApi.patch_namespaced_custom_object") as patch_mock:
+                patch_mock.side_effect = self.side_effect_breakdown_get
+                patch_mock.return_value = TestUtil.WFR_JSON
+                self.assertTrue(self.dws.wfr_update_servers(ba))
+
+    def test_dws_update_servers_unchanged(self):
+        allocation_set = [{"label": "xfs", "allocationSize": 1000, "storage": [{"name": "rabbit-00", "allocationCount": 1}]}]
+        ba = {"name": "mybreakdown", "serverObj": ["w-0", "default"], "allocationSet": allocation_set}
+        with patch("kubernetes.client.api.custom_objects_api.CustomObjectsApi.get_namespaced_custom_object") as get_mock:
+            get_mock.return_value = {"metadata": {"name": "w-0"}, "spec": {"allocationSets": allocation_set}}
+            with patch("kubernetes.client.api.custom_objects_api.CustomObjectsApi.patch_namespaced_custom_object") as patch_mock:
+                self.assertFalse(self.dws.wfr_update_servers(ba))
+                patch_mock.assert_not_called()
+
+                get_mock.return_value = {"metadata": {"name": "w-0"}, "spec": {}}
+                self.assertTrue(self.dws.wfr_update_servers(ba))
+                patch_mock.assert_called_once()
+
+    def test_dws_update_computes_unchanged(self):
+        wfr = Workflow(TestUtil.WFR_JSON)
+        with patch("kubernetes.client.api.custom_objects_api.CustomObjectsApi.get_namespaced_custom_object") as get_mock:
+            get_mock.return_value = {"metadata": {"name": "w"}, "data": [{"name": "c1"}, {"name": "c2"}]}
+            with patch("kubernetes.client.api.custom_objects_api.CustomObjectsApi.patch_namespaced_custom_object") as patch_mock:
+                self.assertFalse(self.dws.wfr_update_computes(wfr, ["c1", "c2"]))
+                self.assertTrue(self.dws.wfr_update_computes(wfr, ["c2", "c3"]))
+                patch_mock.assert_called_once()
 
     def test_dws_inventory_build_from_cluster(self):
         with patch("kubernetes.client.api.custom_objects_api.CustomObjectsApi.list_cluster_custom_object") as function_mock:
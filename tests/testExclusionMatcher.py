@@ -0,0 +1,80 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# ExclusionMatcher unit tests
+
+import os
+import tempfile
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.Config import Config
+from pkg.Dws import DWSError
+from pkg.ExclusionMatcher import ExclusionMatcher
+
+
+class TestExclusionMatcher(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_exclusion_expand_hostlist(self):
+        self.assertEqual(ExclusionMatcher.expand_hostlist("compute-01"), ["compute-01"])
+        self.assertEqual(ExclusionMatcher.expand_hostlist("nid[008-010,12]"), ["nid008", "nid009", "nid010", "nid12"])
+        self.assertEqual(ExclusionMatcher.expand_hostlist("r[1-2]c[1-2]"), ["r1c1", "r1c2", "r2c1", "r2c2"])
+        self.assertEqual(len(ExclusionMatcher.expand_hostlist("compute_r01_[01-16]")), 16)
+        with self.assertRaises(DWSError):
+            ExclusionMatcher.expand_hostlist("nid[10-1]")
+
+    def test_exclusion_matches(self):
+        matcher = ExclusionMatcher(["Compute-00 ", "compute_r01_[01-16]", "rack2-*", "re:nid0+(7|8)", ""])
+        self.assertEqual(len(matcher), 4)
+        self.assertTrue(matcher.matches(" compute-00"))
+        self.assertTrue(matcher.matches("COMPUTE_R01_07"))
+        self.assertFalse(matcher.matches("compute_r01_17"))
+        self.assertTrue("rack2-c01" in matcher)
+        self.assertTrue(matcher.matches("nid0007"))
+        self.assertFalse(matcher.matches("nid0007x"))
+        self.assertFalse(matcher.matches("compute-01"))
+        self.assertFalse(ExclusionMatcher().matches("compute-00"))
+
+    def test_exclusion_invalid_regex(self):
+        with self.assertRaises(DWSError):
+            ExclusionMatcher(["re:nid[0-"])
+
+    def test_exclusion_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "drained.txt")
+            with open(path, "w") as stream:
+                stream.write("# drained for maintenance\ncompute-00, compute-01\ncompute-[10-11]  # cooling\n\n")
+            self.assertEqual(ExclusionMatcher.read_file(path), ["compute-00", "compute-01", "compute-[10-11]"])
+
+            config = Config(["dwsutil", "-c", "tests/empty.cfg", "--excfile", path, "--exc", "Compute-02"])
+            self.assertEqual(config.exclude_computes, ["compute-00", "compute-01", "compute-[10-11]", "compute-02"])
+            self.assertTrue(ExclusionMatcher(config.exclude_computes).matches("compute-11"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# FitCheck unit tests
+
+import os
+import tempfile
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.Allocator import Allocator
+from pkg.Config import Config
+from pkg.FitCheck import FitCheck
+
+
+class TestFitCheck(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def setUp(self):
+        self.config = Config(["dwsutil", "-c", "tests/empty.cfg"])
+        self.settings = Allocator.settings_from_config(self.config)
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_fitcheck_feasible(self):
+        self.settings["nodes"] = 4
+        rabbits = TestUtil.storage_inventory(rabbits=4, capacity=2000000000000)
+        ledger = {"rabbits": {"rabbit-00": {"allocated": 1500000000000, "allocationCount": 1}},
+                  "computes": ["rabbit-01-c00"]}
+        result = FitCheck(self.settings, rabbits, ledger).check(["#DW jobdw type=xfs capacity=200GB name=x"])
+        self.assertTrue(result["feasible"])
+        self.assertEqual(result["servers"][0]["allocationSets"][0]["storage"],
+                         [{"name": "rabbit-00", "allocationCount": 2}, {"name": "rabbit-01", "allocationCount": 2}])
+        self.assertEqual(result["computes"], ["rabbit-00-c00", "rabbit-00-c01", "rabbit-01-c01", "rabbit-01-c02"])
+
+        # Checking takes nothing from the inventory
+        self.assertEqual(rabbits["rabbit-00"].remaining_storage, 500000000000)
+        self.assertEqual(rabbits["rabbit-01"].remaining_storage, 2000000000000)
+
+    def test_fitcheck_infeasible(self):
+        self.settings["nodes"] = 40
+        rabbits = TestUtil.storage_inventory(rabbits=2)
+        fitcheck = FitCheck(self.settings, rabbits)
+        result = fitcheck.check(["#DW jobdw type=lustre capacity=1TB name=l"])
+        self.assertFalse(result["feasible"])
+        self.assertIn("40 nodes", result["message"])
+
+        fitcheck.allocator.nodes = 2
+        self.assertTrue(fitcheck.check(["#DW jobdw type=lustre capacity=1TB name=l"])["feasible"])
+
+    def test_fitcheck_load_ledger(self):
+        self.assertEqual(FitCheck.load_ledger(None), {"rabbits": {}, "computes": []})
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "ledger.yaml")
+            with open(path, "w") as stream:
+                stream.write("rabbits:\n  rabbit-00:\n    allocated: 10\ncomputes: [rabbit-00-c00]\n")
+            ledger = FitCheck.load_ledger(path)
+        self.assertEqual(ledger["rabbits"]["rabbit-00"]["allocated"], 10)
+        self.assertEqual(ledger["computes"], ["rabbit-00-c00"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# InventoryFile unit tests
+
+import os
+import pickle
+import tempfile
+import unittest
+
+import yaml
+
+from tests.TestUtil import TestUtil
+from pkg.InventoryFile import InventoryFile
+
+
+class Planted:
+    """Creates a file when unpickled."""
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return (open, (self.path, "w"))
+
+
+class TestInventoryFile(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.inventory_file = os.path.join(self.tmpdir.name, "inventory.yaml")
+        self.write_inventory(3)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_inventory(self, rabbits):
+        nodes = [TestUtil.storage_json(f"rabbit-{idx:02d}", computes=2) for idx in range(rabbits)]
+        with open(self.inventory_file, "w") as stream:
+            yaml.safe_dump({"system": {"nnf-nodes": nodes}}, stream)
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_inventory_file_cache(self):
+        reader = InventoryFile(self.inventory_file)
+        parsed = reader.load()
+        self.assertFalse(reader.cached)
+        self.assertTrue(os.path.exists(reader.cache_file))
+
+        cached = reader.load()
+        self.assertTrue(reader.cached)
+        self.assertEqual(parsed, cached)
+
+    def test_inventory_file_cache_stale(self):
+        reader = InventoryFile(self.inventory_file)
+        reader.load()
+        self.write_inventory(4)
+        st = os.stat(self.inventory_file)
+        os.utime(self.inventory_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+
+        inventory_data = reader.load()
+        self.assertFalse(reader.cached)
+        self.assertEqual(len(inventory_data["system"]["nnf-nodes"]), 4)
+        reader.load()
+        self.assertTrue(reader.cached)
+
+    def test_inventory_file_cache_corrupt(self):
+        reader = InventoryFile(self.inventory_file)
+        with open(reader.cache_file, "wb") as stream:
+            stream.write(b"not json")
+        inventory_data = reader.load()
+        self.assertFalse(reader.cached)
+        self.assertEqual(len(inventory_data["system"]["nnf-nodes"]), 3)
+
+        # A current header does not make a damaged body usable
+        with open(reader.cache_file, "r") as stream:
+            header = stream.readline()
+        with open(reader.cache_file, "w") as stream:
+            stream.write(header + '{"system": ')
+        inventory_data = reader.load()
+        self.assertFalse(reader.cached)
+        self.assertEqual(len(inventory_data["system"]["nnf-nodes"]), 3)
+
+    def test_inventory_file_cache_pickle(self):
+        # A cache file planted by someone else is never unpickled
+        marker = os.path.join(self.tmpdir.name, "ran")
+        reader = InventoryFile(self.inventory_file)
+        with open(reader.cache_file, "wb") as stream:
+            pickle.dump(Planted(marker), stream)
+        inventory_data = reader.load()
+        self.assertFalse(reader.cached)
+        self.assertFalse(os.path.exists(marker))
+        self.assertEqual(len(inventory_data["system"]["nnf-nodes"]), 3)
+
+    def test_inventory_file_columns(self):
+        reader = InventoryFile(self.inventory_file)
+        inventory = reader.load_columns()
+        self.assertFalse(reader.cached)
+        self.assertEqual(inventory.names, ["rabbit-00", "rabbit-01", "rabbit-02"])
+
+        mapped = reader.load_columns()
+        self.assertTrue(reader.cached)
+        self.assertEqual(mapped["rabbit-02"].computes, inventory["rabbit-02"].computes)
+
+    def test_inventory_file_no_cache(self):
+        reader = InventoryFile(self.inventory_file, use_cache=False)
+        reader.load()
+        reader.load()
+        self.assertFalse(reader.cached)
+        self.assertFalse(os.path.exists(reader.cache_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# InventoryGenerator unit tests
+
+import json
+import os
+import tempfile
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.Dws import DWSError
+from pkg.InventoryFile import InventoryFile
+from pkg.InventoryGenerator import InventoryGenerator
+from pkg.crd.Storage import Storage
+
+
+class TestInventoryGenerator(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_inventorygenerator_parse_capacity(self):
+        self.assertEqual(InventoryGenerator.parse_capacity("40TB"), ("fixed", [40 * 10**12]))
+        self.assertEqual(InventoryGenerator.parse_capacity("uniform:10TB-40TB"), ("uniform", [10 * 10**12, 40 * 10**12]))
+        self.assertEqual(InventoryGenerator.parse_capacity("normal:30TB,5TB"), ("normal", [30 * 10**12, 5 * 10**12]))
+        self.assertEqual(InventoryGenerator.parse_capacity("choice:1TiB,2TiB,4TiB"), ("choice", [2**40, 2**41, 2**42]))
+        for spec in ["uniform:40TB-10TB", "normal:30TB", "lognormal:1TB,2TB", "lots"]:
+            with self.assertRaises(DWSError):
+                InventoryGenerator.parse_capacity(spec)
+
+    def test_inventorygenerator_patterns(self):
+        InventoryGenerator.check_patterns("nid-{r}", "x{n}")
+        InventoryGenerator.check_patterns("nid-{r}", "nid-{r}-{c}")
+        with self.assertRaises(DWSError):
+            InventoryGenerator.check_patterns("rabbit", "x{n}")
+        with self.assertRaises(DWSError):
+            InventoryGenerator.check_patterns("rabbit-{r}", "compute-{c}")
+        # Unknown fields, format specs, conversions, and stray braces
+        for rabbit_pattern, compute_pattern in [("rabbit-{r}", "compute-{x}-{n}"), ("rabbit-{r}-{c}", "x{n}"),
+                                                ("rabbit-{r:02d}", "x{n}"), ("rabbit-{r}", "x{n!r}"),
+                                                ("rabbit-{r}", "x{}{n}"), ("rabbit-{r", "x{n}")]:
+            with self.assertRaises(DWSError):
+                InventoryGenerator.check_patterns(rabbit_pattern, compute_pattern)
+
+    def test_inventorygenerator_pattern_clash(self):
+        # Rabbit 2 and compute 2 are both 'node-2'
+        generator = InventoryGenerator(3, 1, rabbit_pattern="node-{r}", compute_pattern="node-{n}")
+        with self.assertRaises(DWSError):
+            generator.storages()
+        generator = InventoryGenerator(3, 1, rabbit_pattern="node-{r}", compute_pattern="node-{r}-{c}")
+        self.assertEqual(len(generator.storages()), 3)
+
+    def test_inventorygenerator_storages(self):
+        generator = InventoryGenerator(120, 4, "uniform:10TB-40TB", 0.1, 0.25, compute_pattern="x{n}", seed=7)
+        storages = generator.storages()
+        self.assertEqual(storages, InventoryGenerator(120, 4, "uniform:10TB-40TB", 0.1, 0.25, compute_pattern="x{n}", seed=7).storages())
+        self.assertNotEqual(storages, InventoryGenerator(120, 4, "uniform:10TB-40TB", 0.1, 0.25, compute_pattern="x{n}", seed=8).storages())
+
+        rabbits = [Storage(s) for s in storages]
+        self.assertEqual(rabbits[0].name, "rabbit-001")
+        self.assertEqual(rabbits[-1].computes[-1]["name"], "x480")
+        self.assertEqual(len(set(r.name for r in rabbits)), 120)
+        self.assertEqual(len([r for r in rabbits if not r.is_ready]), 12)
+        computes = [c for r in rabbits for c in r.computes]
+        self.assertEqual(len(set(c["name"] for c in computes)), 480)
+        self.assertEqual(len([c for c in computes if c["status"] != "Ready"]), 120)
+        self.assertTrue(all(10 * 10**12 <= r.capacity <= 40 * 10**12 for r in rabbits))
+
+    def test_inventorygenerator_write(self):
+        storages = InventoryGenerator(5, 2, "choice:1TB,2TB", 0.2).storages()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            inventory_file = os.path.join(tmpdir, "inventory.yaml")
+            storage_file = os.path.join(tmpdir, "storages.json")
+            InventoryGenerator.write_inventory(storages, inventory_file)
+            InventoryGenerator.write_storages(storages, storage_file)
+
+            self.assertEqual(InventoryFile(inventory_file, use_cache=False).load(), {"system": {"nnf-nodes": storages}})
+            with open(storage_file, "r") as stream:
+                body = json.load(stream)
+            self.assertEqual(body["kind"], "List")
+            self.assertEqual(body["items"], storages)
+            self.assertEqual(body["items"][0]["kind"], "Storage")
+            self.assertEqual(sorted(os.listdir(tmpdir)), ["inventory.yaml", "storages.json"])
+
+
+if __name__ == '__main__':
+    unittest.main()
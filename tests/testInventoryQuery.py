@@ -0,0 +1,93 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# InventoryQuery unit tests
+
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.ColumnarInventory import ColumnarInventory
+from pkg.Dws import DWSError
+from pkg.InventoryQuery import InventoryQuery
+from pkg.crd.Storage import Storage
+
+
+class TestInventoryQuery(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def setUp(self):
+        storages = [TestUtil.storage_json("rabbit-00", computes=16, capacity=10 * 10**12),
+                    TestUtil.storage_json("rabbit-01", computes=16, capacity=20 * 10**12),
+                    TestUtil.storage_json("rabbit-02", computes=8, capacity=40 * 10**12),
+                    TestUtil.storage_json("rabbit-03", computes=16, capacity=40 * 10**12, status="NotReady")]
+        for compute in storages[1]["status"]["access"]["computes"][:6]:
+            compute["status"] = "Offline"
+        self.rabbits = {s["metadata"]["name"]: Storage(s) for s in storages}
+        self.index = InventoryQuery(self.rabbits)
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_inventoryquery_fields(self):
+        self.assertEqual(self.index.query("status == Ready and capacity >= 20TB and readycomputes >= 10"), ["rabbit-01"])
+        self.assertEqual(self.index.query("status == ready and capacity >= 20TB"), ["rabbit-01", "rabbit-02"])
+        self.assertEqual(self.index.query("compute == rabbit-01-c03"), ["rabbit-01"])
+        self.assertEqual(self.index.query("compute == missing"), [])
+        self.assertEqual(self.index.query("capacity == 40TB"), ["rabbit-02", "rabbit-03"])
+        self.assertEqual(self.index.query("capacity != 40TB"), ["rabbit-00", "rabbit-01"])
+        self.assertEqual(self.index.query("capacity < 20TB"), ["rabbit-00"])
+        self.assertEqual(self.index.query("capacity <= 20TB"), ["rabbit-00", "rabbit-01"])
+        self.assertEqual(self.index.query("capacity > 20TB"), ["rabbit-02", "rabbit-03"])
+        self.assertEqual(self.index.query("computes < 16"), ["rabbit-02"])
+        self.assertEqual(self.index.query("readycomputes == 10"), ["rabbit-01"])
+        self.assertEqual(self.index.query("status != Ready"), ["rabbit-03"])
+
+    def test_inventoryquery_patterns(self):
+        self.assertEqual(self.index.query("name ~ rabbit-0[1-2]"), ["rabbit-01", "rabbit-02"])
+        self.assertEqual(self.index.query("name ~ 'rabbit-0*'"), ["rabbit-00", "rabbit-01", "rabbit-02", "rabbit-03"])
+        self.assertEqual(self.index.query("compute ~ 're:rabbit-0(0|3)-c15'"), ["rabbit-00", "rabbit-03"])
+        self.assertEqual(self.index.query("status ~ not*"), ["rabbit-03"])
+
+    def test_inventoryquery_boolean(self):
+        self.assertEqual(self.index.query("not status == Ready or computes < 16"), ["rabbit-02", "rabbit-03"])
+        self.assertEqual(self.index.query("capacity >= 20TB and (name == rabbit-01 or name == rabbit-03)"), ["rabbit-01", "rabbit-03"])
+        self.assertEqual(self.index.query("NOT (capacity >= 20TB AND status == Ready)"), ["rabbit-00", "rabbit-03"])
+
+    def test_inventoryquery_errors(self):
+        for expression in ["status >= Ready", "capacity ~ 1TB", "size == 1", "status ==", "(status == Ready",
+                           "status == Ready extra", "computes > many", "capacity > lots", "name ~ 're:(a'", "status = Ready"]:
+            with self.assertRaises(DWSError, msg=expression):
+                InventoryQuery.parse(expression)
+
+    def test_inventoryquery_columnar(self):
+        columns = InventoryQuery(ColumnarInventory.from_storages(self.rabbits))
+        for expression in ["status == Ready and capacity >= 20TB", "compute == rabbit-02-c07", "readycomputes < 16"]:
+            self.assertEqual(columns.query(expression), self.index.query(expression))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# InventorySnapshot unit tests
+
+import os
+import tempfile
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.Config import Config
+from pkg.DWSUtility import DWSUtility
+from pkg.InventorySnapshot import InventorySnapshot
+
+
+class TestInventorySnapshot(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def storage(self, name, resource_version):
+        storage = TestUtil.storage_json(name, computes=2)
+        storage["metadata"]["resourceVersion"] = resource_version
+        storage["metadata"]["managedFields"] = [{"manager": "nnf-controller"}]
+        return storage
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_inventorysnapshot_reconcile(self):
+        snapshot = InventorySnapshot()
+        counts = snapshot.reconcile([self.storage("rabbit-00", "1"), self.storage("rabbit-01", "2")], "10")
+        self.assertEqual(counts, {"added": 2, "modified": 0, "deleted": 0, "unchanged": 0})
+        self.assertNotIn("managedFields", snapshot.nodes["rabbit-00"]["metadata"])
+
+        counts = snapshot.reconcile([self.storage("rabbit-00", "1"), self.storage("rabbit-02", "3")], "11")
+        self.assertEqual(counts, {"added": 1, "modified": 0, "deleted": 1, "unchanged": 1})
+        self.assertEqual(snapshot.resource_version, "11")
+
+    def test_inventorysnapshot_apply(self):
+        snapshot = InventorySnapshot()
+        snapshot.reconcile([self.storage("rabbit-00", "1"), self.storage("rabbit-01", "2"), self.storage("rabbit-02", "3")], "10")
+        events = [{"type": "MODIFIED", "object": self.storage("rabbit-00", "11")},
+                  {"type": "MODIFIED", "object": self.storage("rabbit-00", "12")},
+                  {"type": "DELETED", "object": self.storage("rabbit-01", "13")},
+                  {"type": "ADDED", "object": self.storage("rabbit-03", "14")},
+                  {"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "15"}}}]
+        counts = snapshot.apply(events, "15")
+        self.assertEqual(counts, {"added": 1, "modified": 1, "deleted": 1, "unchanged": 1})
+        self.assertEqual(sorted(snapshot.nodes), ["rabbit-00", "rabbit-02", "rabbit-03"])
+        self.assertEqual(snapshot.nodes["rabbit-00"]["metadata"]["resourceVersion"], "12")
+
+    def test_inventorysnapshot_save_load(self):
+        snapshot = InventorySnapshot()
+        snapshot.reconcile([self.storage("rabbit-01", "2"), self.storage("rabbit-00", "1")], "10")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "inventory.yaml")
+            snapshot.save(path)
+            loaded = InventorySnapshot.load(path)
+            self.assertEqual(loaded.resource_version, "10")
+            self.assertEqual(loaded.nodes, snapshot.nodes)
+
+            # The snapshot is a loadable inventory file
+            dwsu = DWSUtility.__new__(DWSUtility)
+            dwsu.config = Config(["dwsutil", "-c", "tests/empty.cfg", "-i", path, "--noinventorycache"])
+            self.assertEqual(sorted(dwsu.do_load_inventory_file()), ["rabbit-00", "rabbit-01"])
+            dwsu.config.columnar = True
+            self.assertEqual(sorted(dwsu.do_load_inventory_file()), ["rabbit-00", "rabbit-01"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# InventorySummary unit tests
+
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.ColumnarInventory import ColumnarInventory
+from pkg.InventorySummary import InventorySummary
+
+
+class TestInventorySummary(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def setUp(self):
+        self.storages = [TestUtil.storage_json("rabbit-00", computes=16, capacity=10 * 10**12),
+                         TestUtil.storage_json("rabbit-01", computes=16, capacity=20 * 10**12),
+                         TestUtil.storage_json("rabbit-02", computes=8, capacity=40 * 10**12),
+                         TestUtil.storage_json("rabbit-03", computes=16, capacity=40 * 10**12, status="NotReady")]
+        for compute in self.storages[1]["status"]["access"]["computes"][:6]:
+            compute["status"] = "Offline"
+        # The rabbit itself is not one of its computes
+        self.storages[2]["status"]["access"]["computes"].append({"name": "rabbit-02", "status": "Ready"})
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_inventorysummary_storages(self):
+        summary = InventorySummary()
+        for storage in self.storages:
+            summary.add_storage(storage)
+        body = summary.to_json()
+        self.assertEqual(body["rabbits"], {"total": 4, "ready": 3, "statuses": {"NotReady": 1, "Ready": 3}})
+        self.assertEqual(body["computes"], {"total": 56, "ready": 50})
+        self.assertEqual(body["capacity"]["total"], 110 * 10**12)
+        self.assertEqual(body["capacity"]["ready"], 70 * 10**12)
+        self.assertEqual(body["capacity"]["min"], 10 * 10**12)
+        self.assertEqual(body["capacity"]["p50"], 20 * 10**12)
+        self.assertEqual(body["capacity"]["p90"], 40 * 10**12)
+        self.assertEqual(body["computesPerRabbit"]["histogram"], {"8": 1, "16": 3})
+        self.assertEqual(body["computesPerRabbit"]["p50"], 16)
+        self.assertEqual(body["computesPerRabbit"]["mean"], 14.0)
+
+    def test_inventorysummary_columns(self):
+        summary = InventorySummary()
+        for storage in self.storages:
+            summary.add_storage(storage)
+        columns = InventorySummary()
+        columns.add_columns(ColumnarInventory.from_document({"system": {"nnf-nodes": self.storages}}))
+        self.assertEqual(columns.to_json(), summary.to_json())
+
+    def test_inventorysummary_empty(self):
+        body = InventorySummary().to_json()
+        self.assertEqual(body["rabbits"]["total"], 0)
+        self.assertIsNone(body["capacity"]["p50"])
+        self.assertIsNone(body["computesPerRabbit"]["p99"])
+
+    def test_inventorysummary_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(InventorySummary.percentile(values, 50), 50)
+        self.assertEqual(InventorySummary.percentile(values, 99), 99)
+        self.assertEqual(InventorySummary.percentile([7], 90), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
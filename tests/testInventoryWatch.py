@@ -0,0 +1,130 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# InventoryWatch unit tests
+
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from tests.TestUtil import TestUtil
+from pkg.InventoryWatch import InventoryWatch
+
+
+class TestInventoryWatch(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def storage(self, name, resource_version, status="Ready", compute_status=None):
+        storage = TestUtil.storage_json(name, computes=2, status=status)
+        storage["metadata"]["resourceVersion"] = resource_version
+        if compute_status is not None:
+            storage["status"]["access"]["computes"][0]["status"] = compute_status
+        return storage
+
+    def watch(self):
+        watch = InventoryWatch(MagicMock(), debounce=2.0, clock=lambda: 0.0)
+        watch.load([self.storage("rabbit-00", "1"), self.storage("rabbit-01", "2")], "10")
+        return watch
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_inventorywatch_diff(self):
+        before = InventoryWatch.summarize(self.storage("rabbit-00", "1"))
+        after = InventoryWatch.summarize(self.storage("rabbit-00", "2", status="NotReady", compute_status="Offline"))
+        self.assertEqual(InventoryWatch.diff(before, after),
+                         [{"field": "status", "from": "Ready", "to": "NotReady"},
+                          {"field": "compute", "compute": "rabbit-00-c00", "from": "Ready", "to": "Offline"}])
+        self.assertEqual(InventoryWatch.diff(before, before), [])
+        self.assertEqual(InventoryWatch.diff(None, before), [{"field": "rabbit", "from": "Absent", "to": "Present"}])
+
+    def test_inventorywatch_debounce(self):
+        watch = self.watch()
+        watch.apply({"type": "MODIFIED", "object": self.storage("rabbit-00", "11", status="NotReady")}, now=0.0)
+        watch.apply({"type": "MODIFIED", "object": self.storage("rabbit-00", "12", compute_status="Offline")}, now=1.0)
+        # Metadata only changes are not tracked
+        watch.apply({"type": "MODIFIED", "object": self.storage("rabbit-01", "13")}, now=1.0)
+        self.assertEqual(watch.resource_version, "13")
+        self.assertEqual(watch.flush(now=2.5), [])
+
+        records = watch.flush(now=3.0)
+        self.assertEqual(records, [{"name": "rabbit-00", "events": 2,
+                                    "changes": [{"field": "compute", "compute": "rabbit-00-c00", "from": "Ready", "to": "Offline"}]}])
+        self.assertIsNone(watch.next_flush())
+
+    def test_inventorywatch_flapped_and_overdue(self):
+        watch = self.watch()
+        watch.apply({"type": "MODIFIED", "object": self.storage("rabbit-00", "11", status="NotReady")}, now=0.0)
+        watch.apply({"type": "MODIFIED", "object": self.storage("rabbit-00", "12")}, now=1.0)
+        self.assertEqual(watch.flush(now=3.0), [{"name": "rabbit-00", "events": 2, "changes": [], "flapped": True}])
+
+        # A rabbit that never settles is reported after MAX_DELAY debounce intervals
+        for second in range(12):
+            status = "NotReady" if second % 2 == 0 else "Ready"
+            watch.apply({"type": "MODIFIED", "object": self.storage("rabbit-01", str(20 + second), status=status)}, now=float(second))
+            records = watch.flush(now=float(second))
+            if records:
+                break
+        self.assertEqual(second, 2 * InventoryWatch.MAX_DELAY)
+
+    def test_inventorywatch_resync(self):
+        watch = self.watch()
+        watch.resync([self.storage("rabbit-01", "5", status="NotReady"), self.storage("rabbit-02", "6")], "30", now=0.0)
+        records = {record["name"]: record["changes"] for record in watch.flush(now=0.0, force=True)}
+        self.assertEqual(records["rabbit-00"], [{"field": "rabbit", "from": "Present", "to": "Absent"}])
+        self.assertEqual(records["rabbit-01"], [{"field": "status", "from": "Ready", "to": "NotReady"}])
+        self.assertEqual(records["rabbit-02"], [{"field": "rabbit", "from": "Absent", "to": "Present"}])
+        self.assertEqual(watch.resource_version, "30")
+
+    def test_inventorywatch_run(self):
+        dws = MagicMock()
+        dws.list_cluster_custom_object_versioned.side_effect = [([self.storage("rabbit-00", "1")], "10"),
+                                                                ([self.storage("rabbit-00", "15", status="NotReady")], "15")]
+        streams = [[{"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "12"}}},
+                    {"type": "ERROR", "object": {"code": 410}}]]
+
+        def watch_changes(plural, resource_version, timeout_seconds):
+            if streams:
+                yield from streams.pop(0)
+            else:
+                time.sleep(0.01)
+        dws.watch_changes.side_effect = watch_changes
+
+        emitted = []
+        loaded = []
+        watch = InventoryWatch(dws, debounce=0.05)
+        watch.run(emitted.append, duration=0.3, loaded=loaded.append)
+        self.assertEqual(loaded, [[self.storage("rabbit-00", "1")]])
+        self.assertEqual(dws.watch_changes.call_args_list[0].args[1], "10")
+        self.assertEqual(dws.watch_changes.call_args_list[1].args[1], "15")
+        self.assertEqual(watch.relists, 1)
+        self.assertEqual(emitted, [[{"name": "rabbit-00", "events": 1,
+                                     "changes": [{"field": "status", "from": "Ready", "to": "NotReady"}]}]])
+
+
+if __name__ == '__main__':
+    unittest.main()
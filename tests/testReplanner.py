@@ -0,0 +1,143 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Replanner unit tests
+
+import copy
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.Allocator import Allocator
+from pkg.Config import Config
+from pkg.Replanner import Replanner
+from pkg.crd.DirectiveBreakdown import DirectiveBreakdown
+
+
+class TestReplanner(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def setUp(self):
+        self.config = Config(["dwsutil", "-c", "tests/empty.cfg"])
+        self.settings = Allocator.settings_from_config(self.config)
+        self.rabbits = TestUtil.storage_inventory(rabbits=4, computes=4)
+        self.replanner = Replanner(self.settings, self.rabbits)
+
+    def changed(self, name, status=None, compute_status=None):
+        raw = copy.deepcopy(self.replanner.inventory[name].raw_storage)
+        if status is not None:
+            raw["status"]["status"] = status
+        for compute_name, value in (compute_status or {}).items():
+            for c in raw["status"]["access"]["computes"]:
+                if c["name"] == compute_name:
+                    c["status"] = value
+        return raw
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_replanner_add_workflow(self):
+        result = self.replanner.add_workflow("wf-a", [DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)], 6, ["wf-a", "default"])
+        self.assertEqual(result["failures"], [])
+        servers, computes = result["patches"]
+        self.assertEqual(servers["allocationSets"][0]["storage"],
+                         [{"name": "rabbit-00", "allocationCount": 4}, {"name": "rabbit-01", "allocationCount": 2}])
+        self.assertEqual(computes["computes"], ["rabbit-00-c00", "rabbit-00-c01", "rabbit-00-c02",
+                                                "rabbit-00-c03", "rabbit-01-c00", "rabbit-01-c01"])
+        self.assertEqual(self.replanner.rabbit_index["rabbit-01"], {("wf-a", 0)})
+        self.assertEqual(self.replanner.compute_index["rabbit-01-c01"], "wf-a")
+
+        # The next workflow only gets what is left
+        result = self.replanner.add_workflow("wf-b", [DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)], 2)
+        self.assertEqual(result["patches"][1]["computes"], ["rabbit-01-c02", "rabbit-01-c03"])
+
+    def test_replanner_rabbit_not_ready(self):
+        self.replanner.add_workflow("wf-a", [DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)], 4)
+        self.replanner.add_workflow("wf-b", [DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)], 2)
+        untouched = self.replanner.workflows["wf-a"]["breakdowns"][0]["allocationSet"]
+
+        result = self.replanner.update_storage(self.changed("rabbit-01", status="NotReady"))
+        self.assertEqual(result["failures"], [])
+        self.assertEqual([(p["kind"], p["workflow"]) for p in result["patches"]], [("servers", "wf-b"), ("computes", "wf-b")])
+        self.assertEqual(result["patches"][0]["allocationSets"][0]["storage"], [{"name": "rabbit-02", "allocationCount": 2}])
+        self.assertEqual(result["patches"][1]["computes"], ["rabbit-02-c00", "rabbit-02-c01"])
+        self.assertEqual(self.replanner.rabbit_index["rabbit-01"], set())
+        self.assertEqual(self.replanner.workflows["wf-a"]["breakdowns"][0]["allocationSet"], untouched)
+        self.assertEqual(self.replanner.inventory["rabbit-01"].remaining_storage, self.replanner.inventory["rabbit-01"].capacity)
+
+    def test_replanner_compute_offline(self):
+        self.replanner.add_workflow("wf-a", [DirectiveBreakdown(TestUtil.LUSTRE_BREAKDOWN_JSON)], 2)
+        computes = list(self.replanner.workflows["wf-a"]["computes"])
+
+        result = self.replanner.update_storage(self.changed("rabbit-00", compute_status={computes[0]: "Offline"}))
+        self.assertEqual(len(result["patches"]), 1)
+        self.assertEqual(result["patches"][0]["kind"], "computes")
+        self.assertEqual(result["patches"][0]["computes"][0], computes[1])
+        self.assertNotIn(computes[0], result["patches"][0]["computes"])
+        self.assertNotIn(computes[0], self.replanner.compute_index)
+
+    def test_replanner_load_workflow(self):
+        allocation_set = [{"label": "xfs", "allocationSize": 5000000000, "storage": [{"name": "rabbit-03", "allocationCount": 2}]}]
+        self.replanner.load_workflow("wf-a", [DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)], [allocation_set],
+                                     ["rabbit-03-c00", "rabbit-03-c01"])
+        self.assertEqual(self.replanner.inventory["rabbit-03"].allocationCount, 2)
+
+        # Changes elsewhere leave the workflow alone
+        self.assertEqual(self.replanner.update_storage(self.changed("rabbit-01", status="NotReady"))["patches"], [])
+
+        result = self.replanner.update_storage(self.changed("rabbit-03", compute_status={"rabbit-03-c01": "Offline"}))
+        self.assertEqual([p["kind"] for p in result["patches"]], ["servers", "computes"])
+        self.assertEqual(result["patches"][1]["computes"], ["rabbit-00-c00", "rabbit-00-c01"])
+
+    def test_replanner_rabbit_not_ready_per_compute(self):
+        # Both xfs workflows sit on rabbit-00 and move when it fails
+        self.replanner.add_workflow("wf-a", [DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)], 2)
+        self.replanner.add_workflow("wf-b", [DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)], 2)
+        self.assertEqual(self.replanner.rabbit_index["rabbit-00"], {("wf-a", 0), ("wf-b", 0)})
+
+        result = self.replanner.update_storage(self.changed("rabbit-00", status="NotReady"))
+        self.assertEqual(result["failures"], [])
+        computes = {p["workflow"]: p["computes"] for p in result["patches"] if p["kind"] == "computes"}
+        self.assertEqual(computes, {"wf-a": ["rabbit-01-c00", "rabbit-01-c01"], "wf-b": ["rabbit-01-c02", "rabbit-01-c03"]})
+        for workflow_name, names in computes.items():
+            for name in names:
+                self.assertEqual(self.replanner.compute_index[name], workflow_name)
+
+    def test_replanner_remove_storage(self):
+        self.replanner.add_workflow("wf-a", [DirectiveBreakdown(TestUtil.BREAKDOWN_JSON)], 2)
+        self.assertIn("rabbit-00", self.replanner.rabbit_index)
+
+        result = self.replanner.remove_storage("rabbit-00")
+        self.assertEqual(result["failures"], [])
+        servers, computes = result["patches"]
+        self.assertEqual(servers["allocationSets"][0]["storage"], [{"name": "rabbit-01", "allocationCount": 2}])
+        self.assertEqual(computes["computes"], ["rabbit-01-c00", "rabbit-01-c01"])
+        self.assertEqual(self.replanner.free_computes["rabbit-00"], {})
+        self.assertEqual(self.replanner.remove_storage("rabbit-99"), {"patches": [], "failures": []})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Directive and Simulator unit tests
+
+import json
+import os
+import tempfile
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.Allocator import Allocator
+from pkg.Config import Config
+from pkg.Directive import Directive
+from pkg.Dws import DWSError
+from pkg.Simulator import Simulator
+
+
+class TestSimulator(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def setUp(self):
+        self.config = Config(["dwsutil", "-c", "tests/empty.cfg"])
+        self.settings = Allocator.settings_from_config(self.config)
+
+    def job(self, arrival, duration, nodes, directives):
+        return {"name": f"job-{arrival}", "arrival": arrival, "duration": duration, "nodes": nodes, "directives": directives}
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_directive_parse_capacity(self):
+        self.assertEqual(Directive.parse_capacity("5GB"), 5000000000)
+        self.assertEqual(Directive.parse_capacity("1TiB"), 2**40)
+        self.assertEqual(Directive.parse_capacity("1.5gb"), 1500000000)
+        self.assertEqual(Directive.parse_capacity(1024), 1024)
+        with self.assertRaises(DWSError):
+            Directive.parse_capacity("10 bananas")
+
+    def test_directive_breakdown_json(self):
+        xfs = Directive("#DW jobdw type=xfs capacity=5GB name=myxfs").breakdown_json()
+        self.assertEqual(xfs["metadata"]["name"], "myxfs")
+        allocs = xfs["status"]["storage"]["allocationSets"]
+        self.assertEqual([(a["label"], a["allocationStrategy"]) for a in allocs], [("xfs", "AllocatePerCompute")])
+
+        lustre = Directive("#DW jobdw type=lustre capacity=10TB name=mylustre").allocation_sets()
+        self.assertEqual([a["label"] for a in lustre], ["mgt", "mdt", "ost"])
+        self.assertEqual(lustre[2]["minimumCapacity"], 10000000000000)
+
+        self.assertIsNone(Directive("#DW persistentdw name=mypersistent").breakdown_json())
+        with self.assertRaises(DWSError):
+            Directive("#DW jobdw type=nfs capacity=5GB name=bad").allocation_sets()
+        with self.assertRaises(DWSError):
+            Directive("jobdw type=xfs")
+
+    def test_simulator_releases_capacity(self):
+        rabbits = TestUtil.storage_inventory(rabbits=2, computes=4, capacity=10000)
+        xfs = ["#DW jobdw type=xfs capacity=1000B name=x"]
+        jobs = [self.job(0, 100, 4, xfs),
+                self.job(10, 100, 4, xfs),
+                self.job(20, 100, 4, xfs),    # No computes left
+                self.job(200, 100, 8, xfs)]   # Everything released by now
+        results = Simulator(self.settings, rabbits, jobs, sample_interval=50).run()
+        self.assertEqual(results["accepted"], 3)
+        self.assertEqual(results["rejected"], 1)
+        self.assertEqual(results["rejectionRate"], 0.25)
+        self.assertEqual(results["span"], 300)
+        self.assertEqual(results["rabbits"], ["rabbit-00", "rabbit-01"])
+        self.assertEqual(results["samples"][0]["load"], [0.0, 0.0])
+        self.assertEqual(results["samples"][1]["load"], [0.4, 0.4])
+        self.assertEqual(results["samples"][1]["computeUtilization"], 1.0)
+        for r in rabbits.values():
+            self.assertEqual(r.remaining_storage, r.capacity)
+
+    def test_simulator_capacity_rejection(self):
+        rabbits = TestUtil.storage_inventory(rabbits=1, computes=4, capacity=10000)
+        jobs = [self.job(0, 100, 2, ["#DW jobdw type=xfs capacity=4000B name=x"]),
+                self.job(1, 100, 2, ["#DW jobdw type=xfs capacity=4000B name=x"])]
+        results = Simulator(self.settings, rabbits, jobs).run()
+        self.assertEqual(results["accepted"], 1)
+        self.assertEqual(list(results["rejections"].keys()),
+                         ["There are not enough compute nodes to meet the required node count of <n> for an allocation of type 'xfs'."])
+
+    def test_simulator_lustre(self):
+        rabbits = TestUtil.storage_inventory(rabbits=4, computes=4)
+        jobs = [self.job(0, 100, 6, ["#DW jobdw type=lustre capacity=10TB name=l"]),
+                self.job(0, 100, 12, ["#DW jobdw type=lustre capacity=10TB name=l"])]
+        results = Simulator(self.settings, rabbits, jobs).run()
+        self.assertEqual(results["accepted"], 1)
+        self.assertGreater(results["storageUtilization"], 0)
+
+    def test_simulator_load_trace(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            trace_file = os.path.join(tmpdir, "trace.json")
+            with open(trace_file, "w") as stream:
+                json.dump({"jobs": [{"arrival": 5, "duration": 1, "directives": "#DW jobdw type=xfs capacity=1GB name=x"},
+                                    {"arrival": 1, "duration": 1, "nodes": 2, "directives": []}]}, stream)
+            jobs = Simulator.load_trace(trace_file)
+            self.assertEqual([job["arrival"] for job in jobs], [1, 5])
+            self.assertEqual(jobs[1]["directives"], ["#DW jobdw type=xfs capacity=1GB name=x"])
+
+            trace_file = os.path.join(tmpdir, "trace.yaml")
+            with open(trace_file, "w") as stream:
+                stream.write("- arrival: 0\n")
+            with self.assertRaises(DWSError):
+                Simulator.load_trace(trace_file)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Sweep unit tests
+
+import os
+import tempfile
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.Allocator import Allocator
+from pkg.Config import Config
+from pkg.Dws import DWSError
+from pkg.Sweep import Sweep
+
+
+class TestSweep(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def setUp(self):
+        self.config = Config(["dwsutil", "-c", "tests/empty.cfg"])
+        self.settings = Allocator.settings_from_config(self.config)
+        self.directives = ["#DW jobdw type=lustre capacity=10TB name=l"]
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_sweep_parse_grid(self):
+        grid = Sweep.parse_grid("ostcount=1,2;noreuse=true,false;strategy=first")
+        self.assertEqual(grid, {"ostcount": [1, 2], "noreuse": [True, False], "strategy": ["first"]})
+        self.assertEqual(len(Sweep.combinations(grid)), 4)
+        self.assertIn("strategy", Sweep.parse_grid(None))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "grid.yaml")
+            with open(path, "w") as stream:
+                stream.write("ostcount: [2, 4]\nostperrabbit: 2\n")
+            self.assertEqual(Sweep.parse_grid(path), {"ostcount": [2, 4], "ostperrabbit": [2]})
+
+        for spec in ["bogus=1", "ostcount", "strategy=nope"]:
+            with self.assertRaises(DWSError):
+                Sweep.parse_grid(spec)
+
+    def test_sweep_rank(self):
+        rabbits = TestUtil.storage_inventory(rabbits=4)
+        grid = Sweep.parse_grid("ostcount=1,2,8")
+        results = Sweep(self.settings, rabbits, self.directives, grid, workers=1).run()
+        self.assertEqual(results["combinations"], 3)
+        self.assertEqual(results["feasible"], 2)
+        ranking = results["ranking"]
+        self.assertEqual([r["rank"] for r in ranking], [1, 2, 3])
+        self.assertFalse(ranking[-1]["feasible"])
+        self.assertEqual(ranking[-1]["settings"], {"ostcount": 8})
+        self.assertLessEqual(ranking[0]["imbalance"], ranking[1]["imbalance"])
+
+    def test_sweep_capacity_enforced(self):
+        # A single 10TB OST only fits an 8TB rabbit by over-committing it
+        rabbits = TestUtil.storage_inventory(rabbits=4, capacity=8 * 10**12)
+        grid = Sweep.parse_grid("ostcount=1,2")
+        results = Sweep(self.settings, rabbits, self.directives, grid, workers=1).run()
+        outcome = {r["settings"]["ostcount"]: r for r in results["ranking"]}
+        self.assertFalse(outcome[1]["feasible"])
+        self.assertTrue(outcome[2]["feasible"])
+        self.assertGreaterEqual(outcome[2]["headroom"], 0)
+
+    def test_sweep_rank_spread(self):
+        # 'first' stacks both file systems on the same rabbits, round robin spreads them
+        rabbits = TestUtil.storage_inventory(rabbits=4)
+        directives = ["#DW jobdw type=lustre capacity=4TB name=a", "#DW jobdw type=lustre capacity=4TB name=b"]
+        grid = Sweep.parse_grid("strategy=first,roundrobin;ostcount=1;noreuse=false")
+        ranking = Sweep(self.settings, rabbits, directives, grid, workers=1).run()["ranking"]
+        self.assertEqual([r["settings"]["strategy"] for r in ranking], ["roundrobin", "first"])
+        self.assertLess(ranking[0]["imbalance"], ranking[1]["imbalance"])
+
+    def test_sweep_process_pool(self):
+        rabbits = TestUtil.storage_inventory(rabbits=4)
+        grid = Sweep.parse_grid("ostcount=1,2;ostperrabbit=1,2")
+        serial = Sweep(self.settings, rabbits, self.directives, grid, workers=1).run()
+        pooled = Sweep(self.settings, rabbits, self.directives, grid, workers=2).run()
+        self.assertEqual(pooled["workers"], 2)
+        self.assertEqual(serial["ranking"], pooled["ranking"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Telemetry unit tests
+
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.Telemetry import Telemetry
+
+
+class TestTelemetry(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.metrics_file = os.path.join(self.tmpdir.name, "metrics.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_metrics(self, rabbits):
+        with open(self.metrics_file, "w") as stream:
+            json.dump({"rabbits": rabbits}, stream)
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_telemetry_scores(self):
+        self.write_metrics({"rabbit-00": {"queueDepth": 10, "bandwidth": 50, "driveHealth": 1.0},
+                            "rabbit-01": {"queueDepth": 5, "bandwidth": 100, "driveHealth": 0.5}})
+        telemetry = Telemetry(self.metrics_file)
+        self.assertEqual(telemetry.score("rabbit-00"), 1.5)
+        self.assertEqual(telemetry.score("rabbit-01"), 2.5)
+        self.assertEqual(telemetry.score("rabbit-99"), 2.0)
+
+    def test_telemetry_invalid(self):
+        self.write_metrics({"rabbit-00": {"queueDepth": 10, "bandwidth": 50},
+                            "rabbit-01": {"queueDepth": "high"},
+                            "rabbit-02": {"queueDepth": None},
+                            "rabbit-03": {"driveHealth": -1},
+                            "rabbit-04": {"bandwidth": True},
+                            "rabbit-05": "busy",
+                            "rabbit-06": {"queueDepth": "5"}})
+        telemetry = Telemetry(self.metrics_file)
+        # Bad rabbits are skipped and scored like rabbits without metrics
+        self.assertEqual(sorted(telemetry.scores()), ["rabbit-00", "rabbit-06"])
+        self.assertEqual(telemetry.score("rabbit-00"), 2.0)
+        self.assertEqual(telemetry.score("rabbit-06"), 0.5)
+        self.assertEqual(telemetry.score("rabbit-01"), 1.25)
+
+        self.write_metrics(["rabbit-00"])
+        self.assertEqual(Telemetry(self.metrics_file).scores(), {})
+
+    def test_telemetry_ttl(self):
+        self.write_metrics({"rabbit-00": {"queueDepth": 1}})
+        telemetry = Telemetry(self.metrics_file, ttl=3600)
+        telemetry.scores()
+        os.remove(self.metrics_file)
+        self.assertEqual(telemetry.score("rabbit-00"), 1.0)
+        self.assertEqual(telemetry.reads, 1)
+
+        # An expired cache that can't be refreshed keeps the old scores
+        telemetry.ttl = 0
+        telemetry._expires = 0
+        self.assertEqual(telemetry.score("rabbit-00"), 1.0)
+        self.assertEqual(Telemetry(self.metrics_file).scores(), {})
+
+    def test_telemetry_unix_socket(self):
+        path = os.path.join(self.tmpdir.name, "metrics.sock")
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(1)
+
+        def serve():
+            conn, _ = server.accept()
+            conn.sendall(json.dumps({"rabbits": {"rabbit-00": {"driveHealth": 0.25}}}).encode("utf-8"))
+            conn.close()
+
+        thread = threading.Thread(target=serve)
+        thread.start()
+        try:
+            self.assertEqual(Telemetry(f"unix:{path}").score("rabbit-00"), 1.5)
+        finally:
+            thread.join()
+            server.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# TopologyCache unit tests
+
+import os
+import tempfile
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.TopologyCache import TopologyCache
+from pkg.crd.Storage import Storage
+
+
+class TestTopologyCache(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.tmpdir.name, "topology.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_topology_cache_refresh(self):
+        cache = TopologyCache(self.cache_file)
+        self.assertEqual(cache.apply(TestUtil.storage_inventory(rabbits=3, computes=2)), 3)
+        cache.save()
+        self.assertTrue(os.path.exists(self.cache_file))
+
+        # Only the Storage whose resourceVersion changed is rebuilt
+        rabbits = TestUtil.storage_inventory(rabbits=3, computes=2)
+        raw = TestUtil.storage_json("rabbit-01", computes=1)
+        raw["metadata"]["resourceVersion"] = "2"
+        rabbits["rabbit-01"] = Storage(raw)
+        cache = TopologyCache(self.cache_file)
+        self.assertEqual(cache.apply(rabbits), 1)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        self.assertEqual([c['name'] for c in rabbits["rabbit-00"].computes], ["rabbit-00-c00", "rabbit-00-c01"])
+        self.assertEqual([c['name'] for c in rabbits["rabbit-01"].computes], ["rabbit-01-c00"])
+
+        # A partial inventory does not prune, a full one does
+        del rabbits["rabbit-02"]
+        cache.apply(rabbits, prune=False)
+        self.assertIn("rabbit-02", cache.load())
+        cache.apply(rabbits)
+        self.assertNotIn("rabbit-02", cache.load())
+
+    def test_topology_cache_unversioned(self):
+        raw = TestUtil.storage_json("rabbit-00", computes=2)
+        del raw["metadata"]["resourceVersion"]
+        cache = TopologyCache(self.cache_file)
+        self.assertEqual(cache.apply({"rabbit-00": Storage(raw)}), 0)
+        cache.save()
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_topology_cache_bad_file(self):
+        with open(self.cache_file, "w") as stream:
+            stream.write("not json")
+        cache = TopologyCache(self.cache_file)
+        self.assertEqual(cache.load(), {})
+        self.assertEqual(cache.apply(TestUtil.storage_inventory(rabbits=2)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
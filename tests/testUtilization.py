@@ -0,0 +1,80 @@
+#
+# Copyright 2021, 2022 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Utilization unit tests
+
+import unittest
+
+from tests.TestUtil import TestUtil
+from pkg.Utilization import Utilization
+
+
+class TestUtilization(unittest.TestCase, TestUtil):
+    # *********************************************
+    # * Class methods
+    # *********************************************
+    @classmethod
+    def setUpClass(cls):
+        TestUtil.setUpClass()
+        pass
+
+    # *********************************************
+    # * Instance methods
+    # *********************************************
+    def servers(self, name, allocations):
+        return {"metadata": {"name": name},
+                "spec": {"allocationSets": [{"label": "xfs", "allocationSize": size,
+                                             "storage": [{"name": rabbit, "allocationCount": count}]}
+                                            for rabbit, size, count in allocations]}}
+
+    # *********************************************
+    # * Test methods
+    # *********************************************
+    def test_utilization_join(self):
+        rabbits = TestUtil.storage_inventory(rabbits=4, computes=2, capacity=1000)
+        servers = [self.servers("w-0", [("rabbit-00", 100, 2), ("rabbit-01", 100, 1)]),
+                   self.servers("w-1", [("rabbit-00", 50, 1), ("rabbit-99", 10, 1)]),
+                   {"metadata": {"name": "w-2"}, "spec": {}}]
+        computes = [{"data": [{"name": "rabbit-00-c00"}, {"name": "rabbit-00-c01"}]},
+                    {"data": [{"name": "rabbit-01-c00"}]}]
+        report = Utilization(rabbits, servers, computes).report()
+
+        r0 = report["rabbits"][0]
+        self.assertEqual((r0["allocatedBytes"], r0["allocationCount"], r0["remaining"], r0["servers"]), (250, 3, 750, 2))
+        self.assertEqual((r0["computes"], r0["computesInUse"]), (2, 2))
+        self.assertEqual(report["rabbits"][1]["computesInUse"], 1)
+        self.assertEqual(report["totals"]["allocatedBytes"], 350)
+        self.assertEqual(report["totals"]["computesInUse"], 3)
+        self.assertEqual(report["unknownRabbits"], {"rabbit-99": 10})
+
+        # rabbit-00's 750 free bytes are stranded behind busy computes
+        self.assertEqual(report["fragmentation"], round(750 / 3650, 4))
+        self.assertGreater(report["skewIndex"], 1)
+
+    def test_utilization_hot_spots(self):
+        rabbits = TestUtil.storage_inventory(rabbits=10, capacity=1000)
+        report = Utilization(rabbits, [self.servers("w-0", [("rabbit-03", 900, 1)])]).report()
+        self.assertEqual(report["hotSpots"], ["rabbit-03"])
+        self.assertEqual(report["fragmentation"], 0.0)
+
+        report = Utilization(rabbits, []).report()
+        self.assertEqual((report["skewIndex"], report["hotSpots"]), (0.0, []))
+
+
+if __name__ == '__main__':
+    unittest.main()